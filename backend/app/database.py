@@ -25,6 +25,81 @@ async def close_db():
         db_instance.client.close()
         print("MongoDB connection closed")
 
+# Deletions recorded for delta sync (delta_sync) are kept this long
+TOMBSTONES_COLLECTION = "sync_tombstones"
+SYNC_TOMBSTONE_TTL_SECONDS = int(os.getenv("SYNC_TOMBSTONE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Indexes backing hot query paths: collection -> [(keys, options)]
+INDEXES = {
+    "viewer_sessions": [
+        # Also the keyset order of the streaming exports (export_service)
+        ([("wedding_id", 1), ("join_time", 1), ("_id", 1)], {}),
+        # Rollup windows select sessions by join or leave time across weddings
+        ([("join_time", 1)], {}),
+        ([("leave_time", 1)], {}),
+    ],
+    "reactions": [
+        ([("created_at", 1)], {}),
+        ([("wedding_id", 1), ("created_at", 1), ("_id", 1)], {}),
+    ],
+    "chat_messages": [
+        ([("created_at", 1)], {}),
+        ([("wedding_id", 1), ("created_at", 1), ("_id", 1)], {}),
+    ],
+    # Raw samples also get a TTL index on timestamp from quality_rollup_service
+    "stream_quality_metrics": [
+        ([("wedding_id", 1), ("timestamp", 1)], {}),
+    ],
+    # Comment threads: keyset pages of top-level comments (parent_comment_id null) and
+    # of each comment's replies; lookups by comment id
+    "comments": [
+        ([("wedding_id", 1), ("parent_comment_id", 1), ("created_at", 1), ("_id", 1)], {}),
+        ([("id", 1)], {}),
+    ],
+    # One like per (comment, user); also answers "which of these comments did I like" ($in)
+    "comment_likes": [
+        ([("comment_id", 1), ("user_id", 1)], {"unique": True}),
+    ],
+    "guest_book": [
+        ([("wedding_id", 1), ("created_at", 1), ("_id", 1)], {}),
+    ],
+    # Delta sync deletions since a cursor; expired by TTL
+    TOMBSTONES_COLLECTION: [
+        ([("wedding_id", 1), ("kind", 1), ("deleted_at", 1)], {}),
+        ([("deleted_at", 1)], {"expireAfterSeconds": SYNC_TOMBSTONE_TTL_SECONDS}),
+    ],
+    # Admin user list / sign-up windows and the weddings list creator $lookup
+    "users": [
+        ([("id", 1)], {}),
+        ([("created_at", -1)], {}),
+    ],
+    "weddings": [
+        ([("created_at", -1)], {}),
+        ([("status", 1), ("created_at", -1)], {}),
+    ],
+    "subscriptions": [
+        ([("created_at", 1)], {}),
+    ],
+    # Per-minute socket reaction counts (reaction_aggregator); the rollup job reads by bucket
+    "reaction_rollups": [
+        ([("wedding_id", 1), ("bucket", 1)], {"unique": True}),
+        ([("bucket", 1)], {}),
+    ],
+    # Range reads of unique-viewer sketches (unique_viewers_service)
+    "viewer_sketches": [
+        ([("scope", 1), ("key", 1), ("granularity", 1), ("bucket", 1)], {}),
+    ],
+}
+
+async def ensure_indexes():
+    """Create the indexes in INDEXES (idempotent, safe on every startup)"""
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                await db_instance.db[collection].create_index(keys, **options)
+            except Exception as e:
+                print(f"⚠️ Failed to create index {keys} on {collection}: {e}")
+
 def get_db():
     """Get database instance"""
     return db_instance.db
@@ -777,6 +777,28 @@ class GuestBookResponse(BaseModel):
     email: Optional[str] = None
     created_at: datetime
 
+# Delta sync (incremental polling) responses - see services/delta_sync.py
+class ChatMessageDelta(BaseModel):
+    items: List[ChatMessageResponse] = []
+    deleted: List[str] = []  # ids removed since the cursor
+    cursor: str  # pass back as `cursor` on the next poll
+    has_more: bool = False
+    reset: bool = False  # cursor expired: items are a fresh snapshot
+
+class ReactionDelta(BaseModel):
+    items: List[ReactionResponse] = []
+    deleted: List[str] = []
+    cursor: str
+    has_more: bool = False
+    reset: bool = False
+
+class GuestBookDelta(BaseModel):
+    items: List[GuestBookResponse] = []
+    deleted: List[str] = []
+    cursor: str
+    has_more: bool = False
+    reset: bool = False
+
 # Comment Models (YouTube-style with threading)
 class CommentCreate(BaseModel):
     wedding_id: str
@@ -794,7 +816,8 @@ class CommentResponse(BaseModel):
     likes_count: int = 0
     replies_count: int = 0
     is_liked_by_user: bool = False  # Populated based on current user
-    replies: List['CommentResponse'] = []  # Nested replies
+    replies: List['CommentResponse'] = []  # Nested replies (a preview on comment lists)
+    replies_cursor: Optional[str] = None  # Resume token for replies after `replies`
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -824,12 +847,29 @@ class ViewerSessionResponse(BaseModel):
     reactions_count: int = 0
 
 class StreamQualityMetric(BaseModel):
-    timestamp: datetime
-    quality: str
+    wedding_id: str
+    session_id: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    quality: Optional[str] = None
+    resolution: Optional[str] = None
     bitrate: int
     fps: int
+    buffering_events: int = 0
+    buffering_duration_ms: int = 0
     dropped_frames: int = 0
 
+class StreamQualityMetricResponse(BaseModel):
+    id: str
+    wedding_id: str
+    session_id: Optional[str] = None
+    resolution: str
+    bitrate: int
+    fps: int
+    buffering_events: int = 0
+    buffering_duration_ms: int = 0
+    dropped_frames: int = 0
+    timestamp: datetime
+
 class EngagementMetrics(BaseModel):
     total_viewers: int
     peak_concurrent_viewers: int
@@ -841,8 +881,12 @@ class EngagementMetrics(BaseModel):
 class AnalyticsDashboard(BaseModel):
     wedding_id: str
     engagement: EngagementMetrics
-    quality_metrics: List[StreamQualityMetric]
-    viewer_sessions: List[ViewerSessionResponse]
+    engagement_metrics: Dict[str, Any] = {}
+    viewer_stats: Dict[str, Any] = {}
+    peak_viewership_timeline: List[Dict[str, Any]] = []
+    timezone_distribution: Dict[str, int] = {}
+    quality_metrics: Dict[str, Any] = {}
+    viewer_sessions: List[ViewerSessionResponse] = []  # Most recent sessions
 
 # Features Models  
 class EmailInvitationCreate(BaseModel):
@@ -982,6 +1026,7 @@ class Album(BaseModel):
     cover_photo_url: Optional[str] = None
     music_url: Optional[str] = None
     slides: List[AlbumSlide] = []
+    slides_count: int = 0
     created_at: datetime
     updated_at: datetime
     created_by: str
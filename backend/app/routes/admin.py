@@ -2,8 +2,17 @@ from fastapi import APIRouter, HTTPException, status, Depends, Query
 from app.models import AdminStats, UserResponse, UserRole, SubscriptionPlan, WeddingResponse, StreamStatus
 from app.auth import get_current_admin
 from app.database import get_db
+from app.services.counter_service import CounterService
+from app.services.live_registry import live_registry
+from app.services.chat_buffer import chat_buffer
+from app.services.ingestion_buffer import analytics_ingest
+from app.services.reaction_aggregator import reaction_aggregator
+from app.services.admin_stats_service import (
+    admin_stats, WEDDING_STATUSES,
+    MONTHLY_PLAN_PRICE, YEARLY_PLAN_PRICE, YEARLY_PLAN_MONTHLY_PRICE
+)
 from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -45,31 +54,16 @@ class AnalyticsData(BaseModel):
 @router.get("/stats", response_model=AdminStats)
 async def get_admin_stats(current_user: dict = Depends(get_current_admin)):
     """Get admin dashboard statistics"""
-    db = get_db()
-    
-    # Count totals
-    total_users = await db.users.count_documents({})
-    total_weddings = await db.weddings.count_documents({})
-    active_streams = await db.weddings.count_documents({"status": "live"})
-    total_subscriptions = await db.subscriptions.count_documents({"status": "active"})
-    
-    # Calculate monthly revenue
-    monthly_subscriptions = await db.subscriptions.count_documents({
-        "plan": "monthly",
-        "status": "active"
-    })
-    yearly_subscriptions = await db.subscriptions.count_documents({
-        "plan": "yearly",
-        "status": "active"
-    })
+    stats = await admin_stats.snapshot(get_db())
+    plans = stats["active_subscriptions_by_plan"]
     
-    monthly_revenue = (monthly_subscriptions * 18) + (yearly_subscriptions * 15)
+    monthly_revenue = (plans.get("monthly", 0) * MONTHLY_PLAN_PRICE) + (plans.get("yearly", 0) * YEARLY_PLAN_MONTHLY_PRICE)
     
     return AdminStats(
-        total_users=total_users,
-        total_weddings=total_weddings,
-        active_streams=active_streams,
-        total_subscriptions=total_subscriptions,
+        total_users=stats["total_users"],
+        total_weddings=stats["total_weddings"],
+        active_streams=stats["weddings_by_status"].get("live", 0),
+        total_subscriptions=stats["active_subscriptions"],
         monthly_revenue=monthly_revenue
     )
 
@@ -99,11 +93,9 @@ async def list_all_users(
     
     result = []
     for user in users:
-        # Count user's weddings
-        total_weddings = await db.weddings.count_documents({"creator_id": user["id"]})
-        
-        # Count user's media
-        total_media = await db.media.count_documents({"uploaded_by": user["id"]})
+        # Wedding and media totals are maintained counters on the user document
+        total_weddings = user.get("weddings_count", 0)
+        total_media = user.get("media_count", 0)
         
         result.append(UserWithDetails(
             id=user["id"],
@@ -132,13 +124,25 @@ async def list_all_weddings(
     if status_filter:
         query["status"] = status_filter
     
-    cursor = db.weddings.find(query).sort("created_at", -1).skip(skip).limit(limit)
-    weddings = await cursor.to_list(length=limit)
+    # Creator details joined in the same query instead of one find_one per wedding
+    pipeline = [
+        {"$match": query},
+        {"$sort": {"created_at": -1}},
+        {"$skip": skip},
+        {"$limit": limit},
+        {"$lookup": {
+            "from": "users",
+            "localField": "creator_id",
+            "foreignField": "id",
+            "pipeline": [{"$project": {"_id": 0, "email": 1, "full_name": 1}}, {"$limit": 1}],
+            "as": "creator",
+        }},
+    ]
+    weddings = await db.weddings.aggregate(pipeline).to_list(length=limit)
     
     result = []
     for wedding in weddings:
-        # Get creator info
-        creator = await db.users.find_one({"id": wedding["creator_id"]})
+        creator = wedding["creator"][0] if wedding["creator"] else None
         
         result.append(WeddingWithCreator(
             id=wedding["id"],
@@ -178,11 +182,18 @@ async def delete_user(
         )
     
     # Delete user's weddings and media
+    media_weddings = await db.media.distinct("wedding_id", {"uploaded_by": user_id})
     await db.weddings.delete_many({"creator_id": user_id})
     await db.media.delete_many({"uploaded_by": user_id})
     await db.subscriptions.delete_many({"user_id": user_id})
     
     await db.users.delete_one({"id": user_id})
+    
+    # Media uploaded to other creators' weddings changes their counters
+    for wedding_id in media_weddings:
+        if await db.weddings.find_one({"id": wedding_id}, {"_id": 1}):
+            await CounterService.reconcile_wedding(wedding_id)
+    admin_stats.invalidate()
     return {"message": "User and all associated data deleted successfully"}
 
 @router.delete("/weddings/{wedding_id}")
@@ -201,48 +212,54 @@ async def delete_wedding_admin(
         )
     
     # Delete associated media
+    uploaders = await db.media.distinct("uploaded_by", {"wedding_id": wedding_id})
     await db.media.delete_many({"wedding_id": wedding_id})
     await db.recordings.delete_many({"wedding_id": wedding_id})
     
     await db.weddings.delete_one({"id": wedding_id})
+    await live_registry.remove(wedding_id)
+    
+    # Bulk deletes bypass the per-item counter updates - recompute affected users
+    for user_id in {wedding["creator_id"], *uploaders}:
+        if user_id:
+            await CounterService.reconcile_user(user_id)
+    admin_stats.invalidate()
     return {"message": "Wedding and all associated data deleted successfully"}
 
+@router.post("/counters/reconcile")
+async def reconcile_counters(current_user: dict = Depends(get_current_admin)):
+    """Recompute denormalized wedding/user/album counters from source collections (admin only)"""
+    repaired = await CounterService.reconcile_all()
+    return {"message": "Counters reconciled", "repaired": repaired}
+
+@router.get("/write-buffers")
+async def get_write_buffer_stats(current_user: dict = Depends(get_current_admin)):
+    """Flush metrics of this worker's write-behind buffers (admin only)"""
+    return {
+        "chat": {**chat_buffer.stats, "pending": chat_buffer.pending},
+        "analytics_ingest": {**analytics_ingest.stats, "pending": analytics_ingest.pending},
+        "reactions": reaction_aggregator.stats,
+    }
+
 @router.get("/revenue", response_model=RevenueStats)
 async def get_revenue_stats(current_user: dict = Depends(get_current_admin)):
     """Get revenue statistics"""
-    db = get_db()
-    
-    # Get all active subscriptions
-    subscriptions = await db.subscriptions.find({"status": "active"}).to_list(None)
-    
-    monthly_revenue = 0
-    yearly_revenue = 0
-    
-    for sub in subscriptions:
-        if sub["plan"] == "monthly":
-            monthly_revenue += 18
-        elif sub["plan"] == "yearly":
-            yearly_revenue += 180
+    stats = await admin_stats.snapshot(get_db())
+    plans = stats["active_subscriptions_by_plan"]
     
+    monthly_revenue = plans.get("monthly", 0) * MONTHLY_PLAN_PRICE
+    yearly_revenue = plans.get("yearly", 0) * YEARLY_PLAN_PRICE
     total_revenue = monthly_revenue + yearly_revenue
     
-    # Revenue by month (last 6 months)
-    revenue_by_month = []
-    for i in range(6):
-        month_start = datetime.utcnow() - timedelta(days=30 * (i + 1))
-        month_end = datetime.utcnow() - timedelta(days=30 * i)
-        
-        month_subs = await db.subscriptions.count_documents({
-            "created_at": {"$gte": month_start, "$lt": month_end}
-        })
-        
-        revenue_by_month.append({
+    # Revenue by month (last 6 months, oldest first)
+    revenue_by_month = [
+        {
             "month": month_start.strftime("%B %Y"),
-            "revenue": month_subs * 18,  # Simplified calculation
-            "subscriptions": month_subs
-        })
-    
-    revenue_by_month.reverse()
+            "revenue": subscriptions * MONTHLY_PLAN_PRICE,  # Simplified calculation
+            "subscriptions": subscriptions
+        }
+        for month_start, subscriptions in zip(stats["window_starts"], stats["subscriptions_per_window"])
+    ]
     
     return RevenueStats(
         total_revenue=total_revenue,
@@ -254,50 +271,25 @@ async def get_revenue_stats(current_user: dict = Depends(get_current_admin)):
 @router.get("/analytics", response_model=AnalyticsData)
 async def get_analytics(current_user: dict = Depends(get_current_admin)):
     """Get analytics data for charts"""
-    db = get_db()
+    stats = await admin_stats.snapshot(get_db())
     
     # User growth (last 6 months)
-    user_growth = []
-    for i in range(6):
-        month_start = datetime.utcnow() - timedelta(days=30 * (i + 1))
-        month_end = datetime.utcnow() - timedelta(days=30 * i)
-        
-        users = await db.users.count_documents({
-            "created_at": {"$gte": month_start, "$lt": month_end}
-        })
-        
-        user_growth.append({
-            "month": month_start.strftime("%b"),
-            "users": users
-        })
-    
-    user_growth.reverse()
+    user_growth = [
+        {"month": month_start.strftime("%b"), "users": users}
+        for month_start, users in zip(stats["window_starts"], stats["users_per_window"])
+    ]
     
     # Wedding stats by status
-    wedding_stats = []
-    for status in ["scheduled", "live", "ended", "recorded"]:
-        count = await db.weddings.count_documents({"status": status})
-        wedding_stats.append({
-            "status": status.capitalize(),
-            "count": count
-        })
+    wedding_stats = [
+        {"status": status.capitalize(), "count": stats["weddings_by_status"].get(status, 0)}
+        for status in WEDDING_STATUSES
+    ]
     
     # Revenue trends (last 6 months)
-    revenue_trends = []
-    for i in range(6):
-        month_start = datetime.utcnow() - timedelta(days=30 * (i + 1))
-        month_end = datetime.utcnow() - timedelta(days=30 * i)
-        
-        subs = await db.subscriptions.count_documents({
-            "created_at": {"$gte": month_start, "$lt": month_end}
-        })
-        
-        revenue_trends.append({
-            "month": month_start.strftime("%b"),
-            "revenue": subs * 18
-        })
-    
-    revenue_trends.reverse()
+    revenue_trends = [
+        {"month": month_start.strftime("%b"), "revenue": subscriptions * MONTHLY_PLAN_PRICE}
+        for month_start, subscriptions in zip(stats["window_starts"], stats["subscriptions_per_window"])
+    ]
     
     return AnalyticsData(
         user_growth=user_growth,
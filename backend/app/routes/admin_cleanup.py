@@ -5,6 +5,7 @@ Provides endpoints to clean up invalid data like placeholder file_ids
 from fastapi import APIRouter, HTTPException, Depends
 from app.auth import get_current_user
 from app.database import get_db
+from app.services.counter_service import CounterService
 from app.utils.file_id_validator import is_valid_telegram_file_id, is_placeholder_file_id
 from datetime import datetime
 import logging
@@ -81,6 +82,7 @@ async def cleanup_placeholder_file_ids(
             if not dry_run:
                 # Delete the media item
                 await db.media.delete_one({"id": media_id})
+                await CounterService.media_removed(wedding_id, media.get("uploaded_by"), media.get("file_size", 0))
                 results["media_collection"]["deleted"] += 1
                 logger.info(f"[CLEANUP] Deleted media {media_id}")
     
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Body
 from app.auth import get_current_user
 from app.database import get_db
+from app.services.counter_service import CounterService
 from app.models import Album, AlbumCreate, AlbumUpdate, AlbumSlide, SlideTransition
 from typing import List
 from datetime import datetime
@@ -37,6 +38,7 @@ async def create_album(album: AlbumCreate, current_user: dict = Depends(get_curr
     )
     
     await db.albums.insert_one(new_album.dict())
+    await CounterService.increment_wedding(album.wedding_id, albums_count=1)
     return new_album
 
 @router.get("/{wedding_id}", response_model=List[Album])
@@ -124,6 +126,8 @@ async def update_album(album_id: str, update: AlbumUpdate, current_user: dict =
     # If slides are being updated, ensure they are converted to dicts if they are objects
     if "slides" in update_data and update_data["slides"]:
         update_data["slides"] = [s.dict() if hasattr(s, "dict") else s for s in update_data["slides"]]
+    if "slides" in update_data:
+        update_data["slides_count"] = len(update_data["slides"] or [])
 
     await db.albums.update_one({"id": album_id}, {"$set": update_data})
     
@@ -140,7 +144,9 @@ async def delete_album(album_id: str, current_user: dict = Depends(get_current_u
     if existing["created_by"] != current_user["user_id"] and current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
         
-    await db.albums.delete_one({"id": album_id})
+    result = await db.albums.delete_one({"id": album_id})
+    if result.deleted_count:
+        await CounterService.increment_wedding(existing["wedding_id"], albums_count=-1)
     return {"success": True}
 
 @router.post("/{album_id}/slides", response_model=Album)
@@ -165,6 +171,7 @@ async def add_slides(album_id: str, media_ids: List[str] = Body(...), current_us
         {"id": album_id}, 
         {
             "$push": {"slides": {"$each": new_slides}},
+            "$inc": {"slides_count": len(new_slides)},
             "$set": {"updated_at": datetime.utcnow()}
         }
     )
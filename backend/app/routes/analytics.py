@@ -1,18 +1,37 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import uuid
 
 from app.models import (
     ViewerSessionCreate, ViewerSessionResponse,
-    StreamQualityMetric, StreamQualityResponse,
+    StreamQualityMetric, StreamQualityMetricResponse,
     EngagementMetrics, AnalyticsDashboard
 )
 from app.database import get_database
+from app.services.analytics_service import AnalyticsService
+from app.services.export_service import (
+    EXPORT_DATASETS, EXPORT_FORMATS, DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE,
+    export_filename, export_query, iter_export_documents, stream_export
+)
+from app.services.ingestion_buffer import analytics_ingest, build_quality_sample
+from app.services.quality_rollup_service import quality_rollups, QUALITY_STAT_FIELDS, DEFAULT_MAX_POINTS
+from app.services.rollup_service import analytics_rollups, GRANULARITY_SECONDS
+from app.services.unique_viewers_service import unique_viewers, PLATFORM_KEY
+from app.utils.cursors import decode_cursor
 from app.auth import get_current_user, get_current_user_optional
 
 router = APIRouter()
 
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Query datetimes may carry an offset; stored times are naive UTC"""
+    if value and value.tzinfo:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
 # ==================== VIEWER SESSIONS ====================
 
 @router.post("/sessions", response_model=ViewerSessionResponse)
@@ -26,15 +45,18 @@ async def create_viewer_session(
     # Generate a unique session ID
     session_id = str(uuid.uuid4())
     
-    # Check if session already exists for this user/wedding
-    existing_session = await db.viewer_sessions.find_one({
-        "wedding_id": session.wedding_id,
-        "user_id": current_user["user_id"] if current_user else None,
-        "leave_time": None
-    })
-    
-    if existing_session:
-        return ViewerSessionResponse(**existing_session)
+    # Reuse an open session for a logged-in user (anonymous viewers can't be told apart)
+    if current_user:
+        existing_session = analytics_ingest.pending_open_session(
+            session.wedding_id, current_user["user_id"]
+        ) or await db.viewer_sessions.find_one({
+            "wedding_id": session.wedding_id,
+            "user_id": current_user["user_id"],
+            "leave_time": None
+        })
+        
+        if existing_session:
+            return ViewerSessionResponse(**existing_session)
     
     # Create new session
     session_doc = {
@@ -52,12 +74,13 @@ async def create_viewer_session(
         "reactions_count": 0
     }
     
-    await db.viewer_sessions.insert_one(session_doc)
+    # Written in the next batch by the ingestion buffer
+    await analytics_ingest.session_started(session_doc)
     
     # Update wedding viewers count
     await db.weddings.update_one(
         {"id": session.wedding_id},
-        {"$inc": {"viewers_count": 1}}
+        {"$inc": {"viewers_count": 1, "viewer_sessions_count": 1}}
     )
     
     return ViewerSessionResponse(**session_doc)
@@ -68,31 +91,34 @@ async def end_viewer_session(session_id: str, wedding_id: str):
     """End a viewer session when someone leaves"""
     db = await get_database()
     
-    session = await db.viewer_sessions.find_one({
-        "session_id": session_id,
-        "wedding_id": wedding_id,
-        "leave_time": None
-    })
-    
-    if not session:
+    # The session may still be sitting in the ingestion buffer
+    session = analytics_ingest.pending_session(wedding_id, session_id)
+    if session is None or "join_time" not in session:
+        # Only a heartbeat/end is buffered (or nothing) - the session itself is stored
+        stored = await db.viewer_sessions.find_one(
+            {"session_id": session_id, "wedding_id": wedding_id, "leave_time": None},
+            {"_id": 0, "join_time": 1}
+        )
+        session = {**stored, **(session or {})} if stored else None
+    
+    if not session or session.get("leave_time"):
         raise HTTPException(status_code=404, detail="Active session not found")
     
     leave_time = datetime.utcnow()
     duration = int((leave_time - session["join_time"]).total_seconds())
     
-    await db.viewer_sessions.update_one(
-        {"session_id": session_id, "wedding_id": wedding_id},
-        {
-            "$set": {
-                "leave_time": leave_time,
-                "duration_seconds": duration
-            }
-        }
-    )
+    await analytics_ingest.session_ended(wedding_id, session_id, leave_time, duration)
     
     return {"message": "Session ended", "duration_seconds": duration}
 
 
+@router.post("/sessions/{session_id}/heartbeat")
+async def viewer_session_heartbeat(session_id: str, wedding_id: str):
+    """Mark a viewer session as still watching (coalesced per session before writing)"""
+    accepted = await analytics_ingest.heartbeat(wedding_id, session_id)
+    return {"status": "ok" if accepted else "dropped"}
+
+
 @router.get("/sessions/{wedding_id}", response_model=List[ViewerSessionResponse])
 async def get_wedding_sessions(
     wedding_id: str,
@@ -118,30 +144,16 @@ async def get_wedding_sessions(
 
 # ==================== STREAM QUALITY ====================
 
-@router.post("/quality", response_model=StreamQualityResponse)
+@router.post("/quality", response_model=StreamQualityMetricResponse)
 async def record_stream_quality(metric: StreamQualityMetric):
     """Record stream quality metrics"""
-    db = await get_database()
+    # Timestamp defaults to now when the client didn't send one
+    metric_doc = build_quality_sample(metric.wedding_id, metric.dict())
     
-    # Use the timestamp from the metric if provided, otherwise use current time
-    timestamp = getattr(metric, 'timestamp', datetime.utcnow())
+    # Written in the next batch by the ingestion buffer
+    await analytics_ingest.quality_sample(metric_doc)
     
-    metric_doc = {
-        "id": str(uuid.uuid4()),
-        "wedding_id": metric.wedding_id,
-        "session_id": getattr(metric, 'session_id', None),
-        "bitrate": metric.bitrate,
-        "resolution": getattr(metric, 'resolution', '720p'),
-        "buffering_events": getattr(metric, 'buffering_events', 0),
-        "buffering_duration_ms": getattr(metric, 'buffering_duration_ms', 0),
-        "fps": metric.fps,
-        "dropped_frames": getattr(metric, 'dropped_frames', 0),
-        "timestamp": timestamp
-    }
-    
-    await db.stream_quality_metrics.insert_one(metric_doc)
-    
-    return StreamQualityResponse(**metric_doc)
+    return StreamQualityMetricResponse(**metric_doc)
 
 
 @router.get("/quality/{wedding_id}")
@@ -160,37 +172,58 @@ async def get_stream_quality_stats(
     if current_user["role"] != "admin" and wedding["creator_id"] != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Aggregate quality metrics
-    pipeline = [
-        {"$match": {"wedding_id": wedding_id}},
-        {
-            "$group": {
-                "_id": None,
-                "avg_bitrate": {"$avg": "$bitrate"},
-                "avg_fps": {"$avg": "$fps"},
-                "total_buffering_events": {"$sum": "$buffering_events"},
-                "total_buffering_duration": {"$sum": "$buffering_duration_ms"},
-                "resolutions": {"$push": "$resolution"}
-            }
-        }
-    ]
+    return await AnalyticsService(db).get_quality_summary(wedding_id)
+
+
+@router.get("/quality/{wedding_id}/timeseries")
+async def get_stream_quality_timeseries(
+    wedding_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_points: int = Query(DEFAULT_MAX_POINTS, ge=3, le=5000),
+    metric: str = "bitrate",
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream quality over time for charts. Picks raw samples, per-minute or
+    per-hour min/avg/max/p95 depending on the range and max_points, and
+    thins the series with LTTB on `metric` when it is still too dense.
+    Defaults to the last 24 hours.
+    """
+    db = await get_database()
     
-    result = await db.stream_quality_metrics.aggregate(pipeline).to_list(length=1)
+    # Verify user is creator or admin
+    wedding = await db.weddings.find_one({"id": wedding_id})
+    if not wedding:
+        raise HTTPException(status_code=404, detail="Wedding not found")
     
-    if not result:
-        return {
-            "avg_bitrate": 0,
-            "avg_fps": 0,
-            "total_buffering_events": 0,
-            "total_buffering_duration": 0,
-            "resolutions": []
-        }
+    if current_user["role"] != "admin" and wedding["creator_id"] != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    if metric not in QUALITY_STAT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {list(QUALITY_STAT_FIELDS)}")
     
-    return result[0]
+    start, end = _naive_utc(start), _naive_utc(end)
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    return await quality_rollups.get_chart(wedding_id, start=start, end=end, max_points=max_points, metric=metric)
 
 
 # ==================== ENGAGEMENT METRICS ====================
 
+def _engagement_from_summary(summary: dict, wedding: dict, unique_viewer_count: int) -> EngagementMetrics:
+    """Build EngagementMetrics from a session summary, the unique-viewer sketch and the wedding's counters"""
+    return EngagementMetrics(
+        total_viewers=summary["total_viewers"],
+        peak_concurrent_viewers=summary["peak_viewers"],
+        average_watch_time_seconds=summary["average_watch_time_seconds"],
+        total_chat_messages=wedding.get("chat_messages_count", 0),
+        total_reactions=wedding.get("reactions_count", 0),
+        unique_viewers=unique_viewer_count
+    )
+
+
 @router.get("/engagement/{wedding_id}", response_model=EngagementMetrics)
 async def get_engagement_metrics(
     wedding_id: str,
@@ -207,57 +240,163 @@ async def get_engagement_metrics(
     if current_user["role"] != "admin" and wedding["creator_id"] != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Get viewer statistics
-    sessions = await db.viewer_sessions.find({"wedding_id": wedding_id}).to_list(length=10000)
+    # All session panels come from one aggregation over viewer_sessions
+    summary = await AnalyticsService(db).get_session_summary(wedding_id, recent_limit=0)
+    unique = await unique_viewers.get_unique_viewers("wedding", wedding_id)
     
-    total_viewers = len(sessions)
+    return _engagement_from_summary(summary, wedding, unique["unique_viewers"])
+
+
+# ==================== CONCURRENT VIEWERS ====================
+
+@router.get("/concurrency/{wedding_id}")
+async def get_concurrency_timeline(
+    wedding_id: str,
+    resolution_seconds: Optional[int] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Exact concurrent viewers over time for a wedding's stream.
+    Each timeline point holds the peak concurrency within the bucket
+    (viewers) and the level at its end (closing). The resolution is
+    widened automatically for long streams.
+    """
+    db = await get_database()
     
-    # Calculate peak viewers
-    if sessions:
-        # Group by 5-minute intervals
-        time_buckets = {}
-        for session in sessions:
-            bucket_time = session["join_time"].replace(second=0, microsecond=0)
-            bucket_time = bucket_time.replace(minute=(bucket_time.minute // 5) * 5)
-            time_buckets[bucket_time] = time_buckets.get(bucket_time, 0) + 1
-        
-        peak_viewers = max(time_buckets.values()) if time_buckets else 0
-        peak_time = max(time_buckets, key=time_buckets.get) if time_buckets else None
-        
-        # Calculate average watch duration
-        durations = [s["duration_seconds"] for s in sessions if s.get("duration_seconds", 0) > 0]
-        avg_duration = sum(durations) / len(durations) if durations else 0
-    else:
-        peak_viewers = 0
-        peak_time = None
-        avg_duration = 0
+    # Verify user is creator or admin
+    wedding = await db.weddings.find_one({"id": wedding_id})
+    if not wedding:
+        raise HTTPException(status_code=404, detail="Wedding not found")
+    
+    if current_user["role"] != "admin" and wedding["creator_id"] != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    if resolution_seconds is not None and resolution_seconds <= 0:
+        raise HTTPException(status_code=400, detail="resolution_seconds must be positive")
+    
+    concurrency = await AnalyticsService(db).get_concurrency(wedding_id, resolution_seconds=resolution_seconds)
+    return {"wedding_id": wedding_id, **concurrency}
+
+
+# ==================== UNIQUE VIEWERS ====================
+
+async def _unique_viewers_response(
+    scope: str,
+    key: str,
+    wedding_ids: Optional[List[str]],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    exact: bool
+) -> dict:
+    start, end = _naive_utc(start), _naive_utc(end)
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    if exact:
+        # Distinct aggregation over the raw sessions - exact, but scans them all
+        count = await unique_viewers.count_exact(wedding_ids, start=start, end=end)
+        return {
+            "scope": scope, "key": key, "start": start, "end": end,
+            "unique_viewers": count, "exact": True, "relative_error": 0.0
+        }
+    return await unique_viewers.get_unique_viewers(scope, key, start=start, end=end)
+
+
+@router.get("/unique-viewers/platform")
+async def get_platform_unique_viewers(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    exact: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """Distinct viewers across all weddings (admin only)"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    # Count chat messages
-    total_chat = await db.chat_messages.count_documents({"wedding_id": wedding_id})
+    return await _unique_viewers_response("platform", PLATFORM_KEY, None, start, end, exact)
+
+
+@router.get("/unique-viewers/creator/{creator_id}")
+async def get_creator_unique_viewers(
+    creator_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    exact: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """Distinct viewers across all of a creator's weddings"""
+    if current_user["role"] != "admin" and creator_id != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Count reactions
-    total_reactions = await db.reactions.count_documents({"wedding_id": wedding_id})
+    wedding_ids = None
+    if exact:
+        db = await get_database()
+        weddings = await db.weddings.find({"creator_id": creator_id}, {"_id": 0, "id": 1}).to_list(length=None)
+        wedding_ids = [w["id"] for w in weddings]
+    return await _unique_viewers_response("creator", creator_id, wedding_ids, start, end, exact)
+
+
+@router.get("/unique-viewers/{wedding_id}")
+async def get_wedding_unique_viewers(
+    wedding_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    exact: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Distinct viewers of a wedding, over the whole stream or [start, end)
+    (rounded out to whole hours, or days for ranges over a week). Served
+    from HyperLogLog sketches: exact up to about a thousand viewers,
+    within about 1% (standard error, see `relative_error`) above that.
+    `exact=true` counts from the raw sessions instead.
+    """
+    db = await get_database()
     
-    # Count guest book entries
-    total_guest_book = await db.guest_book.count_documents({"wedding_id": wedding_id})
+    # Verify user is creator or admin
+    wedding = await db.weddings.find_one({"id": wedding_id})
+    if not wedding:
+        raise HTTPException(status_code=404, detail="Wedding not found")
     
-    # Count photo booth photos
-    total_photo_booth = await db.photo_booth.count_documents({"wedding_id": wedding_id})
+    if current_user["role"] != "admin" and wedding["creator_id"] != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    return await _unique_viewers_response("wedding", wedding_id, [wedding_id], start, end, exact)
+
+
+# ==================== TIME SERIES ====================
+
+@router.get("/timeseries/{wedding_id}")
+async def get_analytics_timeseries(
+    wedding_id: str,
+    granularity: str = "minute",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Per-minute or per-hour viewers (peak concurrent), joins, leaves, watch
+    time, device mix, reactions and chat volume for a wedding.
+    Closed buckets are served from rollups; only the open tail is computed
+    from raw data. Defaults to the last 24 hours.
+    """
+    db = await get_database()
     
-    # Get timezone distribution
-    timezone_distribution = {}
-    for session in sessions:
-        tz = session.get("timezone", "Unknown")
-        timezone_distribution[tz] = timezone_distribution.get(tz, 0) + 1
+    # Verify user is creator or admin
+    wedding = await db.weddings.find_one({"id": wedding_id})
+    if not wedding:
+        raise HTTPException(status_code=404, detail="Wedding not found")
     
-    return EngagementMetrics(
-        total_viewers=total_viewers,
-        peak_concurrent_viewers=peak_viewers,
-        average_watch_time_seconds=avg_duration,
-        total_chat_messages=total_chat,
-        total_reactions=total_reactions,
-        unique_viewers=total_viewers  # Assuming all viewers are unique for now
-    )
+    if current_user["role"] != "admin" and wedding["creator_id"] != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    if granularity not in GRANULARITY_SECONDS:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {list(GRANULARITY_SECONDS)}")
+    
+    start, end = _naive_utc(start), _naive_utc(end)
+    
+    points = await analytics_rollups.get_series(wedding_id, granularity, start=start, end=end)
+    return {"wedding_id": wedding_id, "granularity": granularity, "points": points}
 
 
 # ==================== ANALYTICS DASHBOARD ====================
@@ -278,48 +417,99 @@ async def get_analytics_dashboard(
     if current_user["role"] != "admin" and wedding["creator_id"] != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Get engagement metrics
-    engagement = await get_engagement_metrics(wedding_id, current_user)
-    
-    # Get stream quality stats
-    quality_stats = await get_stream_quality_stats(wedding_id, current_user)
-    
-    # Get viewer stats
-    sessions = await db.viewer_sessions.find({"wedding_id": wedding_id}).to_list(length=10000)
-    
-    active_sessions = [s for s in sessions if s.get("leave_time") is None]
-    completed_sessions = [s for s in sessions if s.get("leave_time") is not None]
+    dashboard = await AnalyticsService(db).get_dashboard(wedding_id)
+    summary = dashboard["sessions"]
+    unique = await unique_viewers.get_unique_viewers("wedding", wedding_id)
     
     viewer_stats = {
-        "total_viewers": len(sessions),
-        "active_viewers": len(active_sessions),
-        "completed_sessions": len(completed_sessions),
-        "avg_duration": sum([s.get("duration_seconds", 0) for s in completed_sessions]) / len(completed_sessions) if completed_sessions else 0
+        "total_viewers": summary["total_viewers"],
+        "active_viewers": summary["active_viewers"],
+        "completed_sessions": summary["completed_sessions"],
+        "avg_duration": summary["avg_duration"]
     }
     
-    # Build peak viewership timeline (15-minute intervals)
-    timeline = []
-    if sessions:
-        time_buckets = {}
-        for session in sessions:
-            bucket_time = session["join_time"].replace(second=0, microsecond=0)
-            bucket_time = bucket_time.replace(minute=(bucket_time.minute // 15) * 15)
-            time_buckets[bucket_time] = time_buckets.get(bucket_time, 0) + 1
-        
-        timeline = [
-            {"time": time, "viewers": count}
-            for time, count in sorted(time_buckets.items())
-        ]
-    
-    # Get timezone distribution
-    timezone_dist = {}
-    for session in sessions:
-        tz = session.get("timezone", "Unknown")
-        timezone_dist[tz] = timezone_dist.get(tz, 0) + 1
+    # Chat, reaction, guest book and photo booth totals are maintained counters
+    engagement_metrics = {
+        "total_viewers": summary["total_viewers"],
+        "peak_viewers": summary["peak_viewers"],
+        "peak_time": summary["peak_time"],
+        "average_watch_time_seconds": summary["average_watch_time_seconds"],
+        "total_chat_messages": wedding.get("chat_messages_count", 0),
+        "total_reactions": wedding.get("reactions_count", 0),
+        "total_guest_book_entries": wedding.get("guest_book_count", 0),
+        "total_photo_booth_photos": wedding.get("photobooth_count", 0)
+    }
     
     return AnalyticsDashboard(
         wedding_id=wedding_id,
-        engagement=engagement,
-        quality_metrics=quality_stats,
-        viewer_sessions=[ViewerSessionResponse(**s) for s in sessions]
+        engagement=_engagement_from_summary(summary, wedding, unique["unique_viewers"]),
+        engagement_metrics=engagement_metrics,
+        viewer_stats=viewer_stats,
+        peak_viewership_timeline=summary["timeline"],
+        timezone_distribution=summary["timezone_distribution"],
+        quality_metrics=dashboard["quality"],
+        viewer_sessions=[ViewerSessionResponse(**s) for s in summary["recent_sessions"]]
+    )
+
+
+# ==================== EXPORTS ====================
+
+@router.get("/export/{wedding_id}/{dataset}")
+async def export_wedding_data(
+    wedding_id: str,
+    dataset: str,
+    fmt: str = Query("csv", alias="format"),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE),
+    after: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    granularity: str = "minute",
+    gzip: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream a wedding's sessions, chat, reactions, guestbook or rollups as
+    CSV or NDJSON. Rows come straight from the database cursor in time
+    order; each carries a `cursor` token - pass the last one received as
+    `after` to resume an interrupted export. `gzip=true` downloads a
+    gzip-compressed file.
+    """
+    db = await get_database()
+    
+    # Verify user is creator or admin
+    wedding = await db.weddings.find_one({"id": wedding_id})
+    if not wedding:
+        raise HTTPException(status_code=404, detail="Wedding not found")
+    
+    if current_user["role"] != "admin" and wedding["creator_id"] != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown export; available: {list(EXPORT_DATASETS)}")
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(EXPORT_FORMATS)}")
+    if dataset == "rollups" and granularity not in GRANULARITY_SECONDS:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {list(GRANULARITY_SECONDS)}")
+    
+    try:
+        resume_after = decode_cursor(after) if after else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    start, end = _naive_utc(start), _naive_utc(end)
+    
+    spec = EXPORT_DATASETS[dataset]
+    query = export_query(
+        spec, wedding_id, start=start, end=end, after=resume_after,
+        granularity=granularity if dataset == "rollups" else None
+    )
+    documents = iter_export_documents(db, spec, query, batch_size=batch_size, limit=limit)
+    
+    media_type = "application/gzip" if gzip else EXPORT_FORMATS[fmt][0]
+    filename = export_filename(wedding_id, dataset, fmt, gzip)
+    return StreamingResponse(
+        stream_export(documents, spec, fmt=fmt, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
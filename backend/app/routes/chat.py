@@ -1,18 +1,51 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 import uuid
 
 from app.models import (
-    ChatMessageCreate, ChatMessageResponse,
-    ReactionCreate, ReactionResponse,
-    GuestBookCreate, GuestBookResponse
+    ChatMessageCreate, ChatMessageResponse, ChatMessageDelta,
+    ReactionCreate, ReactionResponse, ReactionDelta,
+    GuestBookCreate, GuestBookResponse, GuestBookDelta
 )
-from app.database import get_db
+from app.database import get_db, get_database
+from app.services.counter_service import CounterService
+from app.services.chat_buffer import chat_buffer
+from app.services.delta_sync import delta, record_deletion
+from app.services.recent_chat import recent_chat
 from app.auth import get_current_user_optional
+from app.utils.cursors import decode_cursor
 
 router = APIRouter()
 
+# ==================== DELTA SYNC ====================
+
+async def delta_response(kind: str, wedding_id: str, request: Request, response: Response,
+                         cursor: Optional[str], since: Optional[datetime], limit: int):
+    """
+    Incremental poll: what changed after `cursor` (or the `since` time).
+    Answers 304 when nothing changed and If-None-Match carries the cursor.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if after is None and since is not None:
+        # Query datetimes may carry an offset; stored times are naive UTC
+        if since.tzinfo:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        after = {"t": since, "id": None}
+    
+    result = await delta(get_db(), kind, wedding_id, after, limit)
+    
+    etag = f'"{result["cursor"]}"'
+    if not result["items"] and not result["deleted"] and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return result
+
+
 # ==================== CHAT MESSAGES ====================
 
 @router.post("/messages", response_model=ChatMessageResponse)
@@ -34,6 +67,8 @@ async def send_chat_message(
     }
     
     await db.chat_messages.insert_one(message_doc)
+    await recent_chat.add(message_doc)
+    await CounterService.increment_wedding(message.wedding_id, chat_messages_count=1)
     
     # Update viewer session chat count if user is logged in
     if current_user:
@@ -58,13 +93,40 @@ async def get_chat_messages(
     """Get chat messages for a wedding (public access)"""
     db = get_db()
     
+    # The newest messages come from the in-memory recent-chat ring
+    if offset + limit <= recent_chat.size or recent_chat.complete(wedding_id, offset + limit):
+        recent = (await recent_chat.recent(wedding_id))[::-1]
+        if offset + limit <= len(recent) or len(recent) < recent_chat.size:
+            return [ChatMessageResponse(**msg) for msg in recent[offset:offset + limit]]
+    
+    # _id breaks ties between messages sent in the same millisecond
     messages = await db.chat_messages.find(
         {"wedding_id": wedding_id}
-    ).sort("created_at", -1).skip(offset).limit(limit).to_list(length=limit)
+    ).sort([("created_at", -1), ("_id", -1)]).skip(offset).limit(limit).to_list(length=limit)
+    
+    if offset == 0:
+        # Live messages this worker has not written yet come first
+        pending = chat_buffer.pending_messages(wedding_id)
+        written = {msg["_id"] for msg in messages}
+        messages = [msg for msg in reversed(pending) if msg["_id"] not in written] + messages
+        messages = messages[:limit]
     
     return [ChatMessageResponse(**msg) for msg in messages]
 
 
+@router.get("/messages/{wedding_id}/delta", response_model=ChatMessageDelta)
+async def get_chat_messages_delta(
+    wedding_id: str,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = 100
+):
+    """Chat messages sent after a sync cursor, oldest first (public access)"""
+    return await delta_response("chat", wedding_id, request, response, cursor, since, limit)
+
+
 # ==================== REACTIONS ====================
 
 @router.post("/reactions", response_model=ReactionResponse)
@@ -87,6 +149,7 @@ async def send_reaction(
     }
     
     await db.reactions.insert_one(reaction_doc)
+    await CounterService.increment_wedding(reaction.wedding_id, reactions_count=1)
     
     # Update viewer session reactions count
     if current_user:
@@ -117,6 +180,19 @@ async def get_reactions(
     return [ReactionResponse(**r) for r in reactions]
 
 
+@router.get("/reactions/{wedding_id}/delta", response_model=ReactionDelta)
+async def get_reactions_delta(
+    wedding_id: str,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = 100
+):
+    """Reactions sent after a sync cursor, oldest first (public access)"""
+    return await delta_response("reactions", wedding_id, request, response, cursor, since, limit)
+
+
 # ==================== GUEST BOOK ====================
 
 @router.post("/guestbook", response_model=GuestBookResponse)
@@ -140,6 +216,7 @@ async def create_guest_book_entry(entry: GuestBookCreate):
     }
     
     await db.guest_book.insert_one(entry_doc)
+    await CounterService.increment_wedding(entry.wedding_id, guest_book_count=1)
     
     return GuestBookResponse(**entry_doc)
 
@@ -160,6 +237,19 @@ async def get_guest_book_entries(
     return [GuestBookResponse(**e) for e in entries]
 
 
+@router.get("/guestbook/{wedding_id}/delta", response_model=GuestBookDelta)
+async def get_guest_book_delta(
+    wedding_id: str,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = 100
+):
+    """Guest book entries added and removed after a sync cursor (public access)"""
+    return await delta_response("guestbook", wedding_id, request, response, cursor, since, limit)
+
+
 @router.delete("/guestbook/{entry_id}")
 async def delete_guest_book_entry(
     entry_id: str,
@@ -170,9 +260,12 @@ async def delete_guest_book_entry(
         raise HTTPException(status_code=403, detail="Not authorized")
     
     db = await get_database()
-    result = await db.guest_book.delete_one({"id": entry_id})
+    entry = await db.guest_book.find_one_and_delete({"id": entry_id})
     
-    if result.deleted_count == 0:
+    if not entry:
         raise HTTPException(status_code=404, detail="Entry not found")
     
+    await CounterService.increment_wedding(entry["wedding_id"], guest_book_count=-1)
+    await record_deletion(db, "guestbook", entry["wedding_id"], entry["id"])
+    
     return {"message": "Guest book entry deleted successfully"}
@@ -1,46 +1,88 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from typing import List, Optional
 from datetime import datetime
+import asyncio
 import uuid
 
 from app.models import CommentCreate, CommentResponse, CommentLikeRequest, CommentUpdateRequest
 from app.database import get_db
 from app.auth import get_current_user, get_current_user_optional
 from app.services.socket_service import sio
+from app.services.counter_service import CounterService
+from app.services.comment_likes import delete_likes, liked_comment_ids, migrate_comment_likes, toggle_like
+from app.utils.cursors import decode_cursor, encode_cursor, keyset_after
 
 router = APIRouter()
 
 # ==================== COMMENTS API (Full-Featured: Basic + Likes + Threading) ====================
 
-async def build_comment_tree(comments: List[dict], current_user_id: Optional[str] = None):
-    """Build hierarchical comment tree with replies"""
-    # Create a map of comments by ID
-    comment_map = {}
-    root_comments = []
-    
-    for comment in comments:
-        comment_id = comment["id"]
-        # Add is_liked_by_user field
-        liked_by = comment.get("liked_by", [])
-        comment["is_liked_by_user"] = current_user_id in liked_by if current_user_id else False
-        comment["replies"] = []
-        comment_map[comment_id] = comment
-    
-    # Build tree structure
-    for comment in comments:
-        parent_id = comment.get("parent_comment_id")
-        if parent_id and parent_id in comment_map:
-            # This is a reply, add to parent's replies
-            comment_map[parent_id]["replies"].append(comment)
-        else:
-            # This is a root comment
-            root_comments.append(comment)
-    
-    # Sort replies by creation time (oldest first for better reading flow)
-    for comment in comment_map.values():
-        comment["replies"].sort(key=lambda x: x["created_at"])
-    
-    return root_comments
+# Top-level comments are served newest first, replies oldest first (reading order).
+# Both are keyset pages over the (wedding_id, parent_comment_id, created_at, _id)
+# index; a page carries the cursor for the next one in the X-Next-Cursor header.
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Replies embedded in each top-level comment of a page; the rest load per thread
+DEFAULT_REPLY_PREVIEW = 3
+MAX_REPLY_PREVIEW = 10
+
+
+# Legacy liked_by arrays are never needed to serve a comment (likes live in comment_likes)
+COMMENT_PROJECTION = {"liked_by": 0}
+
+
+def comment_to_response(comment: dict) -> dict:
+    """A stored comment with the thread fields of CommentResponse (is_liked_by_user is set by mark_liked)"""
+    comment["is_liked_by_user"] = False
+    comment.setdefault("replies", [])
+    return comment
+
+
+async def mark_liked(comments: List[dict], current_user_id: Optional[str]):
+    """Set is_liked_by_user on a page of comments and their embedded replies with one query"""
+    flat = [*comments, *(reply for comment in comments for reply in comment.get("replies", []))]
+    liked = await liked_comment_ids(get_db(), current_user_id, (comment["id"] for comment in flat))
+    for comment in flat:
+        comment["is_liked_by_user"] = comment["id"] in liked
+
+
+async def fetch_comment_page(query: dict, limit: int, after: Optional[dict] = None,
+                             newest_first: bool = False, skip: int = 0):
+    """One keyset page of comments and the cursor of the page after it (None on the last page)"""
+    db = get_db()
+    direction = -1 if newest_first else 1
+    if after:
+        query = {**query, **keyset_after("created_at", after, descending=newest_first)}
+    cursor = db.comments.find(query, COMMENT_PROJECTION).sort([("created_at", direction), ("_id", direction)])
+    if skip:
+        cursor = cursor.skip(skip)
+    docs = await cursor.limit(limit + 1).to_list(length=limit + 1)
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1]["created_at"], docs[-1]["_id"])
+
+
+async def attach_reply_previews(comments: List[dict], preview: int):
+    """Embed the first `preview` replies of each comment, one indexed query per thread that has replies"""
+    threads = [comment for comment in comments if comment.get("replies_count", 0) > 0]
+    if preview <= 0 or not threads:
+        return
+    pages = await asyncio.gather(*[
+        fetch_comment_page({"wedding_id": comment["wedding_id"], "parent_comment_id": comment["id"]}, preview)
+        for comment in threads
+    ])
+    for comment, (replies, next_cursor) in zip(threads, pages):
+        comment["replies"] = [comment_to_response(reply) for reply in replies]
+        comment["replies_cursor"] = next_cursor
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[dict]:
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("", response_model=CommentResponse)
@@ -78,12 +120,12 @@ async def create_comment(
         "comment": comment.comment,
         "likes_count": 0,
         "replies_count": 0,
-        "liked_by": [],
         "created_at": datetime.utcnow(),
         "updated_at": None
     }
     
     await db.comments.insert_one(comment_doc)
+    await CounterService.increment_wedding(comment.wedding_id, comments_count=1)
     
     # If this is a reply, increment parent's replies_count
     if comment.parent_comment_id:
@@ -97,7 +139,7 @@ async def create_comment(
         await sio.emit('new_comment', {
             'wedding_id': comment.wedding_id,
             'comment': {
-                **comment_doc,
+                **{key: value for key, value in comment_doc.items() if key != '_id'},
                 'created_at': comment_doc['created_at'].isoformat(),
                 'is_liked_by_user': False,
                 'replies': []
@@ -112,31 +154,73 @@ async def create_comment(
 @router.get("", response_model=List[CommentResponse])
 async def get_comments(
     weddingId: str,
-    limit: int = 100,
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
     offset: int = 0,
+    reply_preview: int = DEFAULT_REPLY_PREVIEW,
     current_user: dict = Depends(get_current_user_optional)
 ):
-    """Get all comments for a wedding with threading"""
+    """
+    Get a page of a wedding's top-level comments, newest first, each with a
+    preview of its replies. Pass the X-Next-Cursor header of a page as
+    `cursor` for the next one (`offset` is still accepted but skips rows).
+    """
     db = get_db()
     
     # Verify wedding exists
-    wedding = await db.weddings.find_one({"id": weddingId})
+    wedding = await db.weddings.find_one({"id": weddingId}, {"_id": 0, "id": 1})
     if not wedding:
         raise HTTPException(status_code=404, detail="Wedding not found")
     
-    # Get all comments (not just root - we need all for threading)
-    all_comments = await db.comments.find(
-        {"wedding_id": weddingId}
-    ).sort("created_at", -1).to_list(length=None)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = parse_cursor(cursor)
+    comments, next_cursor = await fetch_comment_page(
+        {"wedding_id": weddingId, "parent_comment_id": None}, limit, after,
+        newest_first=True, skip=0 if after else max(offset, 0)
+    )
     
-    # Build comment tree
-    current_user_id = current_user.get("id") if current_user else None
-    root_comments = await build_comment_tree(all_comments, current_user_id)
+    comments = [comment_to_response(comment) for comment in comments]
+    await attach_reply_previews(comments, min(max(reply_preview, 0), MAX_REPLY_PREVIEW))
+    await mark_liked(comments, current_user.get("user_id") if current_user else None)
     
-    # Apply pagination to root comments only
-    paginated_comments = root_comments[offset:offset + limit]
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [CommentResponse(**comment) for comment in comments]
+
+
+@router.get("/{comment_id}/replies", response_model=List[CommentResponse])
+async def get_comment_replies(
+    comment_id: str,
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    reply_preview: int = 0,
+    current_user: dict = Depends(get_current_user_optional)
+):
+    """
+    Get a page of a comment's replies, oldest first. Pass a comment's
+    `replies_cursor` (or the X-Next-Cursor header of a page) as `cursor`
+    to continue after the replies already shown.
+    """
+    db = get_db()
+    
+    parent = await db.comments.find_one({"id": comment_id}, {"_id": 0, "id": 1, "wedding_id": 1})
+    if not parent:
+        raise HTTPException(status_code=404, detail="Comment not found")
     
-    return [CommentResponse(**comment) for comment in paginated_comments]
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    replies, next_cursor = await fetch_comment_page(
+        {"wedding_id": parent["wedding_id"], "parent_comment_id": comment_id}, limit, parse_cursor(cursor)
+    )
+    
+    replies = [comment_to_response(reply) for reply in replies]
+    await attach_reply_previews(replies, min(max(reply_preview, 0), MAX_REPLY_PREVIEW))
+    await mark_liked(replies, current_user.get("user_id") if current_user else None)
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [CommentResponse(**reply) for reply in replies]
 
 
 @router.post("/{comment_id}/like")
@@ -153,30 +237,10 @@ async def like_comment(
         raise HTTPException(status_code=404, detail="Comment not found")
     
     user_id = current_user["user_id"]
-    liked_by = comment.get("liked_by", [])
     
-    if user_id in liked_by:
-        # Unlike
-        await db.comments.update_one(
-            {"id": comment_id},
-            {
-                "$pull": {"liked_by": user_id},
-                "$inc": {"likes_count": -1}
-            }
-        )
-        liked = False
-        likes_count = comment["likes_count"] - 1
-    else:
-        # Like
-        await db.comments.update_one(
-            {"id": comment_id},
-            {
-                "$addToSet": {"liked_by": user_id},
-                "$inc": {"likes_count": 1}
-            }
-        )
-        liked = True
-        likes_count = comment["likes_count"] + 1
+    # Comments from before the likes collection still carry liked_by
+    await migrate_comment_likes(db, comment)
+    liked, likes_count = await toggle_like(db, comment, user_id)
     
     # Emit real-time event via Socket.IO
     try:
@@ -255,13 +319,18 @@ async def delete_comment(
     if not (is_creator or is_owner):
         raise HTTPException(status_code=403, detail="Not authorized to delete this comment")
     
-    # Delete the comment and all its replies (cascade)
-    await db.comments.delete_many({
+    # Delete the comment and all its replies (cascade), with their likes
+    thread_query = {
         "$or": [
             {"id": comment_id},
             {"parent_comment_id": comment_id}
         ]
-    })
+    }
+    thread_ids = [doc["id"] async for doc in db.comments.find(thread_query, {"_id": 0, "id": 1})]
+    result = await db.comments.delete_many(thread_query)
+    if result.deleted_count:
+        await CounterService.increment_wedding(comment["wedding_id"], comments_count=-result.deleted_count)
+    await delete_likes(db, thread_ids)
     
     # If this was a reply, decrement parent's replies_count
     if comment.get("parent_comment_id"):
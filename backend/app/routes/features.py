@@ -11,6 +11,7 @@ from app.models import (
     PhotoBoothCreate, PhotoBoothResponse
 )
 from app.database import get_database
+from app.services.counter_service import CounterService
 from app.auth import get_current_user, get_current_user_optional
 from app.services.stream_service import create_stream_call
 
@@ -222,6 +223,7 @@ async def create_photo_booth_photo(
         }
         
         await db.photo_booth.insert_one(photo_doc)
+        await CounterService.increment_wedding(photo.wedding_id, photobooth_count=1)
         
         return PhotoBoothResponse(**photo_doc)
     
@@ -267,7 +269,9 @@ async def delete_photo_booth_photo(
     if not (is_owner or is_creator or is_admin):
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    await db.photo_booth.delete_one({"id": photo_id})
+    result = await db.photo_booth.delete_one({"id": photo_id})
+    if result.deleted_count:
+        await CounterService.increment_wedding(photo["wedding_id"], photobooth_count=-1)
     
     return {"message": "Photo deleted successfully"}
 
@@ -5,6 +5,7 @@ Handles separate backgrounds for Layout Page and Stream Page
 from fastapi import APIRouter, HTTPException, status, Depends
 from app.auth import get_current_user
 from app.database import get_db_dependency
+from app.services.wedding_events import wedding_events
 from app.utils.telegram_url_proxy import telegram_file_id_to_proxy_url
 from pydantic import BaseModel
 from typing import Optional
@@ -121,6 +122,9 @@ async def update_wedding_backgrounds(
         
         logger.info(f"[UPDATE_BACKGROUNDS] Successfully updated backgrounds for wedding: {wedding_id}")
         
+        # Viewer pages swap the background without polling the wedding
+        await wedding_events.publish(wedding_id, "layout", {"backgrounds": current_backgrounds})
+        
         return {
             "message": "Backgrounds updated successfully",
             "backgrounds": current_backgrounds
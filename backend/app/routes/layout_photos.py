@@ -7,6 +7,11 @@ from app.auth import get_current_user
 from app.database import get_db_dependency
 from app.services.telegram_service import TelegramCDNService
 from app.utils.file_id_validator import validate_and_log_file_id, is_valid_telegram_file_id
+from app.services.layout_photo_migration import (
+    LAYOUT_PHOTOS_PROJECTION,
+    LAYOUT_PHOTOS_VERSION,
+    ensure_layout_photos
+)
 from app.layout_schemas import (
     get_layout_schema,
     validate_photo_placeholder,
@@ -130,6 +135,9 @@ async def upload_photo_to_placeholder(
                 detail={"error": "Not authorized to upload photos for this wedding"}
             )
         
+        # Legacy weddings get their cover_photos migrated before we modify layout_photos
+        wedding["layout_photos"] = await ensure_layout_photos(db, wedding)
+        
         # Step 2: Get layout ID and validate placeholder
         layout_id = wedding.get("theme_settings", {}).get("layout_id") or wedding.get("theme_settings", {}).get("theme_id") or "layout_1"
         logger.info(f"[LAYOUT_PHOTO_UPLOAD] Layout ID: {layout_id}")
@@ -275,6 +283,7 @@ async def upload_photo_to_placeholder(
             {"id": wedding_id},
             {"$set": {
                 "layout_photos": layout_photos,
+                "layout_photos_version": LAYOUT_PHOTOS_VERSION,
                 "updated_at": datetime.utcnow()
             }}
         )
@@ -339,9 +348,10 @@ async def get_layout_photos(
     Get all layout photos for a wedding (public access)
     FIXED: Read from layout_photos field directly, not from cover_photos
     FIXED: Return proxy URLs instead of direct Telegram URLs to avoid CORS issues
+    Legacy cover_photos are converted and written back once, on the first read
     """
     try:
-        wedding = await db.weddings.find_one({"id": wedding_id})
+        wedding = await db.weddings.find_one({"id": wedding_id}, LAYOUT_PHOTOS_PROJECTION)
         if not wedding:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -350,56 +360,8 @@ async def get_layout_photos(
         
         layout_id = wedding.get("theme_settings", {}).get("layout_id") or wedding.get("theme_settings", {}).get("theme_id") or "layout_1"
         
-        # Get photos from layout_photos field (NEW location)
-        layout_photos = wedding.get("layout_photos", {})
-        
-        # If no layout_photos but has cover_photos (legacy), migrate data
-        if not layout_photos:
-            cover_photos = wedding.get("theme_settings", {}).get("cover_photos", [])
-            
-            # Convert cover_photos array to placeholder-based structure
-            layout_photos = {}
-            
-            for photo in cover_photos:
-                if isinstance(photo, dict):
-                    category = photo.get("category", "general")
-                    url = photo.get("url", "")
-                    media_id = photo.get("media_id", "")
-                    file_id = photo.get("file_id", "")  # Get actual Telegram file_id
-                    
-                    # Map categories to placeholder names
-                    placeholder_name = None
-                    if category == "bride":
-                        placeholder_name = "bridePhoto"
-                    elif category == "groom":
-                        placeholder_name = "groomPhoto"
-                    elif category == "couple":
-                        placeholder_name = "couplePhoto"
-                    elif category == "moment":
-                        placeholder_name = "preciousMoments"
-                    elif category == "studio":
-                        placeholder_name = "studioImage"
-                    
-                    if placeholder_name and (url or file_id):
-                        # Handle arrays for precious moments
-                        if placeholder_name == "preciousMoments":
-                            if placeholder_name not in layout_photos:
-                                layout_photos[placeholder_name] = []
-                            layout_photos[placeholder_name].append({
-                                "url": url,
-                                "file_id": file_id,  # CRITICAL: Include file_id
-                                "media_id": media_id,
-                                "photo_id": media_id or str(uuid.uuid4()),
-                                "type": photo.get("type", "photo")
-                            })
-                        else:
-                            layout_photos[placeholder_name] = {
-                                "url": url,
-                                "file_id": file_id,  # CRITICAL: Include file_id
-                                "media_id": media_id,
-                                "photo_id": media_id or str(uuid.uuid4()),
-                                "type": photo.get("type", "photo")
-                            }
+        # Migrated weddings are served straight from layout_photos
+        layout_photos = await ensure_layout_photos(db, wedding)
         
         # Filter photos based on supported placeholders
         supported_placeholders = get_supported_photo_placeholders(layout_id)
@@ -502,7 +464,7 @@ async def delete_photo_from_placeholder(
                 detail={"error": "Not authorized to delete photos for this wedding"}
             )
         
-        layout_photos = wedding.get("layout_photos", {})
+        layout_photos = await ensure_layout_photos(db, wedding)
         
         if placeholder not in layout_photos:
             raise HTTPException(
@@ -576,6 +538,7 @@ async def delete_photo_from_placeholder(
             {"id": wedding_id},
             {"$set": {
                 "layout_photos": layout_photos,
+                "layout_photos_version": LAYOUT_PHOTOS_VERSION,
                 "updated_at": datetime.utcnow()
             }}
         )
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Header
+from fastapi.responses import StreamingResponse
+from typing import Optional
 from app.database import get_db
 from app.auth import get_current_user
 from app.services.live_status_service import LiveStatusService
+from app.services.wedding_events import wedding_events
 from app.services.recording_service import RecordingService
 from app.services.telegram_service import TelegramCDNService
 import logging
@@ -276,6 +279,36 @@ async def get_live_status(wedding_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/weddings/{wedding_id}/events")
+async def stream_wedding_events(
+    wedding_id: str,
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Server-Sent Events for viewer pages (public endpoint)
+    
+    Events:
+    - status: live status changes (same fields as /live/status); sent first
+      as a snapshot unless resuming with Last-Event-ID
+    - camera: the active camera was switched
+    - layout: theme settings or page backgrounds changed
+    """
+    # Position before the snapshot: anything published after it is replayed on top
+    mark = wedding_events.mark(wedding_id)
+    status_data = await LiveStatusService(get_db()).get_live_status(wedding_id)
+    if not status_data.pop("success", False):
+        raise HTTPException(
+            status_code=404,
+            detail=status_data.get("error", "Wedding not found")
+        )
+    
+    return StreamingResponse(
+        wedding_events.stream(wedding_id, status_data, mark, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # Live Controls API endpoints (for test compatibility)
 
 @router.get("/live-controls/{wedding_id}")
@@ -7,6 +7,7 @@ from app.auth import get_current_user
 from app.database import get_db
 from app.services.telegram_service import TelegramCDNService
 from app.services.storage_service import StorageService
+from app.services.counter_service import CounterService
 from app.plan_restrictions import check_upload_allowed
 from app.utils.file_id_validator import validate_and_log_file_id, is_valid_telegram_file_id
 from typing import List, Optional
@@ -279,6 +280,7 @@ async def complete_chunked_upload(
         }
         
         await db.media.insert_one(media)
+        await CounterService.media_added(media["wedding_id"], current_user["user_id"], result["file_size"])
         
         # Update user's storage usage
         await storage_service.add_file_to_storage(current_user["user_id"], result["file_size"])
@@ -441,6 +443,7 @@ async def upload_photo(
         }
         
         await db.media.insert_one(media)
+        await CounterService.media_added(wedding_id, current_user["user_id"], result["file_size"])
         logger.info(f"[UPLOAD] Media saved to database with id={media_id}")
         
         # Update user's storage usage
@@ -586,6 +589,7 @@ async def upload_video(
         }
         
         await db.media.insert_one(media)
+        await CounterService.media_added(media["wedding_id"], current_user["user_id"], result["file_size"])
         
         # Update user's storage usage
         await storage_service.add_file_to_storage(current_user["user_id"], result["file_size"])
@@ -804,6 +808,7 @@ async def delete_media(media_id: str, current_user: dict = Depends(get_current_u
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to delete media from database"
             )
+        await CounterService.media_removed(media["wedding_id"], media.get("uploaded_by", user_id), file_size)
         
         # Update storage usage (Task 5.3)
         if file_size > 0:
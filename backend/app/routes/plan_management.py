@@ -83,8 +83,8 @@ async def get_plan_info(current_user: dict = Depends(get_current_user)):
     # Check if upgrade banner should be shown
     show_banner, banner_message = should_show_upgrade_banner(user)
     
-    # Count user's weddings
-    weddings_count = await db.weddings.count_documents({"creator_id": user["id"]})
+    # User's weddings (maintained counter)
+    weddings_count = user.get("weddings_count", 0)
     
     return {
         "plan": plan,
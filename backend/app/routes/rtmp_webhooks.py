@@ -3,7 +3,8 @@ from app.database import get_db
 from app.services.recording_service import RecordingService
 from app.services.telegram_service import TelegramCDNService
 from app.services.live_status_service import LiveStatusService
-from app.services.ffmpeg_composition import start_composition
+from app.services.live_registry import live_registry
+from app.services.ffmpeg_composition import start_composition, composition_service
 from datetime import datetime
 import re
 import logging
@@ -68,6 +69,8 @@ async def on_publish(request: Request, background_tasks: BackgroundTasks):
             # Find the camera object
             cameras = wedding.get("multi_cameras", [])
             camera = next((c for c in cameras if c["stream_key"] == stream_key), None)
+            # Inputs of the composition, so switching between them needs no restart
+            live_cameras = [c for c in cameras if c.get("status") in ("live", "connected")]
             
             if camera:
                 # If no active camera is set, make this one active
@@ -83,14 +86,22 @@ async def on_publish(request: Request, background_tasks: BackgroundTasks):
                     if not camera.get("hls_url"):
                         camera["hls_url"] = f"/hls/{stream_key}.m3u8"
                         
-                    background_tasks.add_task(start_composition, wedding_id, camera)
+                    background_tasks.add_task(start_composition, wedding_id, camera, live_cameras)
                 
                 # If this IS the active camera (e.g. reconnected), restart composition
                 elif wedding.get("active_camera_id") == camera["camera_id"]:
                     logger.info(f"🔄 Active camera {camera['camera_id']} reconnected - restarting composition")
                     if not camera.get("hls_url"):
                          camera["hls_url"] = f"/hls/{stream_key}.m3u8"
-                    background_tasks.add_task(start_composition, wedding_id, camera)
+                    background_tasks.add_task(start_composition, wedding_id, camera, live_cameras)
+                
+                # Another camera joined: add it as an input once its playlist is out, so cutting to it is seamless
+                elif wedding_id in composition_service.active_processes:
+                    active_camera = next((c for c in cameras if c["camera_id"] == wedding.get("active_camera_id")), None)
+                    if active_camera:
+                        logger.info(f"➕ Adding camera {camera['camera_id']} to the composition")
+                        background_tasks.add_task(composition_service.add_input, wedding_id, active_camera, camera,
+                                                  live_cameras)
             
             return {"status": "success", "type": "camera", "wedding_id": wedding_id}
 
@@ -114,6 +125,8 @@ async def on_publish(request: Request, background_tasks: BackgroundTasks):
         
         if not result.get("success"):
             logger.error(f"[RTMP_PUBLISH] Failed to start stream: {result.get('error')}")
+            # Resync the registry in case it diverged from the stored session
+            await live_registry.refresh(wedding_id, db)
             return {"status": "error", "message": result.get("error")}
         
         # Start recording in background if needed
@@ -180,6 +193,10 @@ async def on_publish_done(request: Request, background_tasks: BackgroundTasks):
             if camera_wedding.get("active_camera_id"):
                 cameras = camera_wedding.get("multi_cameras", [])
                 camera = next((c for c in cameras if c["stream_key"] == stream_key), None)
+                remaining_cameras = [
+                    c for c in cameras
+                    if c["stream_key"] != stream_key and c.get("status") in ("live", "connected")
+                ]
                 
                 if camera and camera["camera_id"] == camera_wedding.get("active_camera_id"):
                     logger.warning(f"⚠️ Active camera {camera['camera_id']} went offline!")
@@ -200,12 +217,19 @@ async def on_publish_done(request: Request, background_tasks: BackgroundTasks):
                         if not fallback_camera.get("hls_url"):
                              fallback_camera["hls_url"] = f"/hls/{fallback_camera['stream_key']}.m3u8"
                         
-                        background_tasks.add_task(start_composition, wedding_id, fallback_camera)
+                        background_tasks.add_task(start_composition, wedding_id, fallback_camera, remaining_cameras)
                     else:
                         # No fallback? We might just let composition die or explicitly stop it
                         # For now, let's stop it to be safe
-                        from app.services.ffmpeg_composition import composition_service
                         await composition_service.stop_composition(wedding_id)
+                
+                # An input that ends stops the camera selectors: drop it from the composition
+                elif camera and composition_service.has_input(wedding_id, camera["camera_id"]):
+                    active_camera = next((c for c in remaining_cameras
+                                          if c["camera_id"] == camera_wedding.get("active_camera_id")), None)
+                    if active_camera:
+                        logger.info(f"➖ Removing camera {camera['camera_id']} from the composition")
+                        background_tasks.add_task(start_composition, wedding_id, active_camera, remaining_cameras)
             
             return {"status": "success", "type": "camera", "wedding_id": wedding_id}
 
@@ -224,6 +248,7 @@ async def on_publish_done(request: Request, background_tasks: BackgroundTasks):
         live_session = wedding.get("live_session", {})
         if live_session.get("status") == "ended":
             logger.info(f"[RTMP_DONE] Wedding {wedding_id} already ended, ignoring")
+            await live_registry.refresh(wedding_id, db)
             return {"status": "already_ended", "wedding_id": wedding_id}
         
         # Transition to PAUSED (not ended)
@@ -235,6 +260,7 @@ async def on_publish_done(request: Request, background_tasks: BackgroundTasks):
         
         if not result.get("success"):
             logger.error(f"[RTMP_DONE] Failed to pause stream: {result.get('error')}")
+            await live_registry.refresh(wedding_id, db)
             return {"status": "error", "message": result.get("error")}
         
         # TODO: Notify viewers
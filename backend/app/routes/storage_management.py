@@ -199,12 +199,12 @@ async def get_wedding_storage_breakdown(
             detail="You don't have permission to view this wedding's storage"
         )
     
-    # Calculate storage for this wedding
-    media_items = await db.media_gallery.find({"wedding_id": wedding_id}).to_list(None)
-    total_media_size = sum(item.get("file_size", 0) for item in media_items)
+    # Calculate storage for this wedding from maintained counters
+    media_count = wedding.get("media_count", 0)
+    total_media_size = wedding.get("media_bytes", 0)
     
-    photobooth = await db.photo_booth.find({"wedding_id": wedding_id}).to_list(None)
-    total_photobooth_size = sum(photo.get("file_size", 0) for photo in photobooth)
+    photobooth_count = wedding.get("photobooth_count", 0)
+    total_photobooth_size = 0  # Photo booth photos are stored as URLs, not uploaded bytes
     
     recording_size = wedding.get("recording_size", 0)
     
@@ -219,12 +219,12 @@ async def get_wedding_storage_breakdown(
             "media_gallery": {
                 "size": total_media_size,
                 "size_formatted": format_bytes(total_media_size),
-                "count": len(media_items)
+                "count": media_count
             },
             "photo_booth": {
                 "size": total_photobooth_size,
                 "size_formatted": format_bytes(total_photobooth_size),
-                "count": len(photobooth)
+                "count": photobooth_count
             },
             "recording": {
                 "size": recording_size,
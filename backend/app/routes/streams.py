@@ -7,6 +7,9 @@ from app.models import (
 from app.auth import get_current_user
 from app.database import get_db
 from app.services.stream_service import StreamService
+from app.services.live_registry import live_registry
+from app.services.wedding_events import wedding_events
+from app.services.viewer_tokens import viewer_tokens
 from typing import List, Dict
 from pydantic import BaseModel
 from datetime import datetime
@@ -55,12 +58,16 @@ async def camera_control_ws(websocket: WebSocket, wedding_id: str):
 
 @router.get("/live", response_model=List[StreamResponse])
 async def get_live_streams():
-    """Get all currently live streams"""
+    """Get all currently live streams (served from the in-memory live registry)"""
     try:
-        db = get_db()
+        if not live_registry.loaded:
+            await live_registry.reconcile(get_db())
         
-        cursor = db.weddings.find({"status": StreamStatus.LIVE.value})
-        weddings = await cursor.to_list(length=100)
+        weddings = sorted(
+            live_registry.list_live(),
+            key=lambda w: w.get("started_at") or datetime.min,
+            reverse=True
+        )[:100]
         
         return [
             StreamResponse(
@@ -115,6 +122,7 @@ async def start_stream(
         {"id": wedding_id},
         {"$set": {"status": StreamStatus.LIVE.value, "started_at": datetime.utcnow()}}
     )
+    await live_registry.refresh(wedding_id, db)
     
     # Trigger webhook
     try:
@@ -203,6 +211,7 @@ async def stop_stream(
         {"id": wedding_id},
         {"$set": {"status": StreamStatus.ENDED.value, "ended_at": datetime.utcnow()}}
     )
+    await live_registry.refresh(wedding_id, db)
     
     # Auto-stop recording if active
     try:
@@ -753,10 +762,11 @@ async def switch_camera(
         }
     )
     
-    # Update FFmpeg composition
+    # Update FFmpeg composition: a live switch if it already has this camera as an input
     try:
-        from app.services.ffmpeg_composition import update_composition
-        await update_composition(wedding_id, camera)
+        from app.services.ffmpeg_composition import switch_camera
+        live_cameras = [c for c in cameras if c.get("status") in ("live", "connected")]
+        await switch_camera(wedding_id, camera, live_cameras)
     except Exception as e:
         logger.error(f"Failed to update composition: {e}")
         # Don't fail the request, just log
@@ -768,6 +778,14 @@ async def switch_camera(
     except Exception as e:
         logger.error(f"Failed to broadcast switch: {e}")
     
+    # Notify viewer pages via SSE
+    await wedding_events.publish(wedding_id, "camera", {
+        "camera_id": camera_id,
+        "camera_name": camera.get("name"),
+        "hls_url": camera.get("hls_url"),
+        "switched_at": switch_event["switched_at"]
+    })
+    
     return {"status": "success", "active_camera": camera}
 
 @router.get("/camera/{wedding_id}/active")
@@ -879,7 +897,7 @@ async def generate_livekit_token(
     try:
         db = get_db()
         
-        wedding = await db.weddings.find_one({"id": wedding_id})
+        wedding = await db.weddings.find_one({"id": wedding_id}, {"_id": 0, "creator_id": 1})
         if not wedding:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -900,9 +918,6 @@ async def generate_livekit_token(
                     detail="Only wedding creator can be host"
                 )
         
-        # Generate token using Pulse service
-        stream_service = StreamService()
-        
         # Determine permissions based on role
         can_publish = role in ["host", "camera"]
         can_subscribe = True  # Everyone can subscribe (watch)
@@ -910,6 +925,27 @@ async def generate_livekit_token(
         room_name = f"wedding_{wedding_id}"
         participant_id = f"{role}_{current_user['user_id']}_{uuid.uuid4().hex[:8]}"
         
+        if not can_publish:
+            # Viewer joins: minted locally or served from the per-wedding cache
+            token_result = await viewer_tokens.get_token(
+                room_name=room_name,
+                role=role,
+                participant_name=participant_name,
+                participant_id=participant_id,
+                metadata={"wedding_id": wedding_id, "user_id": current_user["user_id"]}
+            )
+            return {
+                "token": token_result["token"],
+                "server_url": token_result["server_url"],
+                "room_name": room_name,
+                "expires_at": token_result["expires_at"],
+                "participant_id": token_result["participant_id"],
+                "role": role
+            }
+        
+        # Generate token using Pulse service
+        stream_service = StreamService()
+        
         token_result = await stream_service.pulse_service.generate_stream_token(
             room_name=room_name,
             participant_name=participant_name,
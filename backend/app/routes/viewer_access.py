@@ -9,6 +9,7 @@ from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 from app.services.wedding_data_mapper import WeddingDataMapper
+from app.services.layout_photo_migration import ensure_layout_photos
 from app.utils.telegram_url_proxy import telegram_url_to_proxy, telegram_file_id_to_proxy_url
 import re
 import logging
@@ -124,8 +125,8 @@ async def join_wedding_by_code(request: WeddingAccessRequest):
             branding=None
         )
     
-    # Count media items
-    media_count = await db.media_gallery.count_documents({"wedding_id": wedding["id"]})
+    # Media count is a maintained counter on the wedding document
+    media_count = wedding.get("media_count", 0)
     
     # Get creator's branding if exists
     branding = await db.branding_settings.find_one({"user_id": wedding["creator_id"]})
@@ -180,23 +181,26 @@ async def get_wedding_media(wedding_id: str, skip: int = 0, limit: int = 50):
             detail="This wedding is locked. Creator needs to upgrade to Premium to unlock."
         )
     
-    # Get media items
-    media_items = await db.media_gallery.find(
+    # Get media items and the maintained count
+    media_items = await db.media.find(
         {"wedding_id": wedding_id}
-    ).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    ).sort("uploaded_at", -1).skip(skip).limit(limit).to_list(limit)
     
-    total_count = await db.media_gallery.count_documents({"wedding_id": wedding_id})
+    total_count = wedding.get("media_count", 0)
     
     return {
         "wedding_id": wedding_id,
         "media": [
             {
                 "id": item["id"],
-                "type": item["type"],
-                "url": item["url"],
+                "type": item.get("media_type"),
+                "url": (
+                    item.get("youtube_url") if item.get("media_type") == "youtube_video"
+                    else telegram_file_id_to_proxy_url(item.get("file_id"))
+                ),
                 "thumbnail_url": item.get("thumbnail_url"),
                 "caption": item.get("caption"),
-                "created_at": item["created_at"],
+                "created_at": item.get("uploaded_at"),
                 "file_size": item.get("file_size", 0)
             }
             for item in media_items
@@ -227,14 +231,14 @@ async def get_wedding_complete_view(wedding_id: str):
     
     is_locked = wedding.get("is_locked", False)
     
-    # Get media count and recent items
-    media_count = await db.media_gallery.count_documents({"wedding_id": wedding_id})
-    recent_media = await db.media_gallery.find(
+    # Get media count (maintained counter) and recent items
+    media_count = wedding.get("media_count", 0)
+    recent_media = await db.media.find(
         {"wedding_id": wedding_id}
-    ).sort("created_at", -1).limit(12).to_list(12)
+    ).sort("uploaded_at", -1).limit(12).to_list(12)
     
-    # Get photo booth count
-    photobooth_count = await db.photo_booth.count_documents({"wedding_id": wedding_id})
+    # Get photo booth count (maintained counter)
+    photobooth_count = wedding.get("photobooth_count", 0)
     
     # Get creator branding
     branding = await db.branding_settings.find_one({"user_id": wedding["creator_id"]})
@@ -317,8 +321,8 @@ async def get_wedding_complete_view(wedding_id: str):
         theme_settings = clean_invalid_telegram_urls(theme_settings)
         logger.info(f"[VIEWER] Cleaned theme_settings for wedding {wedding_id}")
     
-    # Get layout photos for the public view
-    layout_photos = wedding.get("layout_photos", {})
+    # Get layout photos for the public view (migrating legacy cover_photos on first read)
+    layout_photos = await ensure_layout_photos(db, wedding)
     
     # Convert layout_photos URLs to proxy URLs to avoid CORS issues
     def convert_to_proxy_url(photo_data):
@@ -397,8 +401,11 @@ async def get_wedding_complete_view(wedding_id: str):
             "recent_items": [
                 {
                     "id": item["id"],
-                    "type": item["type"],
-                    "url": item["url"],
+                    "type": item.get("media_type"),
+                    "url": (
+                        item.get("youtube_url") if item.get("media_type") == "youtube_video"
+                        else telegram_file_id_to_proxy_url(item.get("file_id"))
+                    ),
                     "thumbnail_url": item.get("thumbnail_url"),
                     "caption": item.get("caption")
                 }
@@ -10,6 +10,9 @@ from app.models import (
 from app.auth import get_current_user, get_current_creator, get_current_user_optional
 from app.database import get_db
 from app.services.stream_service import StreamService
+from app.services.counter_service import CounterService
+from app.services.live_registry import live_registry
+from app.services.wedding_events import wedding_events
 from app.utils import generate_short_code
 from app.utils.telegram_url_proxy import telegram_url_to_proxy, telegram_file_id_to_proxy_url
 from datetime import datetime
@@ -328,6 +331,7 @@ async def create_wedding(
     }
     
     await db.weddings.insert_one(wedding)
+    await CounterService.increment_user(current_user["user_id"], weddings_count=1)
     
     # Get creator info
     creator = await db.users.find_one({"id": current_user["user_id"]})
@@ -741,6 +745,8 @@ async def list_my_weddings(current_user: dict = Depends(get_current_user)):
                     "description": wedding.get("description"),
                     "creator_id": str(wedding.get("creator_id", "")),
                     "viewers_count": int(wedding.get("viewers_count", 0)),
+                    "media_count": int(wedding.get("media_count", 0)),
+                    "comments_count": int(wedding.get("comments_count", 0)),
                     "is_locked": bool(wedding.get("is_locked", False))
                 }
                 weddings.append(wedding_data)
@@ -1086,7 +1092,10 @@ async def delete_wedding(
             detail="Not authorized to delete this wedding"
         )
     
-    await db.weddings.delete_one({"id": wedding_id})
+    result = await db.weddings.delete_one({"id": wedding_id})
+    if result.deleted_count:
+        await CounterService.increment_user(wedding["creator_id"], weddings_count=-1)
+        await live_registry.remove(wedding_id)
     
     return {"message": "Wedding deleted successfully"}
 
@@ -1363,6 +1372,9 @@ async def update_wedding_theme_settings(
             detail=f"Error saving theme settings: {str(e)}"
         )
     
+    # Viewer pages apply the new layout without reloading the wedding
+    await wedding_events.publish(wedding_id, "layout", {"theme_settings": validated_theme.model_dump()})
+    
     return validated_theme
 
 
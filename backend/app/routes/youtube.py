@@ -3,6 +3,7 @@ from app.models import UserResponse
 from app.auth import get_current_user
 from app.database import get_db
 from app.services.youtube_service import YouTubeService
+from app.services.counter_service import CounterService
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 from datetime import datetime, timedelta
@@ -715,6 +716,7 @@ async def save_youtube_video_to_media(
         }
         
         await db.media.insert_one(media_doc)
+        await CounterService.media_added(wedding_id, current_user["user_id"])
         
         logger.info(f"✅ Saved YouTube video {broadcast_id} to media gallery for wedding {wedding_id}")
         
@@ -0,0 +1,133 @@
+"""
+Admin Stats Service
+Admin dashboard statistics (/admin/stats, /admin/revenue, /admin/analytics)
+computed with one aggregation per collection instead of a chain of
+count_documents calls.
+
+    users          totals from collection metadata, sign-ups per 30-day
+                   window with one $bucket over the created_at index
+    weddings       one $group by status
+    subscriptions  one $facet: active subscriptions per plan and new
+                   subscriptions per 30-day window
+
+The three run concurrently and the combined snapshot is cached for
+ADMIN_STATS_CACHE_SECONDS; concurrent requests for an expired snapshot
+share a single recomputation.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ADMIN_STATS_CACHE_SECONDS = float(os.getenv("ADMIN_STATS_CACHE_SECONDS", "5"))
+
+# Reported windows: the last GROWTH_WINDOWS periods of WINDOW_DAYS each
+GROWTH_WINDOWS = 6
+WINDOW_DAYS = 30
+
+WEDDING_STATUSES = ["scheduled", "live", "ended", "recorded"]
+
+# Plan prices used for the revenue figures
+MONTHLY_PLAN_PRICE = 18
+YEARLY_PLAN_PRICE = 180
+YEARLY_PLAN_MONTHLY_PRICE = 15
+
+
+def window_edges(now: datetime, windows: int = GROWTH_WINDOWS, days: int = WINDOW_DAYS) -> List[datetime]:
+    """Window boundaries, oldest first: windows + 1 datetimes ending at now"""
+    return [now - timedelta(days=days * (windows - i)) for i in range(windows + 1)]
+
+
+def bucket_by_window(field: str, edges: List[datetime]) -> List[Dict]:
+    """Stages counting documents per [edges[i], edges[i + 1]) window of field"""
+    return [
+        {"$match": {field: {"$gte": edges[0], "$lt": edges[-1]}}},
+        {"$bucket": {"groupBy": f"${field}", "boundaries": edges, "output": {"count": {"$sum": 1}}}},
+    ]
+
+
+def subscriptions_pipeline(edges: List[datetime]) -> List[Dict]:
+    return [
+        {"$facet": {
+            "active_by_plan": [
+                {"$match": {"status": "active"}},
+                {"$group": {"_id": "$plan", "count": {"$sum": 1}}},
+            ],
+            "by_window": bucket_by_window("created_at", edges),
+        }},
+    ]
+
+
+def counts_per_window(buckets: List[Dict], edges: List[datetime]) -> List[int]:
+    """$bucket output as a count per window (windows without documents are omitted by $bucket)"""
+    counts = {bucket["_id"]: bucket["count"] for bucket in buckets}
+    return [counts.get(start, 0) for start in edges[:-1]]
+
+
+class AdminStatsService:
+    """Cached admin dashboard snapshot"""
+
+    def __init__(self, cache_seconds: float = ADMIN_STATS_CACHE_SECONDS):
+        self.cache_seconds = cache_seconds
+        self._snapshot: Optional[Dict] = None
+        self._expires_at = 0.0
+        self._refresh: Optional[asyncio.Future] = None
+
+    async def snapshot(self, db) -> Dict:
+        """The current snapshot, recomputed at most once per cache period"""
+        if self._snapshot is not None and time.monotonic() < self._expires_at:
+            return self._snapshot
+        if self._refresh is None:
+            self._refresh = asyncio.ensure_future(self._recompute(db))
+        refresh = self._refresh
+        try:
+            return await asyncio.shield(refresh)
+        finally:
+            if self._refresh is refresh and refresh.done():
+                self._refresh = None
+
+    def invalidate(self):
+        self._expires_at = 0.0
+
+    async def _recompute(self, db) -> Dict:
+        snapshot = await self.compute(db)
+        self._snapshot = snapshot
+        self._expires_at = time.monotonic() + self.cache_seconds
+        return snapshot
+
+    @staticmethod
+    async def compute(db, now: Optional[datetime] = None) -> Dict:
+        """Run the per-collection aggregations concurrently and combine them"""
+        now = now or datetime.utcnow()
+        edges = window_edges(now)
+
+        total_users, total_weddings, user_buckets, wedding_groups, subscription_facets = await asyncio.gather(
+            db.users.estimated_document_count(),
+            db.weddings.estimated_document_count(),
+            db.users.aggregate(bucket_by_window("created_at", edges)).to_list(length=None),
+            db.weddings.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]).to_list(length=None),
+            db.subscriptions.aggregate(subscriptions_pipeline(edges)).to_list(length=1),
+        )
+
+        subscriptions = subscription_facets[0] if subscription_facets else {}
+        active_by_plan = {group["_id"]: group["count"] for group in subscriptions.get("active_by_plan", [])}
+        return {
+            "computed_at": now,
+            "window_starts": edges[:-1],
+            "total_users": total_users,
+            "total_weddings": total_weddings,
+            "weddings_by_status": {group["_id"]: group["count"] for group in wedding_groups},
+            "active_subscriptions_by_plan": active_by_plan,
+            "active_subscriptions": sum(active_by_plan.values()),
+            "users_per_window": counts_per_window(user_buckets, edges),
+            "subscriptions_per_window": counts_per_window(subscriptions.get("by_window", []), edges),
+        }
+
+
+# Singleton instance
+admin_stats = AdminStatsService()
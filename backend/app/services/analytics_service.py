@@ -0,0 +1,315 @@
+"""
+Analytics Service
+Server-side aggregation of viewer session and stream quality analytics.
+
+The per-session panels of the engagement and dashboard endpoints (totals,
+watch time, timezone distribution, recent sessions) are computed by a
+single $facet pipeline, so the sessions are read once per request and
+never truncated. Peak viewers and the viewership timeline come from the
+pre-aggregated rollups (see rollup_service), with raw data only for the
+still-open tail.
+
+Concurrent viewers are computed exactly with a sweep line: each session
+becomes a +1 event at join_time and a -1 event at leave_time (open
+sessions have no leave event and count until now). MongoDB sorts the
+events (O(n log n), spilling to disk if needed) and ConcurrencySweep
+walks the cursor once, keeping only the running count and the timeline.
+"""
+
+import asyncio
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_BUCKET_MINUTES = 15
+# Streams longer than this get an hourly dashboard timeline
+MINUTE_TIMELINE_MAX_SPAN = timedelta(days=2)
+RECENT_SESSIONS_LIMIT = 100
+
+# Concurrency timeline resolution; widened automatically to stay under the point cap
+DEFAULT_CONCURRENCY_RESOLUTION_SECONDS = 60
+MAX_CONCURRENCY_POINTS = 1440
+EPOCH = datetime(1970, 1, 1)
+CONCURRENCY_RESOLUTION_STEPS = [1, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 21600, 43200, 86400]
+
+
+def session_summary_pipeline(
+    wedding_id: str,
+    recent_limit: int = RECENT_SESSIONS_LIMIT,
+) -> List[Dict]:
+    """Single-pass pipeline computing every viewer-session panel for a wedding"""
+    # Missing and null leave_time both mean the session is still open
+    is_open = {"$eq": [{"$ifNull": ["$leave_time", None]}, None]}
+    has_duration = {"$gt": ["$duration_seconds", 0]}
+
+    facets = {
+        "totals": [
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "active": {"$sum": {"$cond": [is_open, 1, 0]}},
+                "completed_duration": {
+                    "$sum": {"$cond": [is_open, 0, {"$ifNull": ["$duration_seconds", 0]}]}
+                },
+                "watched_sessions": {"$sum": {"$cond": [has_duration, 1, 0]}},
+                "watched_duration": {"$sum": {"$cond": [has_duration, "$duration_seconds", 0]}},
+                "first_join": {"$min": "$join_time"},
+            }}
+        ],
+        "timezones": [
+            {"$group": {"_id": {"$ifNull": ["$timezone", "Unknown"]}, "count": {"$sum": 1}}},
+        ],
+    }
+    if recent_limit > 0:
+        facets["recent"] = [
+            {"$sort": {"join_time": -1}},
+            {"$limit": recent_limit},
+            {"$project": {"_id": 0}},
+        ]
+
+    return [
+        {"$match": {"wedding_id": wedding_id}},
+        {"$facet": facets},
+    ]
+
+
+def summarize_session_facets(facets: Dict[str, List[Dict]]) -> Dict[str, Any]:
+    """Flatten the $facet output into the panel values the endpoints return"""
+    totals = facets["totals"][0] if facets.get("totals") else {}
+    total = totals.get("total", 0)
+    active = totals.get("active", 0)
+    completed = total - active
+    watched_sessions = totals.get("watched_sessions", 0)
+
+    return {
+        "total_viewers": total,
+        "active_viewers": active,
+        "completed_sessions": completed,
+        # Average over completed sessions (dashboard viewer_stats)
+        "avg_duration": totals.get("completed_duration", 0) / completed if completed else 0,
+        # Average over sessions with a recorded duration (engagement)
+        "average_watch_time_seconds": (
+            totals.get("watched_duration", 0) / watched_sessions if watched_sessions else 0
+        ),
+        "first_join": totals.get("first_join"),
+        "timezone_distribution": {row["_id"]: row["count"] for row in facets.get("timezones", [])},
+        "recent_sessions": facets.get("recent", []),
+    }
+
+
+def concurrency_events_pipeline(wedding_id: str) -> List[Dict]:
+    """Join/leave events of a wedding's sessions, sorted for a sweep (leaves before joins on ties)"""
+    is_open = {"$eq": [{"$ifNull": ["$leave_time", None]}, None]}
+    return [
+        {"$match": {"wedding_id": wedding_id, "join_time": {"$ne": None}}},
+        {"$project": {
+            "_id": 0,
+            "events": {"$concatArrays": [
+                [{"t": "$join_time", "d": 1}],
+                {"$cond": [
+                    is_open,
+                    [],
+                    # Clamp bad data where leave_time precedes join_time
+                    [{"t": {"$max": ["$leave_time", "$join_time"]}, "d": -1}]
+                ]},
+            ]},
+        }},
+        {"$unwind": "$events"},
+        {"$replaceRoot": {"newRoot": "$events"}},
+        {"$sort": {"t": 1, "d": 1}},
+    ]
+
+
+def floor_time(time: datetime, seconds: int) -> datetime:
+    """Floor a naive UTC datetime to a multiple of `seconds` since the epoch"""
+    step = timedelta(seconds=seconds)
+    return EPOCH + ((time - EPOCH) // step) * step
+
+
+def pick_concurrency_resolution(span: timedelta, requested: Optional[int] = None,
+                                max_points: int = MAX_CONCURRENCY_POINTS) -> int:
+    """Smallest resolution step >= requested that keeps the timeline under max_points"""
+    requested = requested or DEFAULT_CONCURRENCY_RESOLUTION_SECONDS
+    needed = max(requested, math.ceil(span.total_seconds() / max_points))
+    for step in CONCURRENCY_RESOLUTION_STEPS:
+        if step >= needed:
+            return step
+    return needed
+
+
+class ConcurrencySweep:
+    """
+    Streaming sweep over time-sorted (time, delta) events.
+
+    Tracks the exact peak and, when a resolution is given, a timeline of
+    fixed-width buckets starting at `start`. Each bucket holds the maximum
+    concurrency reached in it ("viewers"), the level at its end ("closing")
+    and the viewer-seconds watched in it ("watch_seconds"). Memory is
+    O(buckets), independent of the number of events.
+    """
+
+    def __init__(self, start: Optional[datetime] = None, resolution_seconds: Optional[int] = None):
+        self.start = start
+        self.resolution = timedelta(seconds=resolution_seconds) if resolution_seconds else None
+        self.current = 0
+        self.peak = 0
+        self.peak_time: Optional[datetime] = None
+        self.timeline: List[Dict[str, Any]] = []
+        self._bucket_index = 0
+        self._bucket_max = 0
+        self._bucket_seconds = 0.0
+        self._bucket_has_events = False
+        self._last_time: Optional[datetime] = None
+
+    def _integrate(self, until: datetime):
+        """Accumulate viewer-seconds at the current level up to `until`"""
+        if self._last_time is not None and until > self._last_time:
+            self._bucket_seconds += self.current * (until - self._last_time).total_seconds()
+        self._last_time = until
+
+    def _close_buckets_until(self, index: int, until: Optional[datetime] = None):
+        while self._bucket_index < index:
+            bucket_start = self.start + self._bucket_index * self.resolution
+            bucket_end = bucket_start + self.resolution
+            self._integrate(min(bucket_end, until) if until else bucket_end)
+            self.timeline.append({
+                "time": bucket_start,
+                "viewers": self._bucket_max,
+                "closing": self.current,
+                "watch_seconds": round(self._bucket_seconds, 3),
+            })
+            self._bucket_index += 1
+            self._bucket_max = self.current
+            self._bucket_seconds = 0.0
+            self._bucket_has_events = False
+
+    def add(self, time: datetime, delta: int):
+        if self.resolution is not None:
+            self._close_buckets_until((time - self.start) // self.resolution)
+            self._bucket_has_events = True
+        self._integrate(time)
+        self.current += delta
+        if self.current > self._bucket_max:
+            self._bucket_max = self.current
+        if self.current > self.peak:
+            self.peak = self.current
+            self.peak_time = time
+
+    def finish(self, end: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Close every bucket that starts before `end` (plus the bucket of the
+        last event) and return the result. Watch time is only counted up to
+        `end`, so a partial trailing bucket is not padded.
+        """
+        if self.resolution is not None and end is not None:
+            index = math.ceil((end - self.start) / self.resolution)
+            if self._bucket_has_events:
+                index = max(index, self._bucket_index + 1)
+            self._close_buckets_until(index, until=end)
+        return {
+            "peak_concurrent_viewers": self.peak,
+            "peak_time": self.peak_time,
+            "current_viewers": self.current,
+            "timeline": self.timeline,
+        }
+
+
+class AnalyticsService:
+    """Aggregation-backed analytics queries"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def get_session_summary(self, wedding_id: str, recent_limit: int = RECENT_SESSIONS_LIMIT) -> Dict[str, Any]:
+        """All viewer-session panels for a wedding, including the exact peak and timeline"""
+        from app.services.rollup_service import analytics_rollups, merge_points
+
+        pipeline = session_summary_pipeline(wedding_id, recent_limit=recent_limit)
+        result = await self.db.viewer_sessions.aggregate(pipeline).to_list(length=1)
+        summary = summarize_session_facets(result[0] if result else {})
+
+        series = []
+        first_join = summary["first_join"]
+        if first_join is not None:
+            granularity = "minute" if datetime.utcnow() - first_join <= MINUTE_TIMELINE_MAX_SPAN else "hour"
+            series = await analytics_rollups.get_series(wedding_id, granularity, start=first_join)
+
+        # Per-minute peaks are exact, so their maximum is the exact overall peak
+        peak = max(series, key=lambda point: point["viewers"], default=None)
+        summary["peak_viewers"] = peak["viewers"] if peak else 0
+        summary["peak_time"] = peak["bucket"] if peak and peak["viewers"] else None
+
+        timeline_seconds = TIMELINE_BUCKET_MINUTES * 60 if series and granularity == "minute" else 3600
+        summary["timeline"] = [
+            {"time": point["bucket"], "viewers": point["viewers"], "joins": point["joins"]}
+            for point in merge_points(series, timeline_seconds)
+        ]
+        return summary
+
+    async def get_concurrency(
+        self,
+        wedding_id: str,
+        resolution_seconds: Optional[int] = None,
+        include_timeline: bool = True,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """Exact peak and concurrency-over-time for a wedding's viewer sessions"""
+        now = now or datetime.utcnow()
+        sweep = ConcurrencySweep()
+        end = None
+
+        if include_timeline:
+            bounds = await self.db.viewer_sessions.aggregate([
+                {"$match": {"wedding_id": wedding_id, "join_time": {"$ne": None}}},
+                {"$group": {
+                    "_id": None,
+                    "first_join": {"$min": "$join_time"},
+                    "last_join": {"$max": "$join_time"},
+                    "last_leave": {"$max": "$leave_time"},
+                    "open_sessions": {"$sum": {"$cond": [
+                        {"$eq": [{"$ifNull": ["$leave_time", None]}, None]}, 1, 0
+                    ]}},
+                }},
+            ]).to_list(length=1)
+
+            if bounds:
+                bounds = bounds[0]
+                # Open sessions are still watching, so the stream extends to now
+                end = max(t for t in (bounds["last_join"], bounds["last_leave"]) if t is not None)
+                if bounds["open_sessions"]:
+                    end = max(end, now)
+                resolution_seconds = pick_concurrency_resolution(end - bounds["first_join"], resolution_seconds)
+                sweep = ConcurrencySweep(floor_time(bounds["first_join"], resolution_seconds), resolution_seconds)
+
+        cursor = self.db.viewer_sessions.aggregate(
+            concurrency_events_pipeline(wedding_id), allowDiskUse=True, batchSize=5000
+        )
+        async for event in cursor:
+            sweep.add(event["t"], event["d"])
+
+        result = sweep.finish(end)
+        if include_timeline:
+            result["resolution_seconds"] = resolution_seconds
+            result["start"] = sweep.start
+            result["end"] = end
+        else:
+            result.pop("timeline")
+        return result
+
+    async def get_quality_summary(self, wedding_id: str) -> Dict[str, Any]:
+        """Aggregated stream quality statistics for a wedding"""
+        # Raw samples expire; hour rollups plus the open tail cover the whole stream
+        from app.services.quality_rollup_service import quality_rollups
+
+        return await quality_rollups.get_summary(wedding_id)
+
+    async def get_dashboard(self, wedding_id: str) -> Dict[str, Any]:
+        """Session and quality panels, queried concurrently"""
+        sessions, quality = await asyncio.gather(
+            self.get_session_summary(wedding_id),
+            self.get_quality_summary(wedding_id),
+        )
+        return {"sessions": sessions, "quality": quality}
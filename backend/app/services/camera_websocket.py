@@ -1,52 +1,124 @@
+"""
+Camera Control WebSockets
+Pushes camera-switch and room status events to the clients connected to
+/ws/camera-control/{wedding_id}.
 
-from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, Set
+A broadcast serializes the event once and queues the text on every
+connection of the wedding; it never waits on a client. Each connection has
+its own writer task that sends from a bounded queue
+(CAMERA_WS_SEND_QUEUE messages), so clients are written to concurrently
+and one slow or half-dead client cannot hold up the others. A client is
+dropped (and its socket closed) when its queue overflows or a single send
+takes longer than CAMERA_WS_SEND_TIMEOUT_SECONDS.
+"""
+
+from fastapi import WebSocket
+from typing import Dict, Optional
+import asyncio
 import logging
 import json
+import os
 
 logger = logging.getLogger(__name__)
 
+SEND_QUEUE_SIZE = int(os.getenv("CAMERA_WS_SEND_QUEUE", "32"))
+SEND_TIMEOUT_SECONDS = float(os.getenv("CAMERA_WS_SEND_TIMEOUT_SECONDS", "5"))
+# Closing a dropped client must not hang on the same dead connection
+CLOSE_TIMEOUT_SECONDS = 1.0
+
+
+class CameraConnection:
+    """One client: its bounded send queue and the task draining it"""
+
+    def __init__(self, ws: WebSocket, queue_size: int):
+        self.ws = ws
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+
+
 class CameraWebSocketManager:
-    def __init__(self):
-        # wedding_id -> Set[WebSocket]
-        self.connections: Dict[str, Set[WebSocket]] = {}
-    
+    def __init__(self, queue_size: int = SEND_QUEUE_SIZE, send_timeout: float = SEND_TIMEOUT_SECONDS):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        # wedding_id -> {WebSocket: CameraConnection}
+        self.connections: Dict[str, Dict[WebSocket, CameraConnection]] = {}
+        self.stats = {"broadcasts": 0, "messages_sent": 0, "dropped_clients": 0}
+
     async def connect(self, ws: WebSocket, wedding_id: str):
         await ws.accept()
-        if wedding_id not in self.connections:
-            self.connections[wedding_id] = set()
-        self.connections[wedding_id].add(ws)
+        connection = CameraConnection(ws, self.queue_size)
+        connection.task = asyncio.create_task(self._writer(connection, wedding_id))
+        self.connections.setdefault(wedding_id, {})[ws] = connection
         logger.info(f"Client connected to camera control for wedding {wedding_id}")
-    
+
     def disconnect(self, ws: WebSocket, wedding_id: str):
-        if wedding_id in self.connections:
-            self.connections[wedding_id].remove(ws)
-            if not self.connections[wedding_id]:
-                del self.connections[wedding_id]
+        connection = self.connections.get(wedding_id, {}).pop(ws, None)
+        if wedding_id in self.connections and not self.connections[wedding_id]:
+            del self.connections[wedding_id]
+        if connection is None:
+            # Already dropped as a slow consumer
+            return
+        if connection.task is not None and connection.task is not asyncio.current_task():
+            connection.task.cancel()
         logger.info(f"Client disconnected from camera control for wedding {wedding_id}")
-    
+
+    async def broadcast_to_wedding(self, wedding_id: str, message: dict) -> int:
+        """Queue an event for every client of a wedding; returns how many got it"""
+        connections = self.connections.get(wedding_id)
+        if not connections:
+            return 0
+        self.stats["broadcasts"] += 1
+        text = json.dumps(message, default=str)
+        queued = 0
+        for connection in list(connections.values()):
+            try:
+                connection.queue.put_nowait(text)
+                queued += 1
+            except asyncio.QueueFull:
+                logger.warning(f"Camera control client for wedding {wedding_id} is {self.queue_size} "
+                               f"messages behind, dropping it")
+                self._drop(connection, wedding_id)
+        return queued
+
     async def broadcast_camera_switch(self, wedding_id: str, camera: dict):
         """Notify all connected clients of camera switch"""
-        if wedding_id in self.connections:
-            message = {
-                "event": "camera_switched",
-                "camera_id": camera.get("camera_id"),
-                "camera_name": camera.get("name"),
-                "stream_key": camera.get("stream_key"),
-                "hls_url": camera.get("hls_url"), # Make sure this is populated
-                "status": "live"
-            }
-            
-            to_remove = []
-            for ws in self.connections[wedding_id]:
-                try:
-                    await ws.send_json(message)
-                except Exception as e:
-                    logger.warning(f"Error sending to WS: {e}")
-                    to_remove.append(ws)
-            
-            for ws in to_remove:
-                self.disconnect(ws, wedding_id)
+        await self.broadcast_to_wedding(wedding_id, {
+            "event": "camera_switched",
+            "camera_id": camera.get("camera_id"),
+            "camera_name": camera.get("name"),
+            "stream_key": camera.get("stream_key"),
+            "hls_url": camera.get("hls_url"), # Make sure this is populated
+            "status": "live"
+        })
+
+    async def _writer(self, connection: CameraConnection, wedding_id: str):
+        """Send a client's queued messages, one at a time, each with a timeout"""
+        while True:
+            text = await connection.queue.get()
+            try:
+                await asyncio.wait_for(connection.ws.send_text(text), timeout=self.send_timeout)
+                self.stats["messages_sent"] += 1
+            except asyncio.TimeoutError:
+                logger.warning(f"Camera control send timed out after {self.send_timeout}s "
+                               f"for wedding {wedding_id}, dropping client")
+                self._drop(connection, wedding_id)
+                return
+            except Exception as e:
+                logger.warning(f"Error sending to WS: {e}")
+                self._drop(connection, wedding_id)
+                return
+
+    def _drop(self, connection: CameraConnection, wedding_id: str):
+        self.stats["dropped_clients"] += 1
+        self.disconnect(connection.ws, wedding_id)
+        asyncio.ensure_future(self._close(connection.ws))
+
+    async def _close(self, ws: WebSocket):
+        try:
+            # 1013: try again later - the client should reconnect
+            await asyncio.wait_for(ws.close(code=1013), timeout=CLOSE_TIMEOUT_SECONDS)
+        except Exception:
+            pass
 
 # Singleton instance
 ws_manager = CameraWebSocketManager()
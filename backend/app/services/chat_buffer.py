@@ -0,0 +1,204 @@
+"""
+Live Chat Write Buffer
+Write-behind persistence for chat messages sent over Socket.IO.
+
+Messages are broadcast as soon as they arrive and written to `chat_messages`
+in batches: one insert_many when CHAT_FLUSH_MAX_MESSAGES are pending or
+every CHAT_FLUSH_INTERVAL_SECONDS, plus one bulk $inc of the weddings'
+chat_messages_count counters.
+
+Documents get their id, _id and created_at when they are buffered, in
+arrival order, so history sorted by (created_at, _id) shows each wedding's
+messages in the order they were sent no matter how batches are written.
+Because _id is fixed up front, re-sending a batch after a failed flush
+cannot store a message twice: copies that made it the first time are
+rejected as duplicate keys.
+
+Backpressure: once CHAT_MAX_PENDING messages are buffered producers wait
+for a flush; if it could not make room the message is rejected (the
+sender's ack reports it) rather than silently lost. A batch that fails is
+put back at the head of the buffer and retried on the next flush.
+
+Call start(db) from lifespan and stop() on shutdown - stop() flushes.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = float(os.getenv("CHAT_FLUSH_INTERVAL_SECONDS", "0.5"))
+FLUSH_MAX_MESSAGES = int(os.getenv("CHAT_FLUSH_MAX_MESSAGES", "200"))
+MAX_PENDING = int(os.getenv("CHAT_MAX_PENDING", "10000"))
+
+
+def build_chat_message(wedding_id: str, message: str, guest_name: Optional[str] = None,
+                       user_id: Optional[str] = None) -> Dict:
+    """chat_messages document, in the shape the REST endpoints write"""
+    created_at = datetime.utcnow()
+    return {
+        "_id": ObjectId(),
+        "id": str(uuid.uuid4()),
+        "wedding_id": wedding_id,
+        "user_id": user_id,
+        "guest_name": guest_name,
+        "message": message,
+        "created_at": created_at,
+        "timestamp": created_at.isoformat(),
+    }
+
+
+class ChatWriteBuffer:
+    """Batched write-behind buffer for chat_messages"""
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL_SECONDS,
+                 flush_max_messages: int = FLUSH_MAX_MESSAGES, max_pending: int = MAX_PENDING):
+        self.flush_interval = flush_interval
+        self.flush_max_messages = flush_max_messages
+        self.max_pending = max_pending
+        self._db = None
+        self._pending: List[Dict] = []
+        # Handed to insert_many but not yet acknowledged
+        self._inflight: List[Dict] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "messages": 0,
+            "messages_written": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "rejected_writes": 0,
+            "duplicate_writes": 0,
+            "dropped": 0,
+            "largest_batch": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    # ---- producers ----
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def add(self, message_doc: Dict) -> bool:
+        """Buffer a message for writing; False if it was rejected under backpressure"""
+        if self.pending >= self.max_pending:
+            # Backpressure: the caller waits for the buffer to drain
+            await self.flush()
+            if self.pending >= self.max_pending:
+                self.stats["dropped"] += 1
+                return False
+        self._pending.append(message_doc)
+        self.stats["messages"] += 1
+        if self.pending >= self.flush_max_messages and self._task is not None:
+            self._flush_requested.set()
+        return True
+
+    def pending_messages(self, wedding_id: str) -> List[Dict]:
+        """Buffered (not yet written) messages of a wedding, oldest first"""
+        return [doc for doc in (*self._inflight, *self._pending) if doc["wedding_id"] == wedding_id]
+
+    # ---- flushing ----
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns the number of messages written"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, []
+            self._inflight = batch
+
+            db = self._db
+            if db is None:
+                from app.database import get_db
+                db = get_db()
+
+            started = time.perf_counter()
+            rejected, duplicates = set(), set()
+            try:
+                await db.chat_messages.insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                # Duplicates are copies from a retried batch that were written the first time
+                duplicates = {error["index"] for error in errors if error.get("code") == 11000}
+                failures = [error for error in errors if error.get("code") != 11000]
+                rejected = {error["index"] for error in failures}
+                self.stats["duplicate_writes"] += len(duplicates)
+                if rejected:
+                    self.stats["rejected_writes"] += len(rejected)
+                    logger.warning(f"[CHAT] {len(rejected)} of {len(batch)} messages rejected: "
+                                   f"{failures[0].get('errmsg')}")
+            except Exception as e:
+                self.stats["failed_flushes"] += 1
+                logger.error(f"[CHAT] Flush failed, {len(batch)} messages re-queued: {e}")
+                self._pending = batch + self._pending
+                return 0
+            finally:
+                self._inflight = []
+
+            # Only messages this insert wrote are counted
+            skipped = rejected | duplicates
+            written = len(batch) - len(skipped)
+            per_wedding = Counter(doc["wedding_id"] for i, doc in enumerate(batch) if i not in skipped)
+            try:
+                if per_wedding:
+                    await db.weddings.bulk_write([
+                        UpdateOne({"id": wedding_id}, {"$inc": {"chat_messages_count": count}})
+                        for wedding_id, count in per_wedding.items()
+                    ], ordered=False)
+            except Exception as e:
+                # Counters are repaired by reconciliation - the messages are written
+                logger.error(f"[CHAT] Failed to update chat counters: {e}")
+
+            self.stats["flushes"] += 1
+            self.stats["messages_written"] += written
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+            self.stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return written
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"[CHAT] Flush loop error: {e}")
+
+    async def start(self, db):
+        """Start the periodic flush (called from lifespan)"""
+        self._db = db
+        self._flush_requested = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the periodic flush and write out whatever is still buffered"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self.pending:
+            logger.error(f"[CHAT] {self.pending} buffered messages lost on shutdown")
+        logger.info(f"[CHAT] Stopped: {self.stats}")
+
+
+# Singleton instance
+chat_buffer = ChatWriteBuffer()
@@ -2,6 +2,7 @@ import logging
 from datetime import datetime
 from typing import List, Dict, Optional
 from bson import ObjectId
+from app.services.counter_service import CounterService
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +38,7 @@ class ChatService:
             
             result = await self.messages_collection.insert_one(message_doc)
             message_id = str(result.inserted_id)
+            await CounterService.increment_wedding(wedding_id, chat_messages_count=1)
             
             logger.info(f"💬 Message saved for wedding {wedding_id} by {guest_name}")
             
@@ -119,11 +121,12 @@ class ChatService:
     ) -> bool:
         """Delete a message (admin/creator only)"""
         try:
-            result = await self.messages_collection.delete_one({
+            deleted = await self.messages_collection.find_one_and_delete({
                 "_id": ObjectId(message_id)
             })
             
-            if result.deleted_count > 0:
+            if deleted:
+                await CounterService.increment_wedding(deleted["wedding_id"], chat_messages_count=-1)
                 logger.info(f"Message {message_id} deleted by user {user_id}")
                 return True
             
@@ -134,12 +137,13 @@ class ChatService:
             raise
     
     async def get_message_count(self, wedding_id: str) -> int:
-        """Get total message count for a wedding"""
+        """Get total message count for a wedding (maintained counter)"""
         try:
-            count = await self.messages_collection.count_documents({
-                "wedding_id": wedding_id
-            })
-            return count
+            wedding = await self.weddings_collection.find_one(
+                {"id": wedding_id},
+                {"_id": 0, "chat_messages_count": 1}
+            )
+            return wedding.get("chat_messages_count", 0) if wedding else 0
         except Exception as e:
             logger.error(f"Failed to get message count for wedding {wedding_id}: {str(e)}")
             return 0
@@ -154,6 +158,7 @@ class ChatService:
             result = await self.messages_collection.delete_many({
                 "wedding_id": wedding_id
             })
+            await CounterService.increment_wedding(wedding_id, chat_messages_count=-result.deleted_count)
             
             logger.info(f"Cleared {result.deleted_count} messages for wedding {wedding_id} by user {user_id}")
             return result.deleted_count
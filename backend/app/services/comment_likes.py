@@ -0,0 +1,91 @@
+"""
+Comment Likes
+Likes live in their own collection, one document per (comment, user) with a
+unique index on (comment_id, user_id), instead of an unbounded `liked_by`
+array on the comment. The comment keeps an atomic `likes_count`.
+
+Toggling a like is a single insert (or delete) on the unique index followed
+by one $inc, so concurrent likes can neither double count nor lose a like.
+Whether the viewer liked the comments of a page is answered with one $in
+query over the page's comment ids.
+
+Comments written before this carry a `liked_by` array. The like endpoint
+migrates such a comment before toggling (lazy migration), and
+scripts/migrate_comment_likes.py migrates everything else in one pass. Both
+go through migrate_comment_likes, which is idempotent.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+LIKES_COLLECTION = "comment_likes"
+
+
+async def liked_comment_ids(db, user_id: Optional[str], comment_ids: Iterable[str]) -> Set[str]:
+    """The subset of `comment_ids` the user has liked (one indexed query)"""
+    comment_ids = list(comment_ids)
+    if not user_id or not comment_ids:
+        return set()
+    cursor = db[LIKES_COLLECTION].find(
+        {"user_id": user_id, "comment_id": {"$in": comment_ids}}, {"_id": 0, "comment_id": 1}
+    )
+    return {like["comment_id"] async for like in cursor}
+
+
+async def toggle_like(db, comment: Dict, user_id: str):
+    """Like the comment, or unlike it if the user already did; returns (liked, likes_count)"""
+    try:
+        await db[LIKES_COLLECTION].insert_one({
+            "comment_id": comment["id"],
+            "user_id": user_id,
+            "wedding_id": comment["wedding_id"],
+            "created_at": datetime.utcnow(),
+        })
+        liked, delta = True, 1
+    except DuplicateKeyError:
+        result = await db[LIKES_COLLECTION].delete_one({"comment_id": comment["id"], "user_id": user_id})
+        # 0 when a concurrent request removed it first - that request decremented
+        liked, delta = False, -result.deleted_count
+
+    updated = await db.comments.find_one_and_update(
+        {"id": comment["id"]},
+        {"$inc": {"likes_count": delta}},
+        projection={"_id": 0, "likes_count": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    return liked, (updated or {}).get("likes_count", 0)
+
+
+async def delete_likes(db, comment_ids: Iterable[str]) -> int:
+    """Remove the likes of deleted comments"""
+    result = await db[LIKES_COLLECTION].delete_many({"comment_id": {"$in": list(comment_ids)}})
+    return result.deleted_count
+
+
+async def migrate_comment_likes(db, comment: Dict) -> bool:
+    """Move a comment's legacy `liked_by` array into comment_likes; False if there was nothing to migrate"""
+    liked_by = comment.get("liked_by")
+    if liked_by is None:
+        return False
+    upserts = [
+        UpdateOne(
+            {"comment_id": comment["id"], "user_id": user_id},
+            {"$setOnInsert": {"wedding_id": comment.get("wedding_id"), "created_at": datetime.utcnow()}},
+            upsert=True,
+        )
+        for user_id in dict.fromkeys(liked_by) if user_id
+    ]
+    if upserts:
+        await db[LIKES_COLLECTION].bulk_write(upserts, ordered=False)
+    likes_count = await db[LIKES_COLLECTION].count_documents({"comment_id": comment["id"]})
+    await db.comments.update_one(
+        {"id": comment["id"]},
+        {"$set": {"likes_count": likes_count}, "$unset": {"liked_by": ""}},
+    )
+    return True
@@ -0,0 +1,245 @@
+"""
+Denormalized counter service for WedLive
+Maintains O(1) counters on wedding, user and album documents so that read
+endpoints don't have to run count_documents / full scans on every request.
+
+Counters are updated with $inc in the same code paths that insert or delete
+the underlying documents. Drift (crashes between writes, manual DB edits,
+legacy data) is repaired by the reconcile_* methods, which recompute the
+counters from the source collections.
+"""
+
+import logging
+from typing import Dict, Optional
+from app.database import get_db
+
+logger = logging.getLogger(__name__)
+
+# Counter fields maintained on wedding documents -> (source collection, source filter field)
+WEDDING_COUNTERS = {
+    "media_count": ("media", "wedding_id"),
+    "photobooth_count": ("photo_booth", "wedding_id"),
+    "comments_count": ("comments", "wedding_id"),
+    "chat_messages_count": ("chat_messages", "wedding_id"),
+    "reactions_count": ("reactions", "wedding_id"),
+    "guest_book_count": ("guest_book", "wedding_id"),
+    "albums_count": ("albums", "wedding_id"),
+    "viewer_sessions_count": ("viewer_sessions", "wedding_id"),
+}
+
+# Wedding counters that also add up a field of another collection -> (collection, filter field, summed field).
+# Socket reaction taps are only kept as per-minute totals in reaction_rollups (reaction_aggregator).
+WEDDING_COUNTER_SUMS = {
+    "reactions_count": ("reaction_rollups", "wedding_id", "total"),
+}
+
+# Counter fields maintained on user documents -> (source collection, source filter field)
+USER_COUNTERS = {
+    "weddings_count": ("weddings", "creator_id"),
+    "media_count": ("media", "uploaded_by"),
+}
+
+
+class CounterService:
+    """Service to maintain and reconcile denormalized counters"""
+
+    @staticmethod
+    async def increment_wedding(wedding_id: Optional[str], **deltas: int) -> None:
+        """Atomically apply counter deltas to a wedding document"""
+        if not wedding_id or not deltas:
+            return
+        db = get_db()
+        try:
+            await db.weddings.update_one({"id": wedding_id}, {"$inc": deltas})
+        except Exception as e:
+            # Counters are repaired by reconciliation - never fail the write path
+            logger.error(f"[COUNTERS] Failed to update wedding {wedding_id} counters {deltas}: {e}")
+
+    @staticmethod
+    async def increment_user(user_id: Optional[str], **deltas: int) -> None:
+        """Atomically apply counter deltas to a user document"""
+        if not user_id or not deltas:
+            return
+        db = get_db()
+        try:
+            await db.users.update_one({"id": user_id}, {"$inc": deltas})
+        except Exception as e:
+            logger.error(f"[COUNTERS] Failed to update user {user_id} counters {deltas}: {e}")
+
+    @staticmethod
+    async def increment_album(album_id: Optional[str], **deltas: int) -> None:
+        """Atomically apply counter deltas to an album document"""
+        if not album_id or not deltas:
+            return
+        db = get_db()
+        try:
+            await db.albums.update_one({"id": album_id}, {"$inc": deltas})
+        except Exception as e:
+            logger.error(f"[COUNTERS] Failed to update album {album_id} counters {deltas}: {e}")
+
+    @staticmethod
+    async def media_added(wedding_id: str, user_id: str, file_size: int = 0) -> None:
+        """Record a new media item on its wedding and uploader"""
+        await CounterService.increment_wedding(wedding_id, media_count=1, media_bytes=file_size or 0)
+        await CounterService.increment_user(user_id, media_count=1)
+
+    @staticmethod
+    async def media_removed(wedding_id: str, user_id: str, file_size: int = 0) -> None:
+        """Record a deleted media item on its wedding and uploader"""
+        await CounterService.increment_wedding(wedding_id, media_count=-1, media_bytes=-(file_size or 0))
+        await CounterService.increment_user(user_id, media_count=-1)
+
+    # ==================== RECONCILIATION ====================
+
+    @staticmethod
+    async def _grouped_counts(collection: str, field: str, match: Optional[Dict] = None) -> Dict[str, int]:
+        """Count documents per value of `field` with a single $group pass"""
+        db = get_db()
+        pipeline = []
+        if match:
+            pipeline.append({"$match": match})
+        pipeline.append({"$group": {"_id": f"${field}", "count": {"$sum": 1}}})
+        counts = {}
+        async for row in db[collection].aggregate(pipeline):
+            if row["_id"] is not None:
+                counts[row["_id"]] = row["count"]
+        return counts
+
+    @staticmethod
+    async def _grouped_sums(collection: str, field: str, sum_field: str, match: Optional[Dict] = None) -> Dict[str, int]:
+        """Sum `sum_field` per value of `field` with a single $group pass"""
+        db = get_db()
+        pipeline = []
+        if match:
+            pipeline.append({"$match": match})
+        pipeline.append({"$group": {"_id": f"${field}", "total": {"$sum": {"$ifNull": [f"${sum_field}", 0]}}}})
+        sums = {}
+        async for row in db[collection].aggregate(pipeline):
+            if row["_id"] is not None:
+                sums[row["_id"]] = row["total"]
+        return sums
+
+    @staticmethod
+    async def reconcile_wedding(wedding_id: str) -> Dict[str, int]:
+        """Recompute all counters of a single wedding from source collections"""
+        db = get_db()
+        counters = {}
+        for counter, (collection, field) in WEDDING_COUNTERS.items():
+            counters[counter] = await db[collection].count_documents({field: wedding_id})
+
+        for counter, (collection, field, sum_field) in WEDDING_COUNTER_SUMS.items():
+            sums = await CounterService._grouped_sums(collection, field, sum_field, {field: wedding_id})
+            counters[counter] += sums.get(wedding_id, 0)
+
+        sums = await CounterService._grouped_sums("media", "wedding_id", "file_size", {"wedding_id": wedding_id})
+        counters["media_bytes"] = sums.get(wedding_id, 0)
+
+        await db.weddings.update_one({"id": wedding_id}, {"$set": counters})
+        return counters
+
+    @staticmethod
+    async def reconcile_user(user_id: str) -> Dict[str, int]:
+        """Recompute all counters (including storage_used) of a single user"""
+        from app.services.storage_service import StorageService
+
+        db = get_db()
+        counters = {}
+        for counter, (collection, field) in USER_COUNTERS.items():
+            counters[counter] = await db[collection].count_documents({field: user_id})
+        counters["storage_used"] = await StorageService.calculate_user_storage(user_id)
+
+        await db.users.update_one({"id": user_id}, {"$set": counters})
+        return counters
+
+    @staticmethod
+    async def reconcile_all() -> Dict[str, int]:
+        """
+        Repair counter drift across all weddings, users, albums and comments.
+        Each source collection is scanned once with a $group, and only
+        documents whose stored counters differ are rewritten.
+        """
+        from pymongo import UpdateOne
+        from app.services.storage_service import StorageService
+
+        db = get_db()
+        repaired = {"weddings": 0, "users": 0, "albums": 0, "comments": 0}
+
+        # Weddings
+        wedding_counts = {
+            counter: await CounterService._grouped_counts(collection, field)
+            for counter, (collection, field) in WEDDING_COUNTERS.items()
+        }
+        for counter, (collection, field, sum_field) in WEDDING_COUNTER_SUMS.items():
+            sums = await CounterService._grouped_sums(collection, field, sum_field)
+            counts = wedding_counts[counter]
+            for wedding_id, total in sums.items():
+                counts[wedding_id] = counts.get(wedding_id, 0) + total
+        wedding_counts["media_bytes"] = await CounterService._grouped_sums("media", "wedding_id", "file_size")
+
+        projection = {"_id": 0, "id": 1, **{counter: 1 for counter in wedding_counts}}
+        ops = []
+        async for wedding in db.weddings.find({}, projection):
+            expected = {counter: counts.get(wedding["id"], 0) for counter, counts in wedding_counts.items()}
+            if any(wedding.get(counter) != value for counter, value in expected.items()):
+                ops.append(UpdateOne({"id": wedding["id"]}, {"$set": expected}))
+            if len(ops) >= 500:
+                await db.weddings.bulk_write(ops, ordered=False)
+                repaired["weddings"] += len(ops)
+                ops = []
+        if ops:
+            await db.weddings.bulk_write(ops, ordered=False)
+            repaired["weddings"] += len(ops)
+
+        # Users
+        user_counts = {
+            counter: await CounterService._grouped_counts(collection, field)
+            for counter, (collection, field) in USER_COUNTERS.items()
+        }
+        user_counts["storage_used"] = await StorageService.calculate_storage_by_user()
+
+        projection = {"_id": 0, "id": 1, **{counter: 1 for counter in user_counts}}
+        ops = []
+        async for user in db.users.find({}, projection):
+            expected = {counter: counts.get(user["id"], 0) for counter, counts in user_counts.items()}
+            if any(user.get(counter) != value for counter, value in expected.items()):
+                ops.append(UpdateOne({"id": user["id"]}, {"$set": expected}))
+            if len(ops) >= 500:
+                await db.users.bulk_write(ops, ordered=False)
+                repaired["users"] += len(ops)
+                ops = []
+        if ops:
+            await db.users.bulk_write(ops, ordered=False)
+            repaired["users"] += len(ops)
+
+        # Albums - slide count is derived from the embedded array server-side
+        result = await db.albums.update_many(
+            {"$expr": {"$ne": [{"$ifNull": ["$slides_count", -1]}, {"$size": {"$ifNull": ["$slides", []]}}]}},
+            [{"$set": {"slides_count": {"$size": {"$ifNull": ["$slides", []]}}}}]
+        )
+        repaired["albums"] = result.modified_count
+
+        # Comments - replies_count drives the lazy reply threads; likes live in comment_likes
+        comment_counts = {
+            "replies_count": await CounterService._grouped_counts(
+                "comments", "parent_comment_id", {"parent_comment_id": {"$ne": None}}
+            ),
+            "likes_count": await CounterService._grouped_counts("comment_likes", "comment_id"),
+        }
+        ops = []
+        # Comments still carrying liked_by are counted by scripts/migrate_comment_likes.py
+        async for comment in db.comments.find(
+            {"liked_by": {"$exists": False}}, {"_id": 0, "id": 1, "replies_count": 1, "likes_count": 1}
+        ):
+            expected = {counter: counts.get(comment["id"], 0) for counter, counts in comment_counts.items()}
+            if any(comment.get(counter) != value for counter, value in expected.items()):
+                ops.append(UpdateOne({"id": comment["id"]}, {"$set": expected}))
+            if len(ops) >= 500:
+                await db.comments.bulk_write(ops, ordered=False)
+                repaired["comments"] += len(ops)
+                ops = []
+        if ops:
+            await db.comments.bulk_write(ops, ordered=False)
+            repaired["comments"] += len(ops)
+
+        logger.info(f"[COUNTERS] Reconciliation complete: {repaired}")
+        return repaired
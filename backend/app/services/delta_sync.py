@@ -0,0 +1,157 @@
+"""
+Delta Sync
+Incremental reads of a wedding's chat messages, reactions and guest book
+entries for polling clients: each poll returns only what was added (or
+deleted) since the client's sync cursor, instead of the whole recent list.
+
+Items are ordered by (created_at, _id) - the (wedding_id, created_at, _id)
+indexes make every poll one index seek. A sync cursor is a keyset token
+(app.utils.cursors) for the position up to which the client has seen
+everything. The first poll (no cursor) returns a snapshot of the newest
+items.
+
+Writers on other workers (and the chat write buffer) make an item visible
+shortly after its created_at, so a cursor never moves past
+now - SYNC_SETTLE_SECONDS: items newer than that are returned but may be
+returned again by the next poll. Clients upsert items by id.
+
+Kinds that can delete items (the guest book) record a tombstone per
+deletion in sync_tombstones; a delta lists the ids deleted since the
+cursor. Tombstones expire after SYNC_TOMBSTONE_TTL_SECONDS, so a cursor
+older than that gets `reset` and a fresh snapshot instead.
+
+When nothing changed the cursor is returned unchanged (and the routes
+answer a matching If-None-Match with 304); for chat that answer comes from
+the recent-chat ring without touching MongoDB.
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.database import SYNC_TOMBSTONE_TTL_SECONDS, TOMBSTONES_COLLECTION
+from app.utils.cursors import encode_cursor, keyset_after
+
+SETTLE_SECONDS = float(os.getenv("SYNC_SETTLE_SECONDS", "2"))
+MAX_DELTA_ITEMS = 500
+
+# kind -> collection and whether its items can be deleted (tombstones)
+SYNC_KINDS: Dict[str, Dict[str, Any]] = {
+    "chat": {"collection": "chat_messages", "deletes": False},
+    "reactions": {"collection": "reactions", "deletes": False},
+    "guestbook": {"collection": "guest_book", "deletes": True},
+}
+
+
+def _key(doc: Dict):
+    return doc["created_at"], doc["_id"]
+
+
+def _is_after(doc: Dict, after: Dict[str, Any]) -> bool:
+    if after["id"] is None or doc["created_at"] != after["t"]:
+        return doc["created_at"] > after["t"]
+    return doc["_id"] > after["id"]
+
+
+async def record_deletion(db, kind: str, wedding_id: str, item_id: str):
+    """Leave a tombstone so delta syncs learn about the deletion"""
+    await db[TOMBSTONES_COLLECTION].insert_one({
+        "kind": kind,
+        "wedding_id": wedding_id,
+        "item_id": item_id,
+        "deleted_at": datetime.utcnow(),
+    })
+
+
+async def _chat_items(db, wedding_id: str, after: Optional[Dict[str, Any]], limit: int) -> List[Dict]:
+    """Up to limit + 1 chat messages after the cursor (or the newest `limit` without one)"""
+    from app.services.chat_buffer import chat_buffer
+    from app.services.recent_chat import recent_chat
+
+    ring = await recent_chat.recent(wedding_id)
+    # A ring that isn't full holds the wedding's whole history
+    complete = len(ring) < recent_chat.size
+    if after is None:
+        if complete or limit <= len(ring):
+            return ring[-limit:]
+    elif complete or (ring and not _is_after(ring[0], after)):
+        # The ring reaches back past the cursor
+        return [doc for doc in ring if _is_after(doc, after)][:limit + 1]
+
+    docs = await _stored_items(db, "chat_messages", wedding_id, after, limit)
+    # Live messages this worker has not written yet
+    pending = [doc for doc in chat_buffer.pending_messages(wedding_id) if after is None or _is_after(doc, after)]
+    if pending:
+        unique = {doc["_id"]: doc for doc in docs + pending}
+        docs = sorted(unique.values(), key=_key)
+        docs = docs[-limit:] if after is None else docs[:limit + 1]
+    return docs
+
+
+async def _stored_items(db, collection: str, wedding_id: str, after: Optional[Dict[str, Any]], limit: int) -> List[Dict]:
+    if after is None:
+        docs = await db[collection].find({"wedding_id": wedding_id}).sort(
+            [("created_at", -1), ("_id", -1)]
+        ).limit(limit).to_list(length=limit)
+        return docs[::-1]
+    query = {"wedding_id": wedding_id, **keyset_after("created_at", after)}
+    return await db[collection].find(query).sort(
+        [("created_at", 1), ("_id", 1)]
+    ).limit(limit + 1).to_list(length=limit + 1)
+
+
+async def delta(db, kind: str, wedding_id: str, after: Optional[Dict[str, Any]], limit: int = 100) -> Dict[str, Any]:
+    """
+    Items added (oldest first) and ids deleted after a decoded sync cursor:
+    {"items", "deleted", "cursor", "has_more", "reset"}. `cursor` is the
+    token to poll with next; it is unchanged when nothing changed.
+    """
+    spec = SYNC_KINDS[kind]
+    limit = max(1, min(limit, MAX_DELTA_ITEMS))
+    now = datetime.utcnow()
+    settled = now - timedelta(seconds=SETTLE_SECONDS)
+
+    reset = False
+    if after is not None and spec["deletes"] and after["t"] < now - timedelta(seconds=SYNC_TOMBSTONE_TTL_SECONDS):
+        # Deletions this old have expired: start over from a snapshot
+        after, reset = None, True
+
+    if kind == "chat":
+        docs = await _chat_items(db, wedding_id, after, limit)
+    else:
+        docs = await _stored_items(db, spec["collection"], wedding_id, after, limit)
+
+    if after is None:
+        newest = docs[-1]["created_at"] if docs else settled
+        return {
+            "items": docs,
+            "deleted": [],
+            "cursor": encode_cursor(min(newest, settled)),
+            "has_more": False,
+            "reset": reset,
+        }
+
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    tombstones = []
+    if spec["deletes"]:
+        tombstones = await db[TOMBSTONES_COLLECTION].find(
+            {"wedding_id": wedding_id, "kind": kind, "deleted_at": {"$gt": after["t"]}},
+            {"_id": 0, "item_id": 1, "deleted_at": 1},
+        ).sort("deleted_at", 1).to_list(length=MAX_DELTA_ITEMS)
+
+    if has_more and docs[-1]["created_at"] <= settled:
+        cursor = encode_cursor(*_key(docs[-1]))
+    else:
+        newest = max([doc["created_at"] for doc in docs[-1:]] + [t["deleted_at"] for t in tombstones[-1:]],
+                     default=after["t"])
+        position = min(newest, settled)
+        cursor = encode_cursor(position) if position > after["t"] else encode_cursor(after["t"], after["id"])
+
+    return {
+        "items": docs,
+        "deleted": [t["item_id"] for t in tombstones],
+        "cursor": cursor,
+        "has_more": has_more,
+        "reset": reset,
+    }
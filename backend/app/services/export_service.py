@@ -0,0 +1,216 @@
+"""
+Export Service
+Streams a wedding's viewer sessions, chat, reactions, guest book entries
+and analytics rollups as CSV or NDJSON straight from a MongoDB cursor.
+
+Documents are read in batches of `batch_size`, formatted and flushed in
+chunks of about EXPORT_CHUNK_BYTES, so memory stays flat regardless of the
+size of the export. Optionally the stream is gzip-compressed on the fly.
+
+Every row carries a `cursor` column: an opaque keyset token for
+(time field, _id). Passing the last received token as `after` resumes an
+interrupted export exactly after that row. Exports are ordered by the
+dataset's time field with _id as the tie-breaker; the
+(wedding_id, time field, _id) indexes keep that a streaming index scan.
+
+Rollups are insert-only and can hold duplicate buckets (see
+rollup_service), so the rollups export keeps the latest document per
+bucket and its cursor is the bucket time alone.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+
+from bson import ObjectId
+
+from app.services.rollup_service import DEVICE_TYPES, ROLLUPS_COLLECTION
+from app.utils.cursors import encode_cursor, keyset_after
+
+EXPORT_CHUNK_BYTES = 64 * 1024
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+# dataset -> collection, wedding filter field, time field, exported columns
+EXPORT_DATASETS: Dict[str, Dict[str, Any]] = {
+    "sessions": {
+        "collection": "viewer_sessions",
+        "wedding_field": "wedding_id",
+        "time_field": "join_time",
+        "columns": [
+            "id", "session_id", "user_id", "join_time", "leave_time", "duration_seconds",
+            "last_heartbeat_at", "timezone", "user_agent", "chat_messages_count", "reactions_count",
+        ],
+    },
+    "chat": {
+        "collection": "chat_messages",
+        "wedding_field": "wedding_id",
+        "time_field": "created_at",
+        "columns": ["id", "user_id", "guest_name", "message", "created_at"],
+    },
+    "reactions": {
+        "collection": "reactions",
+        "wedding_field": "wedding_id",
+        "time_field": "created_at",
+        "columns": ["id", "user_id", "guest_name", "emoji", "created_at"],
+    },
+    "guestbook": {
+        "collection": "guest_book",
+        "wedding_field": "wedding_id",
+        "time_field": "created_at",
+        "columns": ["id", "guest_name", "email", "message", "created_at"],
+    },
+    "rollups": {
+        "collection": ROLLUPS_COLLECTION,
+        "wedding_field": "meta.wedding_id",
+        "time_field": "bucket",
+        "unique_time": True,
+        "columns": [
+            "bucket", "meta.granularity", "viewers", "joins", "leaves", "watch_seconds",
+            *[f"devices.{device}" for device in DEVICE_TYPES], "reactions", "chat_messages",
+        ],
+    },
+}
+
+
+def export_query(
+    dataset: Dict[str, Any],
+    wedding_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    after: Optional[Dict[str, Any]] = None,
+    granularity: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Filter for one wedding's rows in [start, end), resuming after a decoded cursor"""
+    time_field = dataset["time_field"]
+    time_range: Dict[str, Any] = {"$type": "date"}
+    if start:
+        time_range["$gte"] = start
+    if end:
+        time_range["$lt"] = end
+    query: Dict[str, Any] = {dataset["wedding_field"]: wedding_id, time_field: time_range}
+    if granularity:
+        query["meta.granularity"] = granularity
+    if after:
+        # A unique time needs no _id tie-breaker
+        resume = keyset_after(time_field, {**after, "id": None} if dataset.get("unique_time") else after)
+        time_range.update(resume.pop(time_field, {}))
+        query.update(resume)
+    return query
+
+
+# ==================== FORMATTING ====================
+
+def _field(doc: Dict[str, Any], path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _cell(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+
+def export_row(dataset: Dict[str, Any], doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Exported columns of a document plus its resume cursor"""
+    row = {column: _cell(_field(doc, column)) for column in dataset["columns"]}
+    if "id" in row and row["id"] is None:
+        # Socket-saved chat messages have no "id" - fall back to _id
+        row["id"] = str(doc["_id"])
+    time_value = doc[dataset["time_field"]]
+    row["cursor"] = encode_cursor(time_value) if dataset.get("unique_time") else encode_cursor(time_value, doc["_id"])
+    return row
+
+
+async def iter_export_documents(
+    db,
+    dataset: Dict[str, Any],
+    query: Dict[str, Any],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    limit: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Documents in export order, fetched batch_size at a time"""
+    time_field = dataset["time_field"]
+    projection = {column.split(".")[0]: 1 for column in dataset["columns"]}
+    projection.update({"_id": 1, time_field: 1})
+    if dataset.get("unique_time"):
+        # Latest document first within a bucket; earlier duplicates are skipped
+        sort = [(time_field, 1), ("_id", -1)]
+    else:
+        sort = [(time_field, 1), ("_id", 1)]
+
+    cursor = db[dataset["collection"]].find(query, projection).sort(sort).batch_size(batch_size)
+    emitted, previous_time = 0, None
+    try:
+        async for doc in cursor:
+            if dataset.get("unique_time"):
+                if doc[time_field] == previous_time:
+                    continue
+                previous_time = doc[time_field]
+            yield doc
+            emitted += 1
+            if limit is not None and emitted >= limit:
+                break
+    finally:
+        await cursor.close()
+
+
+async def stream_export(
+    documents: AsyncIterator[Dict[str, Any]],
+    dataset: Dict[str, Any],
+    fmt: str = "csv",
+    compress: bool = False,
+    chunk_bytes: int = EXPORT_CHUNK_BYTES,
+) -> AsyncIterator[bytes]:
+    """Encode documents as CSV or NDJSON, yielding chunks of about chunk_bytes"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=[*dataset["columns"], "cursor"], extrasaction="ignore")
+        writer.writeheader()
+
+    def take() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    async for doc in documents:
+        row = export_row(dataset, doc)
+        if writer:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(row, ensure_ascii=False, default=str))
+            buffer.write("\n")
+        if buffer.tell() >= chunk_bytes:
+            chunk = take()
+            if chunk:
+                yield chunk
+
+    chunk = take()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def export_filename(wedding_id: str, dataset_name: str, fmt: str, compress: bool) -> str:
+    extension = EXPORT_FORMATS[fmt][1]
+    return f"{wedding_id}-{dataset_name}.{extension}{'.gz' if compress else ''}"
+
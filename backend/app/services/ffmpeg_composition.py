@@ -4,109 +4,283 @@ FFmpeg Composition Service for Multi-Camera Live Streaming
 This service manages FFmpeg processes that compose multiple camera HLS streams
 into a single output stream for viewers. It supports dynamic camera switching
 with minimal latency.
+
+Each wedding has one persistent FFmpeg process with every live camera as an
+input. The inputs are normalized to one size, frame rate and audio format
+and fed to a `streamselect`/`astreamselect` pair that picks the camera on
+air; a switch is a `map` command sent to those filters on the running
+process (FFmpeg's interactive command interface on stdin, which works on
+any build - the `zmq` filter needs one with libzmq). The output is encoded
+once with a keyframe at every segment boundary, so a cut shows up in the
+next segment of the same playlist: no process restart, no re-probing of the
+input and no discontinuity for players. The process is only restarted when
+the set of cameras changes (a camera connects or drops out).
+
+A camera becomes an input only once its playlist can be opened (nginx-rtmp
+writes it a segment after the camera connects), and a camera without an
+audio track gets silence in its place. Cameras are probed before the
+running process is stopped, so a restart onto a camera that cannot be read
+leaves the current one on air. A wedding with a single camera needs no
+selectors and no encode: its stream is copied as it comes in.
 """
 
 import asyncio
 import logging
 import os
 import psutil
+import time
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import signal
 
 logger = logging.getLogger(__name__)
 
+# Composed output: every camera is scaled/padded to this and re-encoded once
+COMPOSITION_WIDTH = int(os.getenv("COMPOSITION_WIDTH", "1280"))
+COMPOSITION_HEIGHT = int(os.getenv("COMPOSITION_HEIGHT", "720"))
+COMPOSITION_FPS = int(os.getenv("COMPOSITION_FPS", "30"))
+COMPOSITION_VIDEO_BITRATE = os.getenv("COMPOSITION_VIDEO_BITRATE", "3000k")
+COMPOSITION_X264_PRESET = os.getenv("COMPOSITION_X264_PRESET", "veryfast")
+# HLS segment length; also the keyframe interval, so a cut is visible one segment later
+COMPOSITION_SEGMENT_SECONDS = float(os.getenv("COMPOSITION_SEGMENT_SECONDS", "1"))
+# How long a camera that just connected may take to have a readable playlist
+COMPOSITION_INPUT_WAIT_SECONDS = float(os.getenv("COMPOSITION_INPUT_WAIT_SECONDS", "15"))
+# Longest a single probe of a camera's playlist may take
+COMPOSITION_PROBE_TIMEOUT_SECONDS = 10
+
+# Filter instances that pick the camera on air, addressed by switch commands
+VIDEO_SELECTOR = "streamselect@camera"
+AUDIO_SELECTOR = "astreamselect@camera"
+
 
 class FFmpegCompositionService:
     """
     Manages FFmpeg composition processes for multi-camera weddings.
     
     Each wedding can have one active composition process that:
-    - Reads HLS input from the active camera
+    - Reads HLS input from every live camera
     - Outputs composed HLS stream for viewers
-    - Supports dynamic camera switching
+    - Switches cameras live, without restarting
     - Monitors process health
     """
     
-    def __init__(self):
+    def __init__(self, output_dir: str = "/tmp/hls_output"):
         self.active_processes: Dict[str, asyncio.subprocess.Process] = {}
         self.process_health: Dict[str, dict] = {}
-        self.output_dir = "/tmp/hls_output"
+        # Cameras each running process has as inputs, in input order
+        self.composition_inputs: Dict[str, List[dict]] = {}
+        self.output_dir = output_dir
+        
+        self.width = COMPOSITION_WIDTH
+        self.height = COMPOSITION_HEIGHT
+        self.fps = COMPOSITION_FPS
+        self.video_bitrate = COMPOSITION_VIDEO_BITRATE
+        self.preset = COMPOSITION_X264_PRESET
+        self.segment_seconds = COMPOSITION_SEGMENT_SECONDS
+        self.input_wait = COMPOSITION_INPUT_WAIT_SECONDS
         
         # Ensure output directory exists
         os.makedirs(self.output_dir, exist_ok=True)
     
-    async def start_composition(self, wedding_id: str, camera: dict) -> dict:
+    def _input_url(self, camera: dict) -> str:
+        """URL of a camera's HLS stream"""
+        hls_url = camera.get("hls_url")
+        if not hls_url:
+            stream_key = camera.get("stream_key")
+            hls_url = f"/hls/{stream_key}.m3u8"
+        
+        # Make HLS URL absolute for local access
+        if hls_url.startswith("/hls/"):
+            hls_url = f"http://localhost:8080{hls_url}"
+        
+        return hls_url
+    
+    def _input_args(self, camera: dict) -> List[str]:
+        """FFmpeg input arguments for a camera's HLS stream"""
+        return ["-i", self._input_url(camera)]
+    
+    async def _probe_input(self, camera: dict, wait: float = 0.0) -> Optional[dict]:
+        """
+        Streams of a camera's HLS input, {"audio": bool}, or None if it has
+        no readable video; retried for up to `wait` seconds
+        """
+        deadline = time.monotonic() + wait
+        while True:
+            process = await asyncio.create_subprocess_exec(
+                "ffprobe", "-v", "error", "-show_entries", "stream=codec_type", "-of", "csv=p=0",
+                self._input_url(camera),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            try:
+                output, _ = await asyncio.wait_for(process.communicate(), timeout=COMPOSITION_PROBE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                output = b""
+            codec_types = output.decode(errors="replace").split()
+            if process.returncode == 0 and "video" in codec_types:
+                return {"audio": "audio" in codec_types}
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(1)
+    
+    def _build_command(self, cameras: List[dict], output_dir: str,
+                       audio: Optional[List[bool]] = None) -> List[str]:
+        """
+        FFmpeg command composing `cameras` into one HLS output, starting on the first
+        
+        `audio` tells which cameras have an audio track (default: all of them);
+        the others get silence.
+        """
+        w, h, count = self.width, self.height, len(cameras)
+        audio = audio or [True] * count
+        segment = f"{self.segment_seconds:g}"
+        hls_args = [
+            "-f", "hls",  # Output format: HLS
+            "-hls_time", segment,  # 1-second segments (low latency)
+            "-hls_list_size", "3",  # Keep only 3 segments in playlist
+            "-hls_flags", "delete_segments+independent_segments",  # Delete old segments
+            "-hls_segment_type", "mpegts",  # MPEG-TS segments
+            "-hls_segment_filename", os.path.join(output_dir, "segment_%03d.ts"),
+            os.path.join(output_dir, "output.m3u8")
+        ]
+        
+        ffmpeg_cmd = ["ffmpeg", "-hide_banner", "-nostats", "-loglevel", "warning"]
+        for camera in cameras:
+            ffmpeg_cmd += self._input_args(camera)
+        
+        if count == 1:
+            # Nothing to switch between: pass the camera through as is
+            return ffmpeg_cmd + [
+                "-map", "0:v:0",
+                "-map", "0:a:0?",
+                "-c:v", "copy",  # Copy video codec (no re-encoding)
+                "-c:a", "copy",  # Copy audio codec (no re-encoding)
+            ] + hls_args
+        
+        # Normalize every camera so the selectors can switch between them mid-stream
+        filters = []
+        for i in range(count):
+            filters.append(
+                f"[{i}:v:0]setpts=PTS-STARTPTS,"
+                f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+                f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={self.fps},format=yuv420p[v{i}]"
+            )
+            if audio[i]:
+                filters.append(
+                    f"[{i}:a:0]asetpts=PTS-STARTPTS,aresample=48000:async=1,"
+                    f"aformat=sample_fmts=fltp:channel_layouts=stereo[a{i}]"
+                )
+            else:
+                filters.append(f"anullsrc=channel_layout=stereo:sample_rate=48000,aformat=sample_fmts=fltp[a{i}]")
+        video_inputs = "".join(f"[v{i}]" for i in range(count))
+        audio_inputs = "".join(f"[a{i}]" for i in range(count))
+        filters.append(f"{video_inputs}{VIDEO_SELECTOR}=inputs={count}:map=0[v]")
+        filters.append(f"{audio_inputs}{AUDIO_SELECTOR}=inputs={count}:map=0[a]")
+        
+        gop = str(max(1, round(self.fps * self.segment_seconds)))
+        
+        ffmpeg_cmd += [
+            "-filter_complex", ";".join(filters),
+            "-map", "[v]",
+            "-map", "[a]",
+            "-c:v", "libx264",
+            "-preset", self.preset,
+            "-tune", "zerolatency",
+            "-b:v", self.video_bitrate,
+            "-maxrate", self.video_bitrate,
+            "-bufsize", self.video_bitrate,
+            # A keyframe at every segment boundary: each segment starts clean after a cut
+            "-g", gop,
+            "-keyint_min", gop,
+            "-sc_threshold", "0",
+            "-force_key_frames", f"expr:gte(t,n_forced*{segment})",
+            "-c:a", "aac",
+            "-b:a", "128k",
+        ]
+        return ffmpeg_cmd + hls_args
+    
+    async def start_composition(self, wedding_id: str, camera: dict,
+                                cameras: Optional[List[dict]] = None) -> dict:
         """
         Start FFmpeg composition for a wedding with the specified camera
         
         Args:
             wedding_id: Wedding ID
-            camera: Camera object with stream_key and hls_url
-            
+            camera: Camera object to put on air, with stream_key and hls_url
+            cameras: Every live camera of the wedding, inputs of the process so
+                they can be switched to without a restart (defaults to `camera`)
+        
+        Cameras whose playlist cannot be read within the input wait are left
+        out; if that is the camera to put on air, a running composition is
+        kept as it is.
+        
         Returns:
             dict with status and details
         """
         try:
             logger.info(f"[COMPOSITION] Starting composition for wedding {wedding_id} with camera {camera.get('camera_id')}")
             
+            # The camera on air is input 0, the selectors' initial pick
+            candidates = [c for c in (cameras or []) if c.get("camera_id") != camera.get("camera_id")]
+            candidates.insert(0, camera)
+            probes = await asyncio.gather(*(self._probe_input(c, self.input_wait) for c in candidates))
+            if probes[0] is None:
+                logger.error(f"[COMPOSITION] Camera {camera.get('camera_id')} of wedding {wedding_id} has no readable "
+                             f"stream, keeping the current composition")
+                return {
+                    "success": False,
+                    "error": f"Camera {camera.get('camera_id')} stream is not available"
+                }
+            inputs, audio = [], []
+            for candidate, probe in zip(candidates, probes):
+                if probe is None:
+                    logger.warning(f"[COMPOSITION] Leaving out camera {candidate.get('camera_id')} of wedding "
+                                   f"{wedding_id}: no readable stream")
+                    continue
+                inputs.append(candidate)
+                audio.append(probe["audio"])
+            
             # Stop existing composition if any
             if wedding_id in self.active_processes:
                 await self.stop_composition(wedding_id)
             
-            # Get camera HLS URL
-            hls_url = camera.get("hls_url")
-            if not hls_url:
-                stream_key = camera.get("stream_key")
-                hls_url = f"/hls/{stream_key}.m3u8"
-            
-            # Make HLS URL absolute for local access
-            if hls_url.startswith("/hls/"):
-                hls_url = f"http://localhost:8080{hls_url}"
-            
             # Setup output directory for this wedding
             wedding_output_dir = os.path.join(self.output_dir, f"output_{wedding_id}")
             os.makedirs(wedding_output_dir, exist_ok=True)
             
             output_path = os.path.join(wedding_output_dir, "output.m3u8")
-            
-            # FFmpeg command for HLS re-streaming with optimized settings
-            ffmpeg_cmd = [
-                "ffmpeg",
-                "-i", hls_url,  # Input HLS stream
-                "-c:v", "copy",  # Copy video codec (no re-encoding)
-                "-c:a", "copy",  # Copy audio codec (no re-encoding)
-                "-f", "hls",  # Output format: HLS
-                "-hls_time", "1",  # 1-second segments (low latency)
-                "-hls_list_size", "3",  # Keep only 3 segments in playlist
-                "-hls_flags", "delete_segments+independent_segments",  # Delete old segments
-                "-hls_segment_type", "mpegts",  # MPEG-TS segments
-                "-hls_segment_filename", os.path.join(wedding_output_dir, "segment_%03d.ts"),
-                output_path
-            ]
+            ffmpeg_cmd = self._build_command(inputs, wedding_output_dir, audio)
             
             logger.info(f"[COMPOSITION] FFmpeg command: {' '.join(ffmpeg_cmd)}")
             
-            # Start FFmpeg process
+            # Start FFmpeg process; stdin carries the switch commands
             process = await asyncio.create_subprocess_exec(
                 *ffmpeg_cmd,
-                stdout=asyncio.subprocess.PIPE,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
                 stderr=asyncio.subprocess.PIPE
             )
             
             # Store process
             self.active_processes[wedding_id] = process
+            self.composition_inputs[wedding_id] = inputs
             self.process_health[wedding_id] = {
                 "pid": process.pid,
                 "started_at": datetime.utcnow(),
                 "last_check": datetime.utcnow(),
                 "status": "running",
                 "restart_count": 0,
+                "switch_count": 0,
                 "camera_id": camera.get("camera_id"),
+                "input_camera_ids": [c.get("camera_id") for c in inputs],
                 "output_path": output_path
             }
             
-            logger.info(f"[COMPOSITION] Started FFmpeg process PID {process.pid} for wedding {wedding_id}")
+            logger.info(f"[COMPOSITION] Started FFmpeg process PID {process.pid} for wedding {wedding_id} "
+                        f"with {len(inputs)} camera input(s)")
             
             # Start monitoring task
             asyncio.create_task(self._monitor_process(wedding_id, process))
@@ -115,9 +289,10 @@ class FFmpegCompositionService:
                 "success": True,
                 "pid": process.pid,
                 "output_url": f"/hls_output/output_{wedding_id}/output.m3u8",
-                "camera_id": camera.get("camera_id")
+                "camera_id": camera.get("camera_id"),
+                "restarted": True
             }
-            
+        
         except Exception as e:
             logger.error(f"[COMPOSITION] Failed to start composition: {str(e)}", exc_info=True)
             return {
@@ -125,47 +300,126 @@ class FFmpegCompositionService:
                 "error": str(e)
             }
     
-    async def update_composition(self, wedding_id: str, camera: dict) -> dict:
+    async def switch_camera(self, wedding_id: str, camera: dict,
+                            cameras: Optional[List[dict]] = None) -> dict:
         """
-        Update composition to use a different camera (camera switch)
+        Put a different camera on air
         
-        This stops the current composition and starts a new one with the new camera.
+        If the running composition has the camera as an input, the selectors
+        are switched in place and the next segment comes from the new camera.
+        Otherwise (no composition, or a camera that connected after it
+        started) the composition is restarted with `cameras` as inputs.
         
         Args:
             wedding_id: Wedding ID
             camera: New camera object
-            
+            cameras: Every live camera of the wedding, used if a restart is needed
+        
         Returns:
-            dict with status
+            dict with status; "restarted" tells whether the process was restarted
         """
         try:
-            logger.info(f"[COMPOSITION] Updating composition for wedding {wedding_id} to camera {camera.get('camera_id')}")
+            camera_id = camera.get("camera_id")
+            process = self.active_processes.get(wedding_id)
+            inputs = self.composition_inputs.get(wedding_id, [])
+            index = next((i for i, c in enumerate(inputs) if c.get("camera_id") == camera_id), None)
             
-            # Restart composition with new camera
-            result = await self.start_composition(wedding_id, camera)
+            # Without a second input there are no selectors to switch
+            if process is None or process.returncode is not None or index is None or len(inputs) < 2:
+                logger.info(f"[COMPOSITION] Camera {camera_id} is not an input of a running composition "
+                            f"for wedding {wedding_id}, restarting")
+                return await self.start_composition(wedding_id, camera, cameras or inputs)
             
-            if result.get("success"):
-                # Update health tracking
-                if wedding_id in self.process_health:
-                    self.process_health[wedding_id]["camera_id"] = camera.get("camera_id")
-                    self.process_health[wedding_id]["last_update"] = datetime.utcnow()
+            logger.info(f"[COMPOSITION] Switching wedding {wedding_id} to camera {camera_id} (input {index})")
             
-            return result
+            # Video first: the audio command lands at most one keyboard poll (100 ms) later
+            command = f"c{VIDEO_SELECTOR} -1 map {index}\nc{AUDIO_SELECTOR} -1 map {index}\n"
+            try:
+                process.stdin.write(command.encode())
+                await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError) as e:
+                logger.warning(f"[COMPOSITION] Switch command failed for wedding {wedding_id} ({e}), restarting")
+                return await self.start_composition(wedding_id, camera, cameras or inputs)
+            
+            # Update health tracking
+            health = self.process_health.setdefault(wedding_id, {})
+            health["camera_id"] = camera_id
+            health["last_update"] = datetime.utcnow()
+            health["switch_count"] = health.get("switch_count", 0) + 1
             
+            return {
+                "success": True,
+                "pid": process.pid,
+                "output_url": f"/hls_output/output_{wedding_id}/output.m3u8",
+                "camera_id": camera_id,
+                "restarted": False
+            }
+        
         except Exception as e:
-            logger.error(f"[COMPOSITION] Failed to update composition: {str(e)}", exc_info=True)
+            logger.error(f"[COMPOSITION] Failed to switch camera: {str(e)}", exc_info=True)
             return {
                 "success": False,
                 "error": str(e)
             }
     
+    async def update_composition(self, wedding_id: str, camera: dict,
+                                 cameras: Optional[List[dict]] = None) -> dict:
+        """
+        Update composition to use a different camera (camera switch)
+        
+        Same as switch_camera.
+        
+        Args:
+            wedding_id: Wedding ID
+            camera: New camera object
+            cameras: Every live camera of the wedding, used if a restart is needed
+        
+        Returns:
+            dict with status
+        """
+        logger.info(f"[COMPOSITION] Updating composition for wedding {wedding_id} to camera {camera.get('camera_id')}")
+        return await self.switch_camera(wedding_id, camera, cameras)
+    
+    async def add_input(self, wedding_id: str, active_camera: dict, camera: dict,
+                        cameras: List[dict]) -> dict:
+        """
+        Make a camera that just connected an input of the running composition
+        
+        Waits for the camera's playlist to be readable, then restarts the
+        composition with `cameras` as inputs and `active_camera` on air. If the
+        playlist never shows up the running composition is left alone.
+        
+        Args:
+            wedding_id: Wedding ID
+            active_camera: Camera on air
+            camera: Camera that connected
+            cameras: Every live camera of the wedding
+        
+        Returns:
+            dict with status
+        """
+        if await self._probe_input(camera, self.input_wait) is None:
+            logger.warning(f"[COMPOSITION] Camera {camera.get('camera_id')} of wedding {wedding_id} has no readable "
+                           f"stream after {self.input_wait:g}s, not adding it")
+            return {"success": False, "error": f"Camera {camera.get('camera_id')} stream is not available"}
+        if wedding_id not in self.active_processes:
+            return {"success": False, "error": "No active composition"}
+        logger.info(f"[COMPOSITION] Adding camera {camera.get('camera_id')} to the composition for wedding {wedding_id}")
+        return await self.start_composition(wedding_id, active_camera, cameras)
+    
+    def has_input(self, wedding_id: str, camera_id: str) -> bool:
+        """Whether a running composition for the wedding has the camera as an input"""
+        if wedding_id not in self.active_processes:
+            return False
+        return any(c.get("camera_id") == camera_id for c in self.composition_inputs.get(wedding_id, []))
+    
     async def stop_composition(self, wedding_id: str) -> dict:
         """
         Stop FFmpeg composition for a wedding
         
         Args:
             wedding_id: Wedding ID
-            
+        
         Returns:
             dict with status
         """
@@ -174,7 +428,9 @@ class FFmpegCompositionService:
                 logger.warning(f"[COMPOSITION] No active composition for wedding {wedding_id}")
                 return {"success": True, "message": "No active composition"}
             
-            process = self.active_processes[wedding_id]
+            # Untracked first, so the monitor knows the exit is expected
+            process = self.active_processes.pop(wedding_id)
+            self.composition_inputs.pop(wedding_id, None)
             
             logger.info(f"[COMPOSITION] Stopping composition for wedding {wedding_id}, PID {process.pid}")
             
@@ -182,6 +438,8 @@ class FFmpegCompositionService:
             try:
                 process.terminate()
                 await asyncio.wait_for(process.wait(), timeout=5.0)
+            except ProcessLookupError:
+                pass
             except asyncio.TimeoutError:
                 # Force kill if graceful shutdown fails
                 logger.warning(f"[COMPOSITION] Graceful shutdown failed, force killing PID {process.pid}")
@@ -189,7 +447,6 @@ class FFmpegCompositionService:
                 await process.wait()
             
             # Clean up tracking
-            del self.active_processes[wedding_id]
             if wedding_id in self.process_health:
                 self.process_health[wedding_id]["status"] = "stopped"
                 self.process_health[wedding_id]["stopped_at"] = datetime.utcnow()
@@ -197,7 +454,7 @@ class FFmpegCompositionService:
             logger.info(f"[COMPOSITION] Successfully stopped composition for wedding {wedding_id}")
             
             return {"success": True, "message": "Composition stopped"}
-            
+        
         except Exception as e:
             logger.error(f"[COMPOSITION] Failed to stop composition: {str(e)}", exc_info=True)
             return {
@@ -211,7 +468,7 @@ class FFmpegCompositionService:
         
         Args:
             wedding_id: Wedding ID
-            
+        
         Returns:
             dict with health status
         """
@@ -260,9 +517,11 @@ class FFmpegCompositionService:
                 "started_at": health.get("started_at"),
                 "uptime_seconds": (datetime.utcnow() - health.get("started_at", datetime.utcnow())).total_seconds(),
                 "restart_count": health.get("restart_count", 0),
-                "camera_id": health.get("camera_id")
+                "switch_count": health.get("switch_count", 0),
+                "camera_id": health.get("camera_id"),
+                "input_camera_ids": health.get("input_camera_ids", [])
             }
-            
+        
         except Exception as e:
             logger.error(f"[COMPOSITION] Health check failed: {str(e)}", exc_info=True)
             return {
@@ -278,13 +537,16 @@ class FFmpegCompositionService:
         Args:
             wedding_id: Wedding ID
             camera: Camera object to use for recovery
-            
+        
         Returns:
             dict with recovery status
         """
         try:
             logger.info(f"[COMPOSITION] Attempting to recover composition for wedding {wedding_id}")
             
+            # Keep the other camera inputs of the failed composition
+            cameras = self.composition_inputs.get(wedding_id)
+            
             # Stop existing process
             await self.stop_composition(wedding_id)
             
@@ -295,7 +557,7 @@ class FFmpegCompositionService:
                 restart_count = 1
             
             # Restart composition
-            result = await self.start_composition(wedding_id, camera)
+            result = await self.start_composition(wedding_id, camera, cameras)
             
             if result.get("success") and wedding_id in self.process_health:
                 self.process_health[wedding_id]["restart_count"] = restart_count
@@ -308,7 +570,7 @@ class FFmpegCompositionService:
                 "restart_count": restart_count,
                 "details": result
             }
-            
+        
         except Exception as e:
             logger.error(f"[COMPOSITION] Recovery failed: {str(e)}", exc_info=True)
             return {
@@ -327,12 +589,21 @@ class FFmpegCompositionService:
         try:
             # Read stderr (FFmpeg outputs to stderr)
             async for line in process.stderr:
-                log_line = line.decode().strip()
-                if log_line:
+                log_line = line.decode(errors="replace").strip()
+                if not log_line:
+                    continue
+                # Replies to switch commands; ret:0 is success
+                if log_line.startswith("Command reply") and "ret:0 " not in f"{log_line} ":
+                    logger.warning(f"[COMPOSITION:{wedding_id}] Switch command failed: {log_line}")
+                else:
                     logger.debug(f"[COMPOSITION:{wedding_id}] {log_line}")
             
             # Process ended
             return_code = await process.wait()
+            if self.active_processes.get(wedding_id) is not process:
+                # Stopped or replaced by a restart
+                logger.info(f"[COMPOSITION] Process for wedding {wedding_id} ended with code {return_code}")
+                return
             logger.warning(f"[COMPOSITION] Process for wedding {wedding_id} ended with code {return_code}")
             
             # Update health status
@@ -340,7 +611,7 @@ class FFmpegCompositionService:
                 self.process_health[wedding_id]["status"] = "terminated"
                 self.process_health[wedding_id]["return_code"] = return_code
                 self.process_health[wedding_id]["ended_at"] = datetime.utcnow()
-            
+        
         except Exception as e:
             logger.error(f"[COMPOSITION] Monitoring error for wedding {wedding_id}: {str(e)}", exc_info=True)
     
@@ -360,14 +631,19 @@ composition_service = FFmpegCompositionService()
 
 
 # Convenience functions for backward compatibility
-async def start_composition(wedding_id: str, camera: dict) -> dict:
+async def start_composition(wedding_id: str, camera: dict, cameras: Optional[List[dict]] = None) -> dict:
     """Start composition for a wedding"""
-    return await composition_service.start_composition(wedding_id, camera)
+    return await composition_service.start_composition(wedding_id, camera, cameras)
+
+
+async def switch_camera(wedding_id: str, camera: dict, cameras: Optional[List[dict]] = None) -> dict:
+    """Switch the camera on air, live if the composition has it as an input"""
+    return await composition_service.switch_camera(wedding_id, camera, cameras)
 
 
-async def update_composition(wedding_id: str, camera: dict) -> dict:
+async def update_composition(wedding_id: str, camera: dict, cameras: Optional[List[dict]] = None) -> dict:
     """Update composition to use a different camera"""
-    return await composition_service.update_composition(wedding_id, camera)
+    return await composition_service.update_composition(wedding_id, camera, cameras)
 
 
 async def stop_composition(wedding_id: str) -> dict:
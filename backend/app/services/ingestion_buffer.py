@@ -0,0 +1,312 @@
+"""
+Analytics Ingestion Buffer
+Batches viewer-session and stream-quality writes into bulk_write calls.
+
+Every viewer join, leave, heartbeat and quality sample used to be its own
+insert_one / update_one. With a few thousand viewers heartbeating every few
+seconds that is a write per viewer per interval. The buffer keeps pending
+writes in memory, coalesces everything addressed to one session into a
+single operation and flushes when INGEST_FLUSH_MAX_OPS operations are
+pending or every INGEST_FLUSH_INTERVAL_SECONDS.
+
+Per session (wedding_id, session_id):
+  - start      -> InsertOne of the session document
+  - heartbeat  -> last_heartbeat_at, keeping only the latest value
+  - end        -> leave_time / duration_seconds
+A heartbeat or end that arrives while the start is still buffered is
+folded into the insert, so a short visit costs one write in total.
+
+Quality samples are append-only and go out as batched inserts.
+
+Backpressure: once INGEST_MAX_PENDING operations are buffered (MongoDB slow
+or unreachable) producers wait for a flush before adding more. If the flush
+could not make room, heartbeats and quality samples are dropped and counted;
+session starts and ends are always kept. A batch that fails is merged back
+into the buffer and retried on the next flush.
+
+Call start(db) from lifespan and stop() on shutdown - stop() flushes.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = float(os.getenv("INGEST_FLUSH_INTERVAL_SECONDS", "1.0"))
+FLUSH_MAX_OPS = int(os.getenv("INGEST_FLUSH_MAX_OPS", "500"))
+MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "20000"))
+
+SessionKey = Tuple[str, str]
+
+
+def build_quality_sample(wedding_id: str, sample: Dict, session_id: Optional[str] = None) -> Dict:
+    """stream_quality_metrics document from a client quality report"""
+    timestamp = sample.get("timestamp")
+    if isinstance(timestamp, str):
+        # Socket clients send ISO strings
+        try:
+            timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        except ValueError:
+            timestamp = None
+    if isinstance(timestamp, datetime) and timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return {
+        "id": str(uuid.uuid4()),
+        "wedding_id": wedding_id,
+        "session_id": session_id or sample.get("session_id"),
+        "bitrate": sample.get("bitrate", 0),
+        "resolution": sample.get("resolution") or sample.get("quality") or "720p",
+        "buffering_events": sample.get("buffering_events", 0),
+        "buffering_duration_ms": sample.get("buffering_duration_ms", 0),
+        "fps": sample.get("fps", 0),
+        "dropped_frames": sample.get("dropped_frames", 0),
+        "timestamp": timestamp or datetime.utcnow(),
+    }
+
+
+class _SessionWrite:
+    """Everything buffered for one viewer session"""
+
+    __slots__ = ("insert", "set", "max")
+
+    def __init__(self):
+        self.insert: Optional[Dict] = None
+        self.set: Dict = {}
+        self.max: Dict = {}
+
+    def merged(self) -> Dict:
+        """The session fields as they will look once written"""
+        doc = dict(self.insert or {})
+        doc.update(self.set)
+        for field, value in self.max.items():
+            if doc.get(field) is None or value > doc[field]:
+                doc[field] = value
+        return doc
+
+    def absorb_older(self, older: "_SessionWrite"):
+        """Merge a batch that failed to write underneath this one"""
+        if self.insert is None:
+            self.insert = older.insert
+        self.set = {**older.set, **self.set}
+        for field, value in older.max.items():
+            if field not in self.max or value > self.max[field]:
+                self.max[field] = value
+
+    def to_operation(self, key: SessionKey):
+        if self.insert is not None:
+            return InsertOne(self.merged())
+        update = {}
+        if self.set:
+            update["$set"] = self.set
+        if self.max:
+            update["$max"] = self.max
+        wedding_id, session_id = key
+        return UpdateOne({"session_id": session_id, "wedding_id": wedding_id}, update)
+
+
+class AnalyticsIngestBuffer:
+    """Coalescing write-behind buffer for viewer_sessions and stream_quality_metrics"""
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL_SECONDS,
+                 flush_max_ops: int = FLUSH_MAX_OPS, max_pending: int = MAX_PENDING):
+        self.flush_interval = flush_interval
+        self.flush_max_ops = flush_max_ops
+        self.max_pending = max_pending
+        self._db = None
+        self._sessions: Dict[SessionKey, _SessionWrite] = {}
+        self._quality: List[Dict] = []
+        # Sessions handed to bulk_write but not yet acknowledged
+        self._inflight: Dict[SessionKey, _SessionWrite] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "events": 0,
+            "operations_written": 0,
+            "bulk_writes": 0,
+            "failed_flushes": 0,
+            "dropped": 0,
+        }
+
+    # ---- producers ----
+
+    @property
+    def pending(self) -> int:
+        return len(self._sessions) + len(self._quality)
+
+    async def session_started(self, session_doc: Dict):
+        await self._make_room(droppable=False)
+        entry = self._entry((session_doc["wedding_id"], session_doc["session_id"]))
+        entry.insert = dict(session_doc)
+        self._added()
+
+    async def heartbeat(self, wedding_id: str, session_id: str, at: Optional[datetime] = None) -> bool:
+        """Record a viewer heartbeat; False if it was dropped under backpressure"""
+        key = (wedding_id, session_id)
+        if key not in self._sessions and not await self._make_room(droppable=True):
+            return False
+        entry = self._entry(key)
+        at = at or datetime.utcnow()
+        if entry.max.get("last_heartbeat_at") is None or at > entry.max["last_heartbeat_at"]:
+            entry.max["last_heartbeat_at"] = at
+        self._added()
+        return True
+
+    async def session_ended(self, wedding_id: str, session_id: str, leave_time: datetime, duration_seconds: int):
+        await self._make_room(droppable=False)
+        entry = self._entry((wedding_id, session_id))
+        entry.set["leave_time"] = leave_time
+        entry.set["duration_seconds"] = duration_seconds
+        self._added()
+
+    async def quality_sample(self, metric_doc: Dict) -> bool:
+        """Record a stream quality sample; False if it was dropped under backpressure"""
+        if not await self._make_room(droppable=True):
+            return False
+        self._quality.append(metric_doc)
+        self._added()
+        return True
+
+    def pending_session(self, wedding_id: str, session_id: str) -> Optional[Dict]:
+        """Buffered (not yet written) fields of a session, or None"""
+        key = (wedding_id, session_id)
+        inflight, entry = self._inflight.get(key), self._sessions.get(key)
+        if inflight is None and entry is None:
+            return None
+        return {**(inflight.merged() if inflight else {}), **(entry.merged() if entry else {})}
+
+    def pending_open_session(self, wedding_id: str, user_id: str) -> Optional[Dict]:
+        """A buffered, not yet ended session started by this user"""
+        for pending in (self._sessions, self._inflight):
+            for (pending_wedding_id, session_id), entry in pending.items():
+                if pending_wedding_id != wedding_id or entry.insert is None or entry.insert.get("user_id") != user_id:
+                    continue
+                doc = self.pending_session(wedding_id, session_id)
+                if doc.get("leave_time") is None:
+                    return doc
+        return None
+
+    def _entry(self, key: SessionKey) -> _SessionWrite:
+        entry = self._sessions.get(key)
+        if entry is None:
+            entry = self._sessions[key] = _SessionWrite()
+        return entry
+
+    def _added(self):
+        self.stats["events"] += 1
+        if self.pending >= self.flush_max_ops:
+            if self._task is not None:
+                self._flush_requested.set()
+
+    async def _make_room(self, droppable: bool) -> bool:
+        if self.pending < self.max_pending:
+            return True
+        # Backpressure: the caller waits for the buffer to drain
+        await self.flush()
+        if self.pending < self.max_pending or not droppable:
+            return True
+        self.stats["dropped"] += 1
+        return False
+
+    # ---- flushing ----
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns the number of operations written"""
+        async with self._flush_lock:
+            if not self._sessions and not self._quality:
+                return 0
+            sessions, self._sessions = self._sessions, {}
+            self._inflight = sessions
+            quality, self._quality = self._quality, []
+
+            db = self._db
+            if db is None:
+                from app.database import get_db
+                db = get_db()
+
+            written = 0
+            try:
+                if sessions:
+                    operations = [entry.to_operation(key) for key, entry in sessions.items()]
+                    written += await self._bulk_write(db.viewer_sessions, operations)
+                    sessions = {}
+                if quality:
+                    written += await self._bulk_write(db.stream_quality_metrics, [InsertOne(doc) for doc in quality])
+                    quality = []
+            except Exception as e:
+                self.stats["failed_flushes"] += 1
+                logger.error(f"[INGEST] Flush failed, {len(sessions) + len(quality)} operations re-queued: {e}")
+                self._requeue(sessions, quality)
+            finally:
+                self._inflight = {}
+            return written
+
+    async def _bulk_write(self, collection, operations) -> int:
+        try:
+            await collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Per-document errors (e.g. duplicate keys) will not succeed on retry
+            errors = e.details.get("writeErrors", [])
+            logger.warning(f"[INGEST] {len(errors)} of {len(operations)} writes to {collection.name} rejected: "
+                           f"{errors[0].get('errmsg') if errors else e}")
+        self.stats["bulk_writes"] += 1
+        self.stats["operations_written"] += len(operations)
+        return len(operations)
+
+    def _requeue(self, sessions: Dict[SessionKey, _SessionWrite], quality: List[Dict]):
+        for key, older in sessions.items():
+            newer = self._sessions.get(key)
+            if newer is None:
+                self._sessions[key] = older
+            else:
+                newer.absorb_older(older)
+        self._quality = quality + self._quality
+        overflow = self.pending - self.max_pending
+        if overflow > 0 and self._quality:
+            # Oldest quality samples go first - they matter least
+            dropped = min(overflow, len(self._quality))
+            del self._quality[:dropped]
+            self.stats["dropped"] += dropped
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"[INGEST] Flush loop error: {e}")
+
+    async def start(self, db):
+        """Start the periodic flush (called from lifespan)"""
+        self._db = db
+        self._flush_requested = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the periodic flush and write out whatever is still buffered"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self.pending:
+            logger.error(f"[INGEST] {self.pending} buffered operations lost on shutdown")
+        logger.info(f"[INGEST] Stopped: {self.stats}")
+
+
+# Singleton instance
+analytics_ingest = AnalyticsIngestBuffer()
@@ -0,0 +1,137 @@
+"""
+Layout Photos Migration
+Converts the legacy `theme_settings.cover_photos` array into the
+placeholder-based `layout_photos` structure and persists it.
+
+Weddings carry a `layout_photos_version` field once migrated. Readers only
+need the conversion when that field is missing; the first read writes the
+converted structure back (lazy migration), and
+scripts/migrate_cover_photos_to_layout_photos.py migrates everything else in
+one pass. Both go through migrate_wedding_layout_photos, which is idempotent.
+"""
+
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Bump when the stored layout_photos shape changes and add a migration step
+LAYOUT_PHOTOS_VERSION = 1
+
+# Legacy cover photo category -> layout placeholder
+COVER_CATEGORY_PLACEHOLDERS = {
+    "bride": "bridePhoto",
+    "groom": "groomPhoto",
+    "couple": "couplePhoto",
+    "moment": "preciousMoments",
+    "studio": "studioImage",
+}
+
+# Placeholders that hold an array of photos instead of a single photo
+ARRAY_PLACEHOLDERS = {"preciousMoments"}
+
+# Fields needed to serve and migrate layout photos
+LAYOUT_PHOTOS_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "theme_settings.layout_id": 1,
+    "theme_settings.theme_id": 1,
+    "layout_photos": 1,
+    "layout_photos_version": 1,
+}
+
+
+def convert_cover_photos(cover_photos: List[Any]) -> Dict[str, Any]:
+    """Convert a legacy cover_photos array to the placeholder-based layout_photos structure"""
+    layout_photos: Dict[str, Any] = {}
+
+    for photo in cover_photos or []:
+        if not isinstance(photo, dict):
+            continue
+
+        placeholder_name = COVER_CATEGORY_PLACEHOLDERS.get(photo.get("category", "general"))
+        url = photo.get("url", "")
+        file_id = photo.get("file_id", "")  # Actual Telegram file_id
+        if not placeholder_name or not (url or file_id):
+            continue
+
+        media_id = photo.get("media_id", "")
+        entry = {
+            "url": url,
+            "file_id": file_id,
+            "media_id": media_id,
+            # Persisted, so the id stays stable for later deletes
+            "photo_id": media_id or str(uuid.uuid4()),
+            "type": photo.get("type", "photo"),
+        }
+
+        if placeholder_name in ARRAY_PLACEHOLDERS:
+            layout_photos.setdefault(placeholder_name, []).append(entry)
+        else:
+            layout_photos[placeholder_name] = entry
+
+    return layout_photos
+
+
+def needs_migration(wedding: Dict) -> bool:
+    return (wedding.get("layout_photos_version") or 0) < LAYOUT_PHOTOS_VERSION
+
+
+async def migrate_wedding_layout_photos(db, wedding: Dict) -> Dict[str, Any]:
+    """
+    Persist the converted layout_photos for a wedding and stamp the schema version.
+
+    `wedding` needs at least `id`, `layout_photos` and `layout_photos_version`.
+    Existing layout_photos are never overwritten: the conversion is only written
+    when the stored value is still empty, so a concurrent upload wins.
+    Returns the wedding's current layout_photos.
+    """
+    wedding_id = wedding["id"]
+    if not needs_migration(wedding):
+        return wedding.get("layout_photos") or {}
+
+    layout_photos = wedding.get("layout_photos") or {}
+    stamp = {"layout_photos_version": LAYOUT_PHOTOS_VERSION}
+
+    if not layout_photos:
+        legacy = await db.weddings.find_one(
+            {"id": wedding_id},
+            {"_id": 0, "theme_settings.cover_photos": 1}
+        )
+        cover_photos = ((legacy or {}).get("theme_settings") or {}).get("cover_photos") or []
+        converted = convert_cover_photos(cover_photos)
+
+        if converted:
+            result = await db.weddings.update_one(
+                {
+                    "id": wedding_id,
+                    "$or": [
+                        {"layout_photos": {"$exists": False}},
+                        {"layout_photos": None},
+                        {"layout_photos": {}},
+                    ],
+                },
+                {"$set": {**stamp, "layout_photos": converted, "updated_at": datetime.utcnow()}}
+            )
+            if result.matched_count:
+                logger.info(
+                    f"[LAYOUT_MIGRATION] Wedding {wedding_id}: migrated {len(cover_photos)} cover photo(s) "
+                    f"to placeholders {list(converted.keys())}"
+                )
+                return converted
+
+            # layout_photos was written since we read it - keep that instead
+            current = await db.weddings.find_one({"id": wedding_id}, {"_id": 0, "layout_photos": 1})
+            layout_photos = (current or {}).get("layout_photos") or {}
+
+    await db.weddings.update_one({"id": wedding_id}, {"$set": stamp})
+    return layout_photos
+
+
+async def ensure_layout_photos(db, wedding: Dict) -> Dict[str, Any]:
+    """Current layout_photos of a wedding, migrating legacy cover photos first if needed"""
+    if needs_migration(wedding):
+        return await migrate_wedding_layout_photos(db, wedding)
+    return wedding.get("layout_photos") or {}
@@ -0,0 +1,282 @@
+"""
+Live Wedding Registry
+In-process registry of weddings with an active live session.
+
+Serves the /api/streams/live listing and live-status lookups from memory
+instead of querying the weddings collection on every viewer poll. The
+registry is kept current by LiveStatusService transitions, the stream
+start/stop routes and a periodic reconcile against MongoDB that repairs
+anything changed behind its back (manual DB edits, lost messages).
+
+A transition applied on one worker is shared with the others as a socket
+manager worker event carrying the new snapshot, so every worker's registry
+follows it within a pub/sub round trip rather than at its next reconcile.
+
+Consumers can subscribe to status changes:
+
+    unsubscribe = live_registry.subscribe(callback)
+
+where `callback(event)` is an async function receiving
+{"wedding_id", "status", "previous_status", "wedding", "remote"}; `remote`
+is set when the transition happened on another worker.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Live session states that keep a wedding in the registry
+ACTIVE_SESSION_STATUSES = {"waiting", "live", "paused"}
+
+# Fields cached per wedding - enough for the /live listing and get_live_status
+SNAPSHOT_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "status": 1,
+    "stream_call_id": 1,
+    "started_at": 1,
+    "ended_at": 1,
+    "recording_url": 1,
+    "viewers_count": 1,
+    "can_go_live": 1,
+    # live_session minus the unbounded status_history array
+    "live_session.status": 1,
+    "live_session.stream_started_at": 1,
+    "live_session.stream_paused_at": 1,
+    "live_session.stream_resumed_at": 1,
+    "live_session.stream_ended_at": 1,
+    "live_session.pause_count": 1,
+    "live_session.total_pause_duration": 1,
+    "live_session.recording_started": 1,
+    "live_session.recording_session_id": 1,
+    "live_session.hls_playback_url": 1,
+}
+
+RECONCILE_INTERVAL_SECONDS = int(os.getenv("LIVE_REGISTRY_RECONCILE_SECONDS", "30"))
+WORKER_EVENT = "live_registry"
+
+StatusCallback = Callable[[Dict], Awaitable[None]]
+
+
+def _registry_status(wedding: Dict) -> Optional[str]:
+    """Status the registry tracks for a wedding, or None if it is not active"""
+    session_status = (wedding.get("live_session") or {}).get("status")
+    if session_status in ACTIVE_SESSION_STATUSES:
+        return session_status
+    if wedding.get("status") == "live":
+        # Started without a live session (legacy /streams/start)
+        return "live"
+    if session_status == "ended":
+        return "ended"
+    return None
+
+
+class LiveWeddingRegistry:
+    """Registry of currently-live weddings maintained from status transitions"""
+
+    def __init__(self):
+        # wedding_id -> snapshot (SNAPSHOT_PROJECTION fields)
+        self._active: Dict[str, Dict] = {}
+        # wedding_id -> snapshot of ended weddings (terminal, safe to cache)
+        self._ended: Dict[str, Dict] = {}
+        self._max_ended = 1000
+        self._subscribers: List[StatusCallback] = []
+        self._reconcile_task: Optional[asyncio.Task] = None
+        self._worker_handler_registered = False
+        self._db = None
+        self.loaded = False
+
+    # ==================== READS ====================
+
+    def list_live(self) -> List[Dict]:
+        """Weddings whose main status is live (the /streams/live listing)"""
+        return [w for w in self._active.values() if w.get("status") == "live"]
+
+    def get_snapshot(self, wedding_id: str) -> Optional[Dict]:
+        """Cached wedding snapshot if the wedding is active or ended, else None"""
+        return self._active.get(wedding_id) or self._ended.get(wedding_id)
+
+    def get_status(self, wedding_id: str) -> Optional[str]:
+        """Tracked status (waiting/live/paused/ended) or None if unknown"""
+        snapshot = self.get_snapshot(wedding_id)
+        return _registry_status(snapshot) if snapshot else None
+
+    def is_live(self, wedding_id: str) -> bool:
+        return wedding_id in self._active and self._active[wedding_id].get("status") == "live"
+
+    # ==================== SUBSCRIPTIONS ====================
+
+    def subscribe(self, callback: StatusCallback) -> Callable[[], None]:
+        """Register an async callback for status changes; returns an unsubscribe function"""
+        self._subscribers.append(callback)
+
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    async def _notify(self, wedding_id: str, status: Optional[str], previous_status: Optional[str],
+                      wedding: Optional[Dict], remote: bool = False):
+        event = {
+            "wedding_id": wedding_id,
+            "status": status or "idle",
+            "previous_status": previous_status or "idle",
+            "wedding": wedding,
+            "remote": remote,
+        }
+        for callback in list(self._subscribers):
+            try:
+                await callback(event)
+            except Exception as e:
+                logger.error(f"[LIVE_REGISTRY] Subscriber failed for wedding {wedding_id}: {e}")
+
+    # ==================== WRITES ====================
+
+    async def update(self, wedding: Dict, remote: bool = False):
+        """Apply the current state of a wedding document to the registry"""
+        wedding_id = wedding["id"]
+        previous_status = self.get_status(wedding_id)
+        status = _registry_status(wedding)
+
+        self._active.pop(wedding_id, None)
+        if status in ACTIVE_SESSION_STATUSES:
+            self._active[wedding_id] = wedding
+            self._ended.pop(wedding_id, None)
+        elif status == "ended":
+            self._ended[wedding_id] = wedding
+            if len(self._ended) > self._max_ended:
+                # Drop the oldest cached ended wedding
+                self._ended.pop(next(iter(self._ended)))
+        else:
+            self._ended.pop(wedding_id, None)
+
+        if status != previous_status:
+            logger.info(f"[LIVE_REGISTRY] Wedding {wedding_id}: {previous_status or 'idle'} → {status or 'idle'}")
+            await self._notify(wedding_id, status, previous_status, wedding, remote)
+
+    async def refresh(self, wedding_id: str, db=None, share: bool = True):
+        """
+        Re-read a single wedding from MongoDB and apply it (called after
+        transitions); with `share` the other workers apply it too
+        """
+        if db is None:
+            if self._db is None:
+                from app.database import get_db
+                self._db = get_db()
+            db = self._db
+        if db is None:
+            return
+        try:
+            wedding = await db.weddings.find_one({"id": wedding_id}, SNAPSHOT_PROJECTION)
+        except Exception as e:
+            logger.error(f"[LIVE_REGISTRY] Failed to refresh wedding {wedding_id}: {e}")
+            return
+        if wedding:
+            await self.update(wedding)
+        else:
+            await self.remove(wedding_id, share=False)
+        if share:
+            await self._share(wedding_id, wedding)
+
+    async def remove(self, wedding_id: str, share: bool = True, remote: bool = False):
+        """Forget a wedding (e.g. deleted)"""
+        previous_status = self.get_status(wedding_id)
+        self._active.pop(wedding_id, None)
+        self._ended.pop(wedding_id, None)
+        if previous_status:
+            await self._notify(wedding_id, None, previous_status, None, remote)
+        if share:
+            await self._share(wedding_id, None)
+
+    # ==================== OTHER WORKERS ====================
+
+    async def _share(self, wedding_id: str, wedding: Optional[Dict]):
+        """Hand a wedding's new snapshot (None: forgotten) to the other workers' registries"""
+        try:
+            from app.services.socket_service import sio
+            await sio.manager.publish_worker_event(WORKER_EVENT, {"wedding_id": wedding_id, "wedding": wedding})
+        except Exception as e:
+            # Their next reconcile picks it up
+            logger.error(f"[LIVE_REGISTRY] Failed to share wedding {wedding_id}: {e}")
+
+    def _apply_worker_event(self, message: Dict):
+        """Another worker applied a transition: apply its snapshot here"""
+        asyncio.ensure_future(self._apply_remote(message["wedding_id"], message.get("wedding")))
+
+    async def _apply_remote(self, wedding_id: str, wedding: Optional[Dict]):
+        try:
+            if wedding:
+                await self.update(wedding, remote=True)
+            else:
+                await self.remove(wedding_id, share=False, remote=True)
+        except Exception as e:
+            logger.error(f"[LIVE_REGISTRY] Failed to apply wedding {wedding_id} from another worker: {e}")
+
+    # ==================== RECONCILIATION ====================
+
+    async def reconcile(self, db=None):
+        """Rebuild the active set from MongoDB, notifying subscribers of any differences"""
+        db = db if db is not None else self._db
+        if db is None:
+            return
+        self._db = db
+
+        cursor = db.weddings.find(
+            {"$or": [
+                {"status": "live"},
+                {"live_session.status": {"$in": list(ACTIVE_SESSION_STATUSES)}}
+            ]},
+            SNAPSHOT_PROJECTION
+        )
+        current = {w["id"]: w async for w in cursor}
+
+        for wedding in current.values():
+            await self.update(wedding)
+
+        for wedding_id in list(self._active.keys()):
+            if wedding_id not in current:
+                # Went inactive without a hook firing in this process
+                await self.refresh(wedding_id, db, share=False)
+
+        self.loaded = True
+
+    async def _reconcile_loop(self, interval: int):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[LIVE_REGISTRY] Reconcile failed: {e}")
+
+    async def start(self, db, interval: int = RECONCILE_INTERVAL_SECONDS):
+        """Load the registry, follow other workers' transitions and start the periodic reconcile (called from lifespan)"""
+        self._db = db
+        if not self._worker_handler_registered:
+            from app.services.socket_service import sio
+            sio.manager.on_worker_event(WORKER_EVENT, self._apply_worker_event)
+            self._worker_handler_registered = True
+        try:
+            await self.reconcile(db)
+            logger.info(f"[LIVE_REGISTRY] Loaded {len(self._active)} active weddings")
+        except Exception as e:
+            logger.error(f"[LIVE_REGISTRY] Initial load failed: {e}")
+        self._reconcile_task = asyncio.create_task(self._reconcile_loop(interval))
+
+    async def stop(self):
+        if self._reconcile_task:
+            self._reconcile_task.cancel()
+            try:
+                await self._reconcile_task
+            except asyncio.CancelledError:
+                pass
+            self._reconcile_task = None
+
+
+# Singleton instance
+live_registry = LiveWeddingRegistry()
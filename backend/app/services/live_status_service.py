@@ -1,4 +1,5 @@
 from app.models import LiveStatus, WeddingLiveSession
+from app.services.live_registry import live_registry
 from datetime import datetime, timezone
 from typing import Dict, Optional
 import logging
@@ -6,6 +7,50 @@ import uuid
 
 logger = logging.getLogger(__name__)
 
+
+def describe_live_status(wedding: Dict) -> Dict:
+    """Public live status of a wedding document (live-status endpoint and SSE status events)"""
+    live_session = wedding.get("live_session")
+    
+    if not live_session:
+        return {
+            "status": "idle",
+            "can_go_live": wedding.get("can_go_live", True)
+        }
+    
+    status = live_session.get("status", "idle")
+    
+    # Calculate total duration if live
+    total_duration = 0
+    if live_session.get("stream_started_at"):
+        if status == "live":
+            # Currently live (MongoDB hands back naive UTC datetimes)
+            started_at = live_session["stream_started_at"]
+            if started_at.tzinfo is None:
+                started_at = started_at.replace(tzinfo=timezone.utc)
+            total_duration = int(
+                (datetime.now(timezone.utc) - started_at).total_seconds()
+            ) - live_session.get("total_pause_duration", 0)
+        elif status == "ended":
+            # Ended
+            if live_session.get("stream_ended_at"):
+                total_duration = int(
+                    (live_session["stream_ended_at"] - live_session["stream_started_at"]).total_seconds()
+                ) - live_session.get("total_pause_duration", 0)
+    
+    return {
+        "status": status,
+        "stream_started_at": live_session.get("stream_started_at"),
+        "stream_ended_at": live_session.get("stream_ended_at"),
+        "pause_count": live_session.get("pause_count", 0),
+        "total_duration": total_duration,
+        "total_pause_duration": live_session.get("total_pause_duration", 0),
+        "recording_available": status == "ended" and live_session.get("recording_started", False),
+        "can_go_live": wedding.get("can_go_live", True),
+        "hls_playback_url": live_session.get("hls_playback_url") if status in ["live", "paused"] else None
+    }
+
+
 class LiveStatusService:
     """Service for managing live stream status transitions with state machine logic"""
     
@@ -152,6 +197,7 @@ class LiveStatusService:
                 reason="Host clicked Go Live",
                 triggered_by="host"
             )
+            await live_registry.refresh(wedding_id, self.db)
             
             return {
                 "success": True,
@@ -235,6 +281,7 @@ class LiveStatusService:
                 {"id": wedding_id},
                 {"$set": update_fields}
             )
+            await live_registry.refresh(wedding_id, self.db)
             
             should_start_recording = (
                 current_status == LiveStatus.WAITING and 
@@ -314,6 +361,7 @@ class LiveStatusService:
                     "status": "live"  # Keep main status as live (just paused)
                 }}
             )
+            await live_registry.refresh(wedding_id, self.db)
             
             return {
                 "success": True,
@@ -382,6 +430,7 @@ class LiveStatusService:
                     "live_session.pause_count": live_session.get("pause_count", 0) + 1
                 }}
             )
+            await live_registry.refresh(wedding_id, self.db)
             
             return {
                 "success": True,
@@ -462,6 +511,7 @@ class LiveStatusService:
                     "status": "live"
                 }}
             )
+            await live_registry.refresh(wedding_id, self.db)
             
             return {
                 "success": True,
@@ -551,6 +601,7 @@ class LiveStatusService:
                     "playback_url": None  # Clear playback URL
                 }}
             )
+            await live_registry.refresh(wedding_id, self.db)
             
             return {
                 "success": True,
@@ -571,51 +622,20 @@ class LiveStatusService:
     async def get_live_status(self, wedding_id: str) -> Dict:
         """Get current live status for wedding"""
         try:
-            wedding = await self.db.weddings.find_one({"id": wedding_id})
+            # Active and ended weddings are served from the in-memory registry
+            wedding = live_registry.get_snapshot(wedding_id)
+            if wedding is None:
+                wedding = await self.db.weddings.find_one(
+                    {"id": wedding_id},
+                    {"_id": 0, "live_session.status_history": 0}
+                )
             if not wedding:
                 return {
                     "success": False,
                     "error": "Wedding not found"
                 }
             
-            live_session = wedding.get("live_session")
-            
-            if not live_session:
-                return {
-                    "success": True,
-                    "status": "idle",
-                    "can_go_live": wedding.get("can_go_live", True)
-                }
-            
-            status = live_session.get("status", "idle")
-            
-            # Calculate total duration if live
-            total_duration = 0
-            if live_session.get("stream_started_at"):
-                if status == "live":
-                    # Currently live
-                    total_duration = int(
-                        (datetime.now(timezone.utc) - live_session["stream_started_at"]).total_seconds()
-                    ) - live_session.get("total_pause_duration", 0)
-                elif status == "ended":
-                    # Ended
-                    if live_session.get("stream_ended_at"):
-                        total_duration = int(
-                            (live_session["stream_ended_at"] - live_session["stream_started_at"]).total_seconds()
-                        ) - live_session.get("total_pause_duration", 0)
-            
-            return {
-                "success": True,
-                "status": status,
-                "stream_started_at": live_session.get("stream_started_at"),
-                "stream_ended_at": live_session.get("stream_ended_at"),
-                "pause_count": live_session.get("pause_count", 0),
-                "total_duration": total_duration,
-                "total_pause_duration": live_session.get("total_pause_duration", 0),
-                "recording_available": status == "ended" and live_session.get("recording_started", False),
-                "can_go_live": wedding.get("can_go_live", True),
-                "hls_playback_url": live_session.get("hls_playback_url") if status in ["live", "paused"] else None
-            }
+            return {"success": True, **describe_live_status(wedding)}
             
         except Exception as e:
             logger.error(f"Error in get_live_status: {str(e)}")
@@ -13,17 +13,49 @@ Pulse provides:
 - Token generation and access control
 
 Phase 1 Implementation: Mock credentials for development/testing
+
+All PulseService instances share one pooled aiohttp session, so API
+calls never block the event loop and reuse connections; the lifespan
+closes it with close_http_session().
 """
 
+import asyncio
 import os
 import logging
-import requests
+import aiohttp
 from typing import Dict, Optional, List, Any
 from datetime import datetime, timedelta
 import json
 
 logger = logging.getLogger(__name__)
 
+PULSE_TIMEOUT_SECONDS = float(os.getenv("PULSE_TIMEOUT_SECONDS", "30"))
+PULSE_MAX_CONNECTIONS = int(os.getenv("PULSE_MAX_CONNECTIONS", "100"))
+
+_http_session: Optional[aiohttp.ClientSession] = None
+_http_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Shared connection pool for Pulse API calls (created on first use in the running loop)"""
+    global _http_session, _http_session_loop
+    loop = asyncio.get_running_loop()
+    if _http_session is None or _http_session.closed or _http_session_loop is not loop:
+        _http_session_loop = loop
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=PULSE_MAX_CONNECTIONS),
+            timeout=aiohttp.ClientTimeout(total=PULSE_TIMEOUT_SECONDS)
+        )
+    return _http_session
+
+
+async def close_http_session():
+    """Close the shared session (called from lifespan)"""
+    global _http_session
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
+
 
 class PulseServiceException(Exception):
     """Custom exception for Pulse service errors"""
@@ -60,7 +92,7 @@ class PulseService:
         logger.info(f"   LiveKit URL: {self.livekit_url}")
         logger.info(f"   Mock Mode: {self.mock_mode}")
     
-    def _make_request(
+    async def _make_request(
         self,
         method: str,
         endpoint: str,
@@ -94,19 +126,17 @@ class PulseService:
         }
         
         try:
-            response = requests.request(
-                method=method,
-                url=url,
+            async with get_http_session().request(
+                method,
+                url,
                 json=payload,
                 params=params,
-                headers=headers,
-                timeout=30
-            )
-            
-            response.raise_for_status()
-            return response.json()
+                headers=headers
+            ) as response:
+                response.raise_for_status()
+                return await response.json()
             
-        except requests.exceptions.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error(f"Pulse API request failed: {str(e)}")
             raise PulseServiceException(f"Pulse API error: {str(e)}")
     
@@ -215,7 +245,7 @@ class PulseService:
         self,
         room_name: str,
         participant_name: str,
-        participant_id: str,
+        participant_id: Optional[str],
         can_publish: bool = False,
         can_subscribe: bool = True,
         can_publish_data: bool = True,
@@ -229,7 +259,7 @@ class PulseService:
         Args:
             room_name: Unique room identifier (e.g., wedding_123)
             participant_name: Display name for the participant
-            participant_id: Internal user ID
+            participant_id: Internal user ID (None: not bound to one identity)
             can_publish: Allow publishing video/audio (host only)
             can_subscribe: Allow subscribing to streams (guests)
             can_publish_data: Allow sending chat/data messages
@@ -256,7 +286,7 @@ class PulseService:
             "metadata": metadata or {}
         }
         
-        response = self._make_request("POST", "/v1/tokens/create", payload)
+        response = await self._make_request("POST", "/v1/tokens/create", payload)
         
         logger.info(f"✅ Token generated for {participant_name}")
         return response
@@ -286,7 +316,7 @@ class PulseService:
             "metadata": metadata or {}
         }
         
-        response = self._make_request("POST", "/v1/rooms/create", payload)
+        response = await self._make_request("POST", "/v1/rooms/create", payload)
         
         logger.info(f"✅ Room created: {room_name}")
         return response
@@ -307,7 +337,7 @@ class PulseService:
         """
         logger.info(f"🛑 Ending room: {room_name}")
         
-        response = self._make_request("DELETE", f"/v1/rooms/{room_name}")
+        response = await self._make_request("DELETE", f"/v1/rooms/{room_name}")
         
         logger.info(f"✅ Room ended: {room_name}")
         return response
@@ -329,7 +359,7 @@ class PulseService:
         """
         logger.info(f"ℹ️ Getting room info: {room_name}")
         
-        response = self._make_request("GET", f"/v1/rooms/{room_name}")
+        response = await self._make_request("GET", f"/v1/rooms/{room_name}")
         
         return response
     
@@ -352,7 +382,7 @@ class PulseService:
         """
         logger.info(f"👥 Listing participants in room: {room_name}")
         
-        response = self._make_request("GET", f"/v1/rooms/{room_name}/participants")
+        response = await self._make_request("GET", f"/v1/rooms/{room_name}/participants")
         
         return response.get("participants", [])
     
@@ -406,7 +436,7 @@ class PulseService:
             }
         }
         
-        response = self._make_request("POST", "/v1/egress/room", payload)
+        response = await self._make_request("POST", "/v1/egress/room", payload)
         
         logger.info(f"✅ Recording started: {response.get('egress_id')}")
         return response
@@ -427,7 +457,7 @@ class PulseService:
         """
         logger.info(f"⏹️ Stopping recording: {egress_id}")
         
-        response = self._make_request("POST", f"/v1/egress/{egress_id}/stop")
+        response = await self._make_request("POST", f"/v1/egress/{egress_id}/stop")
         
         logger.info(f"✅ Recording stopped: {egress_id}")
         return response
@@ -459,7 +489,7 @@ class PulseService:
         """
         logger.info(f"📼 Getting recording details: {recording_id}")
         
-        response = self._make_request("GET", f"/v1/recordings/{recording_id}")
+        response = await self._make_request("GET", f"/v1/recordings/{recording_id}")
         
         return response
     
@@ -510,7 +540,7 @@ class PulseService:
             }
         }
         
-        response = self._make_request("POST", "/v1/ingress/rtmp", payload)
+        response = await self._make_request("POST", "/v1/ingress/rtmp", payload)
         
         logger.info(f"✅ RTMP ingress created: {response.get('ingress_id')}")
         return response
@@ -530,7 +560,7 @@ class PulseService:
         """
         logger.info(f"🗑️ Deleting RTMP ingress: {ingress_id}")
         
-        response = self._make_request("DELETE", f"/v1/ingress/{ingress_id}")
+        response = await self._make_request("DELETE", f"/v1/ingress/{ingress_id}")
         
         logger.info(f"✅ RTMP ingress deleted: {ingress_id}")
         return response
@@ -598,7 +628,7 @@ class PulseService:
             "metadata": metadata or {}
         }
         
-        response = self._make_request("POST", "/v1/egress/stream", payload)
+        response = await self._make_request("POST", "/v1/egress/stream", payload)
         
         logger.info(f"✅ YouTube stream started: {response.get('stream_id')}")
         return response
@@ -619,7 +649,7 @@ class PulseService:
         """
         logger.info(f"⏹️ Stopping YouTube stream: {stream_id}")
         
-        response = self._make_request("POST", f"/v1/egress/stream/{stream_id}/stop")
+        response = await self._make_request("POST", f"/v1/egress/stream/{stream_id}/stop")
         
         logger.info(f"✅ YouTube stream stopped: {stream_id}")
         return response
@@ -694,7 +724,7 @@ class PulseService:
             }
         }
         
-        response = self._make_request("POST", "/v1/egress/stream", payload)
+        response = await self._make_request("POST", "/v1/egress/stream", payload)
         
         logger.info(f"✅ Multi-platform stream started: {response.get('stream_id')}")
         return response
@@ -719,7 +749,7 @@ class PulseService:
         logger.info("🏥 Checking Pulse API health")
         
         try:
-            response = self._make_request("GET", "/v1/health")
+            response = await self._make_request("GET", "/v1/health")
             return response
         except Exception as e:
             logger.error(f"❌ Health check failed: {str(e)}")
@@ -0,0 +1,433 @@
+"""
+Stream Quality Rollups
+Tiered retention for `stream_quality_metrics`:
+
+    raw samples     kept for QUALITY_RAW_RETENTION_SECONDS (TTL index)
+    minute points   min / avg / max / p95 per wedding per minute
+    hour points     merged from the minute points
+
+Each rollup point in the `quality_rollups` time-series collection is
+    {"bucket", "meta": {"wedding_id", "granularity"}, "samples",
+     "bitrate" / "fps" / "dropped_frames": {"min", "avg", "max", "p95"},
+     "buffering_events", "buffering_duration_ms" (sums),
+     "resolutions": {resolution: samples}}
+
+Minute p95 is exact (nearest rank over the minute's samples). Coarser p95
+values are the sample-weighted mean of the minute p95s - an approximation
+that avoids holding an hour of raw samples.
+
+The rollups run as part of the analytics rollup job (same lease, grace
+period and insert-only/de-duplicate-on-read scheme) with their own
+high-water marks, starting from the earliest raw sample. The raw TTL index
+is only created once the minute rollups have caught up with the retention
+window, so existing samples are never expired before they are rolled up.
+
+Charts ask for a range and a maximum number of points; get_chart picks
+raw, minute or hour resolution accordingly and thins the result with
+LTTB (largest-triangle-three-buckets) when it is still too dense.
+"""
+
+import logging
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.services.analytics_service import EPOCH, floor_time
+from app.services.rollup_service import (
+    GRANULARITY_SECONDS, ROLLUP_CHUNK_MINUTES, ROLLUP_HOUR_CHUNK, STATE_COLLECTION, STATE_ID,
+    ensure_rollup_collection,
+)
+
+logger = logging.getLogger(__name__)
+
+QUALITY_ROLLUPS_COLLECTION = "quality_rollups"
+
+# Raw samples must outlive the rollup lag by a wide margin
+QUALITY_RAW_RETENTION_SECONDS = max(int(os.getenv("QUALITY_RAW_RETENTION_SECONDS", str(7 * 24 * 3600))), 2 * 3600)
+
+QUALITY_STAT_FIELDS = ("bitrate", "fps", "dropped_frames")
+QUALITY_SUM_FIELDS = ("buffering_events", "buffering_duration_ms")
+
+DEFAULT_MAX_POINTS = 500
+# Raw resolution is only used when the range holds at most this many samples
+RAW_MAX_SAMPLES = 20000
+
+
+# ==================== STATISTICS ====================
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def empty_quality_point(bucket: datetime) -> Dict[str, Any]:
+    point = {"bucket": bucket, "samples": 0, "resolutions": {}}
+    for field in QUALITY_STAT_FIELDS:
+        point[field] = {"min": None, "avg": None, "max": None, "p95": None}
+    for field in QUALITY_SUM_FIELDS:
+        point[field] = 0
+    return point
+
+
+def _resolution_key(resolution: Any) -> str:
+    # Field names can't contain dots
+    return str(resolution or "unknown").replace(".", "_")
+
+
+def combine_quality_points(bucket: datetime, group: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One quality point summarizing a group of finer points"""
+    target = empty_quality_point(bucket)
+    target["samples"] = sum(p["samples"] for p in group)
+    for field in QUALITY_STAT_FIELDS:
+        stats = [(p[field], p["samples"]) for p in group if p[field]["avg"] is not None]
+        if not stats:
+            continue
+        weight = sum(samples for _, samples in stats)
+        target[field] = {
+            "min": min(s["min"] for s, _ in stats),
+            "avg": sum(s["avg"] * samples for s, samples in stats) / weight,
+            "max": max(s["max"] for s, _ in stats),
+            "p95": sum(s["p95"] * samples for s, samples in stats) / weight,
+        }
+    for field in QUALITY_SUM_FIELDS:
+        target[field] = sum(p.get(field, 0) for p in group)
+    for p in group:
+        for resolution, count in (p.get("resolutions") or {}).items():
+            target["resolutions"][resolution] = target["resolutions"].get(resolution, 0) + count
+    return target
+
+
+def merge_quality_points(points: Iterable[Dict[str, Any]], granularity_seconds: int) -> List[Dict[str, Any]]:
+    """Re-bucket quality points into coarser buckets"""
+    groups: Dict[datetime, List[Dict[str, Any]]] = {}
+    for point in points:
+        if point.get("samples"):
+            groups.setdefault(floor_time(point["bucket"], granularity_seconds), []).append(point)
+    return [combine_quality_points(bucket, groups[bucket]) for bucket in sorted(groups)]
+
+
+def lttb(points: List[Dict[str, Any]], threshold: int, x_key: str, y_value) -> List[Dict[str, Any]]:
+    """
+    Largest-triangle-three-buckets downsampling: keeps the first and last
+    point and, from each of threshold - 2 buckets, the point forming the
+    largest triangle with the previously kept point and the next bucket's
+    average. y_value(point) returns the charted value (None counts as 0).
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    def x(point):
+        return (point[x_key] - EPOCH).total_seconds()
+
+    def y(point):
+        return y_value(point) or 0
+
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        range_start = int(math.floor(i * every)) + 1
+        range_end = int(math.floor((i + 1) * every)) + 1
+        next_start = range_end
+        next_end = min(int(math.floor((i + 2) * every)) + 1, len(points))
+        next_bucket = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(x(p) for p in next_bucket) / len(next_bucket)
+        avg_y = sum(y(p) for p in next_bucket) / len(next_bucket)
+
+        ax, ay = x(points[a]), y(points[a])
+        best_area, best = -1.0, range_start
+        for j in range(range_start, min(range_end, len(points) - 1)):
+            area = abs((ax - avg_x) * (y(points[j]) - ay) - (ax - x(points[j])) * (avg_y - ay))
+            if area > best_area:
+                best_area, best = area, j
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def pick_quality_resolution(start: datetime, end: datetime, max_points: int, now: datetime) -> str:
+    """Finest resolution that still fits max_points and whose data still exists"""
+    seconds_per_point = (end - start).total_seconds() / max(max_points, 1)
+    raw_available = start >= now - timedelta(seconds=QUALITY_RAW_RETENTION_SECONDS)
+    if raw_available and seconds_per_point < GRANULARITY_SECONDS["minute"]:
+        return "raw"
+    if seconds_per_point < GRANULARITY_SECONDS["hour"]:
+        return "minute"
+    return "hour"
+
+
+class QualityRollupService:
+    """Minute / hour downsampling of stream quality samples"""
+
+    def __init__(self):
+        self._db = None
+        self._raw_ttl_ready = False
+
+    @property
+    def db(self):
+        if self._db is None:
+            from app.database import get_db
+            self._db = get_db()
+        return self._db
+
+    async def ensure_collection(self):
+        await ensure_rollup_collection(self.db, QUALITY_ROLLUPS_COLLECTION)
+
+    async def ensure_raw_ttl(self, now: datetime):
+        """Expire raw samples once the minute rollups cover everything older than the retention window"""
+        if self._raw_ttl_ready:
+            return
+        state = await self.db[STATE_COLLECTION].find_one({"_id": STATE_ID}) or {}
+        hwm = state.get("quality_minute_hwm")
+        if hwm is None or hwm < now - timedelta(seconds=QUALITY_RAW_RETENTION_SECONDS):
+            return
+        collection = self.db.stream_quality_metrics
+        try:
+            await collection.create_index([("timestamp", 1)], expireAfterSeconds=QUALITY_RAW_RETENTION_SECONDS)
+        except Exception as e:
+            # Index exists with another retention - adjust it in place
+            if getattr(e, "code", None) not in (85, 86):
+                raise
+            await self.db.command({
+                "collMod": collection.name,
+                "index": {"keyPattern": {"timestamp": 1}, "expireAfterSeconds": QUALITY_RAW_RETENTION_SECONDS},
+            })
+        self._raw_ttl_ready = True
+        logger.info(f"[QUALITY_ROLLUPS] Raw quality samples expire after {QUALITY_RAW_RETENTION_SECONDS}s")
+
+    # ==================== RAW COMPUTATION ====================
+
+    async def compute_minute_points(
+        self,
+        start: datetime,
+        end: datetime,
+        wedding_id: Optional[str] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Per-minute quality points for [start, end) from raw samples, keyed by wedding_id"""
+        match = {"timestamp": {"$gte": start, "$lt": end}}
+        if wedding_id:
+            match["wedding_id"] = wedding_id
+        group: Dict[str, Any] = {
+            "_id": {"wedding_id": "$wedding_id", "bucket": {"$dateTrunc": {"date": "$timestamp", "unit": "minute"}}},
+            "samples": {"$sum": 1},
+            "resolutions": {"$push": "$resolution"},
+        }
+        for field in QUALITY_STAT_FIELDS:
+            # Values are kept for the percentile; a minute holds one sample per viewer per report interval
+            group[f"{field}_values"] = {"$push": f"${field}"}
+        for field in QUALITY_SUM_FIELDS:
+            group[field] = {"$sum": f"${field}"}
+
+        points: Dict[str, List[Dict[str, Any]]] = {}
+        cursor = self.db.stream_quality_metrics.aggregate([{"$match": match}, {"$group": group}], allowDiskUse=True)
+        async for row in cursor:
+            wid = row["_id"].get("wedding_id")
+            if not wid:
+                continue
+            point = empty_quality_point(row["_id"]["bucket"])
+            point["samples"] = row["samples"]
+            for field in QUALITY_STAT_FIELDS:
+                values = sorted(v for v in row[f"{field}_values"] if isinstance(v, (int, float)))
+                if values:
+                    point[field] = {
+                        "min": values[0],
+                        "avg": sum(values) / len(values),
+                        "max": values[-1],
+                        "p95": percentile(values, 0.95),
+                    }
+            for field in QUALITY_SUM_FIELDS:
+                point[field] = row.get(field) or 0
+            for resolution in row["resolutions"]:
+                key = _resolution_key(resolution)
+                point["resolutions"][key] = point["resolutions"].get(key, 0) + 1
+            points.setdefault(wid, []).append(point)
+        return {wid: sorted(wedding_points, key=lambda p: p["bucket"]) for wid, wedding_points in points.items()}
+
+    # ==================== INCREMENTAL JOB ====================
+
+    async def _set_state(self, **fields):
+        await self.db[STATE_COLLECTION].update_one({"_id": STATE_ID}, {"$set": fields}, upsert=True)
+
+    async def _insert_points(self, granularity: str, points_by_wedding: Dict[str, List[Dict[str, Any]]]) -> int:
+        docs = [
+            {**point, "meta": {"wedding_id": wid, "granularity": granularity}}
+            for wid, points in points_by_wedding.items()
+            for point in points
+        ]
+        if docs:
+            await self.db[QUALITY_ROLLUPS_COLLECTION].insert_many(docs, ordered=False)
+        return len(docs)
+
+    async def run_once(self, until: datetime, now: datetime, max_chunks: Optional[int]) -> Dict[str, int]:
+        """Roll up closed minutes up to `until`, then closed hours (called by the analytics rollup job)"""
+        state = await self.db[STATE_COLLECTION].find_one({"_id": STATE_ID}) or {}
+        hwm = state.get("quality_minute_hwm")
+        if hwm is None:
+            first = await self.db.stream_quality_metrics.find(
+                {"timestamp": {"$type": "date"}}, {"_id": 0, "timestamp": 1}
+            ).sort("timestamp", 1).limit(1).to_list(length=1)
+            hwm = floor_time(first[0]["timestamp"] if first else until, 3600)
+            await self._set_state(quality_minute_hwm=hwm, quality_hour_hwm=hwm)
+            state["quality_hour_hwm"] = hwm
+
+        minutes = chunks = 0
+        while hwm < until and (max_chunks is None or chunks < max_chunks):
+            window_end = min(hwm + timedelta(minutes=ROLLUP_CHUNK_MINUTES), until)
+            minutes += await self._insert_points("minute", await self.compute_minute_points(hwm, window_end))
+            hwm = window_end
+            await self._set_state(quality_minute_hwm=hwm)
+            chunks += 1
+
+        hours = 0
+        closed_until = floor_time(hwm, 3600)
+        hour_hwm = floor_time(state.get("quality_hour_hwm") or hwm, 3600)
+        while hour_hwm < closed_until:
+            window_end = min(hour_hwm + ROLLUP_HOUR_CHUNK, closed_until)
+            minute_points = await self.read_rollups(None, "minute", hour_hwm, window_end)
+            hour_points = {wid: merge_quality_points(points, 3600) for wid, points in minute_points.items()}
+            hours += await self._insert_points("hour", hour_points)
+            hour_hwm = window_end
+            await self._set_state(quality_hour_hwm=hour_hwm)
+
+        await self.ensure_raw_ttl(now)
+        return {"quality_minute_points": minutes, "quality_hour_points": hours}
+
+    # ==================== READS ====================
+
+    async def read_rollups(
+        self,
+        wedding_id: Optional[str],
+        granularity: str,
+        start: datetime,
+        end: datetime,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Stored quality points in [start, end), keyed by wedding_id, de-duplicated by bucket"""
+        query = {"meta.granularity": granularity, "bucket": {"$gte": start, "$lt": end}}
+        if wedding_id:
+            query["meta.wedding_id"] = wedding_id
+
+        points: Dict[str, Dict[datetime, Dict[str, Any]]] = {}
+        async for doc in self.db[QUALITY_ROLLUPS_COLLECTION].find(query).sort("_id", 1):
+            meta = doc.pop("meta", {})
+            doc.pop("_id", None)
+            points.setdefault(meta.get("wedding_id"), {})[doc["bucket"]] = doc
+        return {wid: [buckets[b] for b in sorted(buckets)] for wid, buckets in points.items()}
+
+    async def get_series(
+        self,
+        wedding_id: str,
+        granularity: str = "minute",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        now: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """Quality points for a wedding: rollups for closed buckets, raw samples for the open tail"""
+        now = now or datetime.utcnow()
+        end = min(end or now, now)
+        seconds = GRANULARITY_SECONDS[granularity]
+        start = floor_time(start or end - timedelta(days=1), seconds)
+        if start >= end:
+            return []
+
+        state = await self.db[STATE_COLLECTION].find_one({"_id": STATE_ID}) or {}
+        minute_hwm = state.get("quality_minute_hwm") or start
+        closed_hwm = state.get("quality_hour_hwm") if granularity == "hour" else minute_hwm
+        closed_hwm = min(max(closed_hwm or start, start), end)
+
+        points: List[Dict[str, Any]] = []
+        if closed_hwm > start:
+            points += (await self.read_rollups(wedding_id, granularity, start, closed_hwm)).get(wedding_id, [])
+        if closed_hwm < end:
+            tail: List[Dict[str, Any]] = []
+            stored_until = min(max(minute_hwm, closed_hwm), end)
+            if stored_until > closed_hwm:
+                tail += (await self.read_rollups(wedding_id, "minute", closed_hwm, stored_until)).get(wedding_id, [])
+            if stored_until < end:
+                tail += (await self.compute_minute_points(stored_until, end, wedding_id)).get(wedding_id, [])
+            points += merge_quality_points(tail, 3600) if granularity == "hour" else tail
+        return points
+
+    async def get_raw(self, wedding_id: str, start: datetime, end: datetime, limit: int) -> List[Dict[str, Any]]:
+        return await self.db.stream_quality_metrics.find(
+            {"wedding_id": wedding_id, "timestamp": {"$gte": start, "$lt": end}},
+            {"_id": 0, "wedding_id": 0},
+        ).sort("timestamp", 1).to_list(length=limit)
+
+    async def get_chart(
+        self,
+        wedding_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        max_points: int = DEFAULT_MAX_POINTS,
+        metric: str = "bitrate",
+        now: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        At most max_points quality points for [start, end) (default: the last
+        24 hours) at the finest resolution that fits, thinned with LTTB on
+        `metric` when needed.
+        """
+        now = now or datetime.utcnow()
+        end = min(end or now, now)
+        start = start or end - timedelta(days=1)
+        resolution = pick_quality_resolution(start, end, max_points, now)
+
+        if resolution == "raw":
+            samples = await self.db.stream_quality_metrics.count_documents(
+                {"wedding_id": wedding_id, "timestamp": {"$gte": start, "$lt": end}}, limit=RAW_MAX_SAMPLES + 1
+            )
+            if samples > RAW_MAX_SAMPLES:
+                # Many concurrent viewers - per-minute statistics chart better than raw samples
+                resolution = "minute"
+
+        if resolution == "raw":
+            points = await self.get_raw(wedding_id, start, end, RAW_MAX_SAMPLES)
+            x_key, value = "timestamp", lambda p: p.get(metric)
+        else:
+            points = await self.get_series(wedding_id, resolution, start, end, now=now)
+            x_key, value = "bucket", lambda p: (p.get(metric) or {}).get("avg")
+
+        total = len(points)
+        if total > max_points:
+            points = lttb(points, max_points, x_key, value)
+        return {
+            "wedding_id": wedding_id,
+            "resolution": resolution,
+            "metric": metric,
+            "start": start,
+            "end": end,
+            "total_points": total,
+            "points": points,
+        }
+
+    async def get_summary(self, wedding_id: str, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Whole-stream quality summary from hour rollups plus the open tail"""
+        now = now or datetime.utcnow()
+        points = [p for p in await self.get_series(wedding_id, "hour", start=EPOCH, end=now, now=now) if p["samples"]]
+        if not points:
+            return {
+                "avg_bitrate": 0,
+                "avg_fps": 0,
+                "total_buffering_events": 0,
+                "total_buffering_duration": 0,
+                "resolutions": [],
+            }
+        total = combine_quality_points(points[0]["bucket"], points)
+        return {
+            "avg_bitrate": total["bitrate"]["avg"] or 0,
+            "avg_fps": total["fps"]["avg"] or 0,
+            "total_buffering_events": total["buffering_events"],
+            "total_buffering_duration": total["buffering_duration_ms"],
+            "resolutions": sorted(total["resolutions"]),
+            "samples": total["samples"],
+            "p95_bitrate": total["bitrate"]["p95"],
+        }
+
+
+# Singleton instance
+quality_rollups = QualityRollupService()
@@ -0,0 +1,228 @@
+"""
+Live Reaction Aggregator
+Batches emoji reactions per wedding room instead of re-broadcasting every tap.
+
+Taps are counted per room for REACTION_WINDOW_MS; when the window closes the
+room gets one `reaction_batch` event:
+    {"wedding_id", "reactions": {emoji: count}, "total", "window_ms"}
+so a burst of thousands of taps per second costs a few frames per viewer
+per second rather than one per tap.
+
+Each sid is capped by a token bucket (REACTION_RATE_PER_SECOND, bursts of
+REACTION_BURST); taps over the cap are dropped and counted. Only the first
+REACTION_MAX_EMOJI distinct emoji of a window are kept.
+
+Accepted taps are also folded into per-minute `reaction_rollups` documents
+    {"wedding_id", "bucket", "total", "counts": {emoji: count}}
+flushed with one bulk upsert every REACTION_PERSIST_INTERVAL_SECONDS, along
+with the weddings' reactions_count counters. The analytics rollup job and
+counter reconciliation count these next to the per-document `reactions`
+written by the REST endpoint.
+
+Call start(db) from lifespan and stop() on shutdown - stop() flushes.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.services.analytics_service import floor_time
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_COLLECTION = "reaction_rollups"
+
+WINDOW_MS = int(os.getenv("REACTION_WINDOW_MS", "250"))
+RATE_PER_SECOND = float(os.getenv("REACTION_RATE_PER_SECOND", "10"))
+BURST = int(os.getenv("REACTION_BURST", "20"))
+MAX_EMOJI = int(os.getenv("REACTION_MAX_EMOJI", "32"))
+PERSIST_INTERVAL_SECONDS = float(os.getenv("REACTION_PERSIST_INTERVAL_SECONDS", "5"))
+# Longest emoji accepted (ZWJ sequences run to a dozen code points)
+MAX_EMOJI_LENGTH = 16
+
+RollupKey = Tuple[str, datetime]
+
+
+def valid_emoji(emoji) -> bool:
+    """Short strings that are safe as MongoDB field names"""
+    return (
+        isinstance(emoji, str) and 0 < len(emoji) <= MAX_EMOJI_LENGTH
+        and "." not in emoji and not emoji.startswith("$")
+    )
+
+
+class ReactionAggregator:
+    """Windowed per-room reaction batching with per-sid rate caps"""
+
+    def __init__(self, window_ms: int = WINDOW_MS, rate_per_second: float = RATE_PER_SECOND,
+                 burst: int = BURST, max_emoji: int = MAX_EMOJI,
+                 persist_interval: float = PERSIST_INTERVAL_SECONDS):
+        self.window_ms = window_ms
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_emoji = max_emoji
+        self.persist_interval = persist_interval
+        self._db = None
+        # wedding_id -> emoji counts of the open window
+        self._windows: Dict[str, Counter] = {}
+        self._window_tasks: Dict[str, asyncio.Task] = {}
+        # sid -> (tokens, monotonic time of the last refill)
+        self._allowance: Dict[str, Tuple[float, float]] = {}
+        # (wedding_id, minute) -> emoji counts not yet persisted
+        self._rollups: Dict[RollupKey, Counter] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "taps": 0,
+            "accepted": 0,
+            "rate_limited": 0,
+            "rejected": 0,
+            "batches": 0,
+            "documents_written": 0,
+            "failed_flushes": 0,
+        }
+
+    # ---- taps ----
+
+    def add(self, sid: str, wedding_id: str, emoji: str) -> str:
+        """Count a tap; returns 'accepted', 'rate_limited' or 'rejected'"""
+        self.stats["taps"] += 1
+        window = self._windows.get(wedding_id)
+        if not valid_emoji(emoji) or (window and emoji not in window and len(window) >= self.max_emoji):
+            self.stats["rejected"] += 1
+            return "rejected"
+        if not self._take(sid):
+            self.stats["rate_limited"] += 1
+            return "rate_limited"
+
+        self.stats["accepted"] += 1
+        if window is None:
+            window = self._windows[wedding_id] = Counter()
+        window[emoji] += 1
+        minute = floor_time(datetime.utcnow(), 60)
+        self._rollups.setdefault((wedding_id, minute), Counter())[emoji] += 1
+        if wedding_id not in self._window_tasks:
+            self._window_tasks[wedding_id] = asyncio.ensure_future(self._broadcast(wedding_id))
+        return "accepted"
+
+    def forget(self, sid: str):
+        """Drop a disconnected sid's rate-limit state"""
+        self._allowance.pop(sid, None)
+
+    def _take(self, sid: str) -> bool:
+        now = time.monotonic()
+        tokens, last = self._allowance.get(sid, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate_per_second)
+        if tokens < 1:
+            self._allowance[sid] = (tokens, now)
+            return False
+        self._allowance[sid] = (tokens - 1, now)
+        return True
+
+    async def _broadcast(self, wedding_id: str):
+        """Emit the room's counts once per window while taps keep coming"""
+        from app.services.socket_service import sio
+
+        try:
+            while wedding_id in self._windows:
+                await asyncio.sleep(self.window_ms / 1000)
+                counts = self._windows.pop(wedding_id)
+                self.stats["batches"] += 1
+                await sio.emit('reaction_batch', {
+                    'wedding_id': wedding_id,
+                    'reactions': dict(counts),
+                    'total': sum(counts.values()),
+                    'window_ms': self.window_ms
+                }, room=wedding_id)
+        except Exception as e:
+            logger.error(f"[REACTIONS] Failed to broadcast reactions for {wedding_id}: {e}")
+        finally:
+            self._window_tasks.pop(wedding_id, None)
+
+    # ---- persistence ----
+
+    async def flush(self) -> int:
+        """Persist the buffered per-minute counts; returns the number of documents written"""
+        async with self._flush_lock:
+            if not self._rollups:
+                return 0
+            rollups, self._rollups = self._rollups, {}
+
+            db = self._db
+            if db is None:
+                from app.database import get_db
+                db = get_db()
+
+            operations: List[UpdateOne] = []
+            per_wedding: Counter = Counter()
+            for (wedding_id, bucket), counts in rollups.items():
+                total = sum(counts.values())
+                per_wedding[wedding_id] += total
+                increments = {f"counts.{emoji}": n for emoji, n in counts.items()}
+                operations.append(UpdateOne(
+                    {"wedding_id": wedding_id, "bucket": bucket},
+                    {"$inc": {"total": total, **increments}},
+                    upsert=True
+                ))
+            try:
+                await db[ROLLUPS_COLLECTION].bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                # Some increments may have applied - retrying could count them twice
+                errors = e.details.get("writeErrors", [])
+                logger.warning(f"[REACTIONS] {len(errors)} of {len(operations)} rollup writes rejected: "
+                               f"{errors[0].get('errmsg') if errors else e}")
+            except Exception as e:
+                self.stats["failed_flushes"] += 1
+                logger.error(f"[REACTIONS] Flush failed, {len(operations)} rollups re-queued: {e}")
+                for key, counts in rollups.items():
+                    self._rollups.setdefault(key, Counter()).update(counts)
+                return 0
+            self.stats["documents_written"] += len(operations)
+
+            try:
+                await db.weddings.bulk_write([
+                    UpdateOne({"id": wedding_id}, {"$inc": {"reactions_count": total}})
+                    for wedding_id, total in per_wedding.items()
+                ], ordered=False)
+            except Exception as e:
+                # Counters are repaired by reconciliation - the rollups are written
+                logger.error(f"[REACTIONS] Failed to update reaction counters: {e}")
+            return len(operations)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.persist_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"[REACTIONS] Flush loop error: {e}")
+
+    async def start(self, db):
+        """Start the periodic persist (called from lifespan)"""
+        self._db = db
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the periodic persist and write out whatever is still buffered"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._rollups:
+            logger.error(f"[REACTIONS] {len(self._rollups)} reaction rollups lost on shutdown")
+        logger.info(f"[REACTIONS] Stopped: {self.stats}")
+
+
+# Singleton instance
+reaction_aggregator = ReactionAggregator()
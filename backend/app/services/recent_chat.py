@@ -0,0 +1,137 @@
+"""
+Recent Chat Cache
+The last RECENT_CHAT_SIZE messages of each active wedding, kept in memory so
+guests joining a live stream get the chat backlog without a query each.
+
+A wedding's ring is warmed from MongoDB on first access (one query, shared
+by everyone asking while it runs) and then kept current on write: messages
+sent through this worker are appended directly and the other workers'
+messages arrive as `chat_message` worker events (see socket_manager).
+Messages still in the chat write buffer are folded into the warm-up, and
+messages that arrive while a warm-up query runs are merged into its
+result, so the ring never misses a message it was told about.
+
+Rings are kept for at most RECENT_CHAT_MAX_WEDDINGS weddings, least
+recently used first out.
+
+Ring entries are chat_messages documents; newest last.
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List
+
+logger = logging.getLogger(__name__)
+
+RECENT_CHAT_SIZE = int(os.getenv("RECENT_CHAT_SIZE", "100"))
+RECENT_CHAT_MAX_WEDDINGS = int(os.getenv("RECENT_CHAT_MAX_WEDDINGS", "500"))
+
+
+def _order(doc: Dict):
+    return doc["created_at"], doc["_id"]
+
+
+def to_socket_message(doc: Dict) -> Dict:
+    """A stored message in the shape of the `new_message` event"""
+    return {
+        "message_id": doc.get("id") or str(doc["_id"]),
+        "wedding_id": doc["wedding_id"],
+        "message": doc["message"],
+        "guest_name": doc.get("guest_name"),
+        "user_id": doc.get("user_id"),
+        "timestamp": doc.get("timestamp") or doc["created_at"].isoformat(),
+    }
+
+
+class RecentChatCache:
+    """Bounded per-wedding rings of the newest chat messages"""
+
+    def __init__(self, size: int = RECENT_CHAT_SIZE, max_weddings: int = RECENT_CHAT_MAX_WEDDINGS):
+        self.size = size
+        self.max_weddings = max_weddings
+        self._db = None
+        self._rings: "OrderedDict[str, Deque[Dict]]" = OrderedDict()
+        self._warming: Dict[str, asyncio.Future] = {}
+        # Messages appended while a wedding's warm-up query runs
+        self._early: Dict[str, List[Dict]] = {}
+        self.stats = {"hits": 0, "warms": 0, "appends": 0, "evictions": 0}
+
+    @property
+    def db(self):
+        if self._db is None:
+            from app.database import get_db
+            return get_db()
+        return self._db
+
+    async def recent(self, wedding_id: str) -> List[Dict]:
+        """The wedding's newest messages, oldest first"""
+        ring = self._rings.get(wedding_id)
+        if ring is not None:
+            self.stats["hits"] += 1
+            self._rings.move_to_end(wedding_id)
+            return list(ring)
+        warming = self._warming.get(wedding_id)
+        if warming is None:
+            warming = self._warming[wedding_id] = asyncio.ensure_future(self._warm(wedding_id))
+        return list(await asyncio.shield(warming))
+
+    def complete(self, wedding_id: str, count: int) -> bool:
+        """Whether the ring can answer for the newest `count` messages"""
+        ring = self._rings.get(wedding_id)
+        # A ring that isn't full holds the wedding's whole history
+        return ring is not None and (count <= len(ring) or len(ring) < self.size)
+
+    def append(self, doc: Dict):
+        """Record a new message (from this worker or a chat_message worker event)"""
+        wedding_id = doc["wedding_id"]
+        ring = self._rings.get(wedding_id)
+        if ring is not None:
+            self.stats["appends"] += 1
+            if ring and _order(doc) < _order(ring[-1]):
+                # Another worker's message that was sent a moment earlier
+                ring.append(doc)
+                ordered = sorted(ring, key=_order)
+                ring.clear()
+                ring.extend(ordered)
+            else:
+                ring.append(doc)
+        elif wedding_id in self._warming:
+            self._early.setdefault(wedding_id, []).append(doc)
+        # Weddings nobody has asked for are warmed from MongoDB when they are
+
+    async def add(self, doc: Dict):
+        """Record a message sent through this worker and tell the other workers"""
+        from app.services.socket_service import sio
+
+        self.append(doc)
+        try:
+            await sio.manager.publish_worker_event("chat_message", doc)
+        except Exception as e:
+            logger.error(f"[RECENT_CHAT] Failed to share message with other workers: {e}")
+
+    async def _warm(self, wedding_id: str) -> Deque[Dict]:
+        from app.services.chat_buffer import chat_buffer
+
+        self._early.setdefault(wedding_id, [])
+        try:
+            self.stats["warms"] += 1
+            docs = await self.db.chat_messages.find(
+                {"wedding_id": wedding_id}
+            ).sort([("created_at", -1), ("_id", -1)]).limit(self.size).to_list(length=self.size)
+            docs += chat_buffer.pending_messages(wedding_id) + self._early.get(wedding_id, [])
+            unique = {doc["_id"]: doc for doc in docs}
+            ring = deque(sorted(unique.values(), key=_order)[-self.size:], maxlen=self.size)
+            self._rings[wedding_id] = ring
+            while len(self._rings) > self.max_weddings:
+                self._rings.popitem(last=False)
+                self.stats["evictions"] += 1
+            return ring
+        finally:
+            self._early.pop(wedding_id, None)
+            self._warming.pop(wedding_id, None)
+
+
+# Singleton instance
+recent_chat = RecentChatCache()
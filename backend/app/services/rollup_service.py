@@ -0,0 +1,461 @@
+"""
+Analytics Rollup Service
+Pre-aggregates viewer, engagement and device analytics into per-minute and
+per-hour buckets stored in the `analytics_rollups` time-series collection.
+
+Each rollup point is
+    {"bucket", "meta": {"wedding_id", "granularity"}, "viewers" (peak
+     concurrent), "joins", "leaves", "watch_seconds", "devices": {...},
+     "reactions", "chat_messages"}
+
+The job runs incrementally from high-water marks kept in `rollup_state`:
+minutes are rolled up once they are ROLLUP_GRACE_SECONDS in the past, and
+hours once all of their minutes are rolled up. Readers
+(get_series) combine rollups for closed buckets with a raw computation of
+the still-open tail, so history is never recomputed from viewer_sessions.
+
+Rollup documents are insert-only (time-series collections don't support
+upserts). If the job dies between inserting a window and advancing the
+high-water mark, the window is re-inserted on the next run; readers
+de-duplicate by bucket, keeping the most recent document.
+
+Only one worker runs the job at a time, coordinated by a lease on the
+state document. The same job downsamples stream quality samples (see
+quality_rollup_service) and maintains the unique-viewer sketches (see
+unique_viewers_service).
+"""
+
+import asyncio
+import logging
+import os
+import re
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.services.analytics_service import ConcurrencySweep, floor_time
+from app.services.reaction_aggregator import ROLLUPS_COLLECTION as REACTION_ROLLUPS_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_COLLECTION = "analytics_rollups"
+STATE_COLLECTION = "rollup_state"
+STATE_ID = "analytics_rollups"
+
+GRANULARITY_SECONDS = {"minute": 60, "hour": 3600}
+
+ROLLUP_INTERVAL_SECONDS = int(os.getenv("ROLLUP_INTERVAL_SECONDS", "60"))
+# Minutes are closed this long after they end (late session ends / buffered writes)
+ROLLUP_GRACE_SECONDS = int(os.getenv("ROLLUP_GRACE_SECONDS", "30"))
+# Largest window computed from raw data in one step
+ROLLUP_CHUNK_MINUTES = 60
+# Bound the work of one tick while catching up (the script has no bound)
+ROLLUP_MAX_CHUNKS_PER_RUN = 24
+# Largest span of minute rollups merged into hours in one step
+ROLLUP_HOUR_CHUNK = timedelta(hours=24)
+
+DEVICE_TYPES = ("desktop", "mobile", "tablet", "unknown")
+SUM_FIELDS = ("joins", "leaves", "watch_seconds", "reactions", "chat_messages")
+
+_TABLET_RE = re.compile(r"ipad|tablet|kindle|silk|playbook", re.IGNORECASE)
+_MOBILE_RE = re.compile(r"mobi|iphone|ipod|android|blackberry|opera mini|iemobile", re.IGNORECASE)
+
+
+def classify_device(user_agent: Optional[str]) -> str:
+    """Coarse device type from a User-Agent string"""
+    if not user_agent:
+        return "unknown"
+    if _TABLET_RE.search(user_agent):
+        return "tablet"
+    if _MOBILE_RE.search(user_agent):
+        # Android tablets don't send "Mobile"
+        if "android" in user_agent.lower() and "mobile" not in user_agent.lower():
+            return "tablet"
+        return "mobile"
+    return "desktop"
+
+
+def empty_point(bucket: datetime) -> Dict[str, Any]:
+    return {
+        "bucket": bucket,
+        "viewers": 0,
+        "joins": 0,
+        "leaves": 0,
+        "watch_seconds": 0.0,
+        "devices": {device: 0 for device in DEVICE_TYPES},
+        "reactions": 0,
+        "chat_messages": 0,
+    }
+
+
+def merge_points(points: Iterable[Dict[str, Any]], granularity_seconds: int) -> List[Dict[str, Any]]:
+    """Re-bucket points into coarser buckets (sums, max of viewers)"""
+    merged: Dict[datetime, Dict[str, Any]] = {}
+    for point in points:
+        bucket = floor_time(point["bucket"], granularity_seconds)
+        target = merged.setdefault(bucket, empty_point(bucket))
+        target["viewers"] = max(target["viewers"], point.get("viewers", 0))
+        for field in SUM_FIELDS:
+            target[field] += point.get(field, 0)
+        for device, count in (point.get("devices") or {}).items():
+            target["devices"][device] = target["devices"].get(device, 0) + count
+    return [merged[bucket] for bucket in sorted(merged)]
+
+
+async def ensure_rollup_collection(db, name: str):
+    """Create a time-series rollup collection and its lookup index (idempotent)"""
+    existing = await db.list_collection_names(filter={"name": name})
+    if not existing:
+        try:
+            await db.create_collection(
+                name,
+                timeseries={"timeField": "bucket", "metaField": "meta", "granularity": "minutes"}
+            )
+            logger.info(f"[ROLLUPS] Created time-series collection {name}")
+        except Exception as e:
+            # Pre-5.0 servers: a regular collection works the same for our queries
+            logger.warning(f"[ROLLUPS] Time-series collection unavailable, using a regular collection: {e}")
+    await db[name].create_index([("meta.wedding_id", 1), ("meta.granularity", 1), ("bucket", 1)])
+
+
+class AnalyticsRollupService:
+    """Incremental per-minute / per-hour analytics rollups"""
+
+    def __init__(self):
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+        self._worker_id = str(uuid.uuid4())
+        self._quality = None
+        self._unique = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            from app.database import get_db
+            self._db = get_db()
+        return self._db
+
+    @property
+    def quality(self):
+        """Stream quality rollups over the same database"""
+        if self._quality is None:
+            from app.services.quality_rollup_service import QualityRollupService
+            self._quality = QualityRollupService()
+        self._quality._db = self.db
+        return self._quality
+
+    @property
+    def unique(self):
+        """Unique-viewer sketches over the same database"""
+        if self._unique is None:
+            from app.services.unique_viewers_service import UniqueViewerService
+            self._unique = UniqueViewerService()
+        self._unique._db = self.db
+        return self._unique
+
+    # ==================== SETUP ====================
+
+    async def ensure_collection(self):
+        """Create the time-series rollup collections and their indexes (idempotent)"""
+        await ensure_rollup_collection(self.db, ROLLUPS_COLLECTION)
+        await self.quality.ensure_collection()
+
+    # ==================== RAW COMPUTATION ====================
+
+    async def compute_minute_points(
+        self,
+        start: datetime,
+        end: datetime,
+        wedding_id: Optional[str] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Per-minute points for [start, end) computed from raw collections,
+        keyed by wedding_id. `start` must be minute-aligned; `end` may fall
+        inside a minute (the open bucket), in which case watch time is only
+        counted up to `end`.
+        """
+        wedding_filter = {"wedding_id": wedding_id} if wedding_id else {}
+        points: Dict[str, Dict[datetime, Dict[str, Any]]] = {}
+
+        def point(wid: str, time: datetime) -> Dict[str, Any]:
+            bucket = floor_time(time, 60)
+            buckets = points.setdefault(wid, {})
+            if bucket not in buckets:
+                buckets[bucket] = empty_point(bucket)
+            return buckets[bucket]
+
+        # Sessions overlapping the window: joined in it, or still open / leaving after its start
+        session_query = {
+            **wedding_filter,
+            "join_time": {"$lt": end},
+            "$or": [
+                {"join_time": {"$gte": start}},
+                {"leave_time": {"$gte": start}},
+                {"leave_time": None},
+            ],
+        }
+        events: Dict[str, List] = {}
+        cursor = self.db.viewer_sessions.find(
+            session_query, {"_id": 0, "wedding_id": 1, "join_time": 1, "leave_time": 1, "user_agent": 1}
+        ).batch_size(5000)
+        async for session in cursor:
+            wid = session.get("wedding_id")
+            join_time = session.get("join_time")
+            if not wid or join_time is None:
+                continue
+            leave_time = session.get("leave_time")
+            if leave_time is not None:
+                leave_time = max(leave_time, join_time)
+
+            # Sessions that ended by the window start (or lasted no time) add no concurrency
+            if leave_time is None or leave_time > max(join_time, start):
+                wedding_events = events.setdefault(wid, [])
+                wedding_events.append((max(join_time, start), 1))
+                if leave_time is not None and leave_time < end:
+                    wedding_events.append((leave_time, -1))
+
+            if join_time >= start:
+                p = point(wid, join_time)
+                p["joins"] += 1
+                p["devices"][classify_device(session.get("user_agent"))] += 1
+            if leave_time is not None and start <= leave_time < end:
+                point(wid, leave_time)["leaves"] += 1
+
+        # Peak concurrency and watch time per minute
+        for wid, wedding_events in events.items():
+            wedding_events.sort()
+            sweep = ConcurrencySweep(start, 60)
+            for time, delta in wedding_events:
+                sweep.add(time, delta)
+            for bucket in sweep.finish(end)["timeline"]:
+                if bucket["viewers"] or bucket["watch_seconds"]:
+                    p = point(wid, bucket["time"])
+                    p["viewers"] = bucket["viewers"]
+                    p["watch_seconds"] = bucket["watch_seconds"]
+
+        # Reaction and chat volume
+        for collection, field in (("reactions", "reactions"), ("chat_messages", "chat_messages")):
+            pipeline = [
+                {"$match": {**wedding_filter, "created_at": {"$gte": start, "$lt": end}}},
+                {"$group": {
+                    "_id": {
+                        "wedding_id": "$wedding_id",
+                        "bucket": {"$dateTrunc": {"date": "$created_at", "unit": "minute"}},
+                    },
+                    "count": {"$sum": 1},
+                }},
+            ]
+            async for row in self.db[collection].aggregate(pipeline):
+                if row["_id"].get("wedding_id"):
+                    point(row["_id"]["wedding_id"], row["_id"]["bucket"])[field] += row["count"]
+
+        # Socket reactions arrive pre-counted per minute (reaction_aggregator)
+        cursor = self.db[REACTION_ROLLUPS_COLLECTION].find(
+            {**wedding_filter, "bucket": {"$gte": start, "$lt": end}},
+            {"_id": 0, "wedding_id": 1, "bucket": 1, "total": 1}
+        )
+        async for row in cursor:
+            if row.get("wedding_id"):
+                point(row["wedding_id"], row["bucket"])["reactions"] += row.get("total", 0)
+
+        return {wid: [buckets[b] for b in sorted(buckets)] for wid, buckets in points.items()}
+
+    # ==================== INCREMENTAL JOB ====================
+
+    async def _get_state(self) -> Dict[str, Any]:
+        return await self.db[STATE_COLLECTION].find_one({"_id": STATE_ID}) or {}
+
+    async def _acquire_lease(self, duration_seconds: int) -> bool:
+        """Take or renew the job lease so only one worker rolls up at a time"""
+        from pymongo.errors import DuplicateKeyError
+
+        now = datetime.utcnow()
+        try:
+            await self.db[STATE_COLLECTION].find_one_and_update(
+                {"_id": STATE_ID, "$or": [
+                    {"lease_until": {"$lt": now}},
+                    {"lease_until": None},
+                    {"lease_owner": self._worker_id},
+                ]},
+                {"$set": {"lease_owner": self._worker_id, "lease_until": now + timedelta(seconds=duration_seconds)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # State exists and another worker holds the lease
+            return False
+        return True
+
+    async def _initial_minute_hwm(self, now: datetime) -> datetime:
+        """Start of history: the earliest viewer session, or now for an empty database"""
+        first = await self.db.viewer_sessions.find(
+            {"join_time": {"$ne": None}}, {"_id": 0, "join_time": 1}
+        ).sort("join_time", 1).limit(1).to_list(length=1)
+        start = first[0]["join_time"] if first else now
+        return floor_time(start, 3600)
+
+    async def _insert_points(self, granularity: str, points_by_wedding: Dict[str, List[Dict[str, Any]]]) -> int:
+        docs = [
+            {**point, "meta": {"wedding_id": wid, "granularity": granularity}}
+            for wid, points in points_by_wedding.items()
+            for point in points
+        ]
+        if docs:
+            await self.db[ROLLUPS_COLLECTION].insert_many(docs, ordered=False)
+        return len(docs)
+
+    async def roll_up_minutes(self, until: datetime, max_chunks: Optional[int]) -> int:
+        """Roll up closed minutes from the minute high-water mark towards `until`"""
+        state = await self._get_state()
+        hwm = state.get("minute_hwm")
+        if hwm is None:
+            hwm = await self._initial_minute_hwm(until)
+            await self.db[STATE_COLLECTION].update_one(
+                {"_id": STATE_ID}, {"$set": {"minute_hwm": hwm, "hour_hwm": hwm}}, upsert=True
+            )
+        written = 0
+        chunks = 0
+
+        while hwm < until and (max_chunks is None or chunks < max_chunks):
+            window_end = min(hwm + timedelta(minutes=ROLLUP_CHUNK_MINUTES), until)
+            points = await self.compute_minute_points(hwm, window_end)
+            written += await self._insert_points("minute", points)
+            hwm = window_end
+            await self.db[STATE_COLLECTION].update_one({"_id": STATE_ID}, {"$set": {"minute_hwm": hwm}}, upsert=True)
+            chunks += 1
+
+        return written
+
+    async def roll_up_hours(self) -> int:
+        """Roll up every hour whose minutes are all rolled up"""
+        state = await self._get_state()
+        minute_hwm = state.get("minute_hwm")
+        if minute_hwm is None:
+            return 0
+        closed_until = floor_time(minute_hwm, 3600)
+        hwm = floor_time(state.get("hour_hwm") or minute_hwm, 3600)
+        written = 0
+
+        while hwm < closed_until:
+            window_end = min(hwm + ROLLUP_HOUR_CHUNK, closed_until)
+            minute_points = await self.read_rollups(None, "minute", hwm, window_end)
+            hour_points = {wid: merge_points(points, 3600) for wid, points in minute_points.items()}
+            written += await self._insert_points("hour", hour_points)
+            hwm = window_end
+            await self.db[STATE_COLLECTION].update_one({"_id": STATE_ID}, {"$set": {"hour_hwm": hwm}}, upsert=True)
+
+        return written
+
+    async def run_once(self, now: Optional[datetime] = None, max_chunks: Optional[int] = ROLLUP_MAX_CHUNKS_PER_RUN) -> Dict[str, int]:
+        """One incremental pass: closed minutes, then closed hours, then quality and unique viewers"""
+        now = now or datetime.utcnow()
+        until = floor_time(now - timedelta(seconds=ROLLUP_GRACE_SECONDS), 60)
+        minutes = await self.roll_up_minutes(until, max_chunks)
+        hours = await self.roll_up_hours()
+        if minutes or hours:
+            logger.info(f"[ROLLUPS] Wrote {minutes} minute and {hours} hour rollup points")
+
+        # Stream quality downsampling runs under the same lease
+        quality = await self.quality.run_once(until, now, max_chunks)
+        if any(quality.values()):
+            logger.info(f"[ROLLUPS] Wrote {quality['quality_minute_points']} minute and "
+                        f"{quality['quality_hour_points']} hour quality points")
+
+        unique = await self.unique.run_once(until, max_chunks)
+        if unique["viewer_sketches"]:
+            logger.info(f"[ROLLUPS] Updated {unique['viewer_sketches']} unique-viewer sketches")
+        return {"minute_points": minutes, "hour_points": hours, **quality, **unique}
+
+    async def _loop(self, interval: int):
+        while True:
+            try:
+                if await self._acquire_lease(interval * 3):
+                    await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[ROLLUPS] Rollup run failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def start(self, db, interval: int = ROLLUP_INTERVAL_SECONDS):
+        """Prepare the collection and start the periodic job (called from lifespan)"""
+        self._db = db
+        try:
+            await self.ensure_collection()
+        except Exception as e:
+            logger.error(f"[ROLLUPS] Failed to prepare rollup collection: {e}")
+        self._task = asyncio.create_task(self._loop(interval))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ==================== READS ====================
+
+    async def read_rollups(
+        self,
+        wedding_id: Optional[str],
+        granularity: str,
+        start: datetime,
+        end: datetime,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Stored rollup points in [start, end), keyed by wedding_id, de-duplicated by bucket"""
+        query = {"meta.granularity": granularity, "bucket": {"$gte": start, "$lt": end}}
+        if wedding_id:
+            query["meta.wedding_id"] = wedding_id
+
+        points: Dict[str, Dict[datetime, Dict[str, Any]]] = {}
+        async for doc in self.db[ROLLUPS_COLLECTION].find(query).sort("_id", 1):
+            meta = doc.pop("meta", {})
+            doc.pop("_id", None)
+            points.setdefault(meta.get("wedding_id"), {})[doc["bucket"]] = doc
+        return {wid: [buckets[b] for b in sorted(buckets)] for wid, buckets in points.items()}
+
+    async def get_series(
+        self,
+        wedding_id: str,
+        granularity: str = "minute",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        now: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Time series for a wedding: stored rollups for closed buckets, raw
+        data only for the tail after the high-water mark (the open bucket).
+        """
+        now = now or datetime.utcnow()
+        end = min(end or now, now)
+        seconds = GRANULARITY_SECONDS[granularity]
+        start = floor_time(start or end - timedelta(days=1), seconds)
+        if start >= end:
+            return []
+
+        state = await self._get_state()
+        minute_hwm = state.get("minute_hwm") or start
+        closed_hwm = state.get("hour_hwm") if granularity == "hour" else minute_hwm
+        closed_hwm = min(max(closed_hwm or start, start), end)
+
+        closed = (await self.read_rollups(wedding_id, granularity, start, closed_hwm)).get(wedding_id, []) if closed_hwm > start else []
+
+        open_points: List[Dict[str, Any]] = []
+        if closed_hwm < end:
+            # Hours still open are assembled from minute rollups plus raw minutes
+            minute_start = closed_hwm
+            stored_until = min(max(minute_hwm, minute_start), end)
+            if stored_until > minute_start:
+                open_points += (await self.read_rollups(wedding_id, "minute", minute_start, stored_until)).get(wedding_id, [])
+            if stored_until < end:
+                raw = await self.compute_minute_points(stored_until, end, wedding_id)
+                open_points += raw.get(wedding_id, [])
+            if granularity == "hour":
+                open_points = merge_points(open_points, 3600)
+
+        return closed + open_points
+
+
+# Singleton instance
+analytics_rollups = AnalyticsRollupService()
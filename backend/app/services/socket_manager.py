@@ -0,0 +1,501 @@
+"""
+Socket.IO Client Managers
+Lets several uvicorn workers (or hosts) serve one audience: every emit is
+published on a shared pub/sub channel and delivered by each worker to its
+own clients in the target room, and viewer counts are summed across
+workers.
+
+The backend is picked from SOCKETIO_MESSAGE_QUEUE:
+
+    (unset)                      single process, in-memory rooms
+    redis://[:password@]host[:port][/db], rediss://...
+                                 Redis PUBLISH / SUBSCRIBE through
+                                 python-socketio's AsyncRedisManager
+                                 (needs the `redis` package)
+    unix:///path/to/broker.sock  a PubSubBroker on a Unix socket
+    memory://                    in-process hub (tests: several servers in
+                                 one process)
+
+The broker speaks a RESP subset, and RespClientManager is the small client
+for it. Messages are pickled dicts on SOCKETIO_CHANNEL - the same wire
+format as AsyncRedisManager, so a TCP broker can also stand in for Redis.
+Delivery has Redis pub/sub semantics: at most once, to every subscriber
+connected at publish time (including the publisher, which ignores its
+own messages), with no persistence.
+
+PubSubBroker is a minimal Redis-compatible pub/sub server (SUBSCRIBE,
+UNSUBSCRIBE, PUBLISH, PING; AUTH and SELECT are accepted) for tests and
+single-host multi-worker deployments without Redis. Run it with
+scripts/socketio_broker.py.
+
+Viewer counts: each worker publishes its local count for a wedding
+whenever it changes, and a full snapshot every
+SOCKETIO_PRESENCE_INTERVAL_SECONDS. viewer_count() adds the latest counts
+from the other workers, ignoring workers not heard from for three
+intervals (so a crashed worker's viewers age out). Counts are absolute,
+not deltas, so a lost message is corrected by the next snapshot.
+
+Worker events: publish_worker_event(name, data) hands `data` to the
+handlers registered with on_worker_event(name, handler) on every other
+worker - for state the workers keep in memory next to their rooms, such
+as the recent-chat cache.
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+import os
+import pickle
+import ssl
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote, urlparse
+
+import socketio
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+logger = logging.getLogger(__name__)
+
+SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE", "")
+SOCKETIO_CHANNEL = os.getenv("SOCKETIO_CHANNEL", "wedlive-socketio")
+PRESENCE_INTERVAL_SECONDS = float(os.getenv("SOCKETIO_PRESENCE_INTERVAL_SECONDS", "5"))
+# A worker's counts are dropped after this many missed snapshots
+PRESENCE_EXPIRY_INTERVALS = 3
+MAX_RECONNECT_SECONDS = 30
+
+
+# ==================== RESP PROTOCOL ====================
+
+class RespError(Exception):
+    """Error reply from the pub/sub server"""
+
+
+def _bulk(value: Any) -> bytes:
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    elif isinstance(value, int):
+        value = str(value).encode()
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def encode_command(*args: Any) -> bytes:
+    """A command (or pushed message) as a RESP array of bulk strings"""
+    return b"*%d\r\n" % len(args) + b"".join(_bulk(arg) for arg in args)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """Read one RESP value; bulk strings stay bytes, errors are returned as RespError"""
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Pub/sub connection closed")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode()
+    if kind == b"-":
+        return RespError(body.decode())
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(body)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"Unexpected pub/sub reply: {line[:40]!r}")
+
+
+# ==================== BROKER ====================
+
+class PubSubBroker:
+    """Minimal Redis-compatible pub/sub server over a Unix socket or TCP"""
+
+    def __init__(self):
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._channels: Dict[bytes, Set[asyncio.StreamWriter]] = {}
+        self._connections: Set[asyncio.StreamWriter] = set()
+        self.path: Optional[str] = None
+        self.port: Optional[int] = None
+
+    @property
+    def url(self) -> str:
+        return f"unix://{self.path}" if self.path else f"redis://127.0.0.1:{self.port}"
+
+    async def start(self, path: Optional[str] = None, host: str = "127.0.0.1", port: int = 0):
+        if path:
+            if os.path.exists(path):
+                os.unlink(path)
+            self._server = await asyncio.start_unix_server(self._serve, path=path)
+            self.path = path
+        else:
+            self._server = await asyncio.start_server(self._serve, host=host, port=port)
+            self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"[SOCKETIO] Pub/sub broker listening on {self.url}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for writer in list(self._connections):
+            writer.close()
+        self._channels.clear()
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        subscriptions: Set[bytes] = set()
+        self._connections.add(writer)
+        try:
+            while True:
+                command = await read_reply(reader)
+                if not isinstance(command, list) or not command:
+                    writer.write(b"-ERR protocol error\r\n")
+                    continue
+                name = bytes(command[0]).upper()
+                args = command[1:]
+                if name == b"PUBLISH" and len(args) == 2:
+                    receivers = list(self._channels.get(args[0], ()))
+                    message = encode_command("message", args[0], args[1])
+                    for receiver in receivers:
+                        receiver.write(message)
+                    writer.write(b":%d\r\n" % len(receivers))
+                elif name == b"SUBSCRIBE" and args:
+                    for channel in args:
+                        self._channels.setdefault(channel, set()).add(writer)
+                        subscriptions.add(channel)
+                        writer.write(b"*3\r\n" + _bulk("subscribe") + _bulk(channel) + b":%d\r\n" % len(subscriptions))
+                elif name == b"UNSUBSCRIBE":
+                    for channel in args or list(subscriptions):
+                        self._channels.get(channel, set()).discard(writer)
+                        subscriptions.discard(channel)
+                        writer.write(b"*3\r\n" + _bulk("unsubscribe") + _bulk(channel) + b":%d\r\n" % len(subscriptions))
+                elif name == b"PING":
+                    writer.write(b"+PONG\r\n")
+                elif name in (b"AUTH", b"SELECT", b"CLIENT"):
+                    writer.write(b"+OK\r\n")
+                else:
+                    writer.write(b"-ERR unknown command '%s'\r\n" % name)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for channel in subscriptions:
+                self._channels.get(channel, set()).discard(writer)
+            self._connections.discard(writer)
+            writer.close()
+
+
+# ==================== VIEWER PRESENCE ====================
+
+class ViewerPresenceMixin(ABC):
+    """Cluster-wide viewer counts for a pub/sub client manager"""
+
+    def _init_presence(self):
+        self._local_counts: Dict[str, int] = {}
+        # host_id -> (last heard, {wedding_id: count})
+        self._remote_counts: Dict[str, Tuple[float, Dict[str, int]]] = {}
+        self._event_handlers: Dict[str, List[Callable[[Any], None]]] = {}
+
+    def on_worker_event(self, name: str, handler: Callable[[Any], None]):
+        """Call handler(data) for events published by the other workers"""
+        self._event_handlers.setdefault(name, []).append(handler)
+
+    async def publish_worker_event(self, name: str, data: Any):
+        """Deliver data to the other workers' handlers for this event"""
+        await self._publish({"method": "worker_event", "host_id": self.host_id, "event": name, "data": data})
+
+    def _apply_worker_event(self, message: Dict[str, Any]):
+        for handler in self._event_handlers.get(message.get("event"), ()):
+            try:
+                handler(message.get("data"))
+            except Exception as e:
+                logger.error(f"[SOCKETIO] Worker event handler for {message.get('event')} failed: {e}")
+
+    async def update_viewer_count(self, wedding_id: str, local_count: int):
+        """Record this worker's viewer count for a wedding and share it"""
+        if local_count:
+            self._local_counts[wedding_id] = local_count
+        else:
+            self._local_counts.pop(wedding_id, None)
+        await self._publish({
+            "method": "viewer_counts", "host_id": self.host_id,
+            "counts": {wedding_id: local_count}, "full": False,
+        })
+
+    def viewer_count(self, wedding_id: str) -> int:
+        """Viewers of a wedding across all workers"""
+        expiry = time.monotonic() - PRESENCE_EXPIRY_INTERVALS * PRESENCE_INTERVAL_SECONDS
+        total = self._local_counts.get(wedding_id, 0)
+        for host_id, (heard_at, counts) in list(self._remote_counts.items()):
+            if heard_at < expiry:
+                del self._remote_counts[host_id]
+            else:
+                total += counts.get(wedding_id, 0)
+        return total
+
+    def _apply_presence(self, message: Dict[str, Any]):
+        host_id = message.get("host_id")
+        if message["method"] == "viewer_counts_request":
+            # A new worker wants everyone's counts now rather than at the next snapshot
+            self.server.start_background_task(self._publish_snapshot)
+            return
+        _, counts = self._remote_counts.get(host_id, (0, {}))
+        counts = dict(message.get("counts") or {}) if message.get("full") else {**counts, **message.get("counts", {})}
+        self._remote_counts[host_id] = (time.monotonic(), {wid: n for wid, n in counts.items() if n})
+
+    async def _publish_snapshot(self):
+        await self._publish({
+            "method": "viewer_counts", "host_id": self.host_id,
+            "counts": dict(self._local_counts), "full": True,
+        })
+
+    def _subscribed(self):
+        """Called by the backend once subscribed: ask the other workers for their counts"""
+        if self.server is not None:
+            self.server.start_background_task(
+                self._publish, {"method": "viewer_counts_request", "host_id": self.host_id}
+            )
+
+    async def _presence_loop(self):
+        while True:
+            await asyncio.sleep(PRESENCE_INTERVAL_SECONDS)
+            try:
+                await self._publish_snapshot()
+            except Exception as e:
+                logger.error(f"[SOCKETIO] Failed to publish viewer counts: {e}")
+
+    def initialize(self):
+        super().initialize()
+        if not self.write_only:
+            self.server.start_background_task(self._presence_loop)
+
+    @abstractmethod
+    def _raw_listen(self):
+        """Async iterator over the messages published on the channel"""
+
+    async def _listen(self):
+        """Take viewer-count messages out of the stream; pass the rest to python-socketio"""
+        async for message in self._raw_listen():
+            data = message
+            if isinstance(message, bytes):
+                try:
+                    data = pickle.loads(message)
+                except Exception:
+                    continue
+            if not isinstance(data, dict):
+                continue
+            if data.get("method") in ("viewer_counts", "viewer_counts_request"):
+                if data.get("host_id") != self.host_id:
+                    self._apply_presence(data)
+                continue
+            if data.get("method") == "worker_event":
+                if data.get("host_id") != self.host_id:
+                    self._apply_worker_event(data)
+                continue
+            yield data
+
+
+class LocalClientManager(socketio.AsyncManager):
+    """Single-process manager with the same viewer-count interface"""
+
+    def __init__(self):
+        super().__init__()
+        self._local_counts: Dict[str, int] = {}
+
+    async def update_viewer_count(self, wedding_id: str, local_count: int):
+        if local_count:
+            self._local_counts[wedding_id] = local_count
+        else:
+            self._local_counts.pop(wedding_id, None)
+
+    def viewer_count(self, wedding_id: str) -> int:
+        return self._local_counts.get(wedding_id, 0)
+
+    def on_worker_event(self, name: str, handler: Callable[[Any], None]):
+        pass
+
+    async def publish_worker_event(self, name: str, data: Any):
+        # No other workers
+        pass
+
+
+# ==================== BACKENDS ====================
+
+class MemoryHub:
+    """In-process pub/sub: every subscriber queue gets every message of its channel"""
+
+    def __init__(self):
+        self.channels: Dict[str, List[asyncio.Queue]] = {}
+
+    def publish(self, channel: str, data: bytes) -> int:
+        queues = self.channels.get(channel, [])
+        for queue in queues:
+            queue.put_nowait(data)
+        return len(queues)
+
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self.channels.setdefault(channel, []).append(queue)
+        return queue
+
+
+memory_hub = MemoryHub()
+
+
+class MemoryClientManager(ViewerPresenceMixin, AsyncPubSubManager):
+    """Pub/sub manager over an in-process MemoryHub"""
+
+    name = "memory"
+
+    def __init__(self, hub: Optional[MemoryHub] = None, channel: str = SOCKETIO_CHANNEL, write_only: bool = False):
+        super().__init__(channel=channel, write_only=write_only)
+        self.hub = hub or memory_hub
+        self._queue: Optional[asyncio.Queue] = None
+        self._init_presence()
+
+    def initialize(self):
+        # Subscribe before the listener task starts so no early message is missed
+        self._queue = self.hub.subscribe(self.channel)
+        super().initialize()
+        self._subscribed()
+
+    async def _publish(self, data):
+        return self.hub.publish(self.channel, pickle.dumps(data))
+
+    async def _raw_listen(self):
+        while True:
+            yield await self._queue.get()
+
+
+class RedisClientManager(ViewerPresenceMixin, socketio.AsyncRedisManager):
+    """python-socketio's Redis manager (redis://, rediss://) with cluster-wide viewer counts"""
+
+    name = "redis"
+
+    def __init__(self, url: str, channel: str = SOCKETIO_CHANNEL, write_only: bool = False):
+        super().__init__(url=url, channel=channel, write_only=write_only)
+        parsed = urlparse(url)
+        # For logs - without credentials
+        self.url = f"{parsed.scheme}://{parsed.hostname}"
+        self._init_presence()
+
+    async def _raw_listen(self):
+        channel = self.channel.encode("utf-8")
+        await self.pubsub.subscribe(self.channel)
+        self._subscribed()
+        async for message in self._redis_listen_with_retries():
+            if message["channel"] == channel and message["type"] == "message" and "data" in message:
+                yield message["data"]
+
+
+class RespClientManager(ViewerPresenceMixin, AsyncPubSubManager):
+    """Pub/sub manager for a PubSubBroker (unix://, or redis:// for a TCP broker)"""
+
+    name = "resp"
+
+    def __init__(self, url: str, channel: str = SOCKETIO_CHANNEL, write_only: bool = False):
+        super().__init__(channel=channel, write_only=write_only)
+        parsed = urlparse(url)
+        if parsed.scheme not in ("redis", "rediss", "unix"):
+            raise ValueError(f"Unsupported message queue URL: {parsed.scheme}://")
+        self._parsed = parsed
+        # For logs - without credentials
+        self.url = f"{parsed.scheme}://{parsed.path if parsed.scheme == 'unix' else parsed.hostname}"
+        self._publisher: Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = None
+        self._publish_lock = asyncio.Lock()
+        self._init_presence()
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        parsed = self._parsed
+        if parsed.scheme == "unix":
+            reader, writer = await asyncio.open_unix_connection(parsed.path)
+        else:
+            reader, writer = await asyncio.open_connection(
+                parsed.hostname or "localhost", parsed.port or 6379,
+                ssl=ssl.create_default_context() if parsed.scheme == "rediss" else None
+            )
+        setup = []
+        if parsed.password:
+            setup.append(("AUTH", unquote(parsed.username), unquote(parsed.password)) if parsed.username
+                         else ("AUTH", unquote(parsed.password)))
+        database = (parsed.path or "/").strip("/")
+        if parsed.scheme != "unix" and database:
+            setup.append(("SELECT", database))
+        for command in setup:
+            writer.write(encode_command(*command))
+            await writer.drain()
+            reply = await read_reply(reader)
+            if isinstance(reply, RespError):
+                writer.close()
+                raise reply
+        return reader, writer
+
+    async def _publish(self, data):
+        payload = encode_command("PUBLISH", self.channel, pickle.dumps(data))
+        async with self._publish_lock:
+            for attempt in (1, 2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = await self._connect()
+                    reader, writer = self._publisher
+                    writer.write(payload)
+                    await writer.drain()
+                    reply = await read_reply(reader)
+                    if isinstance(reply, RespError):
+                        raise reply
+                    return reply
+                except (OSError, ConnectionError, asyncio.IncompleteReadError, RespError) as e:
+                    if self._publisher:
+                        self._publisher[1].close()
+                    self._publisher = None
+                    if attempt == 2:
+                        logger.error(f"[SOCKETIO] Cannot publish to {self.url}, giving up: {e}")
+                    else:
+                        logger.warning(f"[SOCKETIO] Cannot publish to {self.url}, retrying: {e}")
+
+    async def _raw_listen(self):
+        channel = self.channel.encode("utf-8")
+        retry_sleep = 1
+        while True:
+            writer = None
+            try:
+                reader, writer = await self._connect()
+                writer.write(encode_command("SUBSCRIBE", self.channel))
+                await writer.drain()
+                reply = await read_reply(reader)
+                if isinstance(reply, RespError):
+                    raise reply
+                retry_sleep = 1
+                self._subscribed()
+                while True:
+                    reply = await read_reply(reader)
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message" and reply[1] == channel:
+                        yield reply[2]
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, RespError) as e:
+                logger.error(f"[SOCKETIO] Cannot receive from {self.url}, retrying in {retry_sleep}s: {e}")
+                await asyncio.sleep(retry_sleep)
+                retry_sleep = min(retry_sleep * 2, MAX_RECONNECT_SECONDS)
+            finally:
+                if writer:
+                    writer.close()
+
+
+def create_client_manager(url: Optional[str] = None):
+    """Client manager for SOCKETIO_MESSAGE_QUEUE (or `url`)"""
+    url = SOCKETIO_MESSAGE_QUEUE if url is None else url
+    if not url:
+        return LocalClientManager()
+    if url.startswith("memory://"):
+        logger.info("[SOCKETIO] Using the in-process message queue")
+        return MemoryClientManager()
+    if url.startswith(("redis://", "rediss://")):
+        manager = RedisClientManager(url)
+    else:
+        manager = RespClientManager(url)
+    logger.info(f"[SOCKETIO] Using message queue {manager.url}")
+    return manager
@@ -1,21 +1,123 @@
 import socketio
-from typing import Dict, Set
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Set
 import logging
 
+from app.services.chat_buffer import build_chat_message, chat_buffer
+from app.services.reaction_aggregator import reaction_aggregator
+from app.services.recent_chat import recent_chat, to_socket_message
+from app.services.socket_manager import create_client_manager
+
 # Create Socket.IO server
+# With SOCKETIO_MESSAGE_QUEUE set, emits and viewer counts are shared across workers
 sio = socketio.AsyncServer(
     async_mode='asgi',
+    client_manager=create_client_manager(),
     cors_allowed_origins='*',
     logger=True,
     engineio_logger=True
 )
+# Other workers' chat messages keep this worker's recent-chat rings current
+sio.manager.on_worker_event('chat_message', recent_chat.append)
 
-# Track active viewers per wedding
+# Track active viewers per wedding (this worker's clients only)
 active_viewers: Dict[str, Set[str]] = {}
+# Reverse index: the weddings each sid has joined, and what we know about the viewer
+viewer_rooms: Dict[str, Set[str]] = {}
+viewer_info: Dict[str, Dict[str, Any]] = {}
+
+# viewer_count goes out at most once per interval per room; changes in between
+# mark the room dirty and the latest count follows on the trailing edge
+VIEWER_COUNT_INTERVAL_SECONDS = float(os.getenv('SOCKETIO_VIEWER_COUNT_INTERVAL_SECONDS', '1'))
+viewer_count_dirty: Set[str] = set()
+viewer_count_tasks: Dict[str, asyncio.Task] = {}
+# Guest names that joined since a room's last broadcast; they go out with it as one viewer_joined
+viewer_joins: Dict[str, List[str]] = {}
+# Most names one viewer_joined carries
+VIEWER_JOINED_MAX_NAMES = 20
 
 logger = logging.getLogger(__name__)
 
 
+def _track_join(sid: str, wedding_id: str, guest_name: str):
+    active_viewers.setdefault(wedding_id, set()).add(sid)
+    viewer_rooms.setdefault(sid, set()).add(wedding_id)
+    viewer_info[sid] = {'guest_name': guest_name, 'joined_at': datetime.utcnow()}
+
+
+def _track_leave(sid: str, wedding_id: str) -> bool:
+    """Stop tracking sid in one wedding; False if it wasn't there"""
+    viewers = active_viewers.get(wedding_id)
+    if not viewers or sid not in viewers:
+        return False
+    viewers.discard(sid)
+    if not viewers:
+        del active_viewers[wedding_id]
+    rooms = viewer_rooms.get(sid)
+    if rooms is not None:
+        rooms.discard(wedding_id)
+        if not rooms:
+            del viewer_rooms[sid]
+            viewer_info.pop(sid, None)
+    return True
+
+
+def _forget_viewer(sid: str) -> Set[str]:
+    """Stop tracking sid everywhere; returns the weddings it was in"""
+    rooms = viewer_rooms.pop(sid, set())
+    viewer_info.pop(sid, None)
+    for wedding_id in rooms:
+        viewers = active_viewers.get(wedding_id)
+        if viewers is not None:
+            viewers.discard(sid)
+            if not viewers:
+                del active_viewers[wedding_id]
+    return rooms
+
+
+async def _viewer_count_changed(wedding_id: str) -> int:
+    """Share this worker's viewer count for a wedding; returns the count across all workers"""
+    await sio.manager.update_viewer_count(wedding_id, len(active_viewers.get(wedding_id, ())))
+    return sio.manager.viewer_count(wedding_id)
+
+
+def _schedule_viewer_count(wedding_id: str):
+    """Mark a room's viewer count dirty; broadcast now or on the trailing edge"""
+    viewer_count_dirty.add(wedding_id)
+    if wedding_id not in viewer_count_tasks:
+        viewer_count_tasks[wedding_id] = asyncio.ensure_future(_broadcast_viewer_count(wedding_id))
+
+
+async def _broadcast_viewer_count(wedding_id: str):
+    """Send the current count (and who joined) while the room stays dirty, one interval apart"""
+    try:
+        while wedding_id in viewer_count_dirty:
+            viewer_count_dirty.discard(wedding_id)
+            count = sio.manager.viewer_count(wedding_id)
+            await sio.emit('viewer_count', {
+                'wedding_id': wedding_id,
+                'count': count
+            }, room=wedding_id)
+            joined = viewer_joins.pop(wedding_id, None)
+            if joined:
+                # Every join of the interval in one event; the joiners hear about themselves too
+                await sio.emit('viewer_joined', {
+                    'wedding_id': wedding_id,
+                    'guest_name': joined[-1],
+                    'guest_names': joined[-VIEWER_JOINED_MAX_NAMES:],
+                    'joined': len(joined),
+                    'count': count
+                }, room=wedding_id)
+            # Changes during the wait are coalesced into the next broadcast
+            await asyncio.sleep(VIEWER_COUNT_INTERVAL_SECONDS)
+    except Exception as e:
+        logger.error(f"Failed to broadcast viewer count for {wedding_id}: {str(e)}")
+    finally:
+        viewer_count_tasks.pop(wedding_id, None)
+
+
 @sio.on('connect')
 async def connect(sid, environ):
     """Handle client connection"""
@@ -27,16 +129,13 @@ async def connect(sid, environ):
 async def disconnect(sid):
     """Handle client disconnection"""
     logger.info(f"Client disconnected: {sid}")
+    reaction_aggregator.forget(sid)
     
-    # Remove from all rooms
-    for wedding_id, viewers in active_viewers.items():
-        if sid in viewers:
-            viewers.remove(sid)
-            # Broadcast updated viewer count
-            await sio.emit('viewer_count', {
-                'wedding_id': wedding_id,
-                'count': len(viewers)
-            }, room=wedding_id)
+    # Only the weddings this sid joined - python-socketio drops its room memberships
+    for wedding_id in _forget_viewer(sid):
+        # Broadcast updated viewer count
+        await _viewer_count_changed(wedding_id)
+        _schedule_viewer_count(wedding_id)
 
 
 @sio.on('join_wedding')
@@ -52,22 +151,22 @@ async def join_wedding(sid, data):
     await sio.enter_room(sid, wedding_id)
     
     # Track viewer
-    if wedding_id not in active_viewers:
-        active_viewers[wedding_id] = set()
-    active_viewers[wedding_id].add(sid)
+    _track_join(sid, wedding_id, guest_name)
     
-    # Broadcast updated viewer count
-    viewer_count = len(active_viewers[wedding_id])
-    await sio.emit('viewer_count', {
-        'wedding_id': wedding_id,
-        'count': viewer_count
-    }, room=wedding_id)
+    # Broadcast updated viewer count; the join is announced with it
+    viewer_count = await _viewer_count_changed(wedding_id)
+    viewer_joins.setdefault(wedding_id, []).append(guest_name)
+    _schedule_viewer_count(wedding_id)
     
-    # Notify others
-    await sio.emit('viewer_joined', {
-        'guest_name': guest_name,
-        'count': viewer_count
-    }, room=wedding_id, skip_sid=sid)
+    # Chat backlog straight from the recent-chat ring
+    try:
+        recent = await recent_chat.recent(wedding_id)
+        await sio.emit('chat_history', {
+            'wedding_id': wedding_id,
+            'messages': [to_socket_message(doc) for doc in recent]
+        }, to=sid)
+    except Exception as e:
+        logger.error(f"Failed to send chat history for wedding {wedding_id}: {str(e)}")
     
     logger.info(f"Client {sid} joined wedding {wedding_id}. Total viewers: {viewer_count}")
     
@@ -86,15 +185,10 @@ async def leave_wedding(sid, data):
     await sio.leave_room(sid, wedding_id)
     
     # Remove from tracking
-    if wedding_id in active_viewers and sid in active_viewers[wedding_id]:
-        active_viewers[wedding_id].remove(sid)
-        
+    if _track_leave(sid, wedding_id):
         # Broadcast updated viewer count
-        viewer_count = len(active_viewers[wedding_id])
-        await sio.emit('viewer_count', {
-            'wedding_id': wedding_id,
-            'count': viewer_count
-        }, room=wedding_id)
+        await _viewer_count_changed(wedding_id)
+        _schedule_viewer_count(wedding_id)
     
     return {'status': 'left'}
 
@@ -102,10 +196,6 @@ async def leave_wedding(sid, data):
 @sio.on('send_message')
 async def send_message(sid, data):
     """Send a chat message to wedding room"""
-    from app.database import get_db
-    from app.services.chat_service import ChatService
-    from datetime import datetime
-    
     wedding_id = data.get('wedding_id')
     message = data.get('message')
     guest_name = data.get('guest_name', 'Anonymous')
@@ -114,43 +204,17 @@ async def send_message(sid, data):
     if not wedding_id or not message:
         return {'error': 'wedding_id and message required'}
     
-    # Save message to database
-    try:
-        db = await get_db()
-        chat_service = ChatService(db)
-        saved_message = await chat_service.save_message(
-            wedding_id=wedding_id,
-            message=message,
-            guest_name=guest_name,
-            user_id=user_id
-        )
-        
-        # Broadcast message to room
-        message_data = {
-            'message_id': saved_message['message_id'],
-            'wedding_id': wedding_id,
-            'message': message,
-            'guest_name': guest_name,
-            'user_id': user_id,
-            'timestamp': saved_message['timestamp']
-        }
-        
-        await sio.emit('new_message', message_data, room=wedding_id)
-        
-        return {'status': 'sent', 'message_id': saved_message['message_id']}
-        
-    except Exception as e:
-        logger.error(f"Failed to save message: {str(e)}")
-        # Still broadcast even if save fails
-        message_data = {
-            'wedding_id': wedding_id,
-            'message': message,
-            'guest_name': guest_name,
-            'user_id': user_id,
-            'timestamp': datetime.utcnow().isoformat()
-        }
-        await sio.emit('new_message', message_data, room=wedding_id)
-        return {'status': 'sent'}
+    # Written to chat_messages in batches by the chat buffer
+    message_doc = build_chat_message(wedding_id, message, guest_name=guest_name, user_id=user_id)
+    if not await chat_buffer.add(message_doc):
+        logger.error(f"Chat buffer full, message for wedding {wedding_id} not saved")
+        return {'error': 'chat is busy, try again'}
+    await recent_chat.add(message_doc)
+    
+    # Broadcast message to room
+    await sio.emit('new_message', to_socket_message(message_doc), room=wedding_id)
+    
+    return {'status': 'sent', 'message_id': message_doc['id']}
 
 
 @sio.on('send_reaction')
@@ -158,22 +222,15 @@ async def send_reaction(sid, data):
     """Send an emoji reaction to wedding room"""
     wedding_id = data.get('wedding_id')
     emoji = data.get('emoji')
-    guest_name = data.get('guest_name', 'Anonymous')
     
     if not wedding_id or not emoji:
         return {'error': 'wedding_id and emoji required'}
     
-    # Broadcast reaction to room
-    reaction_data = {
-        'wedding_id': wedding_id,
-        'emoji': emoji,
-        'guest_name': guest_name,
-        'timestamp': data.get('timestamp')
-    }
-    
-    await sio.emit('new_reaction', reaction_data, room=wedding_id)
-    
-    return {'status': 'sent'}
+    # Counted into the room's next reaction_batch and the reaction rollups
+    result = reaction_aggregator.add(sid, wedding_id, emoji)
+    if result == 'rejected':
+        return {'error': 'invalid emoji'}
+    return {'status': 'sent' if result == 'accepted' else result}
 
 
 @sio.on('stream_quality_update')
@@ -185,9 +242,13 @@ async def stream_quality_update(sid, data):
     if not wedding_id or not quality_data:
         return {'error': 'wedding_id and quality data required'}
     
-    # Broadcast to admin/creator (optional)
-    # For now, just acknowledge
-    return {'status': 'recorded'}
+    from app.services.ingestion_buffer import analytics_ingest, build_quality_sample
+    
+    # Batched into stream_quality_metrics by the ingestion buffer
+    accepted = await analytics_ingest.quality_sample(
+        build_quality_sample(wedding_id, quality_data, session_id=data.get('session_id'))
+    )
+    return {'status': 'recorded' if accepted else 'dropped'}
 
 
 @sio.on('camera_switch')
@@ -209,8 +270,8 @@ async def camera_switch(sid, data):
 
 
 async def get_viewer_count(wedding_id: str) -> int:
-    """Get current viewer count for a wedding"""
-    return len(active_viewers.get(wedding_id, set()))
+    """Get current viewer count for a wedding (across all workers)"""
+    return sio.manager.viewer_count(wedding_id)
 
 
 async def broadcast_to_wedding(wedding_id: str, event: str, data: dict):
@@ -17,27 +17,37 @@ class StorageService:
         Calculate total storage used by a user across all media
         Returns storage in bytes
         """
+        storage_by_user = await StorageService.calculate_storage_by_user(user_id)
+        return storage_by_user.get(user_id, 0)
+    
+    @staticmethod
+    async def calculate_storage_by_user(user_id: Optional[str] = None) -> Dict[str, int]:
+        """
+        Calculate storage used per user (or a single user), summed server-side
+        with $group instead of loading every document into memory.
+        Returns {user_id: bytes}
+        """
         db = get_db()
-        total_size = 0
-        
-        # Calculate from all media collections
-        # 1. Media gallery items
-        media_items = await db.media_gallery.find({"user_id": user_id}).to_list(None)
-        for item in media_items:
-            total_size += item.get("file_size", 0)
-        
-        # 2. Photo booth images
-        photobooth = await db.photo_booth.find({"user_id": user_id}).to_list(None)
-        for photo in photobooth:
-            total_size += photo.get("file_size", 0)
-        
-        # 3. Recording files (if stored locally)
-        recordings = await db.weddings.find({"creator_id": user_id, "recording_url": {"$ne": None}}).to_list(None)
-        for recording in recordings:
-            # Estimate recording size if not stored
-            total_size += recording.get("recording_size", 0)
-        
-        return total_size
+        totals: Dict[str, int] = {}
+        
+        async def add_sums(collection, user_field: str, size_field: str, extra_match: Dict):
+            match = {**extra_match, user_field: user_id} if user_id else extra_match
+            pipeline = [
+                {"$match": match},
+                {"$group": {"_id": f"${user_field}", "total": {"$sum": {"$ifNull": [f"${size_field}", 0]}}}}
+            ]
+            async for row in collection.aggregate(pipeline):
+                if row["_id"] is not None:
+                    totals[row["_id"]] = totals.get(row["_id"], 0) + row["total"]
+        
+        # 1. Media gallery items (uploads are stored in the `media` collection)
+        # Photo booth photos are stored as URLs, not uploaded bytes, so they take no quota
+        await add_sums(db.media, "user_id", "file_size", {})
+        
+        # 2. Recording files (if stored locally)
+        await add_sums(db.weddings, "creator_id", "recording_size", {"recording_url": {"$ne": None}})
+        
+        return totals
     
     @staticmethod
     async def update_user_storage(user_id: str) -> Dict:
@@ -108,17 +118,18 @@ class StorageService:
         """
         db = get_db()
         
-        # Decrement storage_used (prevent negative values)
-        user = await db.users.find_one({"id": user_id})
-        current_storage = user.get("storage_used", 0)
-        new_storage = max(0, current_storage - file_size)
-        
+        # Decrement storage_used atomically (prevent negative values)
         result = await db.users.find_one_and_update(
             {"id": user_id},
-            {"$set": {"storage_used": new_storage}},
+            [{"$set": {"storage_used": {"$max": [0, {"$subtract": [{"$ifNull": ["$storage_used", 0]}, file_size]}]}}}],
             return_document=True
         )
         
+        if not result:
+            raise ValueError(f"User {user_id} not found")
+        
+        new_storage = result.get("storage_used", 0)
+        
         plan = result.get("subscription_plan", "free")
         storage_limit = get_storage_limit(plan)
         
@@ -147,8 +158,8 @@ class StorageService:
         percentage = round((storage_used / storage_limit * 100), 2) if storage_limit > 0 else 0
         remaining = max(0, storage_limit - storage_used)
         
-        # Get breakdown by type
-        media_count = await db.media_gallery.count_documents({"user_id": user_id})
+        # Get breakdown by type (media count is a maintained counter)
+        media_count = user.get("media_count", 0)
         photobooth_count = await db.photo_booth.count_documents({"user_id": user_id})
         recordings_count = await db.weddings.count_documents({
             "creator_id": user_id,
@@ -155,22 +155,17 @@ class StreamService:
             Viewer token and connection details
         """
         import uuid
+        from app.services.viewer_tokens import viewer_tokens
         
         if not participant_id:
             participant_id = f"guest_{uuid.uuid4().hex[:8]}"
         
-        logger.info(f"🎫 Generating viewer token for room: {room_name}")
-        
-        result = await self.pulse_service.generate_stream_token(
+        # Minted locally or served from the per-room cache, not one Pulse call per viewer
+        result = await viewer_tokens.get_token(
             room_name=room_name,
+            role="viewer",
             participant_name=participant_name,
-            participant_id=participant_id,
-            can_publish=False,
-            can_subscribe=True,
-            can_publish_data=True,
-            metadata={
-                "role": "viewer"
-            }
+            participant_id=participant_id
         )
         
         return {
@@ -0,0 +1,300 @@
+"""
+Unique Viewer Sketches
+Distinct viewer counts per wedding, creator and the whole platform from
+HyperLogLog sketches (app.utils.hyperloglog) instead of building Python
+sets from viewer_sessions on every request.
+
+A viewer is the logged-in user, else the (ip_address, user_agent) pair,
+else the session. A viewer counts towards every bucket in which one of
+their sessions was watching (open sessions count until now, as for the
+concurrency sweep).
+
+Sketches are stored in `viewer_sketches`, one document per
+(scope, key, granularity, bucket):
+
+    scope "wedding"    hour, day and total sketches
+    scope "creator"    day and total sketches over the creator's weddings
+    scope "platform"   day and total sketches over all weddings
+
+    {"_id", "scope", "key", "granularity", "bucket", "sketch" (bytes),
+     "count", "exact", "updated_at"}
+
+The analytics rollup job (same lease and grace period) folds closed
+hours into the sketches from its own high-water mark. Sketch merges are
+idempotent, so replaying a window after a crash never over-counts.
+
+Totals are a single document read (plus the still-open tail after the
+high-water mark, computed from raw sessions). Ranges merge the hour or
+day sketches they cover, rounded out to whole buckets. Counts are exact
+while a sketch holds at most EXACT_LIMIT viewers and within about 1%
+(standard error) beyond that; count_exact() runs a distinct aggregation
+when an exact figure is required for a large set.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ReplaceOne
+
+from app.services.analytics_service import EPOCH, floor_time
+from app.services.rollup_service import STATE_COLLECTION, STATE_ID
+from app.utils.hyperloglog import HyperLogLog
+
+SKETCHES_COLLECTION = "viewer_sketches"
+
+SKETCH_SCOPES = ("wedding", "creator", "platform")
+BUCKET_SECONDS = {"hour": 3600, "day": 86400}
+# Granularities kept per scope (plus "total")
+SCOPE_GRANULARITIES = {"wedding": ("hour", "day"), "creator": ("day",), "platform": ("day",)}
+PLATFORM_KEY = "all"
+# Ranges longer than this merge day sketches instead of hour sketches
+HOURLY_RANGE_MAX = timedelta(days=7)
+
+
+def viewer_key(session: Dict[str, Any]) -> str:
+    """Identity a session counts as (see viewer_key_expression for the aggregation form)"""
+    if session.get("user_id"):
+        return f"user:{session['user_id']}"
+    if session.get("ip_address"):
+        return f"anon:{session['ip_address']}|{session.get('user_agent') or ''}"
+    return f"session:{session.get('session_id')}"
+
+
+def viewer_key_expression() -> Dict[str, Any]:
+    """viewer_key() as an aggregation expression"""
+    return {"$switch": {
+        "branches": [
+            {"case": {"$gt": [{"$ifNull": ["$user_id", None]}, None]},
+             "then": {"$concat": ["user:", "$user_id"]}},
+            {"case": {"$gt": [{"$ifNull": ["$ip_address", None]}, None]},
+             "then": {"$concat": ["anon:", "$ip_address", "|", {"$ifNull": ["$user_agent", ""]}]}},
+        ],
+        "default": {"$concat": ["session:", {"$ifNull": ["$session_id", ""]}]},
+    }}
+
+
+def overlapping_sessions_query(start: datetime, end: datetime) -> Dict[str, Any]:
+    """Sessions watching at some point in [start, end)"""
+    return {
+        "join_time": {"$lt": end},
+        "$or": [
+            {"join_time": {"$gte": start}},
+            {"leave_time": {"$gte": start}},
+            {"leave_time": None},
+        ],
+    }
+
+
+def sketch_id(scope: str, key: str, granularity: str, bucket: datetime) -> str:
+    return f"{scope}:{key}:{granularity}:{bucket.isoformat()}"
+
+
+def sketch_result(sketch: HyperLogLog) -> Dict[str, Any]:
+    return {
+        "unique_viewers": sketch.count(),
+        "exact": sketch.is_exact,
+        "relative_error": sketch.relative_error,
+    }
+
+
+class UniqueViewerService:
+    """HyperLogLog unique-viewer sketches per wedding, creator and platform"""
+
+    def __init__(self):
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            from app.database import get_db
+            self._db = get_db()
+        return self._db
+
+    # ==================== RAW COMPUTATION ====================
+
+    async def compute_sketches(
+        self,
+        start: datetime,
+        end: datetime,
+        wedding_ids: Optional[List[str]] = None,
+    ) -> Dict[str, HyperLogLog]:
+        """Sketch of the viewers watching in [start, end) per wedding, from raw sessions"""
+        query = overlapping_sessions_query(start, end)
+        if wedding_ids is not None:
+            query["wedding_id"] = {"$in": wedding_ids}
+        projection = {"_id": 0, "wedding_id": 1, "user_id": 1, "ip_address": 1, "user_agent": 1, "session_id": 1}
+
+        sketches: Dict[str, HyperLogLog] = {}
+        async for session in self.db.viewer_sessions.find(query, projection).batch_size(5000):
+            wid = session.get("wedding_id")
+            if not wid:
+                continue
+            if wid not in sketches:
+                sketches[wid] = HyperLogLog()
+            sketches[wid].add(viewer_key(session))
+        return sketches
+
+    async def count_exact(
+        self,
+        wedding_ids: Optional[List[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> int:
+        """Exact distinct viewers with a $group over the sessions (costly for large sets)"""
+        match: Dict[str, Any] = {}
+        if start or end:
+            match = overlapping_sessions_query(start or EPOCH, end or datetime.utcnow())
+        if wedding_ids is not None:
+            match["wedding_id"] = {"$in": wedding_ids}
+        result = await self.db.viewer_sessions.aggregate([
+            {"$match": match},
+            {"$group": {"_id": viewer_key_expression()}},
+            {"$count": "viewers"},
+        ], allowDiskUse=True).to_list(length=1)
+        return result[0]["viewers"] if result else 0
+
+    # ==================== INCREMENTAL JOB ====================
+
+    async def _load(self, ids: Iterable[str]) -> Dict[str, HyperLogLog]:
+        stored: Dict[str, HyperLogLog] = {}
+        async for doc in self.db[SKETCHES_COLLECTION].find({"_id": {"$in": list(ids)}}, {"sketch": 1}):
+            stored[doc["_id"]] = HyperLogLog.from_bytes(doc["sketch"])
+        return stored
+
+    async def fold(self, bucket: datetime, sketches: Dict[str, HyperLogLog], creators: Dict[str, str]) -> int:
+        """Merge one hour's per-wedding sketches into every hour/day/total sketch they belong to"""
+        targets: Dict[tuple, HyperLogLog] = {}
+
+        def target(scope: str, key: str, granularity: str) -> HyperLogLog:
+            seconds = BUCKET_SECONDS.get(granularity)
+            target_bucket = floor_time(bucket, seconds) if seconds else EPOCH
+            return targets.setdefault((scope, key, granularity, target_bucket), HyperLogLog())
+
+        for wid, sketch in sketches.items():
+            owners = [("wedding", wid), ("platform", PLATFORM_KEY)]
+            if creators.get(wid):
+                owners.append(("creator", creators[wid]))
+            for scope, key in owners:
+                for granularity in (*SCOPE_GRANULARITIES[scope], "total"):
+                    target(scope, key, granularity).merge(sketch)
+
+        ids = {sketch_id(*identity): identity for identity in targets}
+        stored = await self._load(ids)
+        now = datetime.utcnow()
+        operations = []
+        for _id, (scope, key, granularity, target_bucket) in ids.items():
+            sketch = targets[(scope, key, granularity, target_bucket)]
+            if _id in stored:
+                sketch = stored[_id].merge(sketch)
+            operations.append(ReplaceOne({"_id": _id}, {
+                "scope": scope,
+                "key": key,
+                "granularity": granularity,
+                "bucket": target_bucket,
+                "sketch": sketch.to_bytes(),
+                "count": sketch.count(),
+                "exact": sketch.is_exact,
+                "updated_at": now,
+            }, upsert=True))
+        if operations:
+            await self.db[SKETCHES_COLLECTION].bulk_write(operations, ordered=False)
+        return len(operations)
+
+    async def run_once(self, until: datetime, max_chunks: Optional[int]) -> Dict[str, int]:
+        """Fold closed windows up to `until` into the sketches, an hour at a time (called by the rollup job)"""
+        state = await self.db[STATE_COLLECTION].find_one({"_id": STATE_ID}) or {}
+        hwm = state.get("unique_hwm")
+        if hwm is None:
+            first = await self.db.viewer_sessions.find(
+                {"join_time": {"$ne": None}}, {"_id": 0, "join_time": 1}
+            ).sort("join_time", 1).limit(1).to_list(length=1)
+            hwm = floor_time(first[0]["join_time"] if first else until, 3600)
+
+        written = chunks = 0
+        while hwm < until and (max_chunks is None or chunks < max_chunks):
+            window_end = min(floor_time(hwm, 3600) + timedelta(hours=1), until)
+            sketches = await self.compute_sketches(hwm, window_end)
+            if sketches:
+                weddings = await self.db.weddings.find(
+                    {"id": {"$in": list(sketches)}}, {"_id": 0, "id": 1, "creator_id": 1}
+                ).to_list(length=None)
+                creators = {w["id"]: w.get("creator_id") for w in weddings}
+                written += await self.fold(floor_time(hwm, 3600), sketches, creators)
+            hwm = window_end
+            await self.db[STATE_COLLECTION].update_one({"_id": STATE_ID}, {"$set": {"unique_hwm": hwm}}, upsert=True)
+            chunks += 1
+
+        return {"viewer_sketches": written}
+
+    # ==================== READS ====================
+
+    async def _tail(self, scope: str, key: str, start: datetime, end: datetime) -> HyperLogLog:
+        """Viewers in the window not yet folded into sketches, from raw sessions"""
+        sketch = HyperLogLog()
+        if start >= end:
+            return sketch
+        wedding_ids = None
+        if scope == "wedding":
+            wedding_ids = [key]
+        elif scope == "creator":
+            weddings = await self.db.weddings.find({"creator_id": key}, {"_id": 0, "id": 1}).to_list(length=None)
+            wedding_ids = [w["id"] for w in weddings]
+        for wedding_sketch in (await self.compute_sketches(start, end, wedding_ids)).values():
+            sketch.merge(wedding_sketch)
+        return sketch
+
+    async def get_unique_viewers(
+        self,
+        scope: str,
+        key: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Distinct viewers of a wedding, creator or the platform - over all
+        time, or over [start, end) rounded out to whole hour/day buckets.
+        """
+        if scope not in SKETCH_SCOPES:
+            raise ValueError(f"scope must be one of {list(SKETCH_SCOPES)}")
+        now = now or datetime.utcnow()
+        state = await self.db[STATE_COLLECTION].find_one({"_id": STATE_ID}) or {}
+        hwm = state.get("unique_hwm") or EPOCH
+        collection = self.db[SKETCHES_COLLECTION]
+
+        if start is None and end is None:
+            granularity = "total"
+            doc = await collection.find_one({"_id": sketch_id(scope, key, "total", EPOCH)}, {"sketch": 1})
+            sketch = HyperLogLog.from_bytes(doc["sketch"]) if doc else HyperLogLog()
+            sketch.merge(await self._tail(scope, key, hwm, now))
+        else:
+            end = min(end or now, now)
+            start = start or EPOCH
+            granularity = "hour" if scope == "wedding" and end - start <= HOURLY_RANGE_MAX else "day"
+            seconds = BUCKET_SECONDS[granularity]
+            start = floor_time(start, seconds)
+            if end > floor_time(end, seconds):
+                end = min(floor_time(end, seconds) + timedelta(seconds=seconds), now)
+            sketch = HyperLogLog()
+            stored_until = min(max(hwm, start), end)
+            if stored_until > start:
+                cursor = collection.find({
+                    "scope": scope, "key": key, "granularity": granularity,
+                    "bucket": {"$gte": start, "$lt": stored_until},
+                }, {"sketch": 1})
+                async for doc in cursor:
+                    sketch.merge(HyperLogLog.from_bytes(doc["sketch"]))
+            sketch.merge(await self._tail(scope, key, stored_until, end))
+
+        return {
+            "scope": scope,
+            "key": key,
+            "granularity": granularity,
+            "start": start,
+            "end": end,
+            **sketch_result(sketch),
+        }
+
+
+# Singleton instance
+unique_viewers = UniqueViewerService()
@@ -0,0 +1,246 @@
+"""
+Viewer Tokens
+LiveKit access tokens for viewers joining a wedding stream, without a
+Pulse API round trip per join.
+
+With PULSE_LIVEKIT_API_KEY and PULSE_LIVEKIT_API_SECRET set (the key pair
+of the LiveKit project behind Pulse) tokens are minted locally: a LiveKit
+access token is an HS256 JWT carrying the room grant, so every viewer gets
+a token of their own for the cost of one signature.
+
+Without them every join gets a token of its own from Pulse over the
+pooled aiohttp session: a LiveKit token is bound to its participant
+identity and a room holds one participant per identity, so a token shared
+by several viewers would have each join kick the viewer before it.
+Identical requests - the same identity joining the same room while its
+mint is in flight - share that one mint.
+
+Only where Pulse issues tokens that are not bound to an identity
+(PULSE_SHARED_VIEWER_TOKENS=true; LiveKit then gives every connection an
+identity of its own) are tokens cached per (room, role). An entry is served
+until VIEWER_TOKEN_REFRESH_MARGIN_SECONDS before its token expires; after
+that the next join triggers a refresh in the background and keeps getting
+the old token until the new one arrives, so a join surge costs one Pulse
+call per wedding instead of one per viewer. Refreshes are single-flight:
+concurrent joins needing a token await the same mint. A shared token
+carries nothing viewer-specific, so only subscribe-only roles use it.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+import jwt
+
+from app.services.pulse_service import get_pulse_service
+
+logger = logging.getLogger(__name__)
+
+LIVEKIT_API_KEY = os.getenv("PULSE_LIVEKIT_API_KEY", "")
+LIVEKIT_API_SECRET = os.getenv("PULSE_LIVEKIT_API_SECRET", "")
+# Pulse issues viewer tokens not bound to an identity, so one can be shared
+PULSE_SHARED_VIEWER_TOKENS = os.getenv("PULSE_SHARED_VIEWER_TOKENS", "false").lower() == "true"
+# Lifetime of locally minted tokens
+VIEWER_TOKEN_TTL_SECONDS = int(os.getenv("VIEWER_TOKEN_TTL_SECONDS", "21600"))
+# Cached Pulse tokens are refreshed this long before they expire
+VIEWER_TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("VIEWER_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+# How long to keep a Pulse token whose response carries no expiry
+UNKNOWN_EXPIRY_SECONDS = 300
+MAX_CACHED_TOKENS = 1000
+
+
+def _seconds_until(expires_at) -> Optional[float]:
+    """Seconds until a Pulse expires_at (ISO string or datetime), None if unknown"""
+    if not expires_at:
+        return None
+    try:
+        if isinstance(expires_at, str):
+            expires_at = datetime.fromisoformat(expires_at.replace("Z", "+00:00"))
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+    return (expires_at - datetime.now(timezone.utc)).total_seconds()
+
+
+class ViewerTokenService:
+    """Locally minted or cached, single-flight LiveKit viewer tokens"""
+
+    def __init__(self, api_key: str = LIVEKIT_API_KEY, api_secret: str = LIVEKIT_API_SECRET,
+                 ttl: int = VIEWER_TOKEN_TTL_SECONDS, refresh_margin: int = VIEWER_TOKEN_REFRESH_MARGIN_SECONDS,
+                 shared: bool = PULSE_SHARED_VIEWER_TOKENS, pulse=None):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.shared = shared
+        self._pulse = pulse
+        # (room_name, role) -> {"token", "server_url", "expires_at", "participant_id", "refresh_at", "expires"}
+        self._cache: Dict[Tuple[str, str], Dict] = {}
+        # ("shared", room_name, role) or ("join", room_name, identity) -> mint in flight
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Task] = {}
+        self.stats = {"minted_locally": 0, "pulse_mints": 0, "cache_hits": 0, "coalesced": 0}
+
+    @property
+    def pulse(self):
+        if self._pulse is None:
+            self._pulse = get_pulse_service()
+        return self._pulse
+
+    @property
+    def local(self) -> bool:
+        """Whether tokens are minted here rather than by Pulse"""
+        return bool(self.api_key and self.api_secret)
+
+    # ==================== LOCAL MINTING ====================
+
+    def mint(self, room_name: str, identity: str, participant_name: str, metadata: Optional[Dict] = None) -> Dict:
+        """Sign a subscribe-only LiveKit access token for one participant"""
+        now = int(time.time())
+        claims = {
+            "iss": self.api_key,
+            "sub": identity,
+            "jti": identity,
+            "nbf": now,
+            "exp": now + self.ttl,
+            "name": participant_name,
+            "metadata": json.dumps(metadata or {}),
+            "video": {
+                "room": room_name,
+                "roomJoin": True,
+                "canPublish": False,
+                "canSubscribe": True,
+                "canPublishData": True,
+            },
+        }
+        self.stats["minted_locally"] += 1
+        return {
+            "token": jwt.encode(claims, self.api_secret, algorithm="HS256"),
+            "server_url": self.pulse.livekit_url,
+            "expires_at": datetime.fromtimestamp(now + self.ttl, timezone.utc).isoformat(),
+            "participant_id": identity,
+        }
+
+    # ==================== PULSE TOKENS ====================
+
+    def _single_flight(self, key: Tuple[str, str, str], mint) -> asyncio.Task:
+        """The in-flight mint for a key, starting `mint()` if there is none"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            return task
+        task = asyncio.ensure_future(mint())
+        self._inflight[key] = task
+
+        def done(finished: asyncio.Task):
+            self._inflight.pop(key, None)
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.error(f"[VIEWER_TOKENS] Pulse token mint failed for {key[1]}: {finished.exception()}")
+
+        task.add_done_callback(done)
+        return task
+
+    async def _mint_for_join(self, room_name: str, identity: str, participant_name: str, metadata: Dict) -> Dict:
+        result = await self.pulse.generate_stream_token(
+            room_name=room_name,
+            participant_name=participant_name,
+            participant_id=identity,
+            can_publish=False,
+            can_subscribe=True,
+            can_publish_data=True,
+            metadata=metadata,
+        )
+        self.stats["pulse_mints"] += 1
+        return {
+            "token": result.get("token"),
+            "server_url": result.get("server_url"),
+            "expires_at": result.get("expires_at"),
+            "participant_id": identity,
+        }
+
+    # ==================== SHARED PULSE TOKENS ====================
+
+    async def _mint_shared(self, key: Tuple[str, str]) -> Dict:
+        room_name, role = key
+        result = await self.pulse.generate_stream_token(
+            room_name=room_name,
+            participant_name=role.capitalize(),
+            # No identity: LiveKit gives each connection its own
+            participant_id=None,
+            can_publish=False,
+            can_subscribe=True,
+            can_publish_data=True,
+            # Shared by the wedding's viewers, so nothing viewer-specific goes in
+            metadata={"role": role},
+        )
+        self.stats["pulse_mints"] += 1
+
+        lifetime = _seconds_until(result.get("expires_at"))
+        if lifetime is None:
+            lifetime, margin = UNKNOWN_EXPIRY_SECONDS, 0
+        else:
+            # Short-lived tokens are still cached for half their life
+            margin = min(self.refresh_margin, lifetime / 2)
+        now = time.monotonic()
+        entry = {
+            "token": result.get("token"),
+            "server_url": result.get("server_url"),
+            "expires_at": result.get("expires_at"),
+            "participant_id": None,
+            "refresh_at": now + lifetime - margin,
+            "expires": now + lifetime,
+        }
+        self._cache.pop(key, None)
+        self._cache[key] = entry
+        if len(self._cache) > MAX_CACHED_TOKENS:
+            self._cache.pop(next(iter(self._cache)))
+        return entry
+
+    def _refresh(self, key: Tuple[str, str]) -> asyncio.Task:
+        """The in-flight mint of a shared token, starting one if there is none"""
+        return self._single_flight(("shared",) + key, lambda: self._mint_shared(key))
+
+    async def _cached(self, room_name: str, role: str) -> Dict:
+        key = (room_name, role)
+        entry = self._cache.get(key)
+        now = time.monotonic()
+        if entry is not None and now < entry["expires"]:
+            self.stats["cache_hits"] += 1
+            if now >= entry["refresh_at"]:
+                # Due for renewal: renew in the background, this join keeps the current token
+                self._refresh(key)
+            return entry
+        # Shielded: a joiner that disconnects must not cancel the mint the others await
+        return await asyncio.shield(self._refresh(key))
+
+    # ==================== JOINS ====================
+
+    async def get_token(self, room_name: str, role: str = "viewer", participant_name: str = "Guest",
+                        participant_id: Optional[str] = None, metadata: Optional[Dict] = None) -> Dict:
+        """
+        A subscribe-only token for joining `room_name`:
+        {"token", "server_url", "expires_at", "participant_id"}
+        """
+        identity = participant_id or f"{role}_{uuid.uuid4().hex[:12]}"
+        metadata = {"role": role, **(metadata or {})}
+        if self.local:
+            return self.mint(room_name, identity, participant_name, metadata)
+
+        if self.shared:
+            entry = await self._cached(room_name, role)
+            return {key: entry[key] for key in ("token", "server_url", "expires_at", "participant_id")}
+
+        # One token per identity; a repeated request for the same identity shares its mint
+        mint = self._single_flight(("join", room_name, identity),
+                                   lambda: self._mint_for_join(room_name, identity, participant_name, metadata))
+        # Shielded: a joiner that disconnects must not cancel the mint the others await
+        return await asyncio.shield(mint)
+
+
+# Singleton instance
+viewer_tokens = ViewerTokenService()
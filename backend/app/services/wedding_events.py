@@ -0,0 +1,273 @@
+"""
+Wedding Event Streams
+Server-Sent Events for viewer pages: live status transitions, camera
+switches and layout changes of a wedding, pushed as they happen instead of
+polled from the live-status and wedding endpoints.
+
+Each wedding has one channel shared by all of its subscribers on this
+worker. An event is serialized into an SSE frame once and queued on every
+subscriber's bounded queue (SSE_SEND_QUEUE frames); a subscriber that falls
+that far behind is disconnected and resumes on reconnect. Status events
+come from live_registry transitions, so one transition costs no reads per
+subscriber. Events published here are shared with the other workers
+(socket manager worker events), so a transition the other workers'
+registries apply from there is not announced again, and one they pick up
+later on reconcile is recognized as a duplicate and skipped.
+
+Event ids are per wedding and increase with time: `<ms>-<worker>`, the
+milliseconds since the epoch (bumped when two events land in the same
+millisecond) and the publishing worker's tag, so two workers publishing in
+the same millisecond still give their events distinct ids that every
+worker orders the same way. An event keeps its id on every worker. A
+channel keeps its last
+SSE_HISTORY_SIZE events: a client reconnecting with Last-Event-ID gets the
+events it missed, or a fresh `status` snapshot when they are no longer
+held. Idle streams get a comment line every SSE_HEARTBEAT_SECONDS to keep
+proxies from closing them.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+logger = logging.getLogger(__name__)
+
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_HISTORY_SIZE = int(os.getenv("SSE_HISTORY_SIZE", "50"))
+SSE_SEND_QUEUE = int(os.getenv("SSE_SEND_QUEUE", "32"))
+# Channels kept for weddings nobody is subscribed to (for Last-Event-ID resume)
+SSE_MAX_IDLE_CHANNELS = 1000
+# Reconnect delay suggested to EventSource clients
+SSE_RETRY_MS = 3000
+WORKER_EVENT = "wedding_event"
+
+# (milliseconds, worker tag); compared as a tuple
+EventId = Tuple[int, str]
+
+
+def format_event_id(event_id: EventId) -> str:
+    ms, worker = event_id
+    return f"{ms}-{worker}" if worker else str(ms)
+
+
+def parse_event_id(value: Optional[str]) -> Optional[EventId]:
+    """An SSE id sent back as Last-Event-ID, or None if it is not one of ours"""
+    if not value:
+        return None
+    ms, _, worker = value.partition("-")
+    try:
+        return int(ms), worker
+    except ValueError:
+        return None
+
+
+def _frame(event_id: EventId, event: str, data: Dict) -> str:
+    return f"id: {format_event_id(event_id)}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class WeddingChannel:
+    """One wedding's subscriber queues and recent events"""
+
+    def __init__(self, history_size: int):
+        self.subscribers: Set[asyncio.Queue] = set()
+        # (event id, frame), oldest first
+        self.history: Deque[Tuple[EventId, str]] = deque(maxlen=history_size)
+        self.last_id: EventId = (0, "")
+        # Events up to this id are not all in history
+        self.floor: EventId = (int(time.time() * 1000), "")
+        self.status: Optional[str] = None
+
+    @property
+    def position(self) -> EventId:
+        """Id a client is up to date with after seeing everything published so far"""
+        return max(self.last_id, self.floor)
+
+
+class WeddingEventBroadcaster:
+    """Per-wedding SSE channels fed by status transitions and route hooks"""
+
+    def __init__(self, history_size: int = SSE_HISTORY_SIZE, queue_size: int = SSE_SEND_QUEUE,
+                 heartbeat: float = SSE_HEARTBEAT_SECONDS):
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.channels: Dict[str, WeddingChannel] = {}
+        # Tie-breaker between workers publishing in the same millisecond
+        self.worker_id = uuid.uuid4().hex[:8]
+        self.stats = {"events": 0, "frames_queued": 0, "duplicates": 0, "dropped_subscribers": 0}
+        self._unsubscribe = None
+        self._worker_handler_registered = False
+
+    # ==================== CHANNELS ====================
+
+    def _channel(self, wedding_id: str) -> WeddingChannel:
+        channel = self.channels.get(wedding_id)
+        if channel is None:
+            channel = self.channels[wedding_id] = WeddingChannel(self.history_size)
+            idle = [wid for wid, c in self.channels.items() if not c.subscribers]
+            for stale in idle[:max(0, len(idle) - SSE_MAX_IDLE_CHANNELS)]:
+                del self.channels[stale]
+        return channel
+
+    def subscriber_count(self, wedding_id: str) -> int:
+        channel = self.channels.get(wedding_id)
+        return len(channel.subscribers) if channel else 0
+
+    def mark(self, wedding_id: str) -> EventId:
+        """Current position of a wedding's stream; call before reading a snapshot"""
+        return self._channel(wedding_id).position
+
+    # ==================== PUBLISHING ====================
+
+    async def publish(self, wedding_id: str, event: str, data: Dict, share: bool = True) -> Optional[EventId]:
+        """Push an event to the wedding's subscribers (on every worker); returns its id"""
+        data = jsonable_encoder(data)
+        if event == "status":
+            channel = self.channels.get(wedding_id)
+            if channel is not None and channel.status == data.get("status"):
+                # Already announced (another worker's transition, seen again on reconcile)
+                self.stats["duplicates"] += 1
+                return None
+        channel = self._channel(wedding_id)
+        event_id = (max(channel.position[0] + 1, int(time.time() * 1000)), self.worker_id)
+        self._deliver(wedding_id, channel, event_id, event, data)
+
+        if share:
+            try:
+                from app.services.socket_service import sio
+                await sio.manager.publish_worker_event(WORKER_EVENT, {
+                    "wedding_id": wedding_id, "id": event_id, "event": event, "data": data,
+                })
+            except Exception as e:
+                logger.error(f"[SSE] Failed to share {event} event for wedding {wedding_id}: {e}")
+        return event_id
+
+    def _apply_worker_event(self, message: Dict):
+        """Another worker published an event: deliver it here under the same id"""
+        wedding_id = message["wedding_id"]
+        channel = self.channels.get(wedding_id)
+        if channel is None:
+            # Nobody here has subscribed to this wedding
+            return
+        self._deliver(wedding_id, channel, tuple(message["id"]), message["event"], message["data"])
+
+    def _deliver(self, wedding_id: str, channel: WeddingChannel, event_id: EventId, event: str, data: Dict):
+        if event == "status":
+            channel.status = data.get("status")
+        frame = _frame(event_id, event, data)
+        if len(channel.history) == channel.history.maxlen:
+            channel.floor = max(channel.floor, channel.history[0][0])
+        channel.history.append((event_id, frame))
+        channel.last_id = max(channel.last_id, event_id)
+        self.stats["events"] += 1
+
+        for queue in list(channel.subscribers):
+            try:
+                queue.put_nowait((event_id, frame))
+                self.stats["frames_queued"] += 1
+            except asyncio.QueueFull:
+                logger.warning(f"[SSE] Subscriber of wedding {wedding_id} is {self.queue_size} events behind, "
+                               f"disconnecting it")
+                self._drop(channel, queue)
+
+    def _drop(self, channel: WeddingChannel, queue: asyncio.Queue):
+        self.stats["dropped_subscribers"] += 1
+        self._end(channel, queue)
+
+    @staticmethod
+    def _end(channel: WeddingChannel, queue: asyncio.Queue):
+        channel.subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        # Ends the stream; an EventSource reconnects with Last-Event-ID
+        queue.put_nowait(None)
+
+    async def _on_status_change(self, event: Dict):
+        """live_registry subscriber: announce the wedding's new status"""
+        if event.get("remote"):
+            # Announced by the worker it happened on
+            return
+        from app.services.live_status_service import describe_live_status
+        wedding = event.get("wedding")
+        data = describe_live_status(wedding) if wedding else {"status": "idle"}
+        data["status"] = event["status"]
+        await self.publish(event["wedding_id"], "status", data)
+
+    # ==================== SUBSCRIBING ====================
+
+    async def stream(self, wedding_id: str, status: Dict, mark: EventId,
+                     last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        SSE frames for one subscriber. `status` is a live-status snapshot read
+        after mark(wedding_id) returned `mark`; it is sent first unless the
+        client can resume from `last_event_id`.
+        """
+        channel = self._channel(wedding_id)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        channel.subscribers.add(queue)
+        if channel.status is None:
+            channel.status = status.get("status")
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            resume_from = parse_event_id(last_event_id)
+            if resume_from is None or resume_from < channel.floor:
+                yield _frame(mark, "status", jsonable_encoder(status))
+                resume_from = mark
+            # Replayed events that may also be queued; another worker's event can arrive
+            # after a later one, so the queue is not filtered by id order
+            replayed = set()
+            for event_id, frame in list(channel.history):
+                if queue not in channel.subscribers:
+                    # Dropped while catching up
+                    return
+                if event_id > resume_from:
+                    yield frame
+                    replayed.add(event_id)
+
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if item is None:
+                    return
+                event_id, frame = item
+                if event_id in replayed:
+                    replayed.discard(event_id)
+                    continue
+                yield frame
+        finally:
+            channel.subscribers.discard(queue)
+
+    # ==================== LIFECYCLE ====================
+
+    def start(self):
+        """Follow live status transitions and other workers' events (called from lifespan)"""
+        from app.services.live_registry import live_registry
+        if self._unsubscribe is None:
+            self._unsubscribe = live_registry.subscribe(self._on_status_change)
+        if not self._worker_handler_registered:
+            from app.services.socket_service import sio
+            sio.manager.on_worker_event(WORKER_EVENT, self._apply_worker_event)
+            self._worker_handler_registered = True
+
+    async def stop(self):
+        """Stop following transitions and end open streams so shutdown does not wait on them"""
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        for channel in self.channels.values():
+            for queue in list(channel.subscribers):
+                self._end(channel, queue)
+
+
+# Singleton instance
+wedding_events = WeddingEventBroadcaster()
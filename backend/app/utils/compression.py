@@ -0,0 +1,295 @@
+"""
+Response compression middleware
+gzip / brotli negotiation for JSON API responses and HLS playlists.
+
+- Encoding is negotiated from Accept-Encoding (q-values honoured); brotli is
+  preferred when the optional `brotli` package is installed, gzip otherwise.
+- Only allowlisted content types above a minimum size are compressed.
+  Media (images, video, MPEG-TS segments) and the media proxy routes are
+  passed through untouched, as are range requests and responses that
+  already carry a Content-Encoding.
+- Complete bodies of cacheable static playlists (/hls_output/*.m3u8 with an
+  ETag) are compressed once per (path, ETag, encoding) and served from an
+  LRU cache, so every viewer polling the same playlist revision costs one
+  compression instead of one per request.
+
+See scripts/benchmark_compression.py for bytes-on-wire and CPU numbers.
+"""
+
+import logging
+import os
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional - fall back to gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MINIMUM_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# Quality 4-5 is the usual sweet spot for dynamic responses; 11 is far too slow
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    # HLS playlists (type depends on the platform mimetypes table)
+    "application/vnd.apple.mpegurl",
+    "application/x-mpegurl",
+    "audio/mpegurl",
+    "audio/x-mpegurl",
+    "text/plain",
+    "text/html",
+    "text/css",
+    "text/csv",
+    "text/javascript",
+    "text/xml",
+}
+
+# Proxied Telegram photos/videos are already compressed and often ranged
+SKIP_PATH_PREFIXES = ("/api/media/proxy", "/api/media/telegram-proxy")
+
+# Media segments - mimetypes maps .ts to a text/* type on some systems
+SKIP_PATH_SUFFIXES = (".ts", ".m4s", ".mp4", ".aac", ".jpg", ".jpeg", ".png", ".webp")
+
+CACHEABLE_PATH_PREFIXES = ("/hls_output/",)
+CACHEABLE_PATH_SUFFIXES = (".m3u8",)
+CACHE_MAX_ENTRIES = int(os.getenv("COMPRESSION_CACHE_ENTRIES", "512"))
+
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str, supported: Iterable[str] = SUPPORTED_ENCODINGS) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header, or None"""
+    if not accept_encoding:
+        return None
+
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[token] = q
+
+    best, best_q = None, 0.0
+    for encoding in supported:  # ordered by preference
+        q = qualities.get(encoding, qualities.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress_body(body: bytes, encoding: str, gzip_level: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY) -> bytes:
+    """One-shot compression of a complete body"""
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31 = gzip container
+    return compressor.compress(body) + compressor.flush()
+
+
+class _StreamCompressor:
+    """Incremental compressor for streamed (multi-message) bodies"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+            self._gz = None
+        else:
+            self._br = None
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._br.process(data) if self._br else self._gz.compress(data)
+
+    def finish(self) -> bytes:
+        return self._br.finish() if self._br else self._gz.flush()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing allowlisted responses with gzip or brotli"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = MINIMUM_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+        compressible_types: Iterable[str] = COMPRESSIBLE_TYPES,
+        skip_path_prefixes: Tuple[str, ...] = SKIP_PATH_PREFIXES,
+        skip_path_suffixes: Tuple[str, ...] = SKIP_PATH_SUFFIXES,
+        cacheable_path_prefixes: Tuple[str, ...] = CACHEABLE_PATH_PREFIXES,
+        cacheable_path_suffixes: Tuple[str, ...] = CACHEABLE_PATH_SUFFIXES,
+        cache_max_entries: int = CACHE_MAX_ENTRIES,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.compressible_types = set(compressible_types)
+        self.skip_path_prefixes = skip_path_prefixes
+        self.skip_path_suffixes = skip_path_suffixes
+        self.cacheable_path_prefixes = cacheable_path_prefixes
+        self.cacheable_path_suffixes = cacheable_path_suffixes
+        self.cache_max_entries = cache_max_entries
+        # (path, etag, encoding) -> compressed body
+        self._cache: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope.get("path", "")
+        request_headers = Headers(scope=scope)
+        if (
+            path.startswith(self.skip_path_prefixes)
+            or path.lower().endswith(self.skip_path_suffixes)
+            or "range" in request_headers
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, send, path, encoding)
+        await self.app(scope, receive, responder.send)
+
+    # ==================== PLAYLIST CACHE ====================
+
+    def is_cacheable(self, path: str, headers: Headers) -> bool:
+        if not path.startswith(self.cacheable_path_prefixes) or not path.endswith(self.cacheable_path_suffixes):
+            return False
+        cache_control = headers.get("cache-control", "").lower()
+        return "etag" in headers and "no-store" not in cache_control and "private" not in cache_control
+
+    def cached_compress(self, path: str, etag: str, encoding: str, body: bytes) -> bytes:
+        key = (path, etag, encoding)
+        compressed = self._cache.get(key)
+        if compressed is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return compressed
+
+        self.cache_misses += 1
+        compressed = compress_body(body, encoding, self.gzip_level, self.brotli_quality)
+        self._cache[key] = compressed
+        if len(self._cache) > self.cache_max_entries:
+            self._cache.popitem(last=False)
+        return compressed
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
+
+class _CompressionResponder:
+    """Per-request send wrapper deciding whether and how to compress the response"""
+
+    def __init__(self, middleware: CompressionMiddleware, send: Send, path: str, encoding: str):
+        self.middleware = middleware
+        self.downstream_send = send
+        self.path = path
+        self.encoding = encoding
+        self.start_message: Optional[Message] = None
+        self.started = False
+        self.passthrough = False
+        self.compressor: Optional[_StreamCompressor] = None
+
+    def _should_compress(self, headers: Headers, status: int) -> bool:
+        if status < 200 or status in (204, 206, 304):
+            return False
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type in self.middleware.compressible_types
+
+    def _set_encoding_headers(self, headers: MutableHeaders, length: Optional[int]) -> None:
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if length is None:
+            if "content-length" in headers:
+                del headers["content-length"]
+        else:
+            headers["Content-Length"] = str(length)
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # The representation changed - a strong validator would be wrong
+            headers["ETag"] = f"W/{etag}"
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = not self._should_compress(headers, message["status"])
+            return
+
+        if message_type != "http.response.body":
+            await self.downstream_send(message)
+            return
+
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.downstream_send(self.start_message)
+            await self.downstream_send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.start_message["headers"])
+
+            if not more_body:
+                # Complete body in one message
+                if len(body) < self.middleware.minimum_size:
+                    await self.downstream_send(self.start_message)
+                    await self.downstream_send(message)
+                    return
+
+                if self.middleware.is_cacheable(self.path, headers):
+                    compressed = self.middleware.cached_compress(self.path, headers["etag"], self.encoding, body)
+                else:
+                    compressed = compress_body(body, self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+
+                self._set_encoding_headers(headers, len(compressed))
+                await self.downstream_send(self.start_message)
+                await self.downstream_send({"type": "http.response.body", "body": compressed})
+                return
+
+            # Streamed body - compress incrementally
+            self.compressor = _StreamCompressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            self._set_encoding_headers(headers, None)
+            await self.downstream_send(self.start_message)
+
+        chunk = self.compressor.compress(body) if body else b""
+        if not more_body:
+            chunk += self.compressor.finish()
+            await self.downstream_send({"type": "http.response.body", "body": chunk})
+        elif chunk:
+            await self.downstream_send({"type": "http.response.body", "body": chunk, "more_body": True})
@@ -0,0 +1,46 @@
+"""
+Keyset cursors
+Opaque, URL-safe resume tokens for lists ordered by (time field, _id) -
+the analytics exports and the paginated comment threads. A token carries
+the time of the last row returned and, when the time alone is not unique,
+its _id as the tie-breaker.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict
+
+from bson import ObjectId
+
+
+def encode_cursor(time_value: datetime, object_id: Any = None) -> str:
+    """Opaque resume token for a row"""
+    payload = {"t": time_value.isoformat()}
+    if object_id is not None:
+        payload["id"] = str(object_id)
+        payload["oid"] = isinstance(object_id, ObjectId)
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """{"t": datetime, "id": _id or None}; raises ValueError for a malformed token"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        object_id = payload.get("id")
+        if object_id is not None and payload.get("oid"):
+            object_id = ObjectId(object_id)
+        return {"t": datetime.fromisoformat(payload["t"]), "id": object_id}
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+
+
+def keyset_after(time_field: str, after: Dict[str, Any], descending: bool = False) -> Dict[str, Any]:
+    """Filter for the rows strictly after a decoded cursor in (time field, _id) order"""
+    op = "$lt" if descending else "$gt"
+    if after["id"] is None:
+        return {time_field: {op: after["t"]}}
+    return {"$or": [
+        {time_field: {op: after["t"]}},
+        {time_field: after["t"], "_id": {op: after["id"]}},
+    ]}
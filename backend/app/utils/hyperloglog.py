@@ -0,0 +1,164 @@
+"""
+HyperLogLog cardinality sketch
+Approximate distinct counts in constant space, mergeable across sketches.
+
+A sketch starts in exact mode: it keeps the 64-bit hashes of the items
+it has seen, so counts are exact (up to 64-bit hash collisions, which are
+negligible) while the set is small. Once it holds more than EXACT_LIMIT
+hashes it switches to a dense HyperLogLog with 2^precision registers.
+
+Error bound (dense mode): the relative standard error is 1.04 / sqrt(m)
+for m = 2^precision registers - 0.81% at the default precision 14, so
+about 95% of estimates fall within +-1.6% and 99.7% within +-2.5% of the
+true count. Up to about 3.5 * m distinct items, where the raw HyperLogLog
+estimate is biased upwards, linear counting over the empty registers is
+used instead; its standard error stays below about 1.1% in that range.
+
+Merging is a union: the register-wise maximum (or a union of hashes in
+exact mode). It is idempotent and commutative, so merging the same
+sketch twice never over-counts. Sketches can only be merged at the same
+precision.
+
+Serialized form (to_bytes): a mode byte and the precision, then either
+the sorted hashes (8 bytes each, at most EXACT_LIMIT * 8 bytes) or the
+zlib-compressed registers (about 10-12KB at precision 14).
+"""
+
+import hashlib
+import math
+import struct
+import zlib
+from typing import Iterable, Optional, Set
+
+DEFAULT_PRECISION = 14
+EXACT_LIMIT = 1024
+
+_MODE_EXACT = 1
+_MODE_DENSE = 2
+
+MIN_PRECISION = 4
+MAX_PRECISION = 18
+# Linear counting is used while its estimate is below this many times m
+_LINEAR_COUNTING_LIMIT = 3.5
+# 2^-rank for every possible register value
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(65)]
+
+
+def hash_item(item: str) -> int:
+    """64-bit hash of an item"""
+    return int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _alpha(m: int) -> float:
+    if m == 16:
+        return 0.673
+    if m == 32:
+        return 0.697
+    if m == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / m)
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch, exact for small sets"""
+
+    __slots__ = ("precision", "_hashes", "_registers")
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"precision must be between {MIN_PRECISION} and {MAX_PRECISION}, got {precision}")
+        self.precision = precision
+        self._hashes: Optional[Set[int]] = set()
+        self._registers: Optional[bytearray] = None
+
+    @classmethod
+    def of(cls, items: Iterable[str], precision: int = DEFAULT_PRECISION) -> "HyperLogLog":
+        sketch = cls(precision)
+        for item in items:
+            sketch.add(item)
+        return sketch
+
+    @property
+    def is_exact(self) -> bool:
+        return self._registers is None
+
+    @property
+    def relative_error(self) -> float:
+        """Relative standard error of count() (0 while exact)"""
+        return 0.0 if self.is_exact else 1.04 / math.sqrt(1 << self.precision)
+
+    # ==================== UPDATES ====================
+
+    def add(self, item: str):
+        self.add_hash(hash_item(item))
+
+    def add_hash(self, value: int):
+        if self._registers is None:
+            self._hashes.add(value)
+            if len(self._hashes) > EXACT_LIMIT:
+                self._densify()
+            return
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def _densify(self):
+        hashes = self._hashes
+        self._hashes = None
+        self._registers = bytearray(1 << self.precision)
+        for value in hashes:
+            self.add_hash(value)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Union `other` into this sketch (in place)"""
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge precision {other.precision} into {self.precision}")
+        if other._registers is None:
+            for value in other._hashes:
+                self.add_hash(value)
+            return self
+        if self._registers is None:
+            self._densify()
+        self._registers = bytearray(map(max, self._registers, other._registers))
+        return self
+
+    # ==================== ESTIMATION ====================
+
+    def count(self) -> int:
+        """Distinct items seen: exact in exact mode, estimated otherwise"""
+        if self._registers is None:
+            return len(self._hashes)
+        m = len(self._registers)
+        zeros = self._registers.count(0)
+        if zeros:
+            # The raw estimate is biased while many registers are still empty
+            linear = m * math.log(m / zeros)
+            if linear <= _LINEAR_COUNTING_LIMIT * m:
+                return round(linear)
+        return round(_alpha(m) * m * m / sum(_INVERSE_POWERS[rank] for rank in self._registers))
+
+    def __len__(self) -> int:
+        return self.count()
+
+    # ==================== SERIALIZATION ====================
+
+    def to_bytes(self) -> bytes:
+        if self._registers is None:
+            hashes = sorted(self._hashes)
+            return bytes([_MODE_EXACT, self.precision]) + struct.pack(f">{len(hashes)}Q", *hashes)
+        return bytes([_MODE_DENSE, self.precision]) + zlib.compress(bytes(self._registers), 6)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        if len(data) < 2 or data[0] not in (_MODE_EXACT, _MODE_DENSE):
+            raise ValueError("Not a serialized HyperLogLog sketch")
+        sketch = cls(data[1])
+        payload = bytes(data[2:])
+        if data[0] == _MODE_EXACT:
+            sketch._hashes = set(struct.unpack(f">{len(payload) // 8}Q", payload))
+        else:
+            sketch._hashes = None
+            sketch._registers = bytearray(zlib.decompress(payload))
+        return sketch
@@ -0,0 +1,190 @@
+"""
+Benchmark the admin dashboard queries at 10k users / 100k media.
+
+Seeds a scratch database on a local MongoDB (MONGODB_URI) and compares:
+
+  dashboard   /stats + /revenue + /analytics as a chain of sequential
+              count_documents / find calls vs AdminStatsService.compute
+              (one aggregation per collection, concurrent) vs the cached
+              snapshot
+  user list   one page of /admin/users with per-user count_documents for
+              weddings and media vs reading the maintained counters
+  weddings    one page of /admin/weddings with a find_one per creator vs
+              the $lookup pipeline
+
+Usage: python scripts/benchmark_admin_stats.py [--users 10000] [--media 100000] [--iterations 20]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.database import INDEXES
+from app.services.admin_stats_service import AdminStatsService
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+PAGE_SIZE = 50
+
+
+async def seed(db, args):
+    rng = random.Random(11)
+    now = datetime.utcnow()
+    users = [{
+        "id": str(uuid.uuid4()),
+        "email": f"user{i}@example.com",
+        "full_name": f"User {i}",
+        "role": "creator",
+        "subscription_plan": "free",
+        "created_at": now - timedelta(days=rng.uniform(0, 365)),
+    } for i in range(args.users)]
+    weddings = [{
+        "id": str(uuid.uuid4()),
+        "creator_id": rng.choice(users)["id"],
+        "title": f"Wedding {i}",
+        "bride_name": "Bride",
+        "groom_name": "Groom",
+        "status": rng.choice(["scheduled", "live", "ended", "recorded"]),
+        "scheduled_date": now,
+        "viewers_count": 0,
+        "created_at": now - timedelta(days=rng.uniform(0, 365)),
+    } for i in range(args.users * 2)]
+    media = [{
+        "id": str(uuid.uuid4()),
+        "wedding_id": wedding["id"],
+        "uploaded_by": wedding["creator_id"],
+        "media_type": "photo",
+    } for wedding in (rng.choice(weddings) for _ in range(args.media))]
+    subscriptions = [{
+        "user_id": rng.choice(users)["id"],
+        "plan": rng.choice(["monthly", "yearly"]),
+        "status": rng.choice(["active", "active", "cancelled"]),
+        "created_at": now - timedelta(days=rng.uniform(0, 365)),
+    } for _ in range(args.users // 2)]
+
+    # Maintained counters, as CounterService keeps them
+    weddings_count, media_count = {}, {}
+    for wedding in weddings:
+        weddings_count[wedding["creator_id"]] = weddings_count.get(wedding["creator_id"], 0) + 1
+    for item in media:
+        media_count[item["uploaded_by"]] = media_count.get(item["uploaded_by"], 0) + 1
+    for user in users:
+        user["weddings_count"] = weddings_count.get(user["id"], 0)
+        user["media_count"] = media_count.get(user["id"], 0)
+
+    for name, docs in (("users", users), ("weddings", weddings), ("media", media), ("subscriptions", subscriptions)):
+        for i in range(0, len(docs), 10000):
+            await db[name].insert_many(docs[i:i + 10000])
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            await db[collection].create_index(keys, **options)
+    await db.media.create_index([("uploaded_by", 1)])
+    await db.weddings.create_index([("creator_id", 1)])
+
+
+async def legacy_dashboard(db):
+    """/stats + /revenue + /analytics as sequential queries"""
+    now = datetime.utcnow()
+    await db.users.count_documents({})
+    await db.weddings.count_documents({})
+    await db.weddings.count_documents({"status": "live"})
+    await db.subscriptions.count_documents({"status": "active"})
+    await db.subscriptions.count_documents({"plan": "monthly", "status": "active"})
+    await db.subscriptions.count_documents({"plan": "yearly", "status": "active"})
+    await db.subscriptions.find({"status": "active"}).to_list(None)
+    for i in range(6):
+        window = {"created_at": {"$gte": now - timedelta(days=30 * (i + 1)), "$lt": now - timedelta(days=30 * i)}}
+        await db.subscriptions.count_documents(window)  # /revenue
+        await db.users.count_documents(window)
+        await db.subscriptions.count_documents(window)  # /analytics
+    for status in ["scheduled", "live", "ended", "recorded"]:
+        await db.weddings.count_documents({"status": status})
+
+
+async def legacy_user_page(db):
+    users = await db.users.find({}).sort("created_at", -1).limit(PAGE_SIZE).to_list(PAGE_SIZE)
+    for user in users:
+        await db.weddings.count_documents({"creator_id": user["id"]})
+        await db.media.count_documents({"uploaded_by": user["id"]})
+
+
+async def counter_user_page(db):
+    await db.users.find({}).sort("created_at", -1).limit(PAGE_SIZE).to_list(PAGE_SIZE)
+
+
+async def legacy_wedding_page(db):
+    weddings = await db.weddings.find({}).sort("created_at", -1).limit(PAGE_SIZE).to_list(PAGE_SIZE)
+    for wedding in weddings:
+        await db.users.find_one({"id": wedding["creator_id"]})
+
+
+async def lookup_wedding_page(db):
+    await db.weddings.aggregate([
+        {"$sort": {"created_at": -1}},
+        {"$limit": PAGE_SIZE},
+        {"$lookup": {
+            "from": "users",
+            "localField": "creator_id",
+            "foreignField": "id",
+            "pipeline": [{"$project": {"_id": 0, "email": 1, "full_name": 1}}, {"$limit": 1}],
+            "as": "creator",
+        }},
+    ]).to_list(PAGE_SIZE)
+
+
+async def timed(label, func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"   {label:<38}{statistics.median(samples):>9.2f} ms median{max(samples):>9.2f} ms max")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--media", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client[f"{os.getenv('DB_NAME', 'record_db')}_admin_stats_benchmark"]
+    try:
+        await client.drop_database(db.name)
+        print(f"🌱 Seeding {args.users} users, {args.users * 2} weddings, {args.media} media...")
+        await seed(db, args)
+
+        service = AdminStatsService(cache_seconds=60)
+        print("\n📊 Dashboard (/stats + /revenue + /analytics)")
+        await timed("sequential count_documents", lambda: legacy_dashboard(db), args.iterations)
+        await timed("per-collection aggregations", lambda: AdminStatsService.compute(db), args.iterations)
+        await timed("cached snapshot", lambda: service.snapshot(db), args.iterations)
+
+        print(f"\n👥 User list page ({PAGE_SIZE} users)")
+        await timed("per-user count_documents (N+1)", lambda: legacy_user_page(db), args.iterations)
+        await timed("maintained counters", lambda: counter_user_page(db), args.iterations)
+
+        print(f"\n💒 Weddings list page ({PAGE_SIZE} weddings)")
+        await timed("find_one per creator (N+1)", lambda: legacy_wedding_page(db), args.iterations)
+        await timed("$lookup", lambda: lookup_wedding_page(db), args.iterations)
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,238 @@
+"""
+Benchmark camera switch latency: the time from a switch call to the first
+segment of the composed HLS playlist that shows the new camera. Cameras
+are local test sources (lavfi solid colours and tones) packaged as live HLS
+by one FFmpeg process each, as the RTMP ingest does for real cameras.
+
+  restart  the previous switch: the composition is stopped and started
+           again on the new camera alone
+  live     switch_camera on one composition with every camera as an input
+
+For each: switch latency, the longest gap between two segments appearing
+in the playlist (what a player stalls on) and how often the playlist
+started over. Segments are attributed to cameras by decoding them.
+
+Needs ffmpeg and ffprobe on PATH.
+
+Usage: python scripts/benchmark_camera_switch.py [--switches 6] [--cameras 2]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.services.ffmpeg_composition import FFmpegCompositionService
+
+# (lavfi colour, its RGB, tone in Hz) per test camera
+CAMERAS = [
+    ("red", (255, 0, 0), 440),
+    ("blue", (0, 0, 255), 660),
+    ("lime", (0, 255, 0), 880),
+    ("yellow", (255, 255, 0), 1100),
+]
+
+
+class TestCamera:
+    """A lavfi test source streamed to a live HLS playlist, standing in for an ingested camera"""
+
+    def __init__(self, index: int, size: str, fps: int, output_dir: str):
+        self.index = index
+        colour, _, tone = CAMERAS[index]
+        self.source = f"color=c={colour}:s={size}:r={fps}[out0];sine=f={tone}:sample_rate=48000[out1]"
+        self.fps = fps
+        self.camera = {
+            "camera_id": f"cam-{index}",
+            "name": colour,
+            "hls_url": os.path.join(output_dir, f"camera_{index}.m3u8"),
+        }
+        self.process = None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-v", "error", "-re", "-f", "lavfi", "-i", self.source,
+            "-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency", "-g", str(self.fps),
+            "-c:a", "aac", "-f", "hls", "-hls_time", "1", "-hls_list_size", "6",
+            "-hls_flags", "delete_segments", self.camera["hls_url"],
+            # Not -nostdin: FFmpeg then ignores SIGTERM
+            stdin=asyncio.subprocess.DEVNULL,
+        )
+
+    async def stop(self):
+        if self.process and self.process.returncode is None:
+            self.process.terminate()
+            await self.process.wait()
+
+
+async def cameras_in_segment(path: str, count: int) -> set:
+    """Indices of the test cameras whose frames are in a segment"""
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-nostdin", "-v", "error", "-i", path, "-an",
+        "-vf", "scale=1:1", "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1",
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+    )
+    pixels, _ = await process.communicate()
+    seen = set()
+    for i in range(0, len(pixels) - 2, 3):
+        pixel = pixels[i:i + 3]
+        seen.add(min(range(count), key=lambda c: sum((a - b) ** 2 for a, b in zip(pixel, CAMERAS[c][1]))))
+    return seen
+
+
+class PlaylistWatcher:
+    """Polls a composed playlist, noting when each segment appears and which cameras it shows"""
+
+    def __init__(self, output_dir: str, cameras: int, interval: float = 0.02):
+        self.playlist = os.path.join(output_dir, "output.m3u8")
+        self.output_dir = output_dir
+        self.cameras = cameras
+        self.interval = interval
+        # (appeared at, task decoding the cameras it shows)
+        self.segments = []
+        self.restarts = 0
+        self._seen = set()
+        self._sequence = -1
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _poll(self):
+        while True:
+            try:
+                with open(self.playlist) as playlist:
+                    lines = playlist.read().splitlines()
+            except FileNotFoundError:
+                lines = []
+            for line in lines:
+                if line.startswith("#EXT-X-MEDIA-SEQUENCE:"):
+                    sequence = int(line.split(":", 1)[1])
+                    if sequence < self._sequence:
+                        self.restarts += 1
+                    self._sequence = sequence
+                elif line and not line.startswith("#"):
+                    path = os.path.join(self.output_dir, line)
+                    try:
+                        key = (line, os.stat(path).st_mtime_ns)
+                    except FileNotFoundError:
+                        continue
+                    if key not in self._seen:
+                        self._seen.add(key)
+                        decoded = asyncio.create_task(cameras_in_segment(path, self.cameras))
+                        self.segments.append((time.monotonic(), decoded))
+            await asyncio.sleep(self.interval)
+
+    async def wait_segments(self, count: int, timeout: float = 30):
+        target = len(self.segments) + count
+        deadline = time.monotonic() + timeout
+        while len(self.segments) < target:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"no segments in {self.playlist} after {timeout:g}s")
+            await asyncio.sleep(self.interval)
+
+    async def first_from(self, camera: int, after: int, timeout: float = 30) -> float:
+        """When the first segment past index `after` showing `camera` appeared"""
+        deadline = time.monotonic() + timeout
+        index = after
+        while time.monotonic() < deadline:
+            if index < len(self.segments):
+                appeared, decoded = self.segments[index]
+                if camera in await decoded:
+                    return appeared
+                index += 1
+            else:
+                await asyncio.sleep(self.interval)
+        raise TimeoutError(f"camera {camera} never showed up")
+
+    def longest_gap(self, since: int) -> float:
+        times = [appeared for appeared, _ in self.segments[since:]]
+        return max((b - a for a, b in zip(times, times[1:])), default=0.0)
+
+
+async def measure(label, service, wedding_id, cameras, switch, switches):
+    watcher = PlaylistWatcher(os.path.join(service.output_dir, f"output_{wedding_id}"), len(cameras))
+    watcher.start()
+    await watcher.wait_segments(2)
+    first, restarts = len(watcher.segments), watcher.restarts
+
+    latencies = []
+    for n in range(switches):
+        target = (n + 1) % len(cameras)
+        after = len(watcher.segments)
+        called = time.monotonic()
+        result = await switch(cameras[target])
+        assert result["success"], result
+        latencies.append((await watcher.first_from(target, after) - called) * 1000)
+        # Let the new camera settle before the next cut
+        await watcher.wait_segments(2)
+
+    await watcher.stop()
+    await service.stop_composition(wedding_id)
+    print(f"   {label:<9}{statistics.median(latencies):>8.0f} ms p50{max(latencies):>8.0f} ms max"
+          f"{watcher.longest_gap(first) * 1000:>8.0f} ms longest segment gap"
+          f"{watcher.restarts - restarts:>4} playlist restarts")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--switches", type=int, default=6)
+    parser.add_argument("--cameras", type=int, default=2, choices=range(2, len(CAMERAS) + 1))
+    parser.add_argument("--size", default="640x360")
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--segment-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        sys.exit("ffmpeg and ffprobe are needed on PATH")
+
+    output_dir = tempfile.mkdtemp(prefix="camera_switch_")
+    service = FFmpegCompositionService(output_dir=output_dir)
+    service.width, service.height = (int(v) for v in args.size.split("x"))
+    service.fps = args.fps
+    service.video_bitrate = "1000k"
+    service.segment_seconds = args.segment_seconds
+    sources = [TestCamera(i, args.size, args.fps, output_dir) for i in range(args.cameras)]
+    cameras = [source.camera for source in sources]
+
+    print(f"🎥 {args.switches} switches between {args.cameras} lavfi cameras "
+          f"({args.size}@{args.fps}, {args.segment_seconds:g} s segments)")
+    try:
+        for source in sources:
+            await source.start()
+        # Cameras have a few segments out before the composition reads them
+        await asyncio.sleep(4)
+
+        await service.start_composition("bench_restart", cameras[0])
+        await measure("restart", service, "bench_restart", cameras,
+                      lambda camera: service.start_composition("bench_restart", camera), args.switches)
+
+        await service.start_composition("bench_live", cameras[0], cameras)
+        await measure("live", service, "bench_live", cameras,
+                      lambda camera: service.switch_camera("bench_live", camera), args.switches)
+    finally:
+        for wedding_id in list(service.active_processes):
+            await service.stop_composition(wedding_id)
+        for source in sources:
+            await source.stop()
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,154 @@
+"""
+Benchmark response compression for typical WedLive payloads.
+
+Part 1 compares bytes-on-wire and CPU time per response for gzip levels and
+brotli qualities on synthetic gallery / analytics / comment JSON and a live
+HLS playlist.
+
+Part 2 runs CompressionMiddleware in front of a StaticFiles mount serving a
+playlist, with and without the compressed-playlist cache, to show what the
+cache saves when many viewers poll the same playlist revision.
+
+Usage: python scripts/benchmark_compression.py [iterations]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.applications import Starlette
+from starlette.staticfiles import StaticFiles
+from starlette.testclient import TestClient
+
+from app.utils.compression import CompressionMiddleware, compress_body, brotli
+
+
+def gallery_payload(count=500):
+    now = datetime.utcnow()
+    return {
+        "media": [
+            {
+                "id": str(uuid.uuid4()),
+                "wedding_id": "wedding-123",
+                "media_type": "photo",
+                "url": f"/api/media/telegram-proxy/photos/AgACAgUAAxkDAAI{i:06d}",
+                "thumbnail_url": f"/api/media/telegram-proxy/photos/AgACAgUAAxkDAAJ{i:06d}",
+                "caption": f"Photo {i} from the ceremony",
+                "file_size": 180000 + i * 37,
+                "uploaded_by": "user-456",
+                "created_at": (now - timedelta(minutes=i)).isoformat(),
+            }
+            for i in range(count)
+        ]
+    }
+
+
+def analytics_payload(points=288):
+    now = datetime.utcnow()
+    return {
+        "wedding_id": "wedding-123",
+        "viewer_timeline": [
+            {"timestamp": (now - timedelta(minutes=5 * i)).isoformat(), "viewers": (i * 7) % 120}
+            for i in range(points)
+        ],
+        "quality_timeline": [
+            {"timestamp": (now - timedelta(minutes=5 * i)).isoformat(), "bitrate": 2500 + i % 300, "fps": 30.0, "buffering": i % 3}
+            for i in range(points)
+        ],
+    }
+
+
+def comments_payload(count=300):
+    return {
+        "comments": [
+            {
+                "id": str(uuid.uuid4()),
+                "user_name": f"Guest {i}",
+                "content": "Congratulations to the happy couple! " * (1 + i % 3),
+                "likes_count": i % 17,
+                "replies": [],
+            }
+            for i in range(count)
+        ]
+    }
+
+
+def hls_playlist(segments=6, sequence=1234):
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:2", f"#EXT-X-MEDIA-SEQUENCE:{sequence}"]
+    for i in range(segments):
+        lines.append("#EXTINF:2.000000,")
+        lines.append(f"segment_{sequence + i:05d}.ts")
+    return "\n".join(lines) + "\n"
+
+
+def bench_codec(body, encoding, iterations, **kwargs):
+    start = time.process_time()
+    for _ in range(iterations):
+        compressed = compress_body(body, encoding, **kwargs)
+    cpu_us = (time.process_time() - start) / iterations * 1e6
+    return len(compressed), cpu_us
+
+
+def run_codec_benchmark(iterations):
+    payloads = {
+        "gallery (500 items)": json.dumps(gallery_payload()).encode(),
+        "analytics timeline": json.dumps(analytics_payload()).encode(),
+        "comment tree": json.dumps(comments_payload()).encode(),
+        "live playlist (.m3u8)": hls_playlist().encode(),
+    }
+    variants = [("gzip", {"gzip_level": level}) for level in (1, 6, 9)]
+    if brotli is not None:
+        variants += [("br", {"brotli_quality": q}) for q in (1, 4, 11)]
+    else:
+        print("⚠️  brotli not installed - gzip only")
+
+    print("\n📦 Bytes on wire / CPU per response")
+    print(f"{'payload':<24}{'codec':<10}{'raw':>10}{'wire':>10}{'ratio':>8}{'cpu µs':>10}")
+    for name, body in payloads.items():
+        for encoding, kwargs in variants:
+            level = next(iter(kwargs.values()))
+            # Quality 11 is very slow - fewer iterations keep the run short
+            n = max(1, iterations // 20) if level >= 9 else iterations
+            size, cpu_us = bench_codec(body, encoding, n, **kwargs)
+            print(f"{name:<24}{f'{encoding}-{level}':<10}{len(body):>10}{size:>10}{len(body) / size:>7.1f}x{cpu_us:>10.0f}")
+
+
+def run_playlist_cache_benchmark(iterations):
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, "wedding-123"))
+        with open(os.path.join(directory, "wedding-123", "output.m3u8"), "w") as f:
+            f.write(hls_playlist(segments=30))
+
+        print(f"\n🎞️  {iterations} playlist polls through CompressionMiddleware")
+        for cached in (False, True):
+            app = Starlette()
+            app.mount("/hls_output", StaticFiles(directory=directory), name="hls_output")
+            middleware_kwargs = {"minimum_size": 256}
+            if not cached:
+                middleware_kwargs["cacheable_path_prefixes"] = ()
+            app.add_middleware(CompressionMiddleware, **middleware_kwargs)
+
+            with TestClient(app) as client:
+                start_wall, start_cpu = time.perf_counter(), time.process_time()
+                wire_bytes = 0
+                for _ in range(iterations):
+                    response = client.get("/hls_output/wedding-123/output.m3u8", headers={"Accept-Encoding": "br, gzip"})
+                    wire_bytes += int(response.headers["content-length"])
+                wall_us = (time.perf_counter() - start_wall) / iterations * 1e6
+                cpu_us = (time.process_time() - start_cpu) / iterations * 1e6
+
+            label = "cache on " if cached else "cache off"
+            print(f"   {label}: {wire_bytes // iterations} B/response, {wall_us:.0f} µs wall, {cpu_us:.0f} µs CPU per request "
+                  f"(encoding: {response.headers.get('content-encoding')})")
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    run_codec_benchmark(iterations)
+    run_playlist_cache_benchmark(iterations)
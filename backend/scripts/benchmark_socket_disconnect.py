@@ -0,0 +1,99 @@
+"""
+Benchmark Socket.IO disconnect handling: full scan vs the sid -> rooms index.
+
+Simulates --viewers viewers spread over --weddings weddings (a share of
+them joined to two weddings), then disconnects everyone - the storm when
+streams end - through the socket_service handlers. Emits, room changes
+and viewer-count publishing are stubbed out, so the numbers are the
+handlers' own bookkeeping.
+
+  scan    the previous disconnect handler: look for the sid in every
+          wedding's viewer set
+  index   socket_service.disconnect: visit only the sid's own weddings
+
+Usage: python scripts/benchmark_socket_disconnect.py [--viewers 10000] [--weddings 500]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.services import socket_service
+
+
+async def _noop(*args, **kwargs):
+    return None
+
+
+def stub_server():
+    """Keep the handlers from touching real clients"""
+    socket_service.sio.emit = _noop
+    socket_service.sio.enter_room = _noop
+    socket_service.sio.leave_room = _noop
+    socket_service.sio.manager.update_viewer_count = _noop
+
+
+async def legacy_disconnect(sid):
+    """The handler before the reverse index"""
+    for wedding_id, viewers in socket_service.active_viewers.items():
+        if sid in viewers:
+            viewers.remove(sid)
+            await socket_service.sio.emit('viewer_count', {
+                'wedding_id': wedding_id,
+                'count': await socket_service._viewer_count_changed(wedding_id)
+            }, room=wedding_id)
+
+
+async def populate(args, rng):
+    socket_service.active_viewers.clear()
+    socket_service.viewer_rooms.clear()
+    socket_service.viewer_info.clear()
+    sids = [f"sid-{i}" for i in range(args.viewers)]
+    weddings = [f"wedding-{i}" for i in range(args.weddings)]
+    for sid in sids:
+        await socket_service.join_wedding(sid, {'wedding_id': rng.choice(weddings), 'guest_name': 'Guest'})
+        if rng.random() < 0.1:
+            await socket_service.join_wedding(sid, {'wedding_id': rng.choice(weddings), 'guest_name': 'Guest'})
+    rng.shuffle(sids)
+    return sids
+
+
+async def storm(label, handler, sids):
+    samples = []
+    start = time.perf_counter()
+    for sid in sids:
+        t = time.perf_counter()
+        await handler(sid)
+        samples.append((time.perf_counter() - t) * 1e6)
+    total = time.perf_counter() - start
+    samples.sort()
+    print(f"   {label:<8}{total * 1000:>10.1f} ms total"
+          f"{statistics.median(samples):>10.1f} µs median"
+          f"{samples[int(len(samples) * 0.99)]:>10.1f} µs p99")
+    assert not any(socket_service.active_viewers.values()), "viewers left behind"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--viewers", type=int, default=10000)
+    parser.add_argument("--weddings", type=int, default=500)
+    args = parser.parse_args()
+
+    stub_server()
+    print(f"🔌 Disconnect storm: {args.viewers} viewers across {args.weddings} weddings")
+    await storm("scan", legacy_disconnect, await populate(args, random.Random(1)))
+    await storm("index", socket_service.disconnect, await populate(args, random.Random(1)))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,154 @@
+"""
+Benchmark viewer token issuing: --joins simultaneous joins of one wedding
+against a local fake Pulse server (a child process, --latency-ms per mint).
+
+  blocking  the previous path: a synchronous `requests` mint per join,
+            which stalls the event loop for the whole round trip
+  per-join  PulseService on the shared async client, one mint per join
+  cached    viewer_tokens with PULSE_SHARED_VIEWER_TOKENS: single-flight,
+            cached per wedding and role
+  local     viewer_tokens with LiveKit keys: signed here, no Pulse call
+
+For each: wall time, Pulse calls, join latency and the longest event loop
+stall seen by a 5 ms ticker.
+
+Usage: python scripts/benchmark_viewer_tokens.py [--joins 1000] [--latency-ms 10]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import requests
+from aiohttp import web
+
+from app.services.pulse_service import PulseService, close_http_session
+from app.services.viewer_tokens import ViewerTokenService
+
+
+class FakePulseServer:
+    """/v1/tokens/create in a child process, counting the mints it serves"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self._calls = multiprocessing.Value("i", 0)
+        self.url = None
+
+    @property
+    def calls(self) -> int:
+        return self._calls.value
+
+    def start(self):
+        parent, child = multiprocessing.Pipe()
+        multiprocessing.Process(target=self._run, args=(child,), daemon=True).start()
+        self.url = parent.recv()
+
+    def _run(self, conn):
+        asyncio.run(self._serve(conn))
+
+    async def _serve(self, conn):
+        async def create_token(request):
+            with self._calls.get_lock():
+                self._calls.value += 1
+                call = self._calls.value
+            payload = await request.json()
+            await asyncio.sleep(self.latency)
+            return web.json_response({
+                "token": f"token_{call}",
+                "server_url": "wss://livekit.local",
+                "expires_at": (datetime.now(timezone.utc) + timedelta(hours=6)).isoformat(),
+                "room_name": payload.get("room_name"),
+                "participant_name": payload.get("participant_name"),
+            })
+
+        app = web.Application()
+        app.router.add_post("/v1/tokens/create", create_token)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0, backlog=2048)
+        await site.start()
+        host, port = runner.addresses[0][:2]
+        conn.send(f"http://{host}:{port}")
+        await asyncio.Event().wait()
+
+
+def blocking_join(pulse: PulseService):
+    """The previous mint: requests inside the coroutine"""
+    async def join(i):
+        response = requests.post(f"{pulse.pulse_api_url}/v1/tokens/create", json={
+            "room_name": "wedding_bench", "participant_name": f"Guest {i}",
+            "participant_identity": f"guest_{i}", "can_publish": False,
+        }, timeout=30)
+        response.raise_for_status()
+        return response.json()
+    return join
+
+
+async def measure(label, join, joins, server):
+    calls_before = server.calls
+    lag = {"max": 0.0}
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            t = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lag["max"] = max(lag["max"], time.perf_counter() - t - 0.005)
+
+    async def timed(i):
+        t = time.perf_counter()
+        result = await join(i)
+        assert result["token"]
+        return (time.perf_counter() - t) * 1000
+
+    ticking = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    samples = sorted(await asyncio.gather(*(timed(i) for i in range(joins))))
+    total = time.perf_counter() - start
+    stop.set()
+    await ticking
+    print(f"   {label:<10}{total * 1000:>10.1f} ms total{server.calls - calls_before:>7} Pulse calls"
+          f"{statistics.median(samples):>10.1f} ms p50{samples[int(len(samples) * 0.99)]:>10.1f} ms p99"
+          f"{lag['max'] * 1000:>10.1f} ms max loop stall")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--joins", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    server = FakePulseServer(args.latency_ms / 1000)
+    server.start()
+    pulse = PulseService()
+    pulse.mock_mode = False
+    pulse.pulse_api_url = server.url
+
+    print(f"🎫 {args.joins} simultaneous viewer joins, fake Pulse at {server.url} ({args.latency_ms:g} ms per mint)")
+    await measure("blocking", blocking_join(pulse), args.joins, server)
+    await measure("per-join", lambda i: pulse.generate_stream_token(
+        room_name="wedding_bench", participant_name=f"Guest {i}", participant_id=f"guest_{i}"
+    ), args.joins, server)
+    cached = ViewerTokenService(api_key="", api_secret="", shared=True, pulse=pulse)
+    await measure("cached", lambda i: cached.get_token("wedding_bench", participant_name=f"Guest {i}"),
+                  args.joins, server)
+    local = ViewerTokenService(api_key="APIbench", api_secret="bench-secret", pulse=pulse)
+    await measure("local", lambda i: local.get_token("wedding_bench", participant_name=f"Guest {i}"),
+                  args.joins, server)
+    await close_http_session()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,207 @@
+"""
+Load test: viewer session / heartbeat / quality writes, direct vs buffered.
+
+Replays the same simulated audience twice against a scratch database on a
+local MongoDB (MONGODB_URI):
+
+  direct    one insert_one / update_one per event (the old write path)
+  buffered  the AnalyticsIngestBuffer, flushed every --flush-interval
+            simulated seconds or when --flush-max-ops are pending
+
+Simulated time runs as fast as MongoDB accepts the writes. Reports the
+server-side round trips (network.numRequests) and document writes
+(opcounters insert + update) per mode from serverStatus, plus wall time.
+
+Usage: python scripts/load_test_ingestion.py [--viewers 2000] [--duration 300]
+       [--heartbeat-interval 5] [--quality-interval 10] [--flush-interval 1]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.services.ingestion_buffer import AnalyticsIngestBuffer, build_quality_sample
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+WEDDING_ID = "ingestion-load-test"
+
+
+def simulate_events(args):
+    """(second, kind, session_id, payload) for every viewer event, in time order"""
+    rng = random.Random(7)
+    start = datetime.utcnow()
+    events = []
+    for _ in range(args.viewers):
+        session_id = str(uuid.uuid4())
+        joined = rng.uniform(0, args.duration * 0.2)
+        left = min(args.duration, joined + rng.uniform(30, args.duration))
+        join_time = start + timedelta(seconds=joined)
+        events.append((joined, "start", session_id, {
+            "id": str(uuid.uuid4()),
+            "wedding_id": WEDDING_ID,
+            "session_id": session_id,
+            "user_id": None,
+            "timezone": "UTC",
+            "user_agent": "load-test",
+            "join_time": join_time,
+            "leave_time": None,
+            "duration_seconds": 0,
+            "chat_messages_count": 0,
+            "reactions_count": 0,
+        }))
+        second = joined + args.heartbeat_interval
+        while second < left:
+            events.append((second, "heartbeat", session_id, start + timedelta(seconds=second)))
+            second += args.heartbeat_interval
+        second = joined + args.quality_interval
+        while second < left:
+            events.append((second, "quality", session_id, build_quality_sample(WEDDING_ID, {
+                "bitrate": rng.randint(1500, 4500),
+                "fps": 30,
+                "quality": "720p",
+                "timestamp": start + timedelta(seconds=second),
+            }, session_id=session_id)))
+            second += args.quality_interval
+        if left < args.duration:
+            events.append((left, "end", session_id, (start + timedelta(seconds=left), int(left - joined))))
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+async def server_counters(client):
+    status = await client.admin.command("serverStatus")
+    return {
+        "requests": status["network"]["numRequests"],
+        "writes": status["opcounters"]["insert"] + status["opcounters"]["update"],
+    }
+
+
+async def run_direct(db, events, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def write(event):
+        _, kind, session_id, payload = event
+        async with semaphore:
+            if kind == "start":
+                await db.viewer_sessions.insert_one(dict(payload))
+            elif kind == "heartbeat":
+                await db.viewer_sessions.update_one(
+                    {"session_id": session_id, "wedding_id": WEDDING_ID},
+                    {"$max": {"last_heartbeat_at": payload}},
+                )
+            elif kind == "quality":
+                await db.stream_quality_metrics.insert_one(dict(payload))
+            else:
+                leave_time, duration = payload
+                await db.viewer_sessions.update_one(
+                    {"session_id": session_id, "wedding_id": WEDDING_ID},
+                    {"$set": {"leave_time": leave_time, "duration_seconds": duration}},
+                )
+
+    # Events of one simulated second go out concurrently, seconds in order
+    second, batch = 0, []
+    for event in events:
+        if int(event[0]) != second and batch:
+            await asyncio.gather(*(write(e) for e in batch))
+            second, batch = int(event[0]), []
+        batch.append(event)
+    await asyncio.gather(*(write(e) for e in batch))
+
+
+async def run_buffered(db, events, args):
+    buffer = AnalyticsIngestBuffer(flush_max_ops=args.flush_max_ops, max_pending=args.max_pending)
+    buffer._db = db
+    next_flush = args.flush_interval
+    for second, kind, session_id, payload in events:
+        while second >= next_flush:
+            await buffer.flush()
+            next_flush += args.flush_interval
+        if kind == "start":
+            await buffer.session_started(payload)
+        elif kind == "heartbeat":
+            await buffer.heartbeat(WEDDING_ID, session_id, payload)
+        elif kind == "quality":
+            await buffer.quality_sample(dict(payload))
+        else:
+            await buffer.session_ended(WEDDING_ID, session_id, *payload)
+        if buffer.pending >= buffer.flush_max_ops:
+            await buffer.flush()
+    # Shutdown flush
+    await buffer.stop()
+    return buffer.stats
+
+
+async def verify(db, events):
+    """Both modes must leave the same data behind"""
+    sessions = await db.viewer_sessions.count_documents({"wedding_id": WEDDING_ID})
+    ended = await db.viewer_sessions.count_documents({"wedding_id": WEDDING_ID, "leave_time": {"$ne": None}})
+    samples = await db.stream_quality_metrics.count_documents({"wedding_id": WEDDING_ID})
+    expected = (
+        sum(1 for e in events if e[1] == "start"),
+        sum(1 for e in events if e[1] == "end"),
+        sum(1 for e in events if e[1] == "quality"),
+    )
+    return (sessions, ended, samples) == expected, (sessions, ended, samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--viewers", type=int, default=2000)
+    parser.add_argument("--duration", type=int, default=300, help="simulated seconds")
+    parser.add_argument("--heartbeat-interval", type=float, default=5)
+    parser.add_argument("--quality-interval", type=float, default=10)
+    parser.add_argument("--flush-interval", type=float, default=1)
+    parser.add_argument("--flush-max-ops", type=int, default=500)
+    parser.add_argument("--max-pending", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=100, help="in-flight writes in direct mode")
+    args = parser.parse_args()
+
+    events = simulate_events(args)
+    print(f"👥 {args.viewers} viewers over {args.duration}s simulated: {len(events)} events")
+
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client[f"{os.getenv('DB_NAME', 'record_db')}_ingestion_load_test"]
+    results = {}
+    try:
+        for mode in ("direct", "buffered"):
+            await client.drop_database(db.name)
+            await db.viewer_sessions.create_index([("session_id", 1), ("wedding_id", 1)])
+            before = await server_counters(client)
+            started = time.perf_counter()
+            if mode == "direct":
+                await run_direct(db, events, args.concurrency)
+            else:
+                stats = await run_buffered(db, events, args)
+            elapsed = time.perf_counter() - started
+            after = await server_counters(client)
+            ok, counts = await verify(db, events)
+            results[mode] = {key: after[key] - before[key] for key in after}
+            print(f"\n{'✅' if ok else '❌'} {mode}: {elapsed:.1f}s wall, {len(events) / elapsed:,.0f} events/s")
+            print(f"   round trips: {results[mode]['requests']:,}   document writes: {results[mode]['writes']:,}")
+            print(f"   sessions/ended/quality samples stored: {counts}")
+            if mode == "buffered":
+                print(f"   buffer stats: {stats}")
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+    direct, buffered = results["direct"], results["buffered"]
+    print(f"\n📉 Round trips: {direct['requests'] / max(buffered['requests'], 1):.0f}x fewer; "
+          f"document writes: {direct['writes'] / max(buffered['writes'], 1):.1f}x fewer")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
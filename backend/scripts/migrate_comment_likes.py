@@ -0,0 +1,49 @@
+"""
+Migrate comment likes from liked_by arrays to the comment_likes collection.
+
+Writes one comment_likes document per (comment, user) found in a legacy
+`liked_by` array, recounts the comment's likes_count from them and removes
+the array. Idempotent - safe to re-run (and to run while the app serves
+likes); comments not covered here are migrated lazily the next time
+someone likes or unlikes them.
+"""
+import asyncio
+import os
+import sys
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.database import init_db, close_db, ensure_indexes, get_db
+from app.services.comment_likes import migrate_comment_likes
+
+
+async def migrate_likes():
+    await init_db()
+    try:
+        # The unique (comment_id, user_id) index must exist before likes are copied
+        await ensure_indexes()
+        db = get_db()
+        query = {"liked_by": {"$exists": True}}
+
+        pending = await db.comments.count_documents(query)
+        print(f"👍 Comments pending likes migration: {pending}")
+
+        migrated = 0
+        likes = 0
+        async for comment in db.comments.find(query, {"_id": 0, "id": 1, "wedding_id": 1, "liked_by": 1}):
+            if await migrate_comment_likes(db, comment):
+                migrated += 1
+                likes += len(set(filter(None, comment["liked_by"])))
+
+        print(f"✅ Migrated {migrated} comment(s), {likes} like(s)")
+    finally:
+        await close_db()
+
+
+if __name__ == '__main__':
+    asyncio.run(migrate_likes())
@@ -0,0 +1,58 @@
+"""
+Migrate legacy theme_settings.cover_photos to layout_photos.
+
+Converts cover_photos into the placeholder-based layout_photos structure for
+every wedding that has not been migrated yet (no layout_photos_version) and
+stamps the schema version. Weddings that already have layout_photos keep
+them and are only stamped. Idempotent - safe to re-run; weddings not covered
+here are migrated lazily on their first layout photos read.
+"""
+import asyncio
+import os
+import sys
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.database import init_db, close_db, get_db
+from app.services.layout_photo_migration import (
+    LAYOUT_PHOTOS_PROJECTION,
+    LAYOUT_PHOTOS_VERSION,
+    migrate_wedding_layout_photos
+)
+
+
+async def migrate_cover_photos():
+    await init_db()
+    try:
+        db = get_db()
+        query = {"$or": [
+            {"layout_photos_version": {"$exists": False}},
+            {"layout_photos_version": {"$lt": LAYOUT_PHOTOS_VERSION}},
+        ]}
+
+        pending = await db.weddings.count_documents(query)
+        print(f"🖼️  Weddings pending layout photos migration: {pending}")
+
+        migrated = 0
+        converted = 0
+        async for wedding in db.weddings.find(query, LAYOUT_PHOTOS_PROJECTION):
+            had_photos = bool(wedding.get("layout_photos"))
+            layout_photos = await migrate_wedding_layout_photos(db, wedding)
+            migrated += 1
+            if layout_photos and not had_photos:
+                converted += 1
+                print(f"   ✅ {wedding['id']}: {list(layout_photos.keys())}")
+
+        print(f"✅ Stamped {migrated} wedding(s) with layout_photos_version={LAYOUT_PHOTOS_VERSION}")
+        print(f"✅ Converted cover_photos for {converted} wedding(s)")
+    finally:
+        await close_db()
+
+
+if __name__ == '__main__':
+    asyncio.run(migrate_cover_photos())
@@ -0,0 +1,38 @@
+"""
+Reconcile denormalized counters on weddings, users, albums and comments.
+
+Recomputes media/comment/chat/reaction/guest book/viewer-session counts,
+media bytes, user wedding/media counts, storage_used and comment reply/like
+counts from the source collections and rewrites only the documents that
+drifted. Safe to run repeatedly (e.g. from cron) and required once to backfill existing data.
+"""
+import asyncio
+import os
+import sys
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.database import init_db, close_db
+from app.services.counter_service import CounterService
+
+
+async def reconcile_counters():
+    await init_db()
+    try:
+        print("🔢 Reconciling counters...")
+        repaired = await CounterService.reconcile_all()
+        print(f"✅ Repaired weddings: {repaired['weddings']}")
+        print(f"✅ Repaired users: {repaired['users']}")
+        print(f"✅ Repaired albums: {repaired['albums']}")
+        print(f"✅ Repaired comments: {repaired['comments']}")
+    finally:
+        await close_db()
+
+
+if __name__ == '__main__':
+    asyncio.run(reconcile_counters())
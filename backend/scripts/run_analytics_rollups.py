@@ -0,0 +1,38 @@
+"""
+Run the analytics rollup job until it has caught up.
+
+Rolls up every closed minute since the minute high-water mark (or since
+the first viewer session on a fresh database) and every closed hour into
+the analytics_rollups time-series collection. The server runs the same job
+every ROLLUP_INTERVAL_SECONDS in bounded steps; use this script for the
+initial backfill or after a long outage. Safe to run repeatedly.
+"""
+import asyncio
+import os
+import sys
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.database import init_db, close_db
+from app.services.rollup_service import analytics_rollups
+
+
+async def run_rollups():
+    await init_db()
+    try:
+        await analytics_rollups.ensure_collection()
+        print("📊 Rolling up analytics...")
+        written = await analytics_rollups.run_once(max_chunks=None)
+        print(f"✅ Minute points written: {written['minute_points']}")
+        print(f"✅ Hour points written: {written['hour_points']}")
+    finally:
+        await close_db()
+
+
+if __name__ == '__main__':
+    asyncio.run(run_rollups())
@@ -0,0 +1,52 @@
+"""
+Run the Socket.IO pub/sub broker for multi-worker deployments without Redis.
+
+Start the broker, then point every worker at it:
+
+    python scripts/socketio_broker.py --unix /tmp/wedlive-socketio.sock
+    SOCKETIO_MESSAGE_QUEUE=unix:///tmp/wedlive-socketio.sock uvicorn server:app --workers 4
+
+The broker speaks the Redis pub/sub protocol subset, so TCP mode also
+works with redis:// URLs (--port 6390 -> redis://127.0.0.1:6390), which the
+workers then reach through AsyncRedisManager.
+
+Usage: python scripts/socketio_broker.py [--unix PATH | --host 127.0.0.1 --port 6390]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.services.socket_manager import PubSubBroker
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--unix", help="Unix socket path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    broker = PubSubBroker()
+    await broker.start(path=args.unix, host=args.host, port=args.port)
+    print(f"📡 Socket.IO broker listening - set SOCKETIO_MESSAGE_QUEUE={broker.url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await broker.stop()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
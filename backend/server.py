@@ -30,10 +30,18 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Import WedLive routes
-from app.database import init_db, close_db, get_db
+from app.database import init_db, close_db, get_db, ensure_indexes
 from app.routes import auth, weddings, streams, subscriptions, admin, media, chat, analytics, features, premium, phase10, plan_management, storage_management, viewer_access, plan_info, recording, folders, quality, profile, security, settings, comments, theme_assets, templates, rtmp_webhooks, themes, live_controls, media_proxy, borders, sections, studios, precious_moments, youtube, layout_photos, layout_backgrounds, admin_cleanup, video_templates, admin_music, creator_music, wedding_music
 from app.routes import albums
 from app.services.socket_service import sio
+from app.services.live_registry import live_registry
+from app.services.rollup_service import analytics_rollups
+from app.services.ingestion_buffer import analytics_ingest
+from app.services.reaction_aggregator import reaction_aggregator
+from app.services.chat_buffer import chat_buffer
+from app.services.wedding_events import wedding_events
+from app.services.pulse_service import close_http_session
+from app.utils.compression import CompressionMiddleware
 
 # Lifespan event handler for startup/shutdown
 @asynccontextmanager
@@ -41,8 +49,22 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_db()
     print("✅ Database connected")
+    await ensure_indexes()
+    await live_registry.start(get_db())
+    wedding_events.start()
+    await analytics_rollups.start(get_db())
+    await analytics_ingest.start(get_db())
+    await reaction_aggregator.start(get_db())
+    await chat_buffer.start(get_db())
     yield
     # Shutdown
+    await wedding_events.stop()
+    await chat_buffer.stop()
+    await reaction_aggregator.stop()
+    await analytics_ingest.stop()
+    await analytics_rollups.stop()
+    await live_registry.stop()
+    await close_http_session()
     await close_db()
     print("👋 Database disconnected")
 
@@ -86,6 +108,10 @@ fastapi_app.add_middleware(
     max_age=3600,
 )
 
+# Response compression (gzip/brotli) for JSON and HLS playlists.
+# Added after CORS so it wraps it and sees the final headers.
+fastapi_app.add_middleware(CompressionMiddleware)
+
 # Global exception handler to ensure CORS headers on errors
 @fastapi_app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test Suite for Admin Dashboard Statistics
+Checks the per-collection aggregations against the sequential
+count_documents queries they replaced, and the snapshot cache.
+
+The comparison needs a MongoDB server (MONGODB_URI) and is skipped when
+none is reachable.
+"""
+import asyncio
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.admin_stats_service import AdminStatsService, counts_per_window, window_edges
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+
+
+class CountingCursor:
+    def __init__(self, result):
+        self.result = result
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(0.01)
+        return self.result
+
+
+class CountingCollection:
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def estimated_document_count(self):
+        self.calls.append("estimated_document_count")
+        return 0
+
+    def aggregate(self, pipeline):
+        self.calls.append("aggregate")
+        return CountingCursor([])
+
+
+class CountingDatabase:
+    def __init__(self):
+        self.calls = []
+        self.users = self.weddings = self.subscriptions = CountingCollection(self.calls)
+
+
+class TestAdminStats:
+    """Admin stats aggregations and cache"""
+
+    def test_window_edges(self):
+        now = datetime(2025, 6, 30)
+        edges = window_edges(now)
+        assert len(edges) == 7 and edges[-1] == now
+        assert edges[0] == now - timedelta(days=180)
+        buckets = [{"_id": edges[1], "count": 4}, {"_id": edges[5], "count": 2}]
+        assert counts_per_window(buckets, edges) == [0, 4, 0, 0, 0, 2]
+
+    def test_snapshot_cached_and_single_flight(self):
+        """Concurrent requests share one recomputation; later ones hit the cache"""
+        print("\n🧪 Testing admin stats cache...")
+
+        async def run():
+            db = CountingDatabase()
+            service = AdminStatsService(cache_seconds=60)
+            await asyncio.gather(*(service.snapshot(db) for _ in range(20)))
+            first = len(db.calls)
+            await service.snapshot(db)
+            cached = len(db.calls)
+            service.invalidate()
+            await service.snapshot(db)
+            return first, cached, len(db.calls)
+
+        first, cached, after_invalidate = asyncio.run(run())
+        # 2 metadata counts + 3 aggregations per recomputation
+        assert first == 5
+        assert cached == 5
+        assert after_invalidate == 10
+        print("✅ 20 concurrent requests ran the 5 queries once")
+
+    def test_matches_sequential_counts(self):
+        """The aggregations agree with the count_documents chain they replaced"""
+        motor = pytest.importorskip("motor.motor_asyncio")
+        print("\n🧪 Testing admin stats against count_documents...")
+
+        async def run():
+            client = motor.AsyncIOMotorClient(MONGODB_URI, serverSelectionTimeoutMS=2000)
+            try:
+                await client.server_info()
+            except Exception:
+                client.close()
+                return None
+            db = client[f"wedlive_admin_stats_test_{uuid.uuid4().hex[:8]}"]
+            try:
+                rng = random.Random(3)
+                now = datetime(2025, 6, 30)
+                await db.users.insert_many([
+                    {"id": str(i), "created_at": now - timedelta(days=rng.uniform(0, 240))} for i in range(1000)
+                ])
+                await db.weddings.insert_many([
+                    {"id": str(i), "status": rng.choice(["scheduled", "live", "ended", "recorded"])} for i in range(500)
+                ])
+                await db.subscriptions.insert_many([
+                    {
+                        "plan": rng.choice(["monthly", "yearly"]),
+                        "status": rng.choice(["active", "cancelled"]),
+                        "created_at": now - timedelta(days=rng.uniform(0, 240)),
+                    }
+                    for _ in range(600)
+                ])
+                stats = await AdminStatsService.compute(db, now)
+
+                legacy_users, legacy_subscriptions = [], []
+                for i in range(6):
+                    window = {"created_at": {"$gte": now - timedelta(days=30 * (i + 1)), "$lt": now - timedelta(days=30 * i)}}
+                    legacy_users.append(await db.users.count_documents(window))
+                    legacy_subscriptions.append(await db.subscriptions.count_documents(window))
+                legacy = {
+                    "users_per_window": legacy_users[::-1],
+                    "subscriptions_per_window": legacy_subscriptions[::-1],
+                    "live": await db.weddings.count_documents({"status": "live"}),
+                    "monthly": await db.subscriptions.count_documents({"plan": "monthly", "status": "active"}),
+                    "active": await db.subscriptions.count_documents({"status": "active"}),
+                }
+                return stats, legacy
+            finally:
+                await client.drop_database(db.name)
+                client.close()
+
+        result = asyncio.run(run())
+        if result is None:
+            pytest.skip(f"MongoDB not reachable at {MONGODB_URI}")
+        stats, legacy = result
+        assert stats["users_per_window"] == legacy["users_per_window"]
+        assert stats["subscriptions_per_window"] == legacy["subscriptions_per_window"]
+        assert stats["weddings_by_status"]["live"] == legacy["live"]
+        assert stats["active_subscriptions_by_plan"]["monthly"] == legacy["monthly"]
+        assert stats["active_subscriptions"] == legacy["active"]
+        assert stats["total_users"] == 1000 and stats["total_weddings"] == 500
+        print("✅ Aggregations match the sequential counts")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
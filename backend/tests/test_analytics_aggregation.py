@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Test Suite for Analytics Aggregation
+Verifies the $facet session pipeline against the previous in-Python
+implementation of the engagement/dashboard endpoints on fixture data, the
+concurrent-viewer sweep against a brute-force overlap count, the
+incremental rollups against a one-shot raw computation, and the stream
+quality rollups against raw samples.
+
+The pipeline tests need a MongoDB 5.0+ server (MONGODB_URI) and are
+skipped when none is reachable.
+"""
+import math
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.quality_rollup_service import (
+    empty_quality_point,
+    lttb,
+    merge_quality_points,
+    percentile,
+    pick_quality_resolution,
+)
+from app.services.rollup_service import AnalyticsRollupService, classify_device, merge_points
+from app.services.analytics_service import (
+    ConcurrencySweep,
+    concurrency_events_pipeline,
+    pick_concurrency_resolution,
+    session_summary_pipeline,
+    summarize_session_facets,
+)
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+WEDDING_ID = "analytics-fixture-wedding"
+
+
+def make_sessions(count, seed=42):
+    """Deterministic fixture sessions spread over a 6 hour stream"""
+    rng = random.Random(seed)
+    start = datetime(2025, 6, 14, 15, 0, 0)
+    timezones = ["Asia/Kolkata", "America/New_York", "Europe/London", None, "UTC"]
+    sessions = []
+    for _ in range(count):
+        join_time = start + timedelta(seconds=rng.randint(0, 6 * 3600), microseconds=rng.randint(0, 999999))
+        session = {
+            "id": str(uuid.uuid4()),
+            "wedding_id": WEDDING_ID,
+            "session_id": str(uuid.uuid4()),
+            "join_time": join_time,
+            "leave_time": None,
+            "duration_seconds": 0,
+        }
+        if rng.random() < 0.8:
+            duration = rng.randint(0, 3 * 3600)
+            session["leave_time"] = join_time + timedelta(seconds=duration)
+            session["duration_seconds"] = duration
+        timezone = rng.choice(timezones)
+        if timezone is not None:
+            session["timezone"] = timezone
+        sessions.append(session)
+    return sessions
+
+
+def legacy_summary(sessions):
+    """The engagement/dashboard computations as they were done in Python"""
+    timezone_distribution = {}
+    for session in sessions:
+        tz = session.get("timezone", "Unknown")
+        timezone_distribution[tz] = timezone_distribution.get(tz, 0) + 1
+
+    durations = [s["duration_seconds"] for s in sessions if s.get("duration_seconds", 0) > 0]
+    active_sessions = [s for s in sessions if s.get("leave_time") is None]
+    completed_sessions = [s for s in sessions if s.get("leave_time") is not None]
+
+    return {
+        "total_viewers": len(sessions),
+        "active_viewers": len(active_sessions),
+        "completed_sessions": len(completed_sessions),
+        "avg_duration": sum(s.get("duration_seconds", 0) for s in completed_sessions) / len(completed_sessions) if completed_sessions else 0,
+        "average_watch_time_seconds": sum(durations) / len(durations) if durations else 0,
+        "timezone_distribution": timezone_distribution,
+    }
+
+
+def events_of(sessions):
+    """Python equivalent of concurrency_events_pipeline"""
+    events = []
+    for s in sessions:
+        events.append((s["join_time"], 1))
+        if s.get("leave_time") is not None:
+            events.append((max(s["leave_time"], s["join_time"]), -1))
+    return sorted(events)
+
+
+def concurrent_at(sessions, t):
+    """Brute force: sessions watching at instant t (leave is exclusive)"""
+    return sum(
+        1 for s in sessions
+        if s["join_time"] <= t and (s.get("leave_time") is None or s["leave_time"] > t)
+    )
+
+
+@pytest.fixture(scope="module")
+def sessions_collection():
+    pymongo = pytest.importorskip("pymongo")
+    client = pymongo.MongoClient(MONGODB_URI, serverSelectionTimeoutMS=2000)
+    try:
+        version = client.server_info()["versionArray"]
+    except Exception:
+        pytest.skip(f"MongoDB not reachable at {MONGODB_URI}")
+    if version[0] < 5:
+        pytest.skip("$dateTrunc requires MongoDB 5.0+")
+
+    db_name = f"wedlive_analytics_test_{uuid.uuid4().hex[:8]}"
+    yield client[db_name].viewer_sessions
+    client.drop_database(db_name)
+    client.close()
+
+
+class TestSessionSummaryPipeline:
+    """Aggregation pipeline vs. the previous in-Python implementation"""
+
+    def _compare(self, collection, sessions):
+        collection.delete_many({})
+        if sessions:
+            collection.insert_many([dict(s) for s in sessions])
+
+        result = list(collection.aggregate(session_summary_pipeline(WEDDING_ID)))
+        summary = summarize_session_facets(result[0] if result else {})
+        expected = legacy_summary(sessions)
+
+        for key in ("total_viewers", "active_viewers", "completed_sessions"):
+            assert summary[key] == expected[key], key
+        assert summary["avg_duration"] == pytest.approx(expected["avg_duration"])
+        assert summary["average_watch_time_seconds"] == pytest.approx(expected["average_watch_time_seconds"])
+        # Sessions stored without a timezone are reported as "Unknown"
+        assert summary["timezone_distribution"] == expected["timezone_distribution"]
+        return summary
+
+    def test_matches_legacy_on_fixture(self, sessions_collection):
+        summary = self._compare(sessions_collection, make_sessions(2000))
+        assert len(summary["recent_sessions"]) == 100
+        print(f"✅ Test Passed: pipeline matches legacy summary ({summary['total_viewers']} sessions)")
+
+    def test_no_truncation_above_10k(self, sessions_collection):
+        summary = self._compare(sessions_collection, make_sessions(12000, seed=7))
+        assert summary["total_viewers"] == 12000
+        print("✅ Test Passed: 12,000 sessions aggregated without truncation")
+
+    def test_concurrency_events_sweep(self, sessions_collection):
+        sessions = make_sessions(3000, seed=11)
+        sessions_collection.delete_many({})
+        sessions_collection.insert_many([dict(s) for s in sessions])
+
+        sweep = ConcurrencySweep()
+        for event in sessions_collection.aggregate(concurrency_events_pipeline(WEDDING_ID)):
+            sweep.add(event["t"], event["d"])
+        result = sweep.finish()
+
+        # Mongo stores milliseconds - compare against the stored precision
+        stored = list(sessions_collection.find({}, {"_id": 0, "join_time": 1, "leave_time": 1}))
+        expected_peak = max(concurrent_at(stored, s["join_time"]) for s in stored)
+        assert result["peak_concurrent_viewers"] == expected_peak
+        assert result["current_viewers"] == sum(1 for s in stored if s.get("leave_time") is None)
+        print(f"✅ Test Passed: exact peak {expected_peak} from aggregation event stream")
+
+    def test_empty_wedding(self, sessions_collection):
+        summary = self._compare(sessions_collection, [])
+        assert summary["first_join"] is None
+        print("✅ Test Passed: empty wedding summary")
+
+
+class TestSummarizeSessionFacets:
+    """Flattening of $facet output (no database needed)"""
+
+    def test_empty_facets(self):
+        summary = summarize_session_facets({})
+        assert summary["total_viewers"] == 0
+        assert summary["avg_duration"] == 0
+        assert summary["first_join"] is None
+        print("✅ Test Passed: empty facets")
+
+    def test_flatten(self):
+        summary = summarize_session_facets({
+            "totals": [{"_id": None, "total": 10, "active": 4, "completed_duration": 600,
+                        "watched_sessions": 5, "watched_duration": 750}],
+            "timezones": [{"_id": "UTC", "count": 6}, {"_id": "Unknown", "count": 4}],
+        })
+        assert summary["completed_sessions"] == 6
+        assert summary["avg_duration"] == 100
+        assert summary["average_watch_time_seconds"] == 150
+        assert summary["timezone_distribution"] == {"UTC": 6, "Unknown": 4}
+        assert summary["recent_sessions"] == []
+        print("✅ Test Passed: facet flattening")
+
+
+class TestConcurrencySweep:
+    """Sweep-line concurrency vs. brute-force overlap counting (no database needed)"""
+
+    def test_peak_matches_brute_force(self):
+        sessions = make_sessions(1500, seed=3)
+        sweep = ConcurrencySweep()
+        for t, d in events_of(sessions):
+            sweep.add(t, d)
+        result = sweep.finish()
+
+        expected_peak = max(concurrent_at(sessions, s["join_time"]) for s in sessions)
+        assert result["peak_concurrent_viewers"] == expected_peak
+        assert concurrent_at(sessions, result["peak_time"]) == expected_peak
+        print(f"✅ Test Passed: sweep peak {expected_peak} matches brute force")
+
+    def test_back_to_back_sessions_do_not_overlap(self):
+        t0 = datetime(2025, 6, 14, 15, 0)
+        sessions = [
+            {"join_time": t0, "leave_time": t0 + timedelta(minutes=10)},
+            {"join_time": t0 + timedelta(minutes=10), "leave_time": t0 + timedelta(minutes=20)},
+        ]
+        sweep = ConcurrencySweep()
+        for t, d in events_of(sessions):
+            sweep.add(t, d)
+        assert sweep.finish()["peak_concurrent_viewers"] == 1
+        print("✅ Test Passed: leave and join at the same instant count once")
+
+    def test_timeline_buckets(self):
+        sessions = make_sessions(800, seed=5)
+        start = min(s["join_time"] for s in sessions).replace(second=0, microsecond=0)
+        end = max(max(s["join_time"], s.get("leave_time") or s["join_time"]) for s in sessions)
+        sweep = ConcurrencySweep(start, 60)
+        for t, d in events_of(sessions):
+            sweep.add(t, d)
+        result = sweep.finish(end)
+
+        timeline = result["timeline"]
+        assert timeline[0]["time"] == start
+        assert timeline[-1]["time"] <= end < timeline[-1]["time"] + timedelta(seconds=60)
+        assert max(point["viewers"] for point in timeline) == result["peak_concurrent_viewers"]
+        for point in timeline[::37]:
+            bucket_end = point["time"] + timedelta(seconds=60)
+            closing = sum(
+                1 for s in sessions
+                if s["join_time"] < bucket_end and (s.get("leave_time") is None or max(s["leave_time"], s["join_time"]) >= bucket_end)
+            )
+            assert point["closing"] == closing
+            assert point["viewers"] >= max(point["closing"], concurrent_at(sessions, point["time"]))
+        # Viewer-seconds in the timeline equal the total overlap of sessions with [start, end]
+        expected_seconds = sum(
+            (min(s.get("leave_time") or end, end) - s["join_time"] for s in sessions),
+            timedelta()
+        ).total_seconds()
+        assert sum(point["watch_seconds"] for point in timeline) == pytest.approx(expected_seconds, abs=1)
+        print(f"✅ Test Passed: {len(timeline)} timeline buckets consistent with brute force")
+
+    def test_resolution_is_widened_for_long_streams(self):
+        assert pick_concurrency_resolution(timedelta(hours=2)) == 60
+        assert pick_concurrency_resolution(timedelta(hours=2), 10) == 10
+        assert pick_concurrency_resolution(timedelta(days=3)) == 300
+        print("✅ Test Passed: resolution selection")
+
+
+class TestAnalyticsRollups:
+    """Rollup helpers, and incremental rollups vs. raw computation"""
+
+    def test_classify_device(self):
+        assert classify_device("Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) Mobile/15E148") == "mobile"
+        assert classify_device("Mozilla/5.0 (Linux; Android 14; Pixel 8) Mobile Safari/537.36") == "mobile"
+        assert classify_device("Mozilla/5.0 (Linux; Android 13; SM-X700) Safari/537.36") == "tablet"
+        assert classify_device("Mozilla/5.0 (iPad; CPU OS 17_0 like Mac OS X)") == "tablet"
+        assert classify_device("Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0") == "desktop"
+        assert classify_device(None) == "unknown"
+        print("✅ Test Passed: device classification")
+
+    def test_merge_points(self):
+        t0 = datetime(2025, 6, 14, 15, 0)
+        points = [
+            {"bucket": t0 + timedelta(minutes=m), "viewers": m % 7, "joins": 1, "leaves": 0,
+             "watch_seconds": 30.0, "devices": {"mobile": 1}, "reactions": 2, "chat_messages": 1}
+            for m in range(90)
+        ]
+        hours = merge_points(points, 3600)
+        assert [h["bucket"] for h in hours] == [t0, t0 + timedelta(hours=1)]
+        assert hours[0]["joins"] == 60 and hours[1]["joins"] == 30
+        assert hours[0]["viewers"] == 6
+        assert hours[0]["devices"]["mobile"] == 60 and hours[0]["devices"]["desktop"] == 0
+        assert hours[1]["watch_seconds"] == 900.0
+        print("✅ Test Passed: merging minute points into hours")
+
+    def test_incremental_rollups_match_raw(self):
+        pytest.importorskip("motor")
+        import asyncio
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from pymongo.errors import PyMongoError
+
+        async def run():
+            client = AsyncIOMotorClient(MONGODB_URI, serverSelectionTimeoutMS=2000)
+            try:
+                info = await client.server_info()
+            except PyMongoError:
+                pytest.skip(f"MongoDB not reachable at {MONGODB_URI}")
+            if info["versionArray"][0] < 5:
+                pytest.skip("$dateTrunc requires MongoDB 5.0+")
+
+            db_name = f"wedlive_rollup_test_{uuid.uuid4().hex[:8]}"
+            db = client[db_name]
+            try:
+                sessions = make_sessions(1500, seed=19)
+                await db.viewer_sessions.insert_many([dict(s) for s in sessions])
+                await db.reactions.insert_many([
+                    {"wedding_id": WEDDING_ID, "created_at": s["join_time"] + timedelta(seconds=5)}
+                    for s in sessions[::3]
+                ])
+
+                service = AnalyticsRollupService()
+                service._db = db
+                await service.ensure_collection()
+
+                # Roll up the first half of the stream only; the rest stays open
+                now = datetime(2025, 6, 14, 21, 30)
+                await service.run_once(now=datetime(2025, 6, 14, 18, 0), max_chunks=None)
+                series = await service.get_series(WEDDING_ID, "minute", start=datetime(2025, 6, 14, 14, 0), now=now)
+                raw = (await service.compute_minute_points(datetime(2025, 6, 14, 14, 0), now, WEDDING_ID))[WEDDING_ID]
+
+                assert [p["bucket"] for p in series] == [p["bucket"] for p in raw]
+                for stored, expected in zip(series, raw):
+                    for field in ("viewers", "joins", "leaves", "reactions", "chat_messages", "devices"):
+                        assert stored[field] == expected[field], (stored["bucket"], field)
+                    assert stored["watch_seconds"] == pytest.approx(expected["watch_seconds"], abs=0.01)
+                assert sum(p["joins"] for p in series) == len(sessions)
+
+                # A second run picks up where the first stopped and writes hours
+                written = await service.run_once(now=now, max_chunks=None)
+                assert written["hour_points"] > 0
+                hours = await service.get_series(WEDDING_ID, "hour", start=datetime(2025, 6, 14, 14, 0), now=now)
+                assert max(h["viewers"] for h in hours) == max(p["viewers"] for p in raw)
+                assert sum(h["joins"] for h in hours) == len(sessions)
+            finally:
+                await client.drop_database(db_name)
+                client.close()
+
+        asyncio.run(run())
+        print("✅ Test Passed: incremental rollups match raw computation")
+
+
+def make_quality_samples(count, seed=23):
+    """Quality samples from two weddings over a 3 hour stream"""
+    rng = random.Random(seed)
+    start = datetime(2025, 6, 14, 15, 0, 0)
+    return [{
+        "id": str(uuid.uuid4()),
+        "wedding_id": rng.choice([WEDDING_ID, "other-wedding"]),
+        "bitrate": rng.randint(500, 5000),
+        "fps": rng.choice([24, 30, 60]),
+        "dropped_frames": rng.randint(0, 10),
+        "buffering_events": rng.randint(0, 2),
+        "buffering_duration_ms": rng.randint(0, 500),
+        "resolution": rng.choice(["720p", "1080p"]),
+        "timestamp": start + timedelta(seconds=rng.uniform(0, 3 * 3600)),
+    } for _ in range(count)]
+
+
+class TestQualityRollups:
+    """Quality downsampling helpers, LTTB, and rollups vs. raw samples"""
+
+    def test_merge_quality_points(self):
+        t0 = datetime(2025, 6, 14, 15, 0)
+        points = []
+        for m in range(120):
+            point = empty_quality_point(t0 + timedelta(minutes=m))
+            point["samples"] = 1 + m % 3
+            point["bitrate"] = {"min": 100 + m, "avg": 1000.0 + m, "max": 2000 + m, "p95": 1900.0}
+            point["buffering_events"] = 2
+            point["resolutions"] = {"720p": point["samples"]}
+            points.append(point)
+        hours = merge_quality_points(points, 3600)
+        assert [h["bucket"] for h in hours] == [t0, t0 + timedelta(hours=1)]
+        first = hours[0]
+        assert first["samples"] == sum(p["samples"] for p in points[:60])
+        assert first["bitrate"]["min"] == 100 and first["bitrate"]["max"] == 2059
+        expected_avg = sum(p["bitrate"]["avg"] * p["samples"] for p in points[:60]) / first["samples"]
+        assert first["bitrate"]["avg"] == pytest.approx(expected_avg)
+        assert first["bitrate"]["p95"] == pytest.approx(1900.0)
+        assert first["fps"]["avg"] is None
+        assert first["buffering_events"] == 120 and first["resolutions"] == {"720p": first["samples"]}
+        assert percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 0.95) == 10
+        assert percentile(list(range(1, 101)), 0.95) == 95
+        print("✅ Test Passed: merging quality points")
+
+    def test_lttb_keeps_shape(self):
+        t0 = datetime(2025, 6, 14, 15, 0)
+        points = [{"t": t0 + timedelta(seconds=i), "v": math.sin(i / 50)} for i in range(5000)]
+        points[2500]["v"] = 25  # a spike must survive downsampling
+        sampled = lttb(points, 200, "t", lambda p: p["v"])
+        assert len(sampled) == 200
+        assert sampled[0] is points[0] and sampled[-1] is points[-1]
+        assert [p["t"] for p in sampled] == sorted(p["t"] for p in sampled)
+        assert any(p["v"] == 25 for p in sampled)
+        assert lttb(points[:50], 200, "t", lambda p: p["v"]) == points[:50]
+        print("✅ Test Passed: LTTB keeps endpoints, order and peaks")
+
+    def test_pick_quality_resolution(self):
+        now = datetime(2025, 6, 14, 18, 0)
+        assert pick_quality_resolution(now - timedelta(hours=1), now, 500, now) == "raw"
+        assert pick_quality_resolution(now - timedelta(hours=12), now, 500, now) == "minute"
+        assert pick_quality_resolution(now - timedelta(days=60), now, 500, now) == "hour"
+        # Raw samples older than the retention window are gone
+        old = now - timedelta(days=365)
+        assert pick_quality_resolution(old, old + timedelta(hours=1), 500, now) == "minute"
+
+    def test_quality_rollups_match_raw(self):
+        pytest.importorskip("motor")
+        import asyncio
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from pymongo.errors import PyMongoError
+
+        async def run():
+            client = AsyncIOMotorClient(MONGODB_URI, serverSelectionTimeoutMS=2000)
+            try:
+                info = await client.server_info()
+            except PyMongoError:
+                pytest.skip(f"MongoDB not reachable at {MONGODB_URI}")
+            if info["versionArray"][0] < 5:
+                pytest.skip("$dateTrunc requires MongoDB 5.0+")
+
+            db_name = f"wedlive_quality_rollup_test_{uuid.uuid4().hex[:8]}"
+            db = client[db_name]
+            try:
+                samples = make_quality_samples(6000)
+                await db.stream_quality_metrics.insert_many([dict(s) for s in samples])
+                service = AnalyticsRollupService()
+                service._db = db
+                await service.ensure_collection()
+
+                now = datetime(2025, 6, 14, 18, 40)
+                written = await service.run_once(now=now, max_chunks=None)
+                assert written["quality_hour_points"] == 6
+
+                ours = [s for s in samples if s["wedding_id"] == WEDDING_ID]
+                minutes = (await service.quality.read_rollups(WEDDING_ID, "minute", datetime(2025, 6, 14), now))[WEDDING_ID]
+                for point in minutes[::17]:
+                    values = sorted(
+                        s["bitrate"] for s in ours
+                        if point["bucket"] <= s["timestamp"] < point["bucket"] + timedelta(minutes=1)
+                    )
+                    assert point["samples"] == len(values)
+                    assert point["bitrate"]["min"] == values[0] and point["bitrate"]["max"] == values[-1]
+                    assert point["bitrate"]["p95"] == percentile(values, 0.95)
+
+                summary = await service.quality.get_summary(WEDDING_ID, now=now)
+                assert summary["samples"] == len(ours)
+                assert summary["avg_bitrate"] == pytest.approx(sum(s["bitrate"] for s in ours) / len(ours))
+                assert summary["total_buffering_events"] == sum(s["buffering_events"] for s in ours)
+                assert summary["resolutions"] == ["1080p", "720p"]
+            finally:
+                await client.drop_database(db_name)
+                client.close()
+
+        asyncio.run(run())
+        print("✅ Test Passed: quality rollups match raw samples")
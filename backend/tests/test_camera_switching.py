@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Test Suite for Multi-Camera Switching
+Checks that a composition has every live camera as an input behind one
+streamselect/astreamselect pair, that switching between its inputs is a
+command to the running FFmpeg process rather than a restart, that a camera
+the composition does not have (or a dead process) falls back to a restart
+with the live cameras, that a single camera is copied rather than encoded,
+that a camera without audio gets silence, that a camera whose playlist
+cannot be read never replaces the running composition, and - with ffmpeg
+on PATH - that a live switch between lavfi test cameras shows up in the
+next segments of the same playlist.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+import pytest
+
+from app.services import ffmpeg_composition
+from app.services.ffmpeg_composition import FFmpegCompositionService
+
+
+def camera(camera_id):
+    return {"camera_id": camera_id, "name": camera_id, "stream_key": f"key_{camera_id}"}
+
+
+def url(camera_id):
+    return f"http://localhost:8080/hls/key_{camera_id}.m3u8"
+
+
+class FakeStdin:
+    def __init__(self, broken=False):
+        self.written = b""
+        self.broken = broken
+
+    def write(self, data):
+        if self.broken:
+            raise BrokenPipeError()
+        self.written += data
+
+    async def drain(self):
+        pass
+
+
+class FakeProcess:
+    """Stands in for a running FFmpeg: takes commands on stdin until terminated"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
+        self.stdin = FakeStdin()
+        self.stderr = self._stderr()
+        self._exited = asyncio.Event()
+
+    async def _stderr(self):
+        return
+        yield
+
+    def terminate(self):
+        self.returncode = 255
+        self._exited.set()
+
+    kill = terminate
+
+    async def wait(self):
+        await self._exited.wait()
+        return self.returncode
+
+
+class FakeProbe:
+    """Stands in for ffprobe: prints the codec types of a stream, or fails"""
+
+    def __init__(self, output):
+        self.output = output
+        self.returncode = None
+
+    async def communicate(self):
+        self.returncode = 0 if self.output else 1
+        return self.output or b"", b""
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    """
+    A composition service whose FFmpeg processes are FakeProcesses; every
+    stream has video and audio unless `streams` says otherwise (None: unreadable)
+    """
+    spawned = []
+    streams = {}
+
+    async def create_subprocess_exec(*cmd, **kwargs):
+        if cmd[0] == "ffprobe":
+            return FakeProbe(streams.get(cmd[-1], b"video\naudio\n"))
+        spawned.append((list(cmd), FakeProcess(1000 + len(spawned))))
+        return spawned[-1][1]
+
+    monkeypatch.setattr(ffmpeg_composition.asyncio, "create_subprocess_exec", create_subprocess_exec)
+    composition = FFmpegCompositionService(output_dir=str(tmp_path))
+    composition.input_wait = 0
+    composition.spawned = spawned
+    composition.streams = streams
+    return composition
+
+
+class TestCameraSwitching:
+    """Persistent multi-input composition with live camera switches"""
+
+    def test_every_camera_is_an_input_behind_the_selectors(self, tmp_path):
+        composition = FFmpegCompositionService(output_dir=str(tmp_path))
+        cmd = composition._build_command([camera("a"), camera("b"), {"camera_id": "c", "hls_url": "/hls/c.m3u8"}],
+                                         str(tmp_path))
+
+        inputs = [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-i"]
+        assert inputs == ["http://localhost:8080/hls/key_a.m3u8", "http://localhost:8080/hls/key_b.m3u8",
+                          "http://localhost:8080/hls/c.m3u8"]
+        graph = cmd[cmd.index("-filter_complex") + 1]
+        assert "[v0][v1][v2]streamselect@camera=inputs=3:map=0[v]" in graph
+        assert "[a0][a1][a2]astreamselect@camera=inputs=3:map=0[a]" in graph
+        # Encoded once, a keyframe opening every segment
+        assert "copy" not in cmd
+        assert cmd[cmd.index("-force_key_frames") + 1] == "expr:gte(t,n_forced*1)"
+
+        # A camera without audio gets silence
+        silent = composition._build_command([camera("a"), camera("b")], str(tmp_path), [True, False])
+        graph = silent[silent.index("-filter_complex") + 1]
+        assert "[0:a:0]" in graph and "[1:a:0]" not in graph
+        assert "anullsrc=channel_layout=stereo:sample_rate=48000,aformat=sample_fmts=fltp[a1]" in graph
+
+        # A single camera needs no selectors and no encode
+        single = composition._build_command([camera("a")], str(tmp_path))
+        assert "-filter_complex" not in single
+        assert single[single.index("-c:v") + 1] == single[single.index("-c:a") + 1] == "copy"
+        assert [single[i + 1] for i, arg in enumerate(single) if arg == "-map"] == ["0:v:0", "0:a:0?"]
+
+    def test_switch_is_a_command_not_a_restart(self, service):
+        print("\n🧪 Testing 5 switches between 3 cameras...")
+        cameras = [camera("a"), camera("b"), camera("c")]
+
+        async def run():
+            started = await service.start_composition("w1", cameras[0], cameras)
+            results = [await service.switch_camera("w1", cameras[i]) for i in (2, 1, 0, 2, 1)]
+            health = await service.check_health("w1")
+            await service.stop_composition("w1")
+            return started, results, health
+
+        started, results, health = asyncio.run(run())
+        assert started["success"] and len(service.spawned) == 1
+        assert all(r["success"] and not r["restarted"] and r["pid"] == started["pid"] for r in results)
+        process = service.spawned[0][1]
+        commands = process.stdin.written.decode().splitlines()
+        assert commands[:2] == ["cstreamselect@camera -1 map 2", "castreamselect@camera -1 map 2"]
+        assert [c.rsplit(" ", 1)[1] for c in commands[::2]] == ["2", "1", "0", "2", "1"]
+        assert health["camera_id"] == "b" and health["switch_count"] == 5
+        assert health["input_camera_ids"] == ["a", "b", "c"]
+        print(f"✅ 5 switches, {len(service.spawned)} FFmpeg process")
+
+    def test_camera_outside_the_composition_restarts_it(self, service):
+        a, b, c = camera("a"), camera("b"), camera("c")
+
+        async def run():
+            await service.start_composition("w1", a, [a, b])
+            # Connected after the composition started
+            joined = await service.switch_camera("w1", c, [a, b, c])
+            # The process is gone: the stdin command fails
+            service.spawned[-1][1].stdin.broken = True
+            broken = await service.switch_camera("w1", a)
+            await service.stop_composition("w1")
+            return joined, broken
+
+        joined, broken = asyncio.run(run())
+        assert joined["restarted"] and broken["restarted"] and len(service.spawned) == 3
+        assert service.spawned[0][1].returncode is not None and service.spawned[1][1].returncode is not None
+        # Restarted with the new camera on air (input 0) and the others kept as inputs
+        second, third = service.spawned[1][0], service.spawned[2][0]
+        assert [second[i + 1] for i, arg in enumerate(second) if arg == "-i"][0].endswith("key_c.m3u8")
+        assert sum(arg == "-i" for arg in second) == 3 and sum(arg == "-i" for arg in third) == 3
+        assert service.process_health["w1"]["input_camera_ids"] == ["a", "c", "b"]
+
+    def test_unreadable_camera_keeps_the_composition(self, service):
+        a, b, c = camera("a"), camera("b"), camera("c")
+        # b has no audio track, c never gets a playlist
+        service.streams.update({url("b"): b"video\n", url("c"): None})
+
+        async def run():
+            started = await service.start_composition("w1", a, [a, b, c])
+            added = await service.add_input("w1", a, c, [a, b, c])
+            switched = await service.switch_camera("w1", c, [a, b, c])
+            health = await service.check_health("w1")
+            await service.stop_composition("w1")
+            return started, added, switched, health
+
+        started, added, switched, health = asyncio.run(run())
+        assert started["success"] and not added["success"] and not switched["success"]
+        # Started without c, and never restarted for it
+        assert len(service.spawned) == 1 and health["healthy"] and health["input_camera_ids"] == ["a", "b"]
+        graph = service.spawned[0][0][service.spawned[0][0].index("-filter_complex") + 1]
+        assert "[1:a:0]" not in graph and "[a1]" in graph
+
+    @pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+    def test_live_switch_with_lavfi_cameras(self):
+        print("\n🧪 Testing a live switch between 2 lavfi cameras...")
+
+        class LavfiComposition(FFmpegCompositionService):
+            def _input_args(self, camera):
+                return ["-re", "-f", "lavfi", "-i", camera["lavfi"]]
+
+            async def _probe_input(self, camera, wait=0.0):
+                return {"audio": True}
+
+        output_dir = tempfile.mkdtemp(prefix="camera_switch_test_")
+        composition = LavfiComposition(output_dir=output_dir)
+        composition.width, composition.height, composition.fps = 320, 180, 25
+        cameras = [
+            {"camera_id": colour, "lavfi": f"color=c={colour}:s=320x180:r=25[out0];sine=f={tone}[out1]"}
+            for colour, tone in (("red", 440), ("blue", 880))
+        ]
+        playlist = os.path.join(output_dir, "output_w1", "output.m3u8")
+
+        def segments():
+            try:
+                with open(playlist) as f:
+                    return [line for line in f.read().splitlines() if line and not line.startswith("#")]
+            except FileNotFoundError:
+                return []
+
+        async def red_fraction(segment):
+            process = await asyncio.create_subprocess_exec(
+                "ffmpeg", "-v", "error", "-i", os.path.join(output_dir, "output_w1", segment), "-an",
+                "-vf", "scale=1:1", "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1",
+                stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+            )
+            pixels, _ = await process.communicate()
+            frames = [pixels[i:i + 3] for i in range(0, len(pixels) - 2, 3)]
+            return sum(frame[0] > frame[2] for frame in frames) / max(len(frames), 1)
+
+        async def wait_for(condition, timeout=20):
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                if condition():
+                    return time.monotonic()
+                await asyncio.sleep(0.02)
+            raise TimeoutError()
+
+        async def run():
+            await composition.start_composition("w1", cameras[0], cameras)
+            try:
+                await wait_for(lambda: len(segments()) >= 2)
+                before = segments()[-1]
+                result = await composition.switch_camera("w1", cameras[1])
+                # The segment in progress at the switch, then one wholly from the new camera
+                await wait_for(lambda: before in segments() and len(segments()[segments().index(before):]) >= 3)
+                after = segments()[segments().index(before) + 1:]
+                with open(playlist) as f:
+                    text = f.read()
+                return result, [await red_fraction(s) for s in [before] + after], text
+            finally:
+                await composition.stop_composition("w1")
+                shutil.rmtree(output_dir, ignore_errors=True)
+
+        result, red, text = asyncio.run(run())
+        assert not result["restarted"]
+        assert red[0] == 1.0 and red[-1] == 0.0
+        assert "#EXT-X-DISCONTINUITY" not in text
+        print(f"✅ Switched in place, share of the old camera per segment: {red}")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test Suite for Camera Control WebSocket Fan-out
+Checks that broadcasts serialize once, reach every client in order, and
+that a stalled or backed-up client is dropped without holding up the
+others.
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.camera_websocket import CameraWebSocketManager
+
+
+class FakeWebSocket:
+    def __init__(self, stalled=False):
+        self.stalled = stalled
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.stalled:
+            # A half-dead client: the send never completes
+            await asyncio.Event().wait()
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+class TestCameraFanOut:
+    """Concurrent, bounded per-client sends"""
+
+    def test_stalled_client_does_not_hold_up_others(self):
+        print("\n🧪 Testing camera broadcasts with a stalled client...")
+        manager = CameraWebSocketManager(queue_size=8, send_timeout=0.2)
+
+        async def run():
+            clients = [FakeWebSocket() for _ in range(50)]
+            stalled = FakeWebSocket(stalled=True)
+            for ws in [stalled, *clients]:
+                await manager.connect(ws, "w1")
+            started = time.monotonic()
+            for index in range(5):
+                await manager.broadcast_camera_switch("w1", {"camera_id": f"cam-{index}", "name": f"Camera {index}"})
+            broadcast_seconds = time.monotonic() - started
+            await asyncio.sleep(0.05)
+            delivered_before_timeout = [len(ws.sent) for ws in clients]
+            await asyncio.sleep(0.3)
+            return clients, stalled, broadcast_seconds, delivered_before_timeout
+
+        clients, stalled, broadcast_seconds, delivered = asyncio.run(run())
+        # Everyone else had every switch before the stalled send even timed out
+        assert delivered == [5] * 50
+        assert broadcast_seconds < 0.05
+        assert all('"camera_id": "cam-4"' in ws.sent[-1] for ws in clients)
+        # Serialized once: every client got the same string object
+        assert all(ws.sent[0] is clients[0].sent[0] for ws in clients)
+        assert stalled.sent == [] and stalled.closed_with == 1013
+        assert stalled not in manager.connections["w1"] and len(manager.connections["w1"]) == 50
+        assert manager.stats["dropped_clients"] == 1
+        print(f"✅ 50 clients got 5 switches in {broadcast_seconds * 1000:.1f} ms; stalled client dropped")
+
+    def test_backed_up_client_is_dropped_on_overflow(self):
+        manager = CameraWebSocketManager(queue_size=4, send_timeout=10)
+
+        async def run():
+            fast, stalled = FakeWebSocket(), FakeWebSocket(stalled=True)
+            await manager.connect(fast, "w1")
+            await manager.connect(stalled, "w1")
+            counts = []
+            for index in range(10):
+                counts.append(await manager.broadcast_to_wedding("w1", {"type": "status", "n": index}))
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0.01)
+            return fast, stalled, counts
+
+        fast, stalled, counts = asyncio.run(run())
+        # One message in flight plus four queued, then the fifth queued message overflows
+        assert counts == [2] * 5 + [1] * 5
+        assert len(fast.sent) == 10 and stalled.closed_with == 1013
+        assert list(manager.connections["w1"]) == [fast]
+
+    def test_disconnect_is_idempotent(self):
+        manager = CameraWebSocketManager()
+
+        async def run():
+            ws = FakeWebSocket()
+            await manager.connect(ws, "w1")
+            manager.disconnect(ws, "w1")
+            manager.disconnect(ws, "w1")
+            return await manager.broadcast_to_wedding("w1", {"type": "status"})
+
+        assert asyncio.run(run()) == 0
+        assert manager.connections == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Test Suite for the Live Chat Write Buffer
+Checks batching, per-wedding ordering, re-queueing of failed batches (and
+that a retry does not count messages twice) and backpressure against an
+in-memory collection that records insert_many calls, and - against MongoDB (skipped when none is reachable at
+MONGODB_URI) - that messages sent over Socket.IO show up in the chat
+history endpoint (and its recent-chat ring) before and after they are
+flushed.
+"""
+import asyncio
+import os
+import uuid
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from app.services import socket_service
+from app.services.chat_buffer import ChatWriteBuffer, build_chat_message
+from app.services.recent_chat import RecentChatCache
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+
+
+class RecordingCollection:
+    def __init__(self, fail_times=0, lose_replies=0):
+        self.calls = []
+        self.fail_times = fail_times
+        # Inserts that are written but whose reply never arrives
+        self.lose_replies = lose_replies
+        self.ids = set()
+
+    async def insert_many(self, documents, ordered=True):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("mongod unreachable")
+        self.calls.append(list(documents))
+        errors = [{"index": i, "code": 11000, "errmsg": "E11000 duplicate key error"}
+                  for i, doc in enumerate(documents) if doc["_id"] in self.ids]
+        self.ids.update(doc["_id"] for doc in documents)
+        if self.lose_replies:
+            self.lose_replies -= 1
+            raise ConnectionError("connection reset")
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(documents) - len(errors)})
+
+    async def bulk_write(self, operations, ordered=True):
+        self.calls.append(list(operations))
+
+
+class RecordingDatabase:
+    def __init__(self, fail_times=0, lose_replies=0):
+        self.chat_messages = RecordingCollection(fail_times, lose_replies)
+        self.weddings = RecordingCollection()
+
+
+def make_buffer(db, **kwargs):
+    buffer = ChatWriteBuffer(**{"flush_interval": 60, "flush_max_messages": 10_000, "max_pending": 10_000, **kwargs})
+    buffer._db = db
+    return buffer
+
+
+class TestChatBuffer:
+    """Batching and ordering of chat writes"""
+
+    def test_messages_batch_in_order(self):
+        print("\n🧪 Testing chat messages are written in batches...")
+
+        async def run():
+            db = RecordingDatabase()
+            buffer = make_buffer(db)
+            for index in range(300):
+                await buffer.add(build_chat_message(f"w{index % 3}", f"message {index}"))
+            await buffer.flush()
+            return db, buffer
+
+        db, buffer = asyncio.run(run())
+        (batch,) = db.chat_messages.calls
+        assert len(batch) == 300
+        for wedding_id in ("w0", "w1", "w2"):
+            docs = [doc for doc in batch if doc["wedding_id"] == wedding_id]
+            order = [(doc["created_at"], doc["_id"]) for doc in docs]
+            # History sorts by (created_at, _id): the send order
+            assert order == sorted(order)
+            assert [int(doc["message"].split()[1]) for doc in docs] == sorted(int(doc["message"].split()[1]) for doc in docs)
+        (counters,) = db.weddings.calls
+        assert sorted(op._doc["$inc"]["chat_messages_count"] for op in counters) == [100, 100, 100]
+        assert buffer.stats["flushes"] == 1 and buffer.stats["messages_written"] == 300
+        print("✅ 300 messages written with one insert_many")
+
+    def test_failed_flush_is_requeued_in_order(self):
+        async def run():
+            db = RecordingDatabase(fail_times=1)
+            buffer = make_buffer(db)
+            first = [build_chat_message("w1", f"first {i}") for i in range(3)]
+            for doc in first:
+                await buffer.add(doc)
+            assert await buffer.flush() == 0
+            assert buffer.pending_messages("w1") == first
+            await buffer.add(build_chat_message("w1", "after the failure"))
+            await buffer.flush()
+            return db, buffer
+
+        db, buffer = asyncio.run(run())
+        (batch,) = db.chat_messages.calls
+        assert [doc["message"] for doc in batch] == ["first 0", "first 1", "first 2", "after the failure"]
+        assert buffer.stats["failed_flushes"] == 1 and buffer.pending == 0
+
+    def test_retried_batch_counts_only_new_messages(self):
+        async def run():
+            db = RecordingDatabase(lose_replies=1)
+            buffer = make_buffer(db)
+            for index in range(4):
+                await buffer.add(build_chat_message("w1", f"first {index}"))
+            # Written, but the reply is lost: re-queued
+            assert await buffer.flush() == 0
+            await buffer.add(build_chat_message("w2", "after the retry"))
+            return db, buffer, await buffer.flush()
+
+        db, buffer, written = asyncio.run(run())
+        # The copies already written are not counted again
+        assert written == 1 and buffer.stats["messages_written"] == 1
+        assert buffer.stats["duplicate_writes"] == 4 and buffer.stats["rejected_writes"] == 0
+        (counters,) = db.weddings.calls
+        assert [(op._filter["id"], op._doc["$inc"]["chat_messages_count"]) for op in counters] == [("w2", 1)]
+
+    def test_size_triggers_flush_and_backpressure(self):
+        async def run():
+            db = RecordingDatabase()
+            buffer = ChatWriteBuffer(flush_interval=60, flush_max_messages=50, max_pending=100)
+            await buffer.start(db)
+            # Producers that never yield hit the pending cap and flush inline
+            for index in range(120):
+                assert await buffer.add(build_chat_message("w1", f"m{index}"))
+            # The flush loop picks up a batch past flush_max_messages
+            for index in range(120, 180):
+                assert await buffer.add(build_chat_message("w1", f"m{index}"))
+            await asyncio.sleep(0.05)
+            loop_flushes = buffer.stats["flushes"]
+            await buffer.stop()
+            return db, buffer, loop_flushes
+
+        db, buffer, loop_flushes = asyncio.run(run())
+        assert [len(batch) for batch in db.chat_messages.calls] == [100, 80]
+        assert loop_flushes == 2
+        assert [doc["message"] for batch in db.chat_messages.calls for doc in batch] == [f"m{i}" for i in range(180)]
+        assert buffer.stats["dropped"] == 0
+
+
+class TestChatHistory:
+    """Socket messages in the REST history"""
+
+    def test_socket_messages_show_up_in_history(self, monkeypatch):
+        motor = pytest.importorskip("motor.motor_asyncio")
+        from app import database
+        from app.routes.chat import get_chat_messages
+        print("\n🧪 Testing socket chat messages reach the history endpoint...")
+
+        async def emit(*args, **kwargs):
+            return None
+
+        monkeypatch.setattr(socket_service.sio, "emit", emit)
+
+        async def run():
+            client = motor.AsyncIOMotorClient(MONGODB_URI, serverSelectionTimeoutMS=2000)
+            try:
+                await client.server_info()
+            except Exception:
+                client.close()
+                return None
+            db = client[f"wedlive_chat_test_{uuid.uuid4().hex[:8]}"]
+            buffer = ChatWriteBuffer(flush_interval=60, flush_max_messages=10_000)
+            monkeypatch.setattr(database.db_instance, "db", db)
+            cache = RecentChatCache()
+            for target in ("app.services.chat_buffer", "app.services.socket_service", "app.routes.chat"):
+                monkeypatch.setattr(f"{target}.chat_buffer", buffer)
+            for target in ("app.services.socket_service", "app.routes.chat"):
+                monkeypatch.setattr(f"{target}.recent_chat", cache)
+            try:
+                await db.weddings.insert_one({"id": "w1", "chat_messages_count": 0})
+                await buffer.start(db)
+                acks = []
+                for index in range(25):
+                    acks.append(await socket_service.send_message(f"sid-{index % 4}", {
+                        "wedding_id": "w1", "message": f"message {index}", "guest_name": f"Guest {index % 4}"
+                    }))
+                await socket_service.send_message("sid-x", {"wedding_id": "w2", "message": "elsewhere"})
+                before_flush = await get_chat_messages("w1", limit=10, offset=0)
+                await buffer.stop()
+                after_flush = await get_chat_messages("w1", limit=100, offset=0)
+                page_two = await get_chat_messages("w1", limit=10, offset=10)
+                wedding = await db.weddings.find_one({"id": "w1"})
+                return acks, before_flush, after_flush, page_two, wedding, buffer.stats
+            finally:
+                await client.drop_database(db.name)
+                client.close()
+
+        result = asyncio.run(run())
+        if result is None:
+            pytest.skip(f"MongoDB not reachable at {MONGODB_URI}")
+        acks, before_flush, after_flush, page_two, wedding, stats = result
+        assert all(ack["status"] == "sent" for ack in acks)
+        expected = [f"message {index}" for index in reversed(range(25))]
+        assert [m.message for m in before_flush] == expected[:10]
+        assert [m.message for m in after_flush] == expected
+        assert [m.message for m in page_two] == expected[10:20]
+        assert [m.id for m in after_flush] == [ack["message_id"] for ack in reversed(acks)]
+        assert wedding["chat_messages_count"] == 25
+        assert stats["flushes"] == 1 and stats["messages_written"] == 26
+        print(f"✅ 25 messages in history, written with {stats['flushes']} insert_many")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
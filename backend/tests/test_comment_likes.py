@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test Suite for Comment Likes
+Checks that a page of comments learns which ones the viewer liked with a
+single $in query, and - against MongoDB (skipped when none is reachable at
+MONGODB_URI) - that concurrent likes keep likes_count exact and legacy
+liked_by arrays migrate into the comment_likes collection.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.services.comment_likes import LIKES_COLLECTION, migrate_comment_likes, toggle_like
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+
+
+class RecordingLikes:
+    def __init__(self, likes):
+        self.likes = likes
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        wanted = set(query["comment_id"]["$in"])
+
+        async def results():
+            for like in self.likes:
+                if like["user_id"] == query["user_id"] and like["comment_id"] in wanted:
+                    yield {"comment_id": like["comment_id"]}
+        return results()
+
+
+class RecordingDatabase:
+    def __init__(self, likes):
+        self.comment_likes = RecordingLikes(likes)
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+def make_comment(comment_id, replies=()):
+    return {"id": comment_id, "replies": [{"id": reply_id, "replies": []} for reply_id in replies]}
+
+
+class TestLikedFlags:
+    """is_liked_by_user for a page"""
+
+    def test_one_query_per_page(self, monkeypatch):
+        from app import database
+        from app.routes.comments import mark_liked
+
+        db = RecordingDatabase([
+            {"comment_id": "c2", "user_id": "u1"},
+            {"comment_id": "r1", "user_id": "u1"},
+            {"comment_id": "c1", "user_id": "u2"},
+        ])
+        monkeypatch.setattr(database.db_instance, "db", db)
+        page = [make_comment(f"c{i}", replies=("r1", "r2") if i == 0 else ()) for i in range(20)]
+
+        asyncio.run(mark_liked(page, "u1"))
+        assert len(db.comment_likes.queries) == 1
+        assert len(db.comment_likes.queries[0]["comment_id"]["$in"]) == 22
+        flags = {c["id"]: c["is_liked_by_user"] for c in [*page, *page[0]["replies"]]}
+        assert {comment_id for comment_id, liked in flags.items() if liked} == {"c2", "r1"}
+
+        # Anonymous viewers cost no query
+        asyncio.run(mark_liked(page, None))
+        assert len(db.comment_likes.queries) == 1
+        assert not any(c["is_liked_by_user"] for c in page)
+
+
+class TestLikesCollection:
+    """Atomic likes and the liked_by migration"""
+
+    def test_concurrent_likes_and_migration(self):
+        motor = pytest.importorskip("motor.motor_asyncio")
+        print("\n🧪 Testing concurrent comment likes...")
+
+        async def run():
+            client = motor.AsyncIOMotorClient(MONGODB_URI, serverSelectionTimeoutMS=2000)
+            try:
+                await client.server_info()
+            except Exception:
+                client.close()
+                return None
+            db = client[f"wedlive_likes_test_{uuid.uuid4().hex[:8]}"]
+            try:
+                await db[LIKES_COLLECTION].create_index([("comment_id", 1), ("user_id", 1)], unique=True)
+                comment = {"id": "c1", "wedding_id": "w1", "likes_count": 0, "created_at": datetime.utcnow()}
+                legacy = {"id": "c2", "wedding_id": "w1", "likes_count": 5, "liked_by": ["u1", "u2", "u2", None]}
+                await db.comments.insert_many([dict(comment), dict(legacy)])
+
+                # 100 users like at once, then half of them unlike at once
+                liked = await asyncio.gather(*[toggle_like(db, comment, f"u{i}") for i in range(100)])
+                unliked = await asyncio.gather(*[toggle_like(db, comment, f"u{i}") for i in range(0, 100, 2)])
+                # One user double-clicks: the two toggles cancel out
+                await asyncio.gather(toggle_like(db, comment, "fast"), toggle_like(db, comment, "fast"))
+                stored = await db.comments.find_one({"id": "c1"})
+                likes = await db[LIKES_COLLECTION].count_documents({"comment_id": "c1"})
+
+                migrated = await migrate_comment_likes(db, await db.comments.find_one({"id": "c2"}))
+                again = await migrate_comment_likes(db, await db.comments.find_one({"id": "c2"}))
+                after_migration = await db.comments.find_one({"id": "c2"})
+                legacy_likes = sorted([
+                    like["user_id"] async for like in db[LIKES_COLLECTION].find({"comment_id": "c2"})
+                ])
+                relike = await toggle_like(db, after_migration, "u1")
+                return liked, unliked, stored, likes, migrated, again, after_migration, legacy_likes, relike
+            finally:
+                await client.drop_database(db.name)
+                client.close()
+
+        result = asyncio.run(run())
+        if result is None:
+            pytest.skip(f"MongoDB not reachable at {MONGODB_URI}")
+        liked, unliked, stored, likes, migrated, again, after_migration, legacy_likes, relike = result
+        assert all(flag for flag, _ in liked) and not any(flag for flag, _ in unliked)
+        assert stored["likes_count"] == likes == 50
+        assert migrated and not again
+        assert legacy_likes == ["u1", "u2"]
+        assert after_migration["likes_count"] == 2 and "liked_by" not in after_migration
+        # u1's legacy like is now a comment_likes row: toggling removes it
+        assert relike == (False, 1)
+        print(f"✅ likes_count {stored['likes_count']} matches {likes} like documents")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test Suite for Paginated Comment Threads
+Checks the keyset cursor filters and - against MongoDB (skipped when none is
+reachable at MONGODB_URI) - that walking the top-level comment pages and a
+thread's reply pages returns every comment exactly once, in order, with
+bounded reply previews.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException, Response
+
+from app.utils.cursors import decode_cursor, encode_cursor, keyset_after
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+
+
+def comment_docs(count, parent_id=None, wedding_id="w1", start=datetime(2025, 6, 14, 18, 0)):
+    # Two comments per second so the _id tie-breaker matters
+    return [{
+        "_id": ObjectId(),
+        "id": str(uuid.uuid4()),
+        "wedding_id": wedding_id,
+        "parent_comment_id": parent_id,
+        "user_id": f"user-{i % 5}",
+        "user_name": f"Guest {i}",
+        "comment": f"{'reply' if parent_id else 'comment'} {i}",
+        "likes_count": 0,
+        "replies_count": 0,
+        "created_at": start + timedelta(seconds=i // 2),
+        "updated_at": None,
+    } for i in range(count)]
+
+
+class TestKeysetCursors:
+    """Cursor tokens and the filters built from them"""
+
+    def test_keyset_filters(self):
+        moment, object_id = datetime(2025, 6, 14, 18, 0, 5), ObjectId()
+        after = decode_cursor(encode_cursor(moment, object_id))
+        assert keyset_after("created_at", after, descending=True) == {"$or": [
+            {"created_at": {"$lt": moment}},
+            {"created_at": moment, "_id": {"$lt": object_id}},
+        ]}
+        assert keyset_after("created_at", decode_cursor(encode_cursor(moment))) == {"created_at": {"$gt": moment}}
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+
+class TestCommentPages:
+    """Top-level pages and lazy reply threads"""
+
+    def test_walk_pages_and_threads(self, monkeypatch):
+        motor = pytest.importorskip("motor.motor_asyncio")
+        from app import database
+        from app.routes.comments import get_comment_replies, get_comments
+        print("\n🧪 Testing keyset pages of comments and replies...")
+
+        async def walk(fetch, **kwargs):
+            pages, cursor = [], None
+            while True:
+                response = Response()
+                pages.append(await fetch(response=response, cursor=cursor, current_user=None, **kwargs))
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    return pages
+
+        async def run():
+            client = motor.AsyncIOMotorClient(MONGODB_URI, serverSelectionTimeoutMS=2000)
+            try:
+                await client.server_info()
+            except Exception:
+                client.close()
+                return None
+            db = client[f"wedlive_comments_test_{uuid.uuid4().hex[:8]}"]
+            monkeypatch.setattr(database.db_instance, "db", db)
+            try:
+                roots = comment_docs(45)
+                # The newest comment has a long thread, another a short one
+                threaded, short = roots[-1], roots[10]
+                replies = comment_docs(23, parent_id=threaded["id"], start=datetime(2025, 6, 14, 19, 0))
+                short_replies = comment_docs(2, parent_id=short["id"], start=datetime(2025, 6, 14, 19, 0))
+                threaded["replies_count"], short["replies_count"] = len(replies), len(short_replies)
+                await db.weddings.insert_one({"id": "w1"})
+                await db.comments.insert_many(roots + replies + short_replies + comment_docs(5, wedding_id="w2"))
+
+                pages = await walk(get_comments, weddingId="w1", limit=20, offset=0, reply_preview=3)
+                thread = await walk(get_comment_replies, comment_id=threaded["id"], limit=10, reply_preview=0)
+                preview = pages[0][0]
+                continued = await get_comment_replies(
+                    comment_id=threaded["id"], response=Response(), limit=100,
+                    cursor=preview.replies_cursor, reply_preview=0, current_user=None,
+                )
+                try:
+                    await get_comments(weddingId="w1", response=Response(), limit=20, cursor="not-a-cursor",
+                                       offset=0, reply_preview=3, current_user=None)
+                    bad_cursor = None
+                except HTTPException as e:
+                    bad_cursor = e.status_code
+                return roots, replies, short_replies, pages, thread, continued, bad_cursor
+            finally:
+                await client.drop_database(db.name)
+                client.close()
+
+        result = asyncio.run(run())
+        if result is None:
+            pytest.skip(f"MongoDB not reachable at {MONGODB_URI}")
+        roots, replies, short_replies, pages, thread, continued, bad_cursor = result
+
+        # Newest first, every top-level comment exactly once, no replies among them
+        assert [len(page) for page in pages] == [20, 20, 5]
+        newest_first = sorted(roots, key=lambda doc: (doc["created_at"], doc["_id"]), reverse=True)
+        assert [c.id for page in pages for c in page] == [doc["id"] for doc in newest_first]
+
+        # Threads carry a bounded preview, oldest first, and a cursor for the rest
+        by_id = {c.id: c for page in pages for c in page}
+        preview = by_id[replies[0]["parent_comment_id"]]
+        assert [r.comment for r in preview.replies] == ["reply 0", "reply 1", "reply 2"]
+        assert preview.replies_count == 23 and preview.replies_cursor
+        short = by_id[short_replies[0]["parent_comment_id"]]
+        assert len(short.replies) == 2 and short.replies_cursor is None
+        assert all(not c.replies for c in by_id.values() if c.replies_count == 0)
+
+        # Reply pages walk the whole thread in reading order
+        assert [len(page) for page in thread] == [10, 10, 3]
+        assert [r.comment for page in thread for r in page] == [f"reply {i}" for i in range(23)]
+        assert [r.comment for r in continued] == [f"reply {i}" for i in range(3, 23)]
+        assert bad_cursor == 400
+        print(f"✅ {len(roots)} comments in {len(pages)} pages, 23 replies in {len(thread)} pages")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test Suite for Response Compression
+Checks Accept-Encoding negotiation (q-values, `*`, identity;q=0), that
+small bodies, non-allowlisted types, range requests, 206/304 responses and
+bodies that already carry a Content-Encoding pass through untouched, that
+streamed bodies are compressed incrementally, and that static playlists
+are compressed once per ETag and answer a conditional request for their
+weak ETag with 304.
+"""
+import asyncio
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+
+from app.utils.compression import CompressionMiddleware, negotiate_encoding
+
+JSON_BODY = b'{"messages": [' + b",".join(b'{"id": %d, "text": "hello"}' % i for i in range(200)) + b"]}"
+
+
+def response_app(body=JSON_BODY, status=200, headers=None, chunks=None):
+    """An ASGI app answering every request with one response (or `chunks` streamed)"""
+    headers = {"content-type": "application/json", **(headers or {})}
+
+    async def app(scope, receive, send):
+        raw = [(k.encode(), v.encode()) for k, v in headers.items()]
+        if chunks is None:
+            raw.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": raw})
+        if chunks is None:
+            await send({"type": "http.response.body", "body": body})
+            return
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+
+    return app
+
+
+def request(app, path="/api/chat", headers=None):
+    """Run one GET through `app`, returning (status, headers, body, body messages)"""
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "server": ("testserver", 80), "client": ("127.0.0.1", 1234),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    response_headers = {k.decode().lower(): v.decode() for k, v in start["headers"]}
+    bodies = [m for m in sent[1:] if m["type"] == "http.response.body"]
+    return start["status"], response_headers, b"".join(m.get("body", b"") for m in bodies), len(bodies)
+
+
+class TestNegotiation:
+    """Accept-Encoding parsing"""
+
+    def test_q_values_and_preference(self):
+        supported = ("br", "gzip")
+        assert negotiate_encoding("gzip, br", supported) == "br"
+        assert negotiate_encoding("br;q=0.5, gzip", supported) == "gzip"
+        assert negotiate_encoding("br;q=0, gzip;q=0", supported) is None
+        assert negotiate_encoding("gzip;q=bogus, br;q=0.1", supported) == "br"
+        assert negotiate_encoding("GZIP", ("gzip",)) == "gzip"
+        assert negotiate_encoding("deflate", supported) is None
+        assert negotiate_encoding("", supported) is None
+
+    def test_wildcard_and_identity(self):
+        supported = ("br", "gzip")
+        assert negotiate_encoding("*", supported) == "br"
+        assert negotiate_encoding("*;q=0.5, br;q=0", supported) == "gzip"
+        # identity;q=0 forbids the uncompressed form, it does not add an encoding
+        assert negotiate_encoding("identity;q=0", supported) is None
+        assert negotiate_encoding("identity;q=0, gzip", supported) == "gzip"
+
+
+class TestCompressionMiddleware:
+    """Which responses are compressed, and how"""
+
+    def test_json_is_gzipped(self):
+        status, headers, body, _ = request(CompressionMiddleware(response_app()), headers={"accept-encoding": "gzip"})
+        assert status == 200 and headers["content-encoding"] == "gzip"
+        assert headers["vary"] == "Accept-Encoding"
+        assert int(headers["content-length"]) == len(body) < len(JSON_BODY)
+        assert gzip.decompress(body) == JSON_BODY
+
+    def test_passthrough(self):
+        print("\n🧪 Testing responses that must not be compressed...")
+        gz = {"accept-encoding": "gzip"}
+        cases = {
+            "no accept-encoding": (response_app(), "/api/chat", {}),
+            "below the minimum size": (response_app(body=b'{"ok": true}'), "/api/chat", gz),
+            "not an allowlisted type": (response_app(headers={"content-type": "image/png"}), "/api/chat", gz),
+            "media segment path": (response_app(headers={"content-type": "text/plain"}), "/hls_output/w1/seg1.ts", gz),
+            "media proxy path": (response_app(), "/api/media/proxy/abc", gz),
+            "range request": (response_app(), "/api/chat", {**gz, "range": "bytes=0-99"}),
+            "206": (response_app(status=206), "/api/chat", gz),
+            "304": (response_app(status=304, body=b""), "/api/chat", gz),
+            "already encoded": (response_app(headers={"content-encoding": "br"}), "/api/chat", gz),
+        }
+        for name, (app, path, headers) in cases.items():
+            status, response_headers, body, _ = request(CompressionMiddleware(app), path, headers)
+            assert response_headers.get("content-encoding") in (None, "br"), name
+            expected = b"" if status == 304 else (b'{"ok": true}' if "minimum" in name else JSON_BODY)
+            assert body == expected, name
+        print(f"✅ {len(cases)} cases passed through")
+
+    def test_streamed_body(self):
+        chunks = [JSON_BODY[i:i + 500] for i in range(0, len(JSON_BODY), 500)]
+        app = CompressionMiddleware(response_app(chunks=chunks))
+        status, headers, body, messages = request(app, headers={"accept-encoding": "gzip"})
+        assert headers["content-encoding"] == "gzip" and "content-length" not in headers
+        assert messages > 1
+        assert gzip.decompress(body) == JSON_BODY
+
+
+class TestPlaylistCache:
+    """Static playlists: one compression per ETag, weak ETag revalidation"""
+
+    @pytest.fixture
+    def playlist_app(self, tmp_path):
+        playlist = tmp_path / "w1" / "output.m3u8"
+        playlist.parent.mkdir()
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:2", "#EXT-X-MEDIA-SEQUENCE:0"]
+        for i in range(60):
+            lines += ["#EXTINF:2.000000,", f"output{i}.ts"]
+        playlist.write_text("\n".join(lines) + "\n")
+        app = Starlette(routes=[Mount("/hls_output", app=StaticFiles(directory=str(tmp_path)))])
+        middleware = CompressionMiddleware(app)
+        middleware.playlist = playlist
+        return middleware
+
+    def test_compressed_once_per_etag(self, playlist_app):
+        print("\n🧪 Testing 5 polls of the same playlist revision...")
+        path, gz = "/hls_output/w1/output.m3u8", {"accept-encoding": "gzip"}
+        responses = [request(playlist_app, path, gz) for _ in range(5)]
+        assert playlist_app.cache_misses == 1 and playlist_app.cache_hits == 4
+        status, headers, body, _ = responses[0]
+        assert status == 200 and headers["content-encoding"] == "gzip"
+        assert gzip.decompress(body) == playlist_app.playlist.read_bytes()
+        assert headers["etag"].startswith('W/"')
+        assert len({r[2] for r in responses}) == 1
+
+        # A new revision has a new ETag and is compressed again
+        playlist_app.playlist.write_text(playlist_app.playlist.read_text() + "#EXT-X-ENDLIST\n")
+        request(playlist_app, path, gz)
+        assert playlist_app.cache_misses == 2
+        print(f"✅ {playlist_app.cache_misses} compressions for 6 polls")
+
+    def test_weak_etag_revalidates(self, playlist_app):
+        path, gz = "/hls_output/w1/output.m3u8", {"accept-encoding": "gzip"}
+        _, headers, _, _ = request(playlist_app, path, gz)
+        status, revalidated, body, _ = request(playlist_app, path, {**gz, "if-none-match": headers["etag"]})
+        assert status == 304 and body == b""
+        assert "content-encoding" not in revalidated
+        assert playlist_app.cache_misses == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Test Suite for Denormalized Counters
+Checks against MongoDB (skipped when none is reachable at MONGODB_URI) that
+the increment helpers move wedding, user and album counters, that removing
+a file never drives storage_used below zero, and that reconcile_wedding and
+reconcile_all restore deliberately corrupted counters to the values derived
+from the source collections - rewriting nothing on a second pass.
+"""
+import asyncio
+import os
+import uuid
+
+import pytest
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+
+WEDDING_FIELDS = [
+    "media_count", "photobooth_count", "comments_count", "chat_messages_count", "reactions_count",
+    "guest_book_count", "albums_count", "viewer_sessions_count", "media_bytes",
+]
+
+
+def run_with_database(monkeypatch, scenario):
+    """Run scenario(db, CounterService, StorageService) on a scratch database, or skip without MongoDB"""
+    motor = pytest.importorskip("motor.motor_asyncio")
+    # Imported late: app.database loads .env, which would change MONGODB_URI for other test modules
+    from app.services import counter_service, storage_service
+
+    async def run():
+        client = motor.AsyncIOMotorClient(MONGODB_URI, serverSelectionTimeoutMS=2000)
+        try:
+            info = await client.server_info()
+        except Exception:
+            client.close()
+            return None
+        if info["versionArray"][0] < 5:
+            client.close()
+            return None
+        db = client[f"wedlive_counters_test_{uuid.uuid4().hex[:8]}"]
+        monkeypatch.setattr(counter_service, "get_db", lambda: db)
+        monkeypatch.setattr(storage_service, "get_db", lambda: db)
+        try:
+            return await scenario(db, counter_service.CounterService, storage_service.StorageService)
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+    result = asyncio.run(run())
+    if result is None:
+        pytest.skip(f"MongoDB 5.0+ not reachable at {MONGODB_URI}")
+    return result
+
+
+async def seed_sources(db):
+    """Two weddings and their users with one of everything the counters are derived from"""
+    await db.weddings.insert_many([
+        {"id": "w1", "creator_id": "u1", "recording_url": "/recordings/w1.mp4", "recording_size": 1000},
+        {"id": "w2", "creator_id": "u2", "recording_url": None, "recording_size": 5000},
+    ])
+    await db.users.insert_many([{"id": "u1"}, {"id": "u2"}])
+    await db.media.insert_many([
+        {"id": "m1", "wedding_id": "w1", "user_id": "u1", "uploaded_by": "u1", "file_size": 100},
+        {"id": "m2", "wedding_id": "w1", "user_id": "u1", "uploaded_by": "u1", "file_size": 200},
+        {"id": "m3", "wedding_id": "w2", "user_id": "u2", "uploaded_by": "u2", "file_size": 50},
+    ])
+    await db.photo_booth.insert_one({"id": "p1", "wedding_id": "w2", "photo_url": "https://cdn/p1.jpg"})
+    await db.comments.insert_many([
+        {"id": "c1", "wedding_id": "w1", "parent_comment_id": None},
+        {"id": "c2", "wedding_id": "w1", "parent_comment_id": "c1"},
+    ])
+    await db.comment_likes.insert_many([{"comment_id": "c1", "user_id": "u1"}, {"comment_id": "c1", "user_id": "u2"}])
+    await db.chat_messages.insert_many([{"wedding_id": "w1", "message": str(i)} for i in range(3)])
+    await db.reactions.insert_one({"wedding_id": "w1", "emoji": "👏"})
+    await db.reaction_rollups.insert_one({"wedding_id": "w1", "total": 5, "counts": {"❤️": 5}})
+    await db.guest_book.insert_one({"wedding_id": "w1", "message": "Congratulations"})
+    await db.albums.insert_one({"id": "a1", "wedding_id": "w1", "slides": [{"id": "s1"}, {"id": "s2"}]})
+    await db.viewer_sessions.insert_many([{"wedding_id": "w1", "session_id": str(i)} for i in range(2)])
+
+
+EXPECTED_WEDDINGS = {
+    "w1": {"media_count": 2, "photobooth_count": 0, "comments_count": 2, "chat_messages_count": 3,
+           # One REST reaction plus five socket taps kept only in reaction_rollups
+           "reactions_count": 6, "guest_book_count": 1, "albums_count": 1, "viewer_sessions_count": 2,
+           "media_bytes": 300},
+    "w2": {"media_count": 1, "photobooth_count": 1, "comments_count": 0, "chat_messages_count": 0,
+           "reactions_count": 0, "guest_book_count": 0, "albums_count": 0, "viewer_sessions_count": 0,
+           "media_bytes": 50},
+}
+# Photo booth photos take no quota; only w1's recording is stored
+EXPECTED_USERS = {
+    "u1": {"weddings_count": 1, "media_count": 2, "storage_used": 1300},
+    "u2": {"weddings_count": 1, "media_count": 1, "storage_used": 50},
+}
+
+
+async def corrupt(db):
+    await db.weddings.update_many({}, {"$set": {field: 99 for field in WEDDING_FIELDS}})
+    await db.users.update_many({}, {"$set": {"weddings_count": -4, "media_count": 99, "storage_used": 123456}})
+    await db.albums.update_many({}, {"$set": {"slides_count": 9}})
+    await db.comments.update_many({}, {"$set": {"replies_count": 7, "likes_count": -1}})
+
+
+async def snapshot(db):
+    weddings = {w["id"]: {f: w.get(f) for f in WEDDING_FIELDS} async for w in db.weddings.find()}
+    users = {u["id"]: {f: u.get(f) for f in EXPECTED_USERS["u1"]} async for u in db.users.find()}
+    albums = {a["id"]: a.get("slides_count") async for a in db.albums.find()}
+    comments = {c["id"]: (c.get("replies_count"), c.get("likes_count")) async for c in db.comments.find()}
+    return weddings, users, albums, comments
+
+
+class TestCounterIncrements:
+    """$inc hooks on the write paths"""
+
+    def test_increments_move_counters(self, monkeypatch):
+        async def scenario(db, CounterService, StorageService):
+            await db.weddings.insert_one({"id": "w1", "creator_id": "u1"})
+            await db.users.insert_one({"id": "u1"})
+            await db.albums.insert_one({"id": "a1", "wedding_id": "w1", "slides_count": 1})
+
+            await CounterService.media_added("w1", "u1", 500)
+            await CounterService.media_added("w1", "u1", 300)
+            await CounterService.media_removed("w1", "u1", 500)
+            await CounterService.increment_wedding("w1", comments_count=2)
+            await CounterService.increment_wedding("w1", comments_count=-1)
+            await CounterService.increment_user("u1", weddings_count=1)
+            await CounterService.increment_album("a1", slides_count=2)
+            # Nothing to update: no id, no deltas, or no such document
+            await CounterService.increment_wedding(None, media_count=1)
+            await CounterService.increment_user("u1")
+            await CounterService.increment_wedding("missing", media_count=1)
+
+            wedding = await db.weddings.find_one({"id": "w1"}, {"_id": 0})
+            user = await db.users.find_one({"id": "u1"}, {"_id": 0})
+            album = await db.albums.find_one({"id": "a1"}, {"_id": 0})
+            return wedding, user, album, await db.weddings.count_documents({})
+
+        wedding, user, album, weddings = run_with_database(monkeypatch, scenario)
+        assert wedding["media_count"] == 1 and wedding["media_bytes"] == 300
+        assert wedding["comments_count"] == 1
+        assert user == {"id": "u1", "media_count": 1, "weddings_count": 1}
+        assert album["slides_count"] == 3
+        assert weddings == 1
+
+    def test_storage_never_goes_negative(self, monkeypatch):
+        async def scenario(db, CounterService, StorageService):
+            await db.users.insert_many([{"id": "u1", "storage_used": 100}, {"id": "u2"}])
+            results = [
+                await StorageService.remove_file_from_storage("u1", 250),
+                await StorageService.remove_file_from_storage("u2", 10),
+                await StorageService.add_file_to_storage("u1", 300),
+                await StorageService.remove_file_from_storage("u1", 100),
+            ]
+            with pytest.raises(ValueError):
+                await StorageService.remove_file_from_storage("missing", 10)
+            stored = {u["id"]: u["storage_used"] async for u in db.users.find()}
+            return [r["storage_used"] for r in results], stored
+
+        used, stored = run_with_database(monkeypatch, scenario)
+        assert used == [0, 0, 300, 200]
+        assert stored == {"u1": 200, "u2": 0}
+
+
+class TestCounterReconciliation:
+    """Drift repaired from the source collections"""
+
+    def test_reconcile_wedding(self, monkeypatch):
+        async def scenario(db, CounterService, StorageService):
+            await seed_sources(db)
+            await corrupt(db)
+            returned = await CounterService.reconcile_wedding("w1")
+            weddings, _, _, _ = await snapshot(db)
+            return returned, weddings
+
+        returned, weddings = run_with_database(monkeypatch, scenario)
+        assert returned == EXPECTED_WEDDINGS["w1"]
+        assert weddings["w1"] == EXPECTED_WEDDINGS["w1"]
+        # Only the requested wedding is rewritten
+        assert weddings["w2"] == {field: 99 for field in WEDDING_FIELDS}
+
+    def test_reconcile_all(self, monkeypatch):
+        print("\n🧪 Testing reconcile_all on corrupted counters...")
+
+        async def scenario(db, CounterService, StorageService):
+            await seed_sources(db)
+            await corrupt(db)
+            repaired = await CounterService.reconcile_all()
+            restored = await snapshot(db)
+            again = await CounterService.reconcile_all()
+            return repaired, restored, again
+
+        repaired, (weddings, users, albums, comments), again = run_with_database(monkeypatch, scenario)
+        assert weddings == EXPECTED_WEDDINGS
+        assert users == EXPECTED_USERS
+        assert albums == {"a1": 2}
+        assert comments == {"c1": (1, 2), "c2": (0, 0)}
+        assert repaired == {"weddings": 2, "users": 2, "albums": 1, "comments": 2}
+        assert again == {"weddings": 0, "users": 0, "albums": 0, "comments": 0}
+        print(f"✅ Repaired {repaired}, nothing left on a second pass")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Test Suite for Delta Sync
+Checks that polling with a sync cursor returns only new items and
+tombstones, that late writes inside the settle window are not missed
+(and a full page does not move the cursor past them), that expired cursors reset, and that unchanged polls are answered with
+304 - for chat straight from the recent-chat ring - against in-memory
+collections that count queries.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi import Response
+from starlette.requests import Request
+
+from app.services import chat_buffer as chat_buffer_module
+from app.services.chat_buffer import ChatWriteBuffer, build_chat_message
+from app.services.recent_chat import RecentChatCache
+from app.utils.cursors import decode_cursor
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(field)
+            if "$gt" in condition and not value > condition["$gt"]:
+                return False
+            if "$lt" in condition and not value < condition["$lt"]:
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, collection, query):
+        self.collection = collection
+        self.query = query
+        self._sort = []
+        self._limit = None
+
+    def sort(self, keys, direction=1):
+        self._sort = [(keys, direction)] if isinstance(keys, str) else keys
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    async def to_list(self, length=None):
+        self.collection.queries += 1
+        docs = [doc for doc in self.collection.docs if matches(doc, self.query)]
+        for field, direction in reversed(self._sort):
+            docs.sort(key=lambda doc: doc[field], reverse=direction == -1)
+        return docs[:self._limit or length]
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.queries = 0
+
+    def find(self, query, projection=None):
+        return FakeCursor(self, query)
+
+    async def insert_one(self, doc):
+        self.docs.append({"_id": ObjectId(), **doc})
+
+    async def find_one_and_delete(self, query):
+        for doc in self.docs:
+            if matches(doc, query):
+                self.docs.remove(doc)
+                return doc
+        return None
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+def entries(wedding_id, count, start):
+    return [{
+        "_id": ObjectId(), "id": f"{wedding_id}-{i}", "wedding_id": wedding_id, "guest_name": f"Guest {i}",
+        "message": f"entry {i}", "created_at": start + timedelta(seconds=i // 2),
+    } for i in range(count)]
+
+
+def request(etag=None):
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""})
+
+
+@pytest.fixture
+def delta_sync():
+    # Imported late: app.database loads .env, which would change MONGODB_URI for other test modules
+    from app.services import delta_sync
+    return delta_sync
+
+
+@pytest.fixture
+def chat_state(monkeypatch):
+    buffer = ChatWriteBuffer(flush_interval=60)
+    cache = RecentChatCache(size=100)
+    monkeypatch.setattr(chat_buffer_module, "chat_buffer", buffer)
+    monkeypatch.setattr("app.services.recent_chat.recent_chat", cache)
+    return buffer, cache
+
+
+class TestDeltaSync:
+    """Incremental polls"""
+
+    def test_guest_book_polls(self, monkeypatch, delta_sync):
+        from app import database
+        from app.routes.chat import delete_guest_book_entry, get_guest_book_delta
+        print("\n🧪 Testing guest book delta polls...")
+        monkeypatch.setattr(delta_sync, "SETTLE_SECONDS", 0)
+        db = FakeDatabase()
+        db.guest_book.docs = entries("w1", 30, datetime.utcnow() - timedelta(hours=1)) + entries("w2", 5, datetime.utcnow())
+        monkeypatch.setattr(database.db_instance, "db", db)
+
+        async def poll(cursor=None, etag=None, limit=100):
+            response = Response()
+            result = await get_guest_book_delta("w1", request(etag), response, cursor=cursor, since=None, limit=limit)
+            return result, response
+
+        async def run():
+            snapshot, first = await poll(limit=10)
+            # Walk forward from a day ago in pages of 12
+            pages = [await get_guest_book_delta("w1", request(), Response(), cursor=None,
+                                                since=datetime.utcnow() - timedelta(days=1), limit=12)]
+            cursor = pages[0]["cursor"]
+            while pages[-1]["has_more"]:
+                page, _ = await poll(cursor, limit=12)
+                pages.append(page)
+                cursor = page["cursor"]
+            queries_before = db.guest_book.queries
+            unchanged, _ = await poll(cursor, etag=f'"{cursor}"')
+            not_modified_queries = db.guest_book.queries - queries_before
+            empty, _ = await poll(cursor)
+
+            await db.guest_book.insert_one({"id": "new", "wedding_id": "w1", "guest_name": "Late", "message": "hi",
+                                            "created_at": datetime.utcnow()})
+            await delete_guest_book_entry("w1-3", current_user={"role": "creator"})
+            changed, _ = await poll(cursor, etag=f'"{cursor}"')
+            return snapshot, first, pages, unchanged, not_modified_queries, empty, changed, cursor
+
+        snapshot, first, pages, unchanged, not_modified_queries, empty, changed, cursor = asyncio.run(run())
+        assert [e["id"] for e in snapshot["items"]] == [f"w1-{i}" for i in range(20, 30)]
+        assert first.headers["ETag"] == f'"{snapshot["cursor"]}"'
+        assert [len(page["items"]) for page in pages] == [12, 12, 6]
+        assert [e["id"] for page in pages for e in page["items"]] == [f"w1-{i}" for i in range(30)]
+        # Nothing changed: 304 after one index seek for items (and one for tombstones)
+        assert unchanged.status_code == 304 and not_modified_queries == 1
+        assert empty["items"] == [] and empty["cursor"] == cursor
+        assert [e["id"] for e in changed["items"]] == ["new"] and changed["deleted"] == ["w1-3"]
+        assert changed["cursor"] != cursor
+        print("✅ 30 entries in 3 pages; unchanged poll answered 304")
+
+    def test_late_writes_inside_settle_window(self, monkeypatch, delta_sync):
+        monkeypatch.setattr(delta_sync, "SETTLE_SECONDS", 2)
+        db = FakeDatabase()
+        now = datetime.utcnow()
+        db.reactions.docs = [{"_id": ObjectId(), "id": "a", "wedding_id": "w1", "reaction_type": "heart",
+                              "created_at": now - timedelta(milliseconds=200)}]
+
+        async def run():
+            first = await delta_sync.delta(db, "reactions", "w1", {"t": now - timedelta(minutes=1), "id": None})
+            # Written by another worker after the poll, stamped before the item it returned
+            await db.reactions.insert_one({"id": "late", "wedding_id": "w1", "reaction_type": "clap",
+                                           "created_at": now - timedelta(milliseconds=500)})
+            second = await delta_sync.delta(db, "reactions", "w1", decode_cursor(first["cursor"]))
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert [r["id"] for r in first["items"]] == ["a"]
+        # The cursor stays behind the settle window
+        assert decode_cursor(first["cursor"])["t"] < now - timedelta(seconds=1)
+        # Not missed; the unsettled item comes again and clients upsert it by id
+        assert [r["id"] for r in second["items"]] == ["late", "a"]
+
+    def test_full_page_stops_at_the_settle_point(self, monkeypatch, delta_sync):
+        monkeypatch.setattr(delta_sync, "SETTLE_SECONDS", 2)
+        db = FakeDatabase()
+        now = datetime.utcnow()
+        # A burst: more than a page, the newest still inside the settle window
+        db.guest_book.docs = entries("w1", 5, now - timedelta(seconds=5))
+        db.guest_book.docs += [{**entry, "id": f"new-{entry['id']}"}
+                               for entry in entries("w1", 5, now - timedelta(milliseconds=500))]
+        after = {"t": now - timedelta(minutes=1), "id": None}
+
+        async def run():
+            settled = await delta_sync.delta(db, "guestbook", "w1", after, limit=4)
+            unsettled = await delta_sync.delta(db, "guestbook", "w1", decode_cursor(settled["cursor"]), limit=4)
+            return settled, unsettled
+
+        settled, unsettled = asyncio.run(run())
+        # Within the settled part the cursor is the last item's key
+        assert settled["has_more"] and decode_cursor(settled["cursor"])["id"] is not None
+        # Past it, the cursor holds at the settle point
+        assert unsettled["has_more"]
+        assert decode_cursor(unsettled["cursor"])["t"] < now - timedelta(seconds=1)
+
+    def test_expired_cursor_resets(self, delta_sync):
+        db = FakeDatabase()
+        db.guest_book.docs = entries("w1", 3, datetime.utcnow() - timedelta(hours=1))
+        stale = {"t": datetime.utcnow() - timedelta(seconds=delta_sync.SYNC_TOMBSTONE_TTL_SECONDS + 60), "id": None}
+        result = asyncio.run(delta_sync.delta(db, "guestbook", "w1", stale))
+        assert result["reset"] and len(result["items"]) == 3
+        # Kinds without deletions keep their cursors
+        assert not asyncio.run(delta_sync.delta(db, "reactions", "w1", stale))["reset"]
+
+    def test_chat_polls_are_served_from_the_ring(self, monkeypatch, chat_state, delta_sync):
+        buffer, cache = chat_state
+        monkeypatch.setattr(delta_sync, "SETTLE_SECONDS", 0)
+        db = FakeDatabase()
+        db.chat_messages.docs = [
+            {**build_chat_message("w1", f"stored {i}"), "created_at": datetime.utcnow() - timedelta(minutes=10, seconds=-i)}
+            for i in range(40)
+        ]
+        cache._db = db
+
+        async def run():
+            snapshot = await delta_sync.delta(db, "chat", "w1", None, limit=20)
+            cursor = decode_cursor(snapshot["cursor"])
+            polls = [await delta_sync.delta(db, "chat", "w1", cursor) for _ in range(50)]
+            live = build_chat_message("w1", "live")
+            await buffer.add(live)
+            cache.append(live)
+            after_live = await delta_sync.delta(db, "chat", "w1", cursor)
+            return snapshot, polls, after_live
+
+        snapshot, polls, after_live = asyncio.run(run())
+        assert [m["message"] for m in snapshot["items"]] == [f"stored {i}" for i in range(20, 40)]
+        assert all(poll["items"] == [] and poll["cursor"] == snapshot["cursor"] for poll in polls)
+        assert [m["message"] for m in after_live["items"]] == ["live"]
+        # One warm-up query; every poll after it came from memory
+        assert db.chat_messages.queries == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
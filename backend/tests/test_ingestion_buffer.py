@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test Suite for the Analytics Ingestion Buffer
+Checks per-session coalescing, folding of heartbeats/ends into a buffered
+insert, backpressure and re-queueing of failed batches against an
+in-memory collection that records bulk_write calls.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo import InsertOne, UpdateOne
+
+from app.services.ingestion_buffer import AnalyticsIngestBuffer, build_quality_sample
+
+
+class RecordingCollection:
+    def __init__(self, name, fail_times=0):
+        self.name = name
+        self.calls = []
+        self.fail_times = fail_times
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("mongod unreachable")
+        self.calls.append(list(operations))
+
+
+class RecordingDatabase:
+    def __init__(self, fail_times=0):
+        self.viewer_sessions = RecordingCollection("viewer_sessions", fail_times)
+        self.stream_quality_metrics = RecordingCollection("stream_quality_metrics")
+
+
+def session_doc(index, wedding_id="wedding-1"):
+    return {
+        "id": f"id-{index}",
+        "wedding_id": wedding_id,
+        "session_id": f"session-{index}",
+        "user_id": None,
+        "join_time": datetime(2025, 6, 14, 15, 0) + timedelta(seconds=index),
+        "leave_time": None,
+        "duration_seconds": 0,
+    }
+
+
+def make_buffer(db, **kwargs):
+    buffer = AnalyticsIngestBuffer(**{"flush_interval": 60, "flush_max_ops": 10_000, "max_pending": 10_000, **kwargs})
+    buffer._db = db
+    return buffer
+
+
+class TestIngestionBuffer:
+    """Coalescing and flushing of viewer session / quality writes"""
+
+    def test_short_visit_is_one_insert(self):
+        """Start, heartbeats and end of an unflushed session fold into the insert"""
+        print("\n🧪 Testing a buffered visit collapses into one InsertOne...")
+
+        async def run():
+            db = RecordingDatabase()
+            buffer = make_buffer(db)
+            doc = session_doc(1)
+            await buffer.session_started(doc)
+            for second in range(1, 6):
+                await buffer.heartbeat("wedding-1", "session-1", doc["join_time"] + timedelta(seconds=second * 5))
+            await buffer.session_ended("wedding-1", "session-1", doc["join_time"] + timedelta(seconds=30), 30)
+            assert buffer.pending_session("wedding-1", "session-1")["leave_time"] is not None
+            await buffer.flush()
+            return db, buffer
+
+        db, buffer = asyncio.run(run())
+        assert len(db.viewer_sessions.calls) == 1
+        (operation,) = db.viewer_sessions.calls[0]
+        assert isinstance(operation, InsertOne)
+        written = operation._doc
+        assert written["duration_seconds"] == 30
+        assert written["last_heartbeat_at"] == written["join_time"] + timedelta(seconds=25)
+        assert buffer.stats["events"] == 7 and buffer.stats["operations_written"] == 1
+        assert buffer.pending_session("wedding-1", "session-1") is None
+        print("✅ 7 events written as 1 operation")
+
+    def test_heartbeats_coalesce_per_session(self):
+        """Heartbeats for stored sessions become one $max update per session per flush"""
+        print("\n🧪 Testing heartbeat coalescing...")
+
+        async def run():
+            db = RecordingDatabase()
+            buffer = make_buffer(db)
+            base = datetime(2025, 6, 14, 16, 0)
+            for round_number in range(10):
+                for index in range(200):
+                    await buffer.heartbeat("wedding-1", f"session-{index}", base + timedelta(seconds=round_number))
+            # An out-of-order heartbeat does not move last_heartbeat_at back
+            await buffer.heartbeat("wedding-1", "session-0", base)
+            await buffer.flush()
+            return db, buffer
+
+        db, buffer = asyncio.run(run())
+        (operations,) = db.viewer_sessions.calls
+        assert len(operations) == 200
+        assert all(isinstance(op, UpdateOne) for op in operations)
+        first = operations[0]
+        assert first._filter == {"session_id": "session-0", "wedding_id": "wedding-1"}
+        assert first._doc == {"$max": {"last_heartbeat_at": datetime(2025, 6, 14, 16, 0, 9)}}
+        assert buffer.stats["events"] == 2001 and buffer.stats["operations_written"] == 200
+        print("✅ 2001 heartbeats written as 200 updates")
+
+    def test_failed_flush_is_requeued(self):
+        """A batch that fails is merged under newer writes and retried"""
+        print("\n🧪 Testing failed batches are retried...")
+
+        async def run():
+            db = RecordingDatabase(fail_times=1)
+            buffer = make_buffer(db)
+            await buffer.session_started(session_doc(1))
+            await buffer.quality_sample(build_quality_sample("wedding-1", {"bitrate": 2500, "fps": 30}))
+            await buffer.flush()
+            assert buffer.stats["failed_flushes"] == 1
+            assert buffer.pending == 2
+            # End arriving after the failure still folds into the insert
+            await buffer.session_ended("wedding-1", "session-1", datetime(2025, 6, 14, 15, 10), 599)
+            await buffer.flush()
+            return db, buffer
+
+        db, buffer = asyncio.run(run())
+        (operations,) = db.viewer_sessions.calls
+        assert isinstance(operations[0], InsertOne)
+        assert operations[0]._doc["duration_seconds"] == 599
+        assert len(db.stream_quality_metrics.calls) == 1
+        assert buffer.pending == 0
+        print("✅ Re-queued batch written on the next flush")
+
+    def test_backpressure_flushes_before_accepting(self):
+        """A full buffer makes producers wait for a flush; droppable writes are shed if it can't drain"""
+        print("\n🧪 Testing backpressure...")
+
+        async def run():
+            db = RecordingDatabase()
+            buffer = make_buffer(db, max_pending=50)
+            for index in range(120):
+                await buffer.quality_sample(build_quality_sample("wedding-1", {"bitrate": index, "fps": 30}))
+            assert buffer.pending <= 50
+            flushed_calls = len(db.stream_quality_metrics.calls)
+
+            # MongoDB down: quality samples are dropped, session starts are kept
+            db.stream_quality_metrics.fail_times = 100
+            db.viewer_sessions.fail_times = 100
+            for index in range(120):
+                await buffer.quality_sample(build_quality_sample("wedding-1", {"bitrate": index, "fps": 30}))
+            await buffer.session_started(session_doc(999))
+            return buffer, flushed_calls
+
+        buffer, flushed_calls = asyncio.run(run())
+        assert flushed_calls == 2
+        assert buffer.stats["dropped"] > 0
+        assert buffer.pending_session("wedding-1", "session-999") is not None
+        print(f"✅ Dropped {buffer.stats['dropped']} quality samples while MongoDB was down")
+
+    def test_quality_sample_timestamps(self):
+        """ISO timestamps from socket clients are stored as naive UTC datetimes"""
+        sample = build_quality_sample("wedding-1", {"timestamp": "2025-06-14T15:00:00+05:30", "quality": "1080p"})
+        assert sample["timestamp"] == datetime(2025, 6, 14, 9, 30)
+        assert sample["resolution"] == "1080p"
+        assert isinstance(build_quality_sample("wedding-1", {"timestamp": "garbage"})["timestamp"], datetime)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test Suite for the Layout Photos Migration
+Checks the conversion of legacy cover photos into layout placeholders, that
+ensure_layout_photos writes the conversion back once and stamps
+LAYOUT_PHOTOS_VERSION so later reads skip it, that migrated or already
+populated weddings are never overwritten, and that an upload racing the
+migration (the guarded update matches nothing) wins over the conversion -
+against an in-memory weddings collection that records every write.
+"""
+import asyncio
+import copy
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.layout_photo_migration import (
+    LAYOUT_PHOTOS_VERSION,
+    convert_cover_photos,
+    ensure_layout_photos,
+)
+
+COVER_PHOTOS = [
+    {"category": "bride", "url": "https://cdn/b.jpg", "file_id": "f-bride", "media_id": "m-bride"},
+    {"category": "moment", "url": "https://cdn/m1.jpg", "file_id": "f-m1", "media_id": "m-m1"},
+    {"category": "moment", "url": "https://cdn/m2.jpg", "file_id": "f-m2"},
+    {"category": "general", "url": "https://cdn/g.jpg"},
+    {"category": "groom"},
+    "not a photo",
+]
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict) and "$exists" in condition:
+            if (field in doc) != condition["$exists"]:
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+
+class FakeWeddings:
+    """
+    An in-memory weddings collection; `before_update` runs ahead of every
+    update_one, to let a test write concurrently with the migration
+    """
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.updates = []
+        self.before_update = None
+
+    async def find_one(self, query, projection=None):
+        doc = next((d for d in self.docs if matches(d, query)), None)
+        return copy.deepcopy(doc)
+
+    async def update_one(self, query, update):
+        if self.before_update:
+            self.before_update()
+        self.updates.append((query, update))
+        doc = next((d for d in self.docs if matches(d, query)), None)
+        if doc is not None:
+            doc.update(update["$set"])
+        return SimpleNamespace(matched_count=int(doc is not None))
+
+
+def legacy_wedding(**fields):
+    return {"id": "w1", "theme_settings": {"cover_photos": copy.deepcopy(COVER_PHOTOS)}, **fields}
+
+
+def stored(wedding):
+    """What a reader fetches with LAYOUT_PHOTOS_PROJECTION"""
+    return {k: wedding.get(k) for k in ("id", "layout_photos", "layout_photos_version") if k in wedding}
+
+
+class TestLayoutPhotoMigration:
+    """Lazy cover_photos -> layout_photos migration"""
+
+    def test_convert_cover_photos(self):
+        converted = convert_cover_photos(COVER_PHOTOS)
+        assert set(converted) == {"bridePhoto", "preciousMoments"}
+        assert converted["bridePhoto"] == {
+            "url": "https://cdn/b.jpg", "file_id": "f-bride", "media_id": "m-bride",
+            "photo_id": "m-bride", "type": "photo",
+        }
+        moments = converted["preciousMoments"]
+        assert [m["file_id"] for m in moments] == ["f-m1", "f-m2"]
+        # Without a media_id the photo still gets an id to delete it by
+        assert moments[1]["photo_id"] and moments[1]["photo_id"] != moments[0]["photo_id"]
+        assert convert_cover_photos(None) == {} and convert_cover_photos([]) == {}
+
+    def test_first_read_writes_back_once(self):
+        print("\n🧪 Testing 3 reads of a legacy wedding...")
+        wedding = legacy_wedding()
+        db = SimpleNamespace(weddings=FakeWeddings([wedding]))
+
+        async def run():
+            return [await ensure_layout_photos(db, stored(wedding)) for _ in range(3)]
+
+        results = asyncio.run(run())
+        assert set(results[0]) == {"bridePhoto", "preciousMoments"}
+        assert results[1] == results[2] == results[0]
+        # One guarded write; later reads see the version and skip the migration
+        assert len(db.weddings.updates) == 1
+        query, update = db.weddings.updates[0]
+        assert "$or" in query
+        assert wedding["layout_photos_version"] == LAYOUT_PHOTOS_VERSION
+        assert wedding["layout_photos"] == results[0]
+        print(f"✅ {len(db.weddings.updates)} write for 3 reads")
+
+    def test_populated_weddings_are_stamped_not_overwritten(self):
+        existing = {"couplePhoto": {"url": "https://cdn/c.jpg", "photo_id": "p1"}}
+        populated = legacy_wedding(layout_photos=copy.deepcopy(existing))
+        empty = {"id": "w2", "theme_settings": {"cover_photos": [{"category": "studio"}]}}
+        migrated = legacy_wedding(id="w3", layout_photos={}, layout_photos_version=LAYOUT_PHOTOS_VERSION)
+        db = SimpleNamespace(weddings=FakeWeddings([populated, empty, migrated]))
+
+        async def run():
+            return [await ensure_layout_photos(db, stored(w)) for w in (populated, empty, migrated)]
+
+        results = asyncio.run(run())
+        assert results == [existing, {}, {}]
+        assert populated["layout_photos"] == existing
+        assert populated["layout_photos_version"] == empty["layout_photos_version"] == LAYOUT_PHOTOS_VERSION
+        # Only the version is written, and nothing for the already migrated wedding
+        assert [update["$set"] for _, update in db.weddings.updates] == [
+            {"layout_photos_version": LAYOUT_PHOTOS_VERSION}
+        ] * 2
+
+    def test_concurrent_upload_wins(self):
+        wedding = legacy_wedding()
+        db = SimpleNamespace(weddings=FakeWeddings([wedding]))
+        uploaded = {"groomPhoto": {"url": "https://cdn/new.jpg", "photo_id": "p-new"}}
+
+        def upload():
+            # Lands between reading the cover photos and the guarded write
+            if "layout_photos" not in wedding:
+                wedding["layout_photos"] = copy.deepcopy(uploaded)
+
+        db.weddings.before_update = upload
+        result = asyncio.run(ensure_layout_photos(db, stored(wedding)))
+
+        assert result == uploaded and wedding["layout_photos"] == uploaded
+        # The guarded write matched nothing; only the version was stamped after it
+        assert len(db.weddings.updates) == 2
+        assert db.weddings.updates[1][1]["$set"] == {"layout_photos_version": LAYOUT_PHOTOS_VERSION}
+        assert wedding["layout_photos_version"] == LAYOUT_PHOTOS_VERSION
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
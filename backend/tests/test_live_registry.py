@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Test Suite for the Live Wedding Registry
+Checks that reconcile() loads the active weddings (and drops ones that went
+inactive behind its back), that refresh() after start/pause/resume/stop
+transitions moves a wedding in and out of list_live(), that subscribers get
+exactly one event per transition and none for a refresh that changes
+nothing, and that transitions are shared with the other workers but
+reconcile repairs are not - against an in-memory weddings collection that
+counts reads.
+"""
+import asyncio
+
+import pytest
+
+from app.services import socket_service
+from app.services.live_registry import WORKER_EVENT, LiveWeddingRegistry
+
+
+def wedding(wedding_id, session_status=None, status=None):
+    """A wedding document as LiveStatusService leaves it in each state"""
+    if status is None:
+        status = {"live": "live", "paused": "live", "ended": "ended"}.get(session_status, "scheduled")
+    doc = {"id": wedding_id, "status": status, "title": f"Wedding {wedding_id}"}
+    if session_status:
+        doc["live_session"] = {"status": session_status, "pause_count": 0}
+    return doc
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+            continue
+        value = doc
+        for part in field.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        if isinstance(condition, dict) and "$in" in condition:
+            if value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+        self.reads = 0
+
+    def find(self, query, projection=None):
+        self.reads += 1
+        return FakeCursor([dict(doc) for doc in self.docs.values() if matches(doc, query)])
+
+    async def find_one(self, query, projection=None):
+        self.reads += 1
+        doc = next((d for d in self.docs.values() if matches(d, query)), None)
+        return dict(doc) if doc else None
+
+
+class FakeDatabase:
+    def __init__(self, *docs):
+        self.weddings = FakeCollection()
+        for doc in docs:
+            self.put(doc)
+
+    def put(self, doc):
+        self.weddings.docs[doc["id"]] = doc
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    """Worker events the registry publishes for the other workers"""
+    published = []
+
+    async def publish_worker_event(name, data):
+        published.append((name, data))
+
+    monkeypatch.setattr(socket_service.sio.manager, "publish_worker_event", publish_worker_event)
+    return published
+
+
+def subscribed(registry):
+    events = []
+
+    async def on_change(event):
+        events.append((event["wedding_id"], event["previous_status"], event["status"]))
+
+    registry.subscribe(on_change)
+    return events
+
+
+def live_ids(registry):
+    return sorted(w["id"] for w in registry.list_live())
+
+
+class TestLiveRegistry:
+    """Registry of live weddings kept current by transitions and reconcile"""
+
+    def test_reconcile_loads_active_weddings(self, shared):
+        db = FakeDatabase(
+            wedding("live", "live"),
+            wedding("paused", "paused"),
+            wedding("waiting", "waiting"),
+            wedding("ended", "ended"),
+            wedding("scheduled"),
+            # Started with the legacy /streams/start, without a live session
+            wedding("legacy", status="live"),
+        )
+        registry = LiveWeddingRegistry()
+        events = subscribed(registry)
+
+        async def run():
+            await registry.reconcile(db)
+            loaded = live_ids(registry), {w: registry.get_status(w) for w in db.weddings.docs}
+            reads = db.weddings.reads
+            # Stopped behind the registry's back (manual DB edit, lost hook)
+            db.put(wedding("live", "ended"))
+            await registry.reconcile()
+            return loaded, reads, live_ids(registry)
+
+        (listed, statuses), reads, after = asyncio.run(run())
+        assert registry.loaded
+        assert listed == ["legacy", "live", "paused"]
+        assert statuses == {"live": "live", "paused": "paused", "waiting": "waiting", "ended": None,
+                            "scheduled": None, "legacy": "live"}
+        # One query for the whole load
+        assert reads == 1
+        assert sorted(events[:4]) == [("legacy", "idle", "live"), ("live", "idle", "live"),
+                                      ("paused", "idle", "paused"), ("waiting", "idle", "waiting")]
+        assert events[4:] == [("live", "live", "ended")]
+        assert after == ["legacy", "paused"] and registry.get_status("live") == "ended"
+        # The other workers run their own reconcile
+        assert shared == []
+
+    def test_transitions_move_the_wedding_in_and_out(self, shared):
+        print("\n🧪 Testing start / pause / resume / stop through refresh()...")
+        db = FakeDatabase(wedding("w1"), wedding("w2", "live"))
+        registry = LiveWeddingRegistry()
+        events = subscribed(registry)
+
+        async def transition(session_status):
+            if session_status:
+                db.put(wedding("w1", session_status))
+            await registry.refresh("w1", db)
+            return live_ids(registry), registry.get_status("w1")
+
+        async def run():
+            await registry.reconcile(db)
+            events.clear()
+            steps = [await transition(s) for s in ("waiting", "live", "paused", "live", "ended")]
+            # Nothing changed since the last refresh
+            steps.append(await transition(None))
+            return steps
+
+        steps = asyncio.run(run())
+        assert steps == [
+            (["w2"], "waiting"),
+            (["w1", "w2"], "live"),
+            (["w1", "w2"], "paused"),
+            (["w1", "w2"], "live"),
+            (["w2"], "ended"),
+            (["w2"], "ended"),
+        ]
+        # Exactly one event per transition, none for the no-op refresh
+        assert events == [
+            ("w1", "idle", "waiting"),
+            ("w1", "waiting", "live"),
+            ("w1", "live", "paused"),
+            ("w1", "paused", "live"),
+            ("w1", "live", "ended"),
+        ]
+        # Ended weddings stay cached for status lookups
+        assert registry.get_snapshot("w1")["live_session"]["status"] == "ended"
+        # Every refresh hands the snapshot to the other workers
+        assert [name for name, _ in shared] == [WORKER_EVENT] * 6
+        assert shared[1][1]["wedding"]["live_session"]["status"] == "live"
+        print(f"✅ {len(events)} events for {len(steps)} refreshes")
+
+    def test_deleted_wedding_is_removed_once(self, shared):
+        db = FakeDatabase(wedding("w1", "live"))
+        registry = LiveWeddingRegistry()
+        events = subscribed(registry)
+        failing = []
+
+        async def broken(event):
+            failing.append(event)
+            raise RuntimeError("subscriber bug")
+
+        registry.subscribe(broken)
+
+        async def run():
+            await registry.refresh("w1", db)
+            del db.weddings.docs["w1"]
+            await registry.refresh("w1", db)
+            # Already gone: no event
+            await registry.remove("w1")
+
+        asyncio.run(run())
+        assert events == [("w1", "idle", "live"), ("w1", "live", "idle")]
+        # A failing subscriber does not stop the others, or the registry
+        assert len(failing) == 2
+        assert registry.get_snapshot("w1") is None and live_ids(registry) == []
+        assert [(data["wedding"] or {}).get("id") for _, data in shared] == ["w1", None, None]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Test Suite for Live Reaction Aggregation
+Checks that a burst of emoji taps goes out as a few {emoji: count} batches
+per room, that per-sid rate caps hold, and - against MongoDB (skipped when
+none is reachable at MONGODB_URI) - that the persisted per-minute rollups
+add up, are picked up by the analytics rollup job and are kept in
+reactions_count by counter reconciliation.
+"""
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import socket_service
+from app.services.analytics_service import floor_time
+from app.services.reaction_aggregator import ROLLUPS_COLLECTION, ReactionAggregator, valid_emoji
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    emitted = []
+
+    async def emit(event, data, room=None, **kwargs):
+        emitted.append((time.monotonic(), event, room, data))
+
+    monkeypatch.setattr(socket_service.sio, "emit", emit)
+    return emitted
+
+
+class TestReactionBatching:
+    """Windowed batches and rate caps"""
+
+    def test_burst_is_batched(self, batches):
+        print("\n🧪 Testing reaction batching under a tap burst...")
+        aggregator = ReactionAggregator(window_ms=100, rate_per_second=20, burst=20)
+        emojis = ["❤️", "😍", "🎉", "👏"]
+
+        async def run():
+            # 200 guests tapping for ~0.5s, two rooms
+            results = []
+            for step in range(25):
+                for guest in range(200):
+                    results.append(aggregator.add(f"sid-{guest}", f"w{guest % 2}", emojis[(guest + step) % 4]))
+                await asyncio.sleep(0.02)
+            await asyncio.sleep(0.3)
+            return results
+
+        results = asyncio.run(run())
+        accepted = results.count("accepted")
+        assert accepted + results.count("rate_limited") == len(results)
+        assert all(event == "reaction_batch" for _, event, _, _ in batches)
+        assert sum(data["total"] for *_, data in batches) == accepted
+        for room in ("w0", "w1"):
+            times = [t for t, _, r, _ in batches if r == room]
+            assert len(times) <= 8
+            assert min(b - a for a, b in zip(times, times[1:])) >= 0.09
+        assert not aggregator._window_tasks and not aggregator._windows
+        print(f"✅ {len(results)} taps -> {len(batches)} batches ({accepted} accepted)")
+
+    def test_rate_cap_per_sid(self, batches):
+        aggregator = ReactionAggregator(window_ms=50, rate_per_second=10, burst=5)
+
+        async def run():
+            spam = [aggregator.add("spammer", "w1", "❤️") for _ in range(100)]
+            polite = aggregator.add("guest", "w1", "❤️")
+            await asyncio.sleep(0.25)
+            # Tokens refill at rate_per_second
+            refilled = [aggregator.add("spammer", "w1", "❤️") for _ in range(10)]
+            await asyncio.sleep(0.1)
+            return spam, polite, refilled
+
+        spam, polite, refilled = asyncio.run(run())
+        assert spam.count("accepted") == 5
+        assert polite == "accepted"
+        assert 2 <= refilled.count("accepted") <= 3
+        assert aggregator.stats["rate_limited"] == 95 + refilled.count("rate_limited")
+        assert sum(data["reactions"].get("❤️", 0) for *_, data in batches) == 6 + refilled.count("accepted")
+
+    def test_rejects_unsafe_emoji(self, batches):
+        assert valid_emoji("👨‍👩‍👧‍👦") and valid_emoji("❤️")
+        for emoji in ("", "a.b", "$inc", "x" * 40, None, 5):
+            assert not valid_emoji(emoji)
+
+        aggregator = ReactionAggregator(window_ms=50, rate_per_second=100, burst=100, max_emoji=2)
+
+        async def run():
+            results = [aggregator.add("sid", "w1", emoji) for emoji in ("a", "b", "c", "a")]
+            await asyncio.sleep(0.1)
+            return results
+
+        assert asyncio.run(run()) == ["accepted", "accepted", "rejected", "accepted"]
+        assert batches[0][3]["reactions"] == {"a": 2, "b": 1}
+
+
+class TestReactionRollups:
+    """Per-minute counts persisted to MongoDB"""
+
+    def test_rollups_persist_and_feed_analytics(self, batches, monkeypatch):
+        motor = pytest.importorskip("motor.motor_asyncio")
+        from app.services.rollup_service import AnalyticsRollupService
+        # Imported late: app.database loads .env, which would change MONGODB_URI for other test modules
+        from app.services import counter_service, storage_service
+        print("\n🧪 Testing persisted reaction rollups against MongoDB...")
+
+        async def run():
+            client = motor.AsyncIOMotorClient(MONGODB_URI, serverSelectionTimeoutMS=2000)
+            try:
+                info = await client.server_info()
+            except Exception:
+                client.close()
+                return None
+            if info["versionArray"][0] < 5:
+                client.close()
+                return None
+            db = client[f"wedlive_reactions_test_{uuid.uuid4().hex[:8]}"]
+            try:
+                await db.weddings.insert_many([{"id": "w1", "reactions_count": 3}, {"id": "w2"}])
+                aggregator = ReactionAggregator(window_ms=50, rate_per_second=1000, burst=1000)
+                aggregator._db = db
+                for i in range(300):
+                    aggregator.add(f"sid-{i % 30}", "w1" if i % 3 else "w2", "❤️" if i % 2 else "🎉")
+                first = await aggregator.flush()
+                for i in range(30):
+                    aggregator.add(f"sid-{i}", "w1", "❤️")
+                await aggregator.flush()
+                await asyncio.sleep(0.1)
+
+                rollups = await db[ROLLUPS_COLLECTION].find({}, {"_id": 0}).to_list(length=None)
+                weddings = {w["id"]: w.get("reactions_count") async for w in db.weddings.find()}
+
+                service = AnalyticsRollupService()
+                service._db = db
+                minute = floor_time(datetime.utcnow(), 60)
+                points = await service.compute_minute_points(minute - timedelta(minutes=2), minute + timedelta(minutes=1))
+                analytics = {wid: sum(p["reactions"] for p in wedding_points) for wid, wedding_points in points.items()}
+
+                # Reconciliation counts REST reactions and socket taps alike
+                monkeypatch.setattr(counter_service, "get_db", lambda: db)
+                monkeypatch.setattr(storage_service, "get_db", lambda: db)
+                await db.reactions.insert_one({"wedding_id": "w2", "emoji": "👏"})
+                await db.weddings.update_many({}, {"$set": {"reactions_count": 0}})
+                await counter_service.CounterService.reconcile_wedding("w1")
+                await counter_service.CounterService.reconcile_all()
+                reconciled = {w["id"]: w.get("reactions_count") async for w in db.weddings.find()}
+                return first, rollups, weddings, analytics, reconciled
+            finally:
+                await client.drop_database(db.name)
+                client.close()
+
+        result = asyncio.run(run())
+        if result is None:
+            pytest.skip(f"MongoDB 5.0+ not reachable at {MONGODB_URI}")
+        first, rollups, weddings, analytics, reconciled = result
+        assert first <= 4
+        by_wedding = {}
+        for doc in rollups:
+            assert doc["total"] == sum(doc["counts"].values())
+            by_wedding[doc["wedding_id"]] = by_wedding.get(doc["wedding_id"], 0) + doc["total"]
+        assert by_wedding == {"w1": 230, "w2": 100}
+        assert weddings == {"w1": 233, "w2": 100}
+        assert analytics == {"w1": 230, "w2": 100}
+        assert reconciled == {"w1": 230, "w2": 101}
+        print(f"✅ 330 taps persisted as {len(rollups)} rollup documents")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Test Suite for the Recent Chat Cache
+Checks that a join burst warms a wedding's ring with one query, that
+messages written during the warm-up or still buffered are not lost, that
+rings are bounded, that other workers' messages arrive as worker events,
+and that socket joins and the chat history endpoint are served from the
+ring - against an in-memory collection that counts queries.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.services import chat_buffer as chat_buffer_module
+from app.services import socket_service
+from app.services.chat_buffer import ChatWriteBuffer, build_chat_message
+from app.services.recent_chat import RecentChatCache
+from app.services.socket_manager import MemoryClientManager, MemoryHub
+
+from tests.test_socket_scaling import FakeServer
+
+
+class FakeCursor:
+    def __init__(self, collection, query):
+        self.collection = collection
+        self.query = query
+        self._sort = []
+        self._skip = 0
+        self._limit = None
+
+    def sort(self, keys):
+        self._sort = keys
+        return self
+
+    def skip(self, count):
+        self._skip = count
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    async def to_list(self, length=None):
+        self.collection.queries += 1
+        if self.collection.gate is not None:
+            await self.collection.gate.wait()
+        docs = [doc for doc in self.collection.docs if doc["wedding_id"] == self.query["wedding_id"]]
+        docs.sort(key=lambda doc: (doc["created_at"], doc["_id"]), reverse=True)
+        return docs[self._skip:][:self._limit]
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.queries = 0
+        self.gate = None
+
+    def find(self, query):
+        return FakeCursor(self, query)
+
+
+class FakeDatabase:
+    def __init__(self, docs=()):
+        self.chat_messages = FakeCollection(docs)
+
+
+def stored_messages(wedding_id, count, start=datetime(2025, 6, 14, 18, 0)):
+    return [
+        {
+            "_id": ObjectId(), "id": f"{wedding_id}-{i}", "wedding_id": wedding_id, "user_id": None,
+            "guest_name": "Guest", "message": f"stored {i}", "created_at": start + timedelta(seconds=i),
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def empty_chat_buffer(monkeypatch):
+    buffer = ChatWriteBuffer(flush_interval=60)
+    monkeypatch.setattr(chat_buffer_module, "chat_buffer", buffer)
+    return buffer
+
+
+class TestRecentChatCache:
+    """Warm-up, ordering and bounds of the rings"""
+
+    def test_join_burst_warms_once(self, empty_chat_buffer):
+        print("\n🧪 Testing a join burst shares one warm-up query...")
+        db = FakeDatabase(stored_messages("w1", 250))
+        cache = RecentChatCache(size=100)
+        cache._db = db
+
+        async def run():
+            db.chat_messages.gate = asyncio.Event()
+            joins = [asyncio.ensure_future(cache.recent("w1")) for _ in range(300)]
+            await asyncio.sleep(0)
+            # Written while the query runs, and still buffered
+            late = build_chat_message("w1", "during warm-up")
+            await empty_chat_buffer.add(late)
+            cache.append(late)
+            db.chat_messages.gate.set()
+            results = await asyncio.gather(*joins)
+            again = await cache.recent("w1")
+            return results, again
+
+        results, again = asyncio.run(run())
+        assert db.chat_messages.queries == 1
+        assert all(result == results[0] for result in results)
+        assert [doc["message"] for doc in results[0]][-2:] == ["stored 249", "during warm-up"]
+        assert len(results[0]) == 100 and results[0][0]["message"] == "stored 151"
+        assert again == results[0] and cache.stats["hits"] == 1
+        print(f"✅ 300 joins, {db.chat_messages.queries} query")
+
+    def test_buffered_messages_and_late_appends(self, empty_chat_buffer):
+        db = FakeDatabase(stored_messages("w1", 3))
+        cache = RecentChatCache(size=5)
+        cache._db = db
+
+        async def run():
+            pending = build_chat_message("w1", "buffered")
+            await empty_chat_buffer.add(pending)
+            warmed = await cache.recent("w1")
+            # Another worker's message sent a moment before the newest one
+            earlier = {**build_chat_message("w1", "from another worker"),
+                       "created_at": pending["created_at"] - timedelta(milliseconds=1)}
+            cache.append(earlier)
+            for i in range(3):
+                cache.append(build_chat_message("w1", f"new {i}"))
+            return warmed, await cache.recent("w1")
+
+        warmed, after = asyncio.run(run())
+        assert [doc["message"] for doc in warmed] == ["stored 0", "stored 1", "stored 2", "buffered"]
+        assert [doc["message"] for doc in after] == ["from another worker", "buffered", "new 0", "new 1", "new 2"]
+
+    def test_rings_are_bounded(self, empty_chat_buffer):
+        db = FakeDatabase([doc for i in range(5) for doc in stored_messages(f"w{i}", 3)])
+        cache = RecentChatCache(size=10, max_weddings=3)
+        cache._db = db
+
+        async def run():
+            for i in range(5):
+                await cache.recent(f"w{i}")
+            await cache.recent("w2")
+            await cache.recent("w0")
+
+        asyncio.run(run())
+        assert list(cache._rings) == ["w4", "w2", "w0"]
+        assert cache.stats["evictions"] == 3
+        # Appends to an evicted wedding wait for its next warm-up
+        cache.append(build_chat_message("w1", "ignored"))
+        assert "w1" not in cache._rings
+
+    def test_other_workers_messages_arrive(self, empty_chat_buffer):
+        async def run():
+            hub = MemoryHub()
+            managers = [MemoryClientManager(hub=hub, channel="chat-test") for _ in range(2)]
+            caches = [RecentChatCache(size=10) for _ in managers]
+            for manager, cache in zip(managers, caches):
+                cache._db = FakeDatabase()
+                manager.set_server(FakeServer())
+                manager.initialize()
+                manager.on_worker_event("chat_message", cache.append)
+                await cache.recent("w1")
+            message = build_chat_message("w1", "hello from worker 0")
+            caches[0].append(message)
+            await managers[0].publish_worker_event("chat_message", message)
+            await asyncio.sleep(0.05)
+            rings = [await cache.recent("w1") for cache in caches]
+            for manager in managers:
+                for task in manager.server.tasks:
+                    task.cancel()
+            return rings
+
+        rings = asyncio.run(run())
+        assert [[doc["message"] for doc in ring] for ring in rings] == [["hello from worker 0"]] * 2
+
+
+class TestRecentChatServing:
+    """Socket joins and REST history from the ring"""
+
+    def test_join_and_history_use_the_ring(self, monkeypatch, empty_chat_buffer):
+        from app import database
+        from app.routes.chat import get_chat_messages
+
+        emitted = []
+
+        async def emit(event, data, **kwargs):
+            emitted.append((event, data, kwargs))
+
+        async def noop(*args, **kwargs):
+            return None
+
+        db = FakeDatabase(stored_messages("w1", 150))
+        cache = RecentChatCache(size=100)
+        cache._db = db
+        monkeypatch.setattr(database.db_instance, "db", db)
+        monkeypatch.setattr(socket_service, "recent_chat", cache)
+        monkeypatch.setattr("app.routes.chat.recent_chat", cache)
+        monkeypatch.setattr(socket_service.sio, "emit", emit)
+        monkeypatch.setattr(socket_service.sio, "enter_room", noop)
+        for name in ("active_viewers", "viewer_rooms", "viewer_info", "viewer_count_tasks"):
+            monkeypatch.setattr(socket_service, name, {})
+        monkeypatch.setattr(socket_service, "viewer_count_dirty", set())
+
+        async def run():
+            for i in range(50):
+                await socket_service.join_wedding(f"sid-{i}", {"wedding_id": "w1"})
+            newest = await get_chat_messages("w1", limit=20, offset=0)
+            page = await get_chat_messages("w1", limit=50, offset=50)
+            queries_from_ring = db.chat_messages.queries
+            older = await get_chat_messages("w1", limit=50, offset=100)
+            return newest, page, older, queries_from_ring
+
+        newest, page, older, queries_from_ring = asyncio.run(run())
+        histories = [data for event, data, kwargs in emitted if event == "chat_history"]
+        assert len(histories) == 50
+        assert [m["message"] for m in histories[0]["messages"]] == [f"stored {i}" for i in range(50, 150)]
+        assert queries_from_ring == 1
+        assert [m.message for m in newest] == [f"stored {i}" for i in range(149, 129, -1)]
+        assert [m.message for m in page] == [f"stored {i}" for i in range(99, 49, -1)]
+        # Past the ring: MongoDB
+        assert [m.message for m in older] == [f"stored {i}" for i in range(49, -1, -1)]
+        assert db.chat_messages.queries == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
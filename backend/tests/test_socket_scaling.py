@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Test Suite for Multi-Worker Socket.IO
+Checks the Redis-compatible pub/sub broker, the backend picked for each
+message queue URL, cluster-wide viewer counts (also through
+AsyncRedisManager when the `redis` package is installed),
+coalesced viewer_count/viewer_joined broadcasts and - with two uvicorn worker processes
+sharing a broker - that room broadcasts reach the clients of every worker
+and that viewer counts add up across workers (and age out when a worker
+dies).
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import pytest
+import socketio
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+from app.services import socket_manager
+from app.services.socket_manager import (
+    LocalClientManager, MemoryClientManager, MemoryHub, PubSubBroker, RedisClientManager,
+    RespClientManager, ViewerPresenceMixin, create_client_manager, encode_command, read_reply
+)
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKER_CODE = (
+    "import os, socketio, uvicorn\n"
+    "from app.services.socket_service import sio\n"
+    "uvicorn.run(socketio.ASGIApp(sio), host='127.0.0.1', port=int(os.environ['PORT']), log_level='warning')\n"
+)
+
+
+class FakeServer:
+    """Just enough of AsyncServer for a manager's background tasks"""
+
+    def __init__(self):
+        self.tasks = []
+        self.logger = logging.getLogger(__name__)
+
+    def start_background_task(self, target, *args, **kwargs):
+        task = asyncio.ensure_future(target(*args, **kwargs))
+        self.tasks.append(task)
+        return task
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TestPubSubBroker:
+    """Redis pub/sub semantics of the stand-in broker"""
+
+    def test_publish_subscribe(self):
+        async def run():
+            broker = PubSubBroker()
+            await broker.start(port=0)
+            try:
+                sub_reader, sub_writer = await asyncio.open_connection("127.0.0.1", broker.port)
+                sub_writer.write(encode_command("SUBSCRIBE", "room"))
+                subscribed = await read_reply(sub_reader)
+                pub_reader, pub_writer = await asyncio.open_connection("127.0.0.1", broker.port)
+                pub_writer.write(encode_command("PUBLISH", "room", b"\x00payload\r\n"))
+                receivers = await read_reply(pub_reader)
+                message = await read_reply(sub_reader)
+                pub_writer.write(encode_command("PUBLISH", "other", "x"))
+                nobody = await read_reply(pub_reader)
+                for writer in (sub_writer, pub_writer):
+                    writer.close()
+                return subscribed, receivers, message, nobody
+            finally:
+                await broker.stop()
+
+        subscribed, receivers, message, nobody = asyncio.run(run())
+        assert subscribed == [b"subscribe", b"room", 1]
+        assert receivers == 1 and nobody == 0
+        assert message == [b"message", b"room", b"\x00payload\r\n"]
+
+
+class TestViewerPresence:
+    """Viewer counts shared between managers"""
+
+    def test_counts_add_up_and_expire(self, monkeypatch):
+        monkeypatch.setattr(socket_manager, "PRESENCE_INTERVAL_SECONDS", 0.1)
+
+        async def run():
+            hub = MemoryHub()
+            managers = [MemoryClientManager(hub=hub, channel="test") for _ in range(3)]
+            for manager in managers:
+                manager.set_server(FakeServer())
+                manager.initialize()
+            await managers[0].update_viewer_count("w1", 5)
+            await managers[1].update_viewer_count("w1", 2)
+            await managers[2].update_viewer_count("w2", 1)
+            await asyncio.sleep(0.05)
+            counts = [(m.viewer_count("w1"), m.viewer_count("w2")) for m in managers]
+
+            # A manager that started late learns the others' counts on subscribing
+            late = MemoryClientManager(hub=hub, channel="test")
+            late.set_server(FakeServer())
+            late.initialize()
+            await asyncio.sleep(0.05)
+            late_count = late.viewer_count("w1")
+
+            # A worker that stops publishing ages out after three intervals
+            for task in managers[1].server.tasks:
+                task.cancel()
+            hub.channels["test"].remove(managers[1]._queue)
+            await asyncio.sleep(0.5)
+            after = managers[0].viewer_count("w1")
+
+            for manager in [*managers, late]:
+                for task in manager.server.tasks:
+                    task.cancel()
+            return counts, late_count, after
+
+        counts, late_count, after = asyncio.run(run())
+        assert counts == [(7, 1)] * 3
+        assert late_count == 7
+        assert after == 5
+
+    def test_backend_per_url(self):
+        assert isinstance(create_client_manager(""), LocalClientManager)
+        assert isinstance(create_client_manager("memory://"), MemoryClientManager)
+        assert isinstance(create_client_manager("unix:///tmp/wedlive-socketio.sock"), RespClientManager)
+
+        class NoListener(ViewerPresenceMixin, AsyncPubSubManager):
+            async def _publish(self, data):
+                pass
+
+        # A backend has to say how it receives messages
+        with pytest.raises(TypeError):
+            NoListener()
+
+    @pytest.mark.skipif(redis is None, reason="redis package not installed")
+    def test_redis_manager_counts(self):
+        async def run():
+            # The broker stands in for Redis
+            broker = PubSubBroker()
+            await broker.start(port=0)
+            managers = [create_client_manager(broker.url) for _ in range(2)]
+            try:
+                for manager in managers:
+                    manager.set_server(FakeServer())
+                    manager.initialize()
+                await asyncio.sleep(0.2)
+                await managers[0].update_viewer_count("w1", 3)
+                await managers[1].update_viewer_count("w1", 4)
+                received = []
+                managers[1].on_worker_event("ping", received.append)
+                await managers[0].publish_worker_event("ping", {"n": 1})
+                await asyncio.sleep(0.2)
+                return managers, [m.viewer_count("w1") for m in managers], received
+            finally:
+                for manager in managers:
+                    for task in manager.server.tasks:
+                        task.cancel()
+                    await manager.redis.aclose()
+                await broker.stop()
+
+        managers, counts, received = asyncio.run(run())
+        assert all(isinstance(m, RedisClientManager) for m in managers)
+        assert counts == [7, 7]
+        assert received == [{"n": 1}]
+
+
+class TestViewerIndex:
+    """sid -> weddings reverse index kept by the socket handlers"""
+
+    def test_join_leave_disconnect(self, monkeypatch):
+        from app.services import socket_service
+        emitted = []
+
+        async def emit(event, data, **kwargs):
+            emitted.append((event, data))
+
+        async def noop(*args, **kwargs):
+            return None
+
+        monkeypatch.setattr(socket_service.sio, "emit", emit)
+        monkeypatch.setattr(socket_service.sio, "enter_room", noop)
+        monkeypatch.setattr(socket_service.sio, "leave_room", noop)
+        for name in ("active_viewers", "viewer_rooms", "viewer_info", "viewer_count_tasks", "viewer_joins"):
+            monkeypatch.setattr(socket_service, name, {})
+        monkeypatch.setattr(socket_service, "viewer_count_dirty", set())
+        monkeypatch.setattr(socket_service, "VIEWER_COUNT_INTERVAL_SECONDS", 0)
+
+        async def run():
+            await socket_service.join_wedding("a", {"wedding_id": "w1", "guest_name": "Ann"})
+            await socket_service.join_wedding("a", {"wedding_id": "w2"})
+            await socket_service.join_wedding("b", {"wedding_id": "w1"})
+            await socket_service.leave_wedding("a", {"wedding_id": "w2"})
+            await asyncio.sleep(0.01)
+            assert socket_service.viewer_rooms == {"a": {"w1"}, "b": {"w1"}}
+            assert "w2" not in socket_service.active_viewers
+            assert socket_service.viewer_info["b"]["guest_name"] == "Anonymous"
+            emitted.clear()
+            await socket_service.disconnect("a")
+            await asyncio.sleep(0.01)
+
+        asyncio.run(run())
+        assert socket_service.active_viewers == {"w1": {"b"}}
+        assert "a" not in socket_service.viewer_rooms and "a" not in socket_service.viewer_info
+        # Only the wedding the sid was in hears about it
+        assert emitted == [("viewer_count", {"wedding_id": "w1", "count": 1})]
+
+
+class TestViewerCountThrottle:
+    """Coalesced viewer_count and viewer_joined broadcasts"""
+
+    def test_join_burst(self, monkeypatch):
+        from app.services import socket_service
+        print("\n🧪 Testing viewer_count coalescing under a join burst...")
+        interval = 0.1
+        broadcasts = []
+        # Every emit to the room: (event, data, one message per viewer in the room)
+        room_emits = []
+
+        async def emit(event, data, room=None, **kwargs):
+            if room is None:
+                return
+            size = len(socket_service.active_viewers.get(room, ())) - (1 if kwargs.get("skip_sid") else 0)
+            room_emits.append((event, data, size))
+            if event == "viewer_count":
+                broadcasts.append((time.monotonic(), data["count"], size))
+
+        async def noop(*args, **kwargs):
+            return None
+
+        monkeypatch.setattr(socket_service.sio, "emit", emit)
+        monkeypatch.setattr(socket_service.sio, "enter_room", noop)
+        monkeypatch.setattr(socket_service.sio, "leave_room", noop)
+        for name in ("active_viewers", "viewer_rooms", "viewer_info", "viewer_count_tasks", "viewer_joins"):
+            monkeypatch.setattr(socket_service, name, {})
+        monkeypatch.setattr(socket_service, "viewer_count_dirty", set())
+        monkeypatch.setattr(socket_service, "VIEWER_COUNT_INTERVAL_SECONDS", interval)
+
+        viewers = 300
+
+        async def run():
+            # 300 viewers join over ~0.5s, then a few leave
+            for i in range(viewers):
+                await socket_service.join_wedding(f"sid-{i}", {"wedding_id": "w1"})
+                if i % 10 == 9:
+                    await asyncio.sleep(0.015)
+            for i in range(5):
+                await socket_service.leave_wedding(f"sid-{i}", {"wedding_id": "w1"})
+            await asyncio.sleep(3 * interval)
+            return socket_service.viewer_count_tasks
+
+        pending = asyncio.run(run())
+        # Unthrottled, each join sends viewer_count and viewer_joined to the room and each leave viewer_count
+        unthrottled = 2 * sum(range(1, viewers + 1)) + sum(range(viewers - 1, viewers - 6, -1))
+        delivered = sum(size for _, _, size in room_emits)
+        joined = [data for event, data, _ in room_emits if event == "viewer_joined"]
+        gaps = [b[0] - a[0] for a, b in zip(broadcasts, broadcasts[1:])]
+        assert {event for event, _, _ in room_emits} == {"viewer_count", "viewer_joined"}
+        assert broadcasts[-1][1] == viewers - 5, "trailing edge must carry the latest count"
+        assert min(gaps) >= interval * 0.9
+        assert len(joined) <= len(broadcasts) and sum(data["joined"] for data in joined) == viewers
+        assert delivered * 10 < unthrottled
+        assert not pending and not socket_service.viewer_joins
+        print(f"✅ {len(room_emits)} broadcasts / {delivered} messages instead of "
+              f"{2 * viewers + 5} / {unthrottled}")
+
+
+class TestMultipleWorkers:
+    """Two uvicorn worker processes sharing one broker"""
+
+    def test_broadcasts_and_counts_span_workers(self):
+        print("\n🧪 Testing Socket.IO across two worker processes...")
+
+        async def connect(port):
+            client = socketio.AsyncClient(reconnection=False)
+            received = {"viewer_count": [], "reaction_batch": []}
+            for event in received:
+                client.on(event, (lambda name: lambda data: received[name].append(data))(event))
+            deadline = time.monotonic() + 20
+            while True:
+                try:
+                    await client.connect(f"http://127.0.0.1:{port}", transports=["polling"])
+                    return client, received
+                except socketio.exceptions.ConnectionError:
+                    if time.monotonic() > deadline:
+                        raise
+                    await asyncio.sleep(0.2)
+
+        async def eventually(check, timeout=5):
+            deadline = time.monotonic() + timeout
+            while not check():
+                if time.monotonic() > deadline:
+                    return False
+                await asyncio.sleep(0.05)
+            return True
+
+        async def run(socket_path):
+            broker = PubSubBroker()
+            await broker.start(path=socket_path)
+            ports = [free_port(), free_port()]
+            env = {
+                **os.environ,
+                "SOCKETIO_MESSAGE_QUEUE": broker.url,
+                "SOCKETIO_PRESENCE_INTERVAL_SECONDS": "0.5",
+                "PYTHONPATH": BACKEND_DIR,
+            }
+            workers = [
+                subprocess.Popen(
+                    [sys.executable, "-c", WORKER_CODE], cwd=BACKEND_DIR, env={**env, "PORT": str(port)},
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+                for port in ports
+            ]
+            clients = []
+            try:
+                a1, a1_events = await connect(ports[0])
+                b1, b1_events = await connect(ports[1])
+                b2, _ = await connect(ports[1])
+                clients += [a1, b1, b2]
+                join = {"wedding_id": "wedding-1", "guest_name": "Guest"}
+
+                first = await a1.call("join_wedding", join)
+                await asyncio.sleep(0.3)
+                second = await b1.call("join_wedding", join)
+                await asyncio.sleep(0.3)
+                third = await b2.call("join_wedding", join)
+                # Worker 2's join is broadcast to worker 1's client too
+                saw_three = await eventually(lambda: any(e["count"] == 3 for e in a1_events["viewer_count"]))
+
+                await a1.emit("send_reaction", {"wedding_id": "wedding-1", "emoji": "❤️"})
+                reaction_crossed = await eventually(lambda: b1_events["reaction_batch"])
+
+                # Killing worker 2 drops its two viewers once its counts expire (3 x 0.5s)
+                workers[1].send_signal(signal.SIGKILL)
+                workers[1].wait()
+                await asyncio.sleep(2)
+                a2, _ = await connect(ports[0])
+                clients.append(a2)
+                after_crash = await a2.call("join_wedding", join)
+                return first, second, third, saw_three, reaction_crossed, after_crash
+            finally:
+                # Graceful shutdown would wait for the clients' pending long-polls
+                for worker in workers:
+                    if worker.poll() is None:
+                        worker.kill()
+                        worker.wait()
+                for client in clients:
+                    for task in (client.eio.read_loop_task, client.eio.write_loop_task):
+                        if task:
+                            task.cancel()
+                    await client.eio.disconnect(abort=True)
+                await broker.stop()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            first, second, third, saw_three, reaction_crossed, after_crash = asyncio.run(
+                run(os.path.join(tmp, "broker.sock"))
+            )
+        assert [first["viewer_count"], second["viewer_count"], third["viewer_count"]] == [1, 2, 3]
+        assert saw_three, "viewer_count from worker 2 did not reach worker 1's client"
+        assert reaction_crossed, "reaction sent on worker 1 did not reach worker 2's client"
+        assert after_crash["viewer_count"] == 2
+        print("✅ Broadcasts and viewer counts span both workers")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test Suite for Unique Viewer Sketches
+Checks the HyperLogLog sketch (exact mode, error bound, merges,
+serialization) and, against MongoDB (skipped when none is reachable at
+MONGODB_URI), that the sketches maintained by the rollup job agree with
+an exact distinct count and survive a replayed window.
+"""
+import asyncio
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.utils.hyperloglog import EXACT_LIMIT, HyperLogLog
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+
+
+class TestHyperLogLog:
+    """Sketch accuracy and merge semantics"""
+
+    def test_exact_for_small_sets(self):
+        sketch = HyperLogLog.of(f"user:{i % 700}" for i in range(5000))
+        assert sketch.is_exact and sketch.count() == 700 and sketch.relative_error == 0
+        sketch.add("user:new")
+        assert sketch.count() == 701
+
+    def test_error_bound(self):
+        print("\n🧪 Testing HyperLogLog error bound...")
+        for n in (EXACT_LIMIT + 1, 5000, 30000, 60000, 200000):
+            sketch = HyperLogLog.of(f"viewer-{n}-{i}" for i in range(n))
+            assert not sketch.is_exact
+            error = abs(sketch.count() - n) / n
+            # Well within four standard errors
+            assert error < 4 * 0.011, (n, sketch.count())
+            print(f"✅ {n} viewers estimated as {sketch.count()} ({error:.2%})")
+
+    def test_merge_is_union_and_idempotent(self):
+        a = HyperLogLog.of(f"v{i}" for i in range(20000))
+        b = HyperLogLog.of(f"v{i}" for i in range(10000, 40000))
+        union = HyperLogLog.of(f"v{i}" for i in range(40000))
+        merged = HyperLogLog.from_bytes(a.to_bytes()).merge(b)
+        assert merged.count() == union.count()
+        assert merged.merge(b).merge(a).count() == union.count()
+
+        small = HyperLogLog.of(["x", "y"])
+        small.merge(HyperLogLog.of(["y", "z"]))
+        assert small.is_exact and small.count() == 3
+        with pytest.raises(ValueError):
+            small.merge(HyperLogLog(precision=12))
+
+    def test_serialization(self):
+        exact = HyperLogLog.of(f"v{i}" for i in range(100))
+        dense = HyperLogLog.of(f"v{i}" for i in range(50000))
+        assert len(exact.to_bytes()) == 2 + 8 * 100
+        assert len(dense.to_bytes()) < 16 * 1024
+        for sketch in (exact, dense):
+            restored = HyperLogLog.from_bytes(sketch.to_bytes())
+            assert restored.count() == sketch.count() and restored.is_exact == sketch.is_exact
+        with pytest.raises(ValueError):
+            HyperLogLog.from_bytes(b"\x07")
+
+
+class TestUniqueViewerSketches:
+    """Sketches maintained by the rollup job"""
+
+    def test_sketches_match_exact_counts(self):
+        motor = pytest.importorskip("motor.motor_asyncio")
+        from app.services.rollup_service import AnalyticsRollupService
+        from app.services.unique_viewers_service import STATE_COLLECTION, STATE_ID
+        print("\n🧪 Testing unique-viewer sketches against MongoDB...")
+
+        async def run():
+            client = motor.AsyncIOMotorClient(MONGODB_URI, serverSelectionTimeoutMS=2000)
+            try:
+                info = await client.server_info()
+            except Exception:
+                client.close()
+                return None
+            if info["versionArray"][0] < 5:
+                client.close()
+                return None
+            db = client[f"wedlive_unique_test_{uuid.uuid4().hex[:8]}"]
+            try:
+                rng = random.Random(5)
+                start = datetime(2025, 6, 14, 12)
+                await db.weddings.insert_many([{"id": f"w{i}", "creator_id": f"c{i % 2}"} for i in range(4)])
+                sessions = []
+                for _ in range(6000):
+                    join = start + timedelta(seconds=rng.uniform(0, 5 * 3600))
+                    sessions.append({
+                        "wedding_id": f"w{rng.randint(0, 3)}",
+                        "session_id": str(uuid.uuid4()),
+                        "user_id": f"u{rng.randint(0, 2500)}" if rng.random() < 0.6 else None,
+                        "ip_address": f"10.0.0.{rng.randint(0, 255)}" if rng.random() < 0.8 else None,
+                        "user_agent": rng.choice(["desktop", "phone"]),
+                        "join_time": join,
+                        "leave_time": join + timedelta(minutes=rng.uniform(1, 90)),
+                    })
+                await db.viewer_sessions.insert_many(sessions)
+
+                service = AnalyticsRollupService()
+                service._db = db
+                await service.ensure_collection()
+                now = start + timedelta(hours=6)
+                await service.run_once(now=now, max_chunks=None)
+                unique = service.unique
+
+                results = {}
+                for scope, key, wedding_ids in (
+                    ("wedding", "w1", ["w1"]), ("creator", "c0", ["w0", "w2"]), ("platform", "all", None)
+                ):
+                    sketch = await unique.get_unique_viewers(scope, key, now=now)
+                    results[scope] = (sketch["unique_viewers"], await unique.count_exact(wedding_ids))
+                window = (start + timedelta(hours=1), start + timedelta(hours=2))
+                ranged = await unique.get_unique_viewers("wedding", "w1", *window, now=now)
+                results["range"] = (ranged["unique_viewers"], await unique.count_exact(["w1"], *window))
+
+                # Replaying every window merges the same viewers again
+                await db[STATE_COLLECTION].update_one({"_id": STATE_ID}, {"$unset": {"unique_hwm": ""}})
+                await service.unique.run_once(now, None)
+                replayed = (await unique.get_unique_viewers("platform", "all", now=now))["unique_viewers"]
+                return results, replayed
+            finally:
+                await client.drop_database(db.name)
+                client.close()
+
+        result = asyncio.run(run())
+        if result is None:
+            pytest.skip(f"MongoDB 5.0+ not reachable at {MONGODB_URI}")
+        results, replayed = result
+        for scope, (estimate, exact) in results.items():
+            assert abs(estimate - exact) <= max(1, 0.04 * exact), (scope, estimate, exact)
+            print(f"✅ {scope}: sketch {estimate}, exact {exact}")
+        assert replayed == results["platform"][0]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
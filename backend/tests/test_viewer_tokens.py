@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test Suite for Viewer Tokens
+Checks that locally minted tokens are valid LiveKit grants with one
+identity per viewer; that without LiveKit keys every join gets a Pulse
+token for its own identity and metadata, repeated requests for one
+identity sharing a mint; and that where Pulse issues shared tokens a surge
+of joins costs one Pulse mint per wedding (single-flight), cached tokens
+are renewed in the background before they expire, and a failed mint is
+retried.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+
+from app.services.viewer_tokens import ViewerTokenService
+
+
+class FakePulse:
+    """generate_stream_token with latency and a call counter"""
+
+    livekit_url = "wss://livekit.test"
+
+    def __init__(self, lifetime=timedelta(hours=24), latency=0.05, failures=0):
+        self.lifetime = lifetime
+        self.latency = latency
+        self.failures = failures
+        self.calls = 0
+        self.requests = []
+
+    async def generate_stream_token(self, room_name, participant_name, participant_id, **kwargs):
+        self.calls += 1
+        self.requests.append({"room_name": room_name, "participant_id": participant_id, **kwargs})
+        call = self.calls
+        await asyncio.sleep(self.latency)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("Pulse API error: 503")
+        return {
+            "token": f"pulse-token-{call}",
+            "server_url": self.livekit_url,
+            "expires_at": (datetime.now(timezone.utc) + self.lifetime).isoformat(),
+            "room_name": room_name,
+            "participant_name": participant_name,
+        }
+
+
+async def join(service, room_name="wedding_w1", joins=1):
+    return await asyncio.gather(*(service.get_token(room_name, participant_name=f"Guest {i}")
+                                  for i in range(joins)))
+
+
+class TestViewerTokens:
+    """Local minting, per-join Pulse tokens and the shared, single-flight Pulse path"""
+
+    def test_local_tokens_are_livekit_grants(self):
+        pulse = FakePulse()
+        service = ViewerTokenService(api_key="APIkey", api_secret="secret", ttl=3600, pulse=pulse)
+        tokens = asyncio.run(join(service, joins=3))
+
+        claims = jwt.decode(tokens[0]["token"], "secret", algorithms=["HS256"])
+        assert claims["iss"] == "APIkey" and claims["sub"] == tokens[0]["participant_id"]
+        assert claims["exp"] - claims["nbf"] == 3600
+        assert claims["video"] == {"room": "wedding_w1", "roomJoin": True, "canPublish": False,
+                                   "canSubscribe": True, "canPublishData": True}
+        assert json.loads(claims["metadata"]) == {"role": "viewer"}
+        assert len({t["participant_id"] for t in tokens}) == 3
+        assert tokens[0]["server_url"] == "wss://livekit.test" and pulse.calls == 0
+
+    def test_pulse_tokens_are_bound_to_each_viewer(self):
+        print("\n🧪 Testing 100 joins without LiveKit keys...")
+        pulse = FakePulse(latency=0.01)
+        service = ViewerTokenService(api_key="", api_secret="", shared=False, pulse=pulse)
+
+        async def run():
+            tokens = await join(service, joins=100)
+            # A client retrying while its first request is in flight
+            repeated = await asyncio.gather(*(
+                service.get_token("wedding_w1", participant_id="viewer_u1_ab", metadata={"user_id": "u1"})
+                for _ in range(3)
+            ))
+            return tokens, repeated
+
+        tokens, repeated = asyncio.run(run())
+        # No viewer's identity is shared, so none is kicked by the next join
+        assert len({t["participant_id"] for t in tokens}) == len({t["token"] for t in tokens}) == 100
+        assert pulse.calls == 101 and service._cache == {}
+        assert {t["participant_id"] for t in repeated} == {"viewer_u1_ab"} and service.stats["coalesced"] == 2
+        assert pulse.requests[-1]["participant_id"] == "viewer_u1_ab"
+        assert pulse.requests[-1]["metadata"] == {"role": "viewer", "user_id": "u1"}
+        print(f"✅ 100 joins, {len({t['participant_id'] for t in tokens})} identities")
+
+    def test_join_surge_mints_once_per_wedding(self):
+        print("\n🧪 Testing 1,000 simultaneous joins across 2 weddings...")
+        pulse = FakePulse()
+        service = ViewerTokenService(api_key="", api_secret="", shared=True, pulse=pulse)
+
+        async def run():
+            return await asyncio.gather(join(service, "wedding_w1", 500), join(service, "wedding_w2", 500))
+
+        w1, w2 = asyncio.run(run())
+        assert pulse.calls == 2
+        assert len({t["token"] for t in w1}) == len({t["token"] for t in w2}) == 1
+        assert w1[0]["token"] != w2[0]["token"]
+        assert w1[0]["participant_id"] is None and pulse.requests[0]["participant_id"] is None
+        assert service.stats["coalesced"] == 998
+        print(f"✅ 1,000 joins, {pulse.calls} Pulse calls")
+
+    def test_tokens_renewed_before_expiry(self):
+        # Refresh due after half of a 2 s lifetime
+        pulse = FakePulse(lifetime=timedelta(seconds=2), latency=0.01)
+        service = ViewerTokenService(api_key="", api_secret="", refresh_margin=300, shared=True, pulse=pulse)
+
+        async def run():
+            first = (await join(service))[0]
+            cached = (await join(service, joins=10))[0]
+            await asyncio.sleep(1.1)
+            # Due for renewal: still served, renewed in the background
+            during = (await join(service, joins=10))[0]
+            await asyncio.sleep(0.05)
+            renewed = (await join(service))[0]
+            return first, cached, during, renewed
+
+        first, cached, during, renewed = asyncio.run(run())
+        assert first["token"] == cached["token"] == during["token"] == "pulse-token-1"
+        assert renewed["token"] == "pulse-token-2" and pulse.calls == 2
+
+    def test_failed_mint_is_retried(self):
+        pulse = FakePulse(latency=0.01, failures=1)
+        service = ViewerTokenService(api_key="", api_secret="", shared=True, pulse=pulse)
+
+        async def run():
+            failed = await asyncio.gather(*(service.get_token("wedding_w1") for _ in range(20)),
+                                          return_exceptions=True)
+            return failed, await service.get_token("wedding_w1")
+
+        failed, retried = asyncio.run(run())
+        # Every waiter of the failed mint sees its error; the next join mints again
+        assert all(isinstance(result, RuntimeError) for result in failed)
+        assert retried["token"] == "pulse-token-2" and pulse.calls == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Test Suite for Wedding Event Streams (SSE)
+Checks that one live status transition fans out to every subscriber
+without per-subscriber reads, that a client reconnecting with
+Last-Event-ID gets exactly the events it missed (or a fresh snapshot when
+they are gone), that idle streams get heartbeats, that a backed-up
+subscriber is disconnected, that events two workers publish in the same
+millisecond both arrive, that a transition seen by two workers is
+announced once, and that a registry transition on one worker reaches the
+other workers' registries without waiting for their reconcile.
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.services import socket_service
+from app.services.live_registry import LiveWeddingRegistry
+from app.services import wedding_events
+from app.services.wedding_events import WeddingEventBroadcaster, format_event_id, parse_event_id
+
+
+def parse(frame):
+    """(id, event, data) of an SSE event frame"""
+    fields = dict(line.split(": ", 1) for line in frame.strip().split("\n"))
+    return parse_event_id(fields["id"]), fields["event"], json.loads(fields["data"])
+
+
+def wedding(status):
+    return {"id": "w1", "status": "live" if status in ("live", "paused") else "scheduled",
+            "live_session": {"status": status, "pause_count": 0, "hls_playback_url": "https://cdn/w1.m3u8"}}
+
+
+async def next_frame(stream, timeout=1.0):
+    return await asyncio.wait_for(stream.__anext__(), timeout)
+
+
+async def open_stream(broadcaster, status="idle", last_event_id=None):
+    """Subscribe and consume the retry line; returns the stream and its first frame"""
+    stream = broadcaster.stream("w1", {"status": status}, broadcaster.mark("w1"), last_event_id)
+    assert (await next_frame(stream)).startswith("retry:")
+    return stream, await next_frame(stream)
+
+
+class TestWeddingEvents:
+    """Per-wedding SSE broadcaster"""
+
+    def test_transition_fans_out_to_all_subscribers(self):
+        print("\n🧪 Testing one transition fanned out to 200 subscribers...")
+        registry, broadcaster = LiveWeddingRegistry(), WeddingEventBroadcaster()
+        registry.subscribe(broadcaster._on_status_change)
+
+        async def run():
+            streams = []
+            for _ in range(200):
+                stream, snapshot = await open_stream(broadcaster)
+                assert parse(snapshot)[1:] == ("status", {"status": "idle"})
+                streams.append(stream)
+            await registry.update(wedding("waiting"))
+            await registry.update(wedding("live"))
+            received = [[parse(await next_frame(s)) for _ in range(2)] for s in streams]
+            for stream in streams:
+                await stream.aclose()
+            return received
+
+        received = asyncio.run(run())
+        assert all([event[2]["status"] for event in frames] == ["waiting", "live"] for frames in received)
+        assert all(frames == received[0] for frames in received)
+        assert received[0][1][2]["hls_playback_url"] == "https://cdn/w1.m3u8"
+        # Each transition was serialized once, however many subscribers
+        assert broadcaster.stats["events"] == 2 and broadcaster.stats["frames_queued"] == 400
+        assert broadcaster.subscriber_count("w1") == 0
+        print("✅ 2 transitions, 400 frames, 2 serializations")
+
+    def test_resume_with_last_event_id(self):
+        broadcaster = WeddingEventBroadcaster(history_size=5)
+
+        async def run():
+            stream, _ = await open_stream(broadcaster)
+            await broadcaster.publish("w1", "status", {"status": "live"}, share=False)
+            last_seen = parse(await next_frame(stream))[0]
+            await stream.aclose()
+
+            # Missed while reconnecting
+            await broadcaster.publish("w1", "camera", {"camera_id": "cam-2"}, share=False)
+            await broadcaster.publish("w1", "layout", {"theme_settings": {"layout_id": "layout_3"}}, share=False)
+            resumed, first = await open_stream(broadcaster, status="live", last_event_id=format_event_id(last_seen))
+            second = await next_frame(resumed)
+            await resumed.aclose()
+
+            # Too far behind: the missed events are no longer held
+            for i in range(6):
+                await broadcaster.publish("w1", "camera", {"camera_id": f"cam-{i}"}, share=False)
+            stale, snapshot = await open_stream(broadcaster, status="live", last_event_id=format_event_id(last_seen))
+            await stale.aclose()
+            return last_seen, first, second, snapshot
+
+        last_seen, first, second, snapshot = asyncio.run(run())
+        assert [parse(first)[1], parse(second)[1]] == ["camera", "layout"]
+        assert last_seen < parse(first)[0] < parse(second)[0]
+        assert parse(snapshot)[1:] == ("status", {"status": "live"})
+
+    def test_heartbeats_and_slow_subscribers(self):
+        broadcaster = WeddingEventBroadcaster(queue_size=2, heartbeat=0.01)
+
+        async def run():
+            idle, _ = await open_stream(broadcaster)
+            heartbeat = await next_frame(idle)
+            await idle.aclose()
+
+            slow, _ = await open_stream(broadcaster)
+            for i in range(3):
+                await broadcaster.publish("w1", "camera", {"camera_id": f"cam-{i}"}, share=False)
+            with pytest.raises(StopAsyncIteration):
+                await next_frame(slow)
+            return heartbeat
+
+        assert asyncio.run(run()) == ": heartbeat\n\n"
+        assert broadcaster.stats["dropped_subscribers"] == 1
+        assert broadcaster.subscriber_count("w1") == 0
+
+    def test_same_millisecond_on_two_workers(self, monkeypatch):
+        worker_a, worker_b = WeddingEventBroadcaster(), WeddingEventBroadcaster()
+        monkeypatch.setattr(wedding_events.time, "time", lambda: 1_700_000_000.0)
+
+        async def run():
+            stream, _ = await open_stream(worker_b)
+            # Both workers publish in the same millisecond, each hearing of the other's event afterwards
+            id_a = await worker_a.publish("w1", "camera", {"camera_id": "cam-a"}, share=False)
+            id_b = await worker_b.publish("w1", "layout", {"theme_settings": {}}, share=False)
+            worker_b._apply_worker_event({"wedding_id": "w1", "id": id_a, "event": "camera",
+                                          "data": {"camera_id": "cam-a"}})
+            frames = [parse(await next_frame(stream)) for _ in range(2)]
+            await stream.aclose()
+            return id_a, id_b, frames
+
+        id_a, id_b, frames = asyncio.run(run())
+        assert id_a[0] == id_b[0] and id_a != id_b
+        assert sorted(frame[0] for frame in frames) == sorted([id_a, id_b])
+        assert {frame[1] for frame in frames} == {"camera", "layout"}
+
+    def test_transition_seen_by_two_workers_is_announced_once(self):
+        worker_a, worker_b = WeddingEventBroadcaster(), WeddingEventBroadcaster()
+        registry_b = LiveWeddingRegistry()
+        registry_b.subscribe(worker_b._on_status_change)
+
+        async def run():
+            stream, _ = await open_stream(worker_b)
+            event_id = await worker_a.publish("w1", "status", {"status": "live"}, share=False)
+            worker_b._apply_worker_event({"wedding_id": "w1", "id": event_id, "event": "status",
+                                          "data": {"status": "live"}})
+            # Worker B's registry catches up on its next reconcile
+            await registry_b.update(wedding("live"))
+            frame = await next_frame(stream)
+            await stream.aclose()
+            return event_id, frame
+
+        event_id, frame = asyncio.run(run())
+        assert parse(frame)[:2] == (event_id, "status")
+        assert worker_b.stats["events"] == 1 and worker_b.stats["duplicates"] == 1
+
+    def test_registry_transition_reaches_other_workers(self, monkeypatch):
+        worker_a, worker_b = WeddingEventBroadcaster(), WeddingEventBroadcaster()
+        registry_a, registry_b = LiveWeddingRegistry(), LiveWeddingRegistry()
+        registry_a.subscribe(worker_a._on_status_change)
+        registry_b.subscribe(worker_b._on_status_change)
+        documents = {"w1": wedding("live")}
+
+        class FakeCollection:
+            async def find_one(self, query, projection=None):
+                return documents.get(query["id"])
+
+        class FakeDatabase:
+            weddings = FakeCollection()
+
+        # Worker A's events reach worker B (the socket manager's worker events)
+        async def publish_worker_event(name, data):
+            if name == "live_registry":
+                registry_b._apply_worker_event(data)
+            else:
+                worker_b._apply_worker_event(data)
+
+        monkeypatch.setattr(socket_service.sio.manager, "publish_worker_event", publish_worker_event)
+
+        async def run():
+            stream, _ = await open_stream(worker_b)
+            await registry_a.refresh("w1", FakeDatabase())
+            frame = await next_frame(stream)
+            await asyncio.sleep(0.01)
+            live = registry_b.get_status("w1")
+            await registry_a.remove("w1")
+            await asyncio.sleep(0.01)
+            removed = registry_b.get_status("w1")
+            idle = await next_frame(stream)
+            await stream.aclose()
+            return frame, live, removed, idle
+
+        frame, live, removed, idle = asyncio.run(run())
+        assert live == "live" and removed is None
+        assert parse(frame)[1] == "status" and parse(frame)[2]["status"] == "live"
+        assert parse(idle)[1] == "status" and parse(idle)[2]["status"] == "idle"
+        # Announced by worker A only, not again by worker B's registry
+        assert worker_b.stats["events"] == 2 and worker_b.stats["duplicates"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
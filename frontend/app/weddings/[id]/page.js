@@ -1,5 +1,5 @@
 'use client';
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { Button } from '@/components/ui/button';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Badge } from '@/components/ui/badge';
@@ -30,6 +30,7 @@ import LayoutRenderer from '@/components/LayoutRenderer';
 import CommentsSection from '@/components/CommentsSection';
 import { SocketProvider } from '@/contexts/SocketContext';
 import ErrorBoundary from '@/components/ErrorBoundary';
+import { useWeddingEvents } from '@/hooks/useWeddingEvents';
 
 function WeddingViewPageContent({ params, searchParams }) {
   const router = useRouter();
@@ -285,8 +286,25 @@ function WeddingViewPageContent({ params, searchParams }) {
     };
   }, [streamBackgroundUrl]); // FIX 2: Remove showTheme dependency - apply whenever URL exists
 
+  // Layout changes and live status transitions are pushed over SSE
+  const lastLiveStatus = useRef(null);
+  const { supported: eventsSupported } = useWeddingEvents(weddingId, {
+    layout: (data) => {
+      // { theme_settings } or { backgrounds }
+      setWedding(prev => (prev ? { ...prev, ...data } : prev));
+    },
+    status: (data) => {
+      // The stream opens with the current status; reload the wedding on later transitions
+      if (lastLiveStatus.current !== null && lastLiveStatus.current !== data.status) {
+        loadWedding();
+      }
+      lastLiveStatus.current = data.status;
+    },
+  });
+
   useEffect(() => {
-    if (!showTheme || !weddingId) return;
+    // Polling fallback for browsers without EventSource
+    if (!showTheme || !weddingId || eventsSupported) return;
     
     const interval = setInterval(async () => {
       try {
@@ -322,7 +340,7 @@ function WeddingViewPageContent({ params, searchParams }) {
     }, 10000); // Refresh every 10 seconds when theme is shown
     
     return () => clearInterval(interval);
-  }, [showTheme, weddingId, wedding]);
+  }, [showTheme, weddingId, wedding, eventsSupported]);
 
   // Listen for background update events for immediate updates (no waiting for polling)
   useEffect(() => {
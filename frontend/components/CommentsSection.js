@@ -20,16 +20,19 @@ import { useAuth } from '@/lib/auth';
 import { useSocket } from '@/contexts/SocketContext';
 import { formatDistanceToNow } from 'date-fns';
 
-function CommentItem({ comment, onReply, onLike, onDelete, onEdit, currentUserId, depth = 0 }) {
+function CommentItem({ comment, onReply, onLike, onDelete, onEdit, onLoadReplies, currentUserId, depth = 0 }) {
   const [showReplies, setShowReplies] = useState(true);
   const [isReplying, setIsReplying] = useState(false);
   const [isEditing, setIsEditing] = useState(false);
   const [editedComment, setEditedComment] = useState(comment.comment);
   const [replyText, setReplyText] = useState('');
   const [isMounted, setIsMounted] = useState(false); // Fix hydration mismatch
+  const [loadingReplies, setLoadingReplies] = useState(false);
 
   const isOwner = currentUserId === comment.user_id;
   const hasReplies = comment.replies && comment.replies.length > 0;
+  // Replies are loaded lazily: lists only carry a preview of each thread
+  const moreReplies = (comment.replies_count || 0) - (comment.replies?.length || 0);
 
   // Fix hydration mismatch
   useEffect(() => {
@@ -51,6 +54,12 @@ function CommentItem({ comment, onReply, onLike, onDelete, onEdit, currentUserId
     setIsEditing(false);
   };
 
+  const handleLoadReplies = async () => {
+    setLoadingReplies(true);
+    await onLoadReplies(comment.id, comment.replies_cursor);
+    setLoadingReplies(false);
+  };
+
   const handleCancelEdit = () => {
     setEditedComment(comment.comment);
     setIsEditing(false);
@@ -173,12 +182,24 @@ function CommentItem({ comment, onReply, onLike, onDelete, onEdit, currentUserId
                   onLike={onLike}
                   onDelete={onDelete}
                   onEdit={onEdit}
+                  onLoadReplies={onLoadReplies}
                   currentUserId={currentUserId}
                   depth={depth + 1}
                 />
               ))}
             </div>
           )}
+
+          {moreReplies > 0 && (
+            <button
+              onClick={handleLoadReplies}
+              disabled={loadingReplies}
+              className="mt-3 flex items-center gap-1 text-sm font-semibold text-rose-600 hover:text-rose-700"
+            >
+              {loadingReplies && <Loader2 className="w-3 h-3 animate-spin" />}
+              View {moreReplies} more {moreReplies === 1 ? 'reply' : 'replies'}
+            </button>
+          )}
         </div>
       </div>
     </div>
@@ -192,6 +213,8 @@ export default function CommentsSection({ weddingId }) {
   const [newComment, setNewComment] = useState('');
   const [loading, setLoading] = useState(true);
   const [submitting, setSubmitting] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const commentsEndRef = useRef(null);
 
   useEffect(() => {
@@ -207,9 +230,21 @@ export default function CommentsSection({ weddingId }) {
 
     // Listen for new comments
     socket.on('new_comment', (data) => {
-      if (data.wedding_id === weddingId) {
+      if (data.wedding_id !== weddingId) return;
+      const parentId = data.comment.parent_comment_id;
+      if (!parentId) {
         setComments((prev) => [data.comment, ...prev]);
+        return;
       }
+      // Replies go at the end of their thread (oldest first) once it is fully loaded
+      setComments((prev) => updateCommentInTree(prev, parentId, (parent) => {
+        const replies = parent.replies || [];
+        const loaded = replies.length >= (parent.replies_count || 0);
+        return {
+          replies_count: (parent.replies_count || 0) + 1,
+          replies: loaded ? [...replies, data.comment] : replies
+        };
+      }));
     });
 
     // Listen for comment likes
@@ -247,6 +282,7 @@ export default function CommentsSection({ weddingId }) {
       setLoading(true);
       const response = await api.get(`/api/comments?weddingId=${weddingId}`);
       setComments(response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       console.error('Error loading comments:', error);
       toast.error('Failed to load comments');
@@ -255,6 +291,44 @@ export default function CommentsSection({ weddingId }) {
     }
   };
 
+  const loadMoreComments = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await api.get(`/api/comments?weddingId=${weddingId}&cursor=${nextCursor}`);
+      setComments((prev) => {
+        // Comments posted live since the first page can already be in the list
+        const seen = new Set(prev.map((c) => c.id));
+        return [...prev, ...response.data.filter((c) => !seen.has(c.id))];
+      });
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Error loading comments:', error);
+      toast.error('Failed to load comments');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const loadReplies = async (commentId, cursor) => {
+    try {
+      const query = cursor ? `?cursor=${cursor}` : '';
+      const response = await api.get(`/api/comments/${commentId}/replies${query}`);
+      const repliesCursor = response.headers['x-next-cursor'] || null;
+      setComments((prev) => updateCommentInTree(prev, commentId, (comment) => {
+        // Without a cursor the first page replaces the (empty) preview
+        const base = cursor ? comment.replies || [] : [];
+        const seen = new Set(base.map((r) => r.id));
+        return {
+          replies: [...base, ...response.data.filter((r) => !seen.has(r.id))],
+          replies_cursor: repliesCursor
+        };
+      }));
+    } catch (error) {
+      console.error('Error loading replies:', error);
+      toast.error('Failed to load replies');
+    }
+  };
+
   const updateCommentLikes = (commentId, likesCount) => {
     setComments((prev) => updateCommentInTree(prev, commentId, { likes_count: likesCount }));
   };
@@ -264,16 +338,22 @@ export default function CommentsSection({ weddingId }) {
   };
 
   const removeComment = (commentId) => {
-    setComments((prev) => prev.filter(c => c.id !== commentId).map(c => ({
-      ...c,
-      replies: c.replies?.filter(r => r.id !== commentId) || []
-    })));
+    const prune = (list) => list.filter(c => c.id !== commentId).map(c => {
+      const replies = c.replies || [];
+      const remaining = prune(replies);
+      return {
+        ...c,
+        replies: remaining,
+        replies_count: Math.max((c.replies_count || 0) - (replies.length - remaining.length), 0)
+      };
+    });
+    setComments((prev) => prune(prev));
   };
 
   const updateCommentInTree = (comments, commentId, updates) => {
     return comments.map((comment) => {
       if (comment.id === commentId) {
-        return { ...comment, ...updates };
+        return { ...comment, ...(typeof updates === 'function' ? updates(comment) : updates) };
       }
       if (comment.replies && comment.replies.length > 0) {
         return {
@@ -337,8 +417,12 @@ export default function CommentsSection({ weddingId }) {
     }
 
     try {
-      await api.post(`/api/comments/${commentId}/like`);
-      // Like count will be updated via Socket.IO event
+      const response = await api.post(`/api/comments/${commentId}/like`);
+      // Other viewers get the new count via the comment_liked Socket.IO event
+      setComments((prev) => updateCommentInTree(prev, commentId, {
+        is_liked_by_user: response.data.liked,
+        likes_count: response.data.likes_count
+      }));
     } catch (error) {
       console.error('Error liking comment:', error);
       toast.error('Failed to like comment');
@@ -452,10 +536,19 @@ export default function CommentsSection({ weddingId }) {
                 onLike={handleLike}
                 onDelete={handleDelete}
                 onEdit={handleEdit}
+                onLoadReplies={loadReplies}
                 currentUserId={user?.id}
                 depth={0}
               />
             ))}
+            {nextCursor && (
+              <div className="flex justify-center pt-6">
+                <Button variant="outline" size="sm" onClick={loadMoreComments} disabled={loadingMore}>
+                  {loadingMore && <Loader2 className="w-4 h-4 mr-2 animate-spin" />}
+                  Load more comments
+                </Button>
+              </div>
+            )}
           </div>
         )}
 
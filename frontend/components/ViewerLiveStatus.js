@@ -3,19 +3,33 @@ import { useState, useEffect } from 'react';
 import { Card, CardContent } from '@/components/ui/card';
 import { Badge } from '@/components/ui/badge';
 import { Radio, Pause, Clock, Heart } from 'lucide-react';
+import { useWeddingEvents } from '@/hooks/useWeddingEvents';
 
 export default function ViewerLiveStatus({ weddingId, onStatusChange }) {
   const [liveStatus, setLiveStatus] = useState('idle');
   const [streamStartedAt, setStreamStartedAt] = useState(null);
   const [pauseCount, setPauseCount] = useState(0);
 
+  const applyStatus = (data) => {
+    setLiveStatus(data.status || 'idle');
+    setStreamStartedAt(data.stream_started_at);
+    setPauseCount(data.pause_count || 0);
+
+    if (onStatusChange) {
+      onStatusChange(data);
+    }
+  };
+
+  // Status changes are pushed; the stream opens with the current status
+  const { supported: eventsSupported } = useWeddingEvents(weddingId, { status: applyStatus });
+
   useEffect(() => {
-    if (weddingId) {
+    if (weddingId && !eventsSupported) {
       fetchStatus();
       const interval = setInterval(fetchStatus, 5000);
       return () => clearInterval(interval);
     }
-  }, [weddingId]);
+  }, [weddingId, eventsSupported]);
 
   const fetchStatus = async () => {
     try {
@@ -28,14 +42,7 @@ export default function ViewerLiveStatus({ weddingId, onStatusChange }) {
         return;
       }
       
-      const data = await response.json();
-      setLiveStatus(data.status || 'idle');
-      setStreamStartedAt(data.stream_started_at);
-      setPauseCount(data.pause_count || 0);
-      
-      if (onStatusChange) {
-        onStatusChange(data);
-      }
+      applyStatus(await response.json());
     } catch (error) {
       console.error('Error fetching status:', error);
     }
@@ -63,6 +63,14 @@ export function SocketProvider({ children, weddingId }) {
       }
     });
 
+    // Recent chat backlog, sent when we join
+    socket.on('chat_history', (data) => {
+      if (data.wedding_id === weddingId) {
+        console.log('💬 Chat history received:', data.messages.length);
+        setMessages(data.messages);
+      }
+    });
+
     // New chat messages
     socket.on('new_message', (data) => {
       if (data.wedding_id === weddingId) {
@@ -71,15 +79,24 @@ export function SocketProvider({ children, weddingId }) {
       }
     });
 
-    // New reactions
-    socket.on('new_reaction', (data) => {
+    // Reactions arrive as {emoji: count} batches, one per room per window
+    socket.on('reaction_batch', (data) => {
       if (data.wedding_id === weddingId) {
-        console.log('❤️ New reaction:', data.emoji);
-        setReactions((prev) => [...prev, data]);
+        console.log('❤️ Reactions:', data.reactions);
+        const receivedAt = Date.now();
+        // Float at most a few of each emoji - a burst would flood the overlay
+        const batch = Object.entries(data.reactions || {}).flatMap(([emoji, count]) =>
+          Array.from({ length: Math.min(count, 5) }, (_, i) => ({
+            wedding_id: data.wedding_id,
+            emoji,
+            timestamp: `${receivedAt}-${emoji}-${i}`
+          }))
+        );
+        setReactions((prev) => [...prev, ...batch]);
         
-        // Remove reaction after 3 seconds
+        // Remove reactions after 3 seconds
         setTimeout(() => {
-          setReactions((prev) => prev.filter((r) => r.timestamp !== data.timestamp));
+          setReactions((prev) => prev.filter((r) => !batch.includes(r)));
         }, 3000);
       }
     });
@@ -0,0 +1,58 @@
+import { useEffect, useRef, useState } from 'react';
+import { getApiBaseUrl } from '@/lib/config';
+
+/**
+ * useWeddingEvents Hook
+ *
+ * Subscribes to a wedding's Server-Sent Events stream
+ * (/api/weddings/{id}/events): `status`, `camera` and `layout` events.
+ * EventSource reconnects by itself and resumes with Last-Event-ID.
+ *
+ * Usage:
+ * ```js
+ * const { supported } = useWeddingEvents(weddingId, {
+ *   status: (data) => setLiveStatus(data.status),
+ *   layout: (data) => applyLayout(data),
+ * });
+ * ```
+ *
+ * @param {string} weddingId - Wedding ID
+ * @param {Object} handlers - event name -> handler(data)
+ * @returns {{ connected: boolean, supported: boolean }} supported is false
+ *   where EventSource is unavailable (callers fall back to polling)
+ */
+export function useWeddingEvents(weddingId, handlers) {
+  const handlersRef = useRef(handlers);
+  const [connected, setConnected] = useState(false);
+  const supported = typeof window === 'undefined' || typeof window.EventSource !== 'undefined';
+
+  handlersRef.current = handlers;
+
+  useEffect(() => {
+    if (!weddingId || !supported) return;
+
+    const source = new EventSource(`${getApiBaseUrl()}/api/weddings/${weddingId}/events`);
+    const listen = (event) => (message) => {
+      const handler = handlersRef.current?.[event];
+      if (!handler) return;
+      try {
+        handler(JSON.parse(message.data));
+      } catch (error) {
+        console.error(`Error handling ${event} event:`, error);
+      }
+    };
+
+    ['status', 'camera', 'layout'].forEach((event) => {
+      source.addEventListener(event, listen(event));
+    });
+    source.onopen = () => setConnected(true);
+    source.onerror = () => setConnected(false);
+
+    return () => {
+      source.close();
+      setConnected(false);
+    };
+  }, [weddingId, supported]);
+
+  return { connected, supported };
+}